@@ -3,25 +3,48 @@ API REST pour le système de recommandation de films et séries.
 Ce fichier permet d'exposer les fonctionnalités du système via une API HTTP.
 """
 
-from flask import Flask, request, jsonify, g
+from flask import Flask, request, jsonify, g, stream_with_context, send_file
 from flask_cors import CORS
 import os
 import sys
 from werkzeug.security import generate_password_hash
 import json
+import logging
+import time
 
 # Ajouter le répertoire courant au chemin pour pouvoir importer les modules
 backend_dir = os.path.dirname(os.path.abspath(__file__))
 if backend_dir not in sys.path:
     sys.path.insert(0, backend_dir)
 
+from src.logging_config import setup_logging, init_request_logging
+setup_logging()
+
 from src.recommendation_engine_v2 import modular_engine
 from models import db, User
-from src.middleware import init_auth_middleware, check_user_access, get_current_user, AuthError, handle_auth_error
+from src.middleware import (
+    init_auth_middleware, check_user_access, get_current_user, get_user_record,
+    get_current_user_record, revoke_user_session, AuthError, handle_auth_error
+)
+from src.static_data import DEFAULT_GENRES
+from src.static_assets import StaticAssets
+from src.compression import init_compression
+from src.json_codec import init_json_provider, dumps as json_dumps
+from src.batch import BatchRunner, BatchError, parse_batch
+from src.response_cache import response_key, is_cacheable, render as render_cached_response
+from src.admission import admission, Overloaded
+from src.metrics import init_metrics
+from src.tracing import init_tracing, slow_traces
+from src import profiling
 
 # Configuration des fichiers statiques pour le frontend
+# (servis par serve_frontend depuis le manifeste, pas par la route statique de Flask)
 static_folder = os.path.join(os.path.dirname(__file__), 'static')
-app = Flask(__name__, static_folder=static_folder, static_url_path='')
+app = Flask(__name__, static_folder=None)
+# jsonify et request.json via orjson (repli sur json s'il n'est pas installé)
+init_json_provider(app)
+static_assets = StaticAssets(static_folder)
+app.config['USE_X_SENDFILE'] = static_assets.offload == 'x-sendfile'
 CORS(app)  # Activer CORS pour permettre les requêtes depuis le frontend
 
 # Configuration SQLAlchemy pour MariaDB (local et serveur)
@@ -33,10 +56,33 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
     'pool_pre_ping': True,
     'pool_recycle': 300,
 }
+# Connexions simultanées à la base par worker (à augmenter en mode gevent,
+# où un worker sert des centaines de requêtes à la fois)
+if os.environ.get('DB_POOL_SIZE'):
+    app.config['SQLALCHEMY_ENGINE_OPTIONS']['pool_size'] = int(os.environ['DB_POOL_SIZE'])
+    app.config['SQLALCHEMY_ENGINE_OPTIONS']['max_overflow'] = int(os.environ.get('DB_MAX_OVERFLOW', '10'))
+
+logger = logging.getLogger(__name__)
 
 # Initialisation de la base
 db.init_app(app)
 
+# Identifiant de corrélation des logs (avant l'authentification pour couvrir ses logs)
+init_request_logging(app)
+
+# Métriques des requêtes (401 compris) et GET /metrics
+init_metrics(app)
+
+# Trace par requête et en-tête Server-Timing
+init_tracing(app)
+
+# Profilage à la demande (jeton signé X-Profile) ; enregistré après la trace
+# pour que l'artefact retrouve les appels sortants de la requête
+profiling.init_profiling(app)
+
+# Compression gzip/brotli des réponses JSON
+init_compression(app)
+
 # Initialiser le middleware d'authentification
 init_auth_middleware(app)
 
@@ -48,6 +94,97 @@ app.register_error_handler(AuthError, handle_auth_error)
 
 # Note: Les utilisateurs sont maintenant gérés par SQLAlchemy via la classe User
 
+def parse_recommendation_params(args):
+    """
+    Lit les paramètres de /api/recommendations (partagé avec le mode ASGI).
+    
+    Args:
+        args: Paramètres de la requête (mapping avec .get)
+    
+    Returns:
+        tuple: (content_type, n, streaming_services)
+    """
+    content_type = args.get('content_type', 'all')
+    n = int(args.get('n', '5'))
+    
+    # Gérer les services de streaming (format flexible)
+    streaming_services = None
+    streaming_service = args.get('streaming_service', None)
+    streaming_services_param = args.get('streaming_services', None)
+    
+    if streaming_services_param:
+        # Format moderne avec liste
+        streaming_services = streaming_services_param.split(',') if ',' in streaming_services_param else [streaming_services_param]
+    elif streaming_service:
+        # Format legacy avec service unique
+        streaming_services = streaming_service.split(',') if ',' in streaming_service else [streaming_service]
+    
+    # Vérifier les paramètres
+    if content_type not in ['all', 'movies', 'series']:
+        content_type = 'all'
+    if n < 1 or n > 20:  # Limiter le nombre de recommandations
+        n = 5
+    
+    return content_type, n, streaming_services
+
+def parse_limit_param(args):
+    """Lit le paramètre limit de /api/search et /api/trending (1 à 50, 20 par défaut)."""
+    max_results = int(args.get('limit', 20))
+    if max_results < 1 or max_results > 50:
+        max_results = 20
+    return max_results
+
+def overloaded_response(error):
+    """Réponse 503 d'une requête refusée par le contrôle d'admission."""
+    response = jsonify({
+        'error': 'Service temporairement surchargé, réessayez dans quelques secondes',
+        'retry_after': error.retry_after
+    })
+    response.status_code = 503
+    response.headers['Retry-After'] = str(error.retry_after)
+    return response
+
+def cached_json_response(key, version, build, limit):
+    """
+    Réponse JSON servie depuis le cache de réponses sérialisées.
+    
+    Args:
+        key: Route et paramètres de la requête
+        version: Version des données (modular_engine.response_version), None pour ne pas cacher
+        build: Fonction calculant les données en l'absence de réponse en cache
+        limit: Groupe du contrôle d'admission (src/admission.py) appliqué au calcul
+    
+    Returns:
+        Réponse Flask : 304 si l'ETag envoyé dans If-None-Match est à jour,
+        sinon le corps en cache (compressé selon Accept-Encoding). En cas de
+        surcharge : dernière réponse connue (périmée) ou 503 avec Retry-After.
+    """
+    cache_key = response_key(key, version)
+    entry = modular_engine.response_cache.get(cache_key) if version is not None else None
+    extra_headers = {}
+    if entry is None:
+        try:
+            with admission[limit].slot():
+                data = build()
+        except Overloaded as e:
+            entry = modular_engine.response_cache.latest(key)
+            if entry is None:
+                logger.warning("Requête refusée (surcharge)", extra={'limit': limit, 'retry_after': e.retry_after})
+                return overloaded_response(e)
+            # Mode dégradé : dernière réponse connue plutôt qu'un refus
+            admission[limit].record_stale()
+            extra_headers['X-Degraded'] = 'stale'
+        else:
+            if version is None or not is_cacheable(data):
+                return jsonify(data)
+            entry = modular_engine.response_cache.store(cache_key, version, data, base_key=key)
+    
+    status, body, headers = render_cached_response(
+        entry, request.headers.get('If-None-Match'), request.headers.get('Accept-Encoding')
+    )
+    headers.update(extra_headers)
+    return app.response_class(body, status=status, headers=headers, mimetype='application/json')
+
 # Endpoint de test simple (sans authentification)
 @app.route('/api/ping', methods=['GET'])
 def ping():
@@ -115,7 +252,7 @@ def get_user(user_id):
         if not check_user_access(user_id):
             return jsonify({'error': 'Accès non autorisé à ce compte'}), 403
         
-        user = User.query.get(user_id)
+        user = get_user_record(user_id)
         if not user:
             return jsonify({'error': 'Utilisateur non trouvé'}), 404
         
@@ -240,11 +377,7 @@ def get_genres():
     """Récupère la liste des genres disponibles."""
     try:
         # Liste de genres par défaut
-        genres = ["Action", "Aventure", "Animation", "Comédie", "Crime", 
-                 "Documentaire", "Drame", "Famille", "Fantaisie", "Histoire", 
-                 "Horreur", "Musique", "Mystère", "Romance", "Science-Fiction", 
-                 "Thriller", "Guerre", "Western"]
-        return jsonify(genres)
+        return jsonify(list(DEFAULT_GENRES))
     except Exception as e:
         return jsonify({
             'error': f'Erreur lors de la récupération des genres: {str(e)}',
@@ -264,18 +397,15 @@ def get_services():
 @app.route('/api/providers', methods=['GET'])
 def get_api_providers():
     """Récupère l'état des fournisseurs d'API disponibles."""
-    from src.api_providers.multi_api_manager import MultiAPIManager
-    api_manager = MultiAPIManager()
-    
     try:
-        # Tester tous les fournisseurs
-        provider_status = api_manager.test_all_providers()
-        available_providers = api_manager.get_available_providers()
+        # Fournisseurs testés au démarrage du worker (aucun nouvel appel réseau)
+        status = modular_engine.api_manager.get_provider_status()
         
         return jsonify({
-            'available_providers': available_providers,
-            'provider_status': provider_status,
-            'total_providers': len(api_manager.providers)
+            'available_providers': status['active_providers'],
+            'provider_status': status['provider_status'],
+            'total_providers': status['total_providers'],
+            'startup_time': status['startup_time']
         })
     except Exception as e:
         return jsonify({
@@ -284,6 +414,69 @@ def get_api_providers():
             'provider_status': {}
         }), 500
 
+@app.route('/api/admission', methods=['GET'])
+def get_admission_stats():
+    """Compteurs du contrôle d'admission de ce worker (en cours, en file, refusées)."""
+    return jsonify(admission.stats())
+
+def profiling_denied():
+    """Réponse 403 si la requête ne porte pas de jeton de profilage valide (None sinon)."""
+    if profiling.verify_token(profiling.request_token(request)) is None:
+        return jsonify({'error': 'Jeton de profilage requis (en-tête X-Profile)'}), 403
+    return None
+
+@app.route('/api/traces', methods=['GET'])
+def get_slow_traces():
+    """Traces les plus lentes de ce worker (étapes et spans), de la plus lente à la plus rapide."""
+    # Routes et paramètres des autres utilisateurs : même jeton signé que les profils
+    denied = profiling_denied()
+    if denied is not None:
+        return denied
+    try:
+        limit = int(request.args.get('limit', 20))
+        return jsonify({'traces': slow_traces.list()[:max(1, limit)]})
+    except ValueError as e:
+        return jsonify({'error': f'Paramètre invalide: {str(e)}'}), 400
+
+@app.route('/api/profiles', methods=['GET'])
+def get_profiles():
+    """Profils de requêtes enregistrés (tous workers), du plus récent au plus ancien."""
+    denied = profiling_denied()
+    if denied is not None:
+        return denied
+    return jsonify({'profiles': profiling.list_profiles()})
+
+@app.route('/api/profiles/<profile_id>', methods=['GET'])
+def get_profile(profile_id):
+    """Résumé d'un profil : durée, fonctions les plus coûteuses, appels sortants."""
+    denied = profiling_denied()
+    if denied is not None:
+        return denied
+    summary = profiling.load_profile(profile_id)
+    if summary is None:
+        return jsonify({'error': 'Profil introuvable'}), 404
+    return jsonify(summary)
+
+@app.route('/api/profiles/<profile_id>/artifact', methods=['GET'])
+def get_profile_artifact(profile_id):
+    """Artefact brut d'un profil : pstats (.prof) ou piles repliées (.collapsed)."""
+    denied = profiling_denied()
+    if denied is not None:
+        return denied
+    path = profiling.artifact_path(profile_id)
+    if path is None:
+        return jsonify({'error': 'Profil introuvable'}), 404
+    mimetype = 'application/octet-stream' if path.endswith('.prof') else 'text/plain'
+    return send_file(path, mimetype=mimetype, as_attachment=True, download_name=os.path.basename(path))
+
+@app.route('/api/status', methods=['GET'])
+def get_api_status():
+    """Statut des fournisseurs et métriques du moteur de ce worker."""
+    try:
+        return jsonify(modular_engine.get_api_status())
+    except Exception as e:
+        return jsonify({'error': f'Erreur lors de la récupération du statut: {str(e)}'}), 500
+
 @app.route('/api/recommendations/<int:user_id>', methods=['GET'])
 def get_user_recommendations(user_id):
     """Récupère des recommandations pour un utilisateur."""
@@ -292,50 +485,81 @@ def get_user_recommendations(user_id):
         if not check_user_access(user_id):
             return jsonify({'error': 'Accès non autorisé à ce compte'}), 403
         
-        content_type = request.args.get('content_type', 'all')
-        n = int(request.args.get('n', '5'))
-        
-        # Gérer les services de streaming (format flexible)
-        streaming_services = None
-        streaming_service = request.args.get('streaming_service', None)
-        streaming_services_param = request.args.get('streaming_services', None)
-        
-        if streaming_services_param:
-            # Format moderne avec liste
-            if isinstance(streaming_services_param, str):
-                streaming_services = streaming_services_param.split(',') if ',' in streaming_services_param else [streaming_services_param]
-            else:
-                streaming_services = streaming_services_param
-        elif streaming_service:
-            # Format legacy avec service unique
-            streaming_services = streaming_service.split(',') if ',' in streaming_service else [streaming_service]
-        
-        # Vérifier les paramètres
-        if content_type not in ['all', 'movies', 'series']:
-            content_type = 'all'
-        if n < 1 or n > 20:  # Limiter le nombre de recommandations
-            n = 5
-            
-        # Debug - Log des paramètres
-        print(f"🔍 DEBUG API Recommendations:")
-        print(f"  - user_id: {user_id}")
-        print(f"  - content_type: {content_type}")
-        print(f"  - n: {n}")
-        print(f"  - streaming_services: {streaming_services}")
+        content_type, n, streaming_services = parse_recommendation_params(request.args)
+        
+        logger.debug("Paramètres recommandations", extra={
+            'user_id': user_id,
+            'content_type': content_type,
+            'n': n,
+            'streaming_services': streaming_services
+        })
             
-        recommendations = modular_engine.get_recommendations(
-            user_id, 
-            n=n, 
-            content_type=content_type, 
-            streaming_services=streaming_services
+        return cached_json_response(
+            response_key('recommendations', user_id, content_type, n, ','.join(streaming_services or [])),
+            modular_engine.response_version(user_id),
+            lambda: modular_engine.get_recommendations(
+                user_id, 
+                n=n, 
+                content_type=content_type, 
+                streaming_services=streaming_services
+            ),
+            'recommendations'
         )
         
-        print(f"✅ Recommandations générées: {len(recommendations)}")
-        return jsonify(recommendations)
-        
     except Exception as e:
+        logger.exception("Erreur route recommandations")
         return jsonify({'error': f'Erreur lors de la récupération des recommandations: {str(e)}'}), 500
 
+def sse_event(event, data):
+    """Événement Server-Sent Events (une ligne data: JSON)"""
+    return b"event: " + event.encode() + b"\ndata: " + json_dumps(data) + b"\n\n"
+
+@app.route('/api/recommendations/<int:user_id>/stream', methods=['GET'])
+def stream_user_recommendations(user_id):
+    """
+    Recommandations en flux (text/event-stream) : un événement "ranking" par
+    classement provisoire, puis "complete" avec le classement final.
+    """
+    if not check_user_access(user_id):
+        return jsonify({'error': 'Accès non autorisé à ce compte'}), 403
+    
+    try:
+        content_type, n, streaming_services = parse_recommendation_params(request.args)
+    except ValueError as e:
+        return jsonify({'error': f'Paramètre invalide: {str(e)}'}), 400
+    
+    # Même limite que /api/recommendations, tenue jusqu'à la fin du flux
+    limit = admission['recommendations']
+    if not limit.acquire():
+        return overloaded_response(Overloaded(limit.name, limit.retry_after()))
+    started = time.monotonic()
+    
+    events = modular_engine.stream_recommendations(
+        user_id,
+        n=n,
+        content_type=content_type,
+        streaming_services=streaming_services
+    )
+    
+    def generate():
+        # Commentaire initial : en-têtes et premier octet envoyés sans attendre les fournisseurs
+        yield b": stream\n\n"
+        for event, data in events:
+            yield sse_event(event, data)
+    
+    response = app.response_class(
+        stream_with_context(generate()),
+        mimetype='text/event-stream',
+        headers={
+            'Cache-Control': 'no-cache',
+            # nginx : transmettre chaque événement sans le mettre en tampon
+            'X-Accel-Buffering': 'no'
+        }
+    )
+    # Appelé par le serveur à la fin du flux, même si le client s'est déconnecté
+    response.call_on_close(lambda: limit.release(time.monotonic() - started))
+    return response
+
 @app.route('/api/users/<int:user_id>/history', methods=['POST'])
 def add_to_user_history(user_id):
     """Ajoute un élément à l'historique d'un utilisateur (nouvelle route)."""
@@ -400,27 +624,58 @@ def search_content():
         
         query = request.args.get('q', '').strip()
         content_type = request.args.get('type', 'all')
-        max_results = int(request.args.get('limit', 20))
+        max_results = parse_limit_param(request.args)
         
         if not query:
             return jsonify({'error': 'Paramètre de recherche requis'}), 400
         
-        if max_results < 1 or max_results > 50:
-            max_results = 20
-        
-        results = modular_engine.search_content(
-            query=query,
-            content_type=content_type,
-            max_results=max_results
+        return cached_json_response(
+            response_key('search', query, content_type, max_results),
+            modular_engine.response_version(),
+            lambda: modular_engine.search_content(
+                query=query,
+                content_type=content_type,
+                max_results=max_results
+            ),
+            'search'
         )
         
-        return jsonify(results)
-        
     except AuthError as e:
         return jsonify({'error': str(e)}), 401
     except Exception as e:
         return jsonify({'error': f'Erreur lors de la recherche: {str(e)}'}), 500
 
+@app.route('/api/search/suggest', methods=['GET'])
+def suggest_titles():
+    """Suggestions de titres pendant la saisie (index en mémoire, sans appel aux APIs)."""
+    try:
+        # Vérifier l'authentification
+        current_user = get_current_user()
+        if not current_user:
+            return jsonify({'error': 'Authentification requise'}), 401
+
+        query = request.args.get('q', '').strip()
+        content_type = request.args.get('type', 'all')
+        try:
+            limit = int(request.args.get('limit', 8))
+        except ValueError:
+            return jsonify({'error': 'Paramètre limit invalide (entier attendu)'}), 400
+        if limit < 1 or limit > 20:
+            limit = 8
+
+        if not query:
+            return jsonify({'error': 'Paramètre de recherche requis'}), 400
+
+        return jsonify({
+            'query': query,
+            'suggestions': modular_engine.suggest_titles(query, content_type, limit)
+        })
+
+    except AuthError as e:
+        return jsonify({'error': str(e)}), 401
+    except Exception as e:
+        return jsonify({'error': f'Erreur lors des suggestions: {str(e)}'}), 500
+
 @app.route('/api/trending', methods=['GET'])
 def get_trending_content():
     """Récupère le contenu tendance."""
@@ -431,18 +686,18 @@ def get_trending_content():
             return jsonify({'error': 'Authentification requise'}), 401
         
         content_type = request.args.get('type', 'all')
-        max_results = int(request.args.get('limit', 20))
-        
-        if max_results < 1 or max_results > 50:
-            max_results = 20
-        
-        results = modular_engine.get_trending_content(
-            content_type=content_type,
-            max_results=max_results
+        max_results = parse_limit_param(request.args)
+        
+        return cached_json_response(
+            response_key('trending', content_type, max_results),
+            modular_engine.response_version(),
+            lambda: modular_engine.get_trending_content(
+                content_type=content_type,
+                max_results=max_results
+            ),
+            'trending'
         )
         
-        return jsonify(results)
-        
     except AuthError as e:
         return jsonify({'error': str(e)}), 401
     except Exception as e:
@@ -491,6 +746,34 @@ def clear_cache():
     except Exception as e:
         return jsonify({'error': f'Erreur lors du vidage du cache: {str(e)}'}), 500
 
+# Sous-requêtes de /api/batch : routes parallélisables (sans accès à la base)
+# et routes exclues (flux, lot imbriqué, frontend)
+batch_runner = BatchRunner(
+    app,
+    concurrent_endpoints=[
+        'get_user_recommendations', 'search_content', 'suggest_titles', 'get_trending_content',
+        'get_genres', 'get_services', 'get_streaming_services', 'get_api_providers',
+        'get_admission_stats', 'get_api_status', 'get_slow_traces', 'ping'
+    ],
+    excluded_endpoints=['batch', 'stream_user_recommendations'],
+    fallback_endpoint='serve_frontend'
+)
+
+@app.route('/api/batch', methods=['POST'])
+def batch():
+    """Exécute plusieurs sous-requêtes de l'API en une seule requête HTTP."""
+    try:
+        subrequests = parse_batch(request.get_json(silent=True))
+    except BatchError as e:
+        return jsonify({'error': str(e)}), 400
+    
+    try:
+        body = batch_runner.run(subrequests, {'Authorization': request.headers.get('Authorization')})
+        return app.response_class(body, mimetype='application/json')
+    except Exception as e:
+        logger.exception("Erreur route batch")
+        return jsonify({'error': f'Erreur lors de l\'exécution du lot: {str(e)}'}), 500
+
 @app.route('/api/register', methods=['POST'])
 def register():
     """Endpoint pour l'inscription des nouveaux utilisateurs."""
@@ -525,6 +808,10 @@ def register():
         db.session.add(new_user)
         db.session.commit()
 
+        # Email de bienvenue mis en file : envoyé en arrière-plan, sans bloquer l'inscription
+        from src.email_service import email_service
+        email_service.send_welcome_email(new_user.email, new_user.name)
+
         # Générer un token JWT pour cet utilisateur
         from src.auth import generate_jwt_token
         token = generate_jwt_token(new_user.id, new_user.name)
@@ -553,8 +840,8 @@ def verify_token():
         if not current_user:
             return jsonify({'error': 'Token invalide'}), 401
             
-        # Récupérer les données complètes de l'utilisateur
-        user = User.query.get(current_user['user_id'])
+        # Récupérer les données complètes de l'utilisateur (cache requête + worker)
+        user = get_current_user_record()
         if not user:
             return jsonify({'error': 'Utilisateur non trouvé'}), 404
             
@@ -572,23 +859,30 @@ def verify_token():
     except Exception as e:
         return jsonify({'error': f'Erreur lors de la vérification: {str(e)}'}), 500
 
+@app.route('/api/logout', methods=['POST'])
+def logout_user():
+    """Révoque le token JWT courant."""
+    try:
+        auth_header = request.headers.get('Authorization', '')
+        token = auth_header.split(" ")[1] if " " in auth_header else None
+        if not token or not revoke_user_session(token):
+            return jsonify({'error': 'Token invalide'}), 401
+        
+        return jsonify({'message': 'Déconnexion réussie'})
+        
+    except Exception as e:
+        db.session.rollback()
+        return jsonify({'error': f'Erreur lors de la déconnexion: {str(e)}'}), 500
+
 # ===== ROUTES POUR SERVIR LE FRONTEND =====
 @app.route('/', defaults={'path': ''})
 @app.route('/<path:path>')
 def serve_frontend(path):
     """Servir les fichiers du frontend Vue.js"""
-    from flask import send_from_directory, send_file
-    
-    static_folder = os.path.join(os.path.dirname(__file__), 'static')
-    
-    # Si le fichier existe, le servir
-    if path and os.path.exists(os.path.join(static_folder, path)):
-        return send_from_directory(static_folder, path)
-    
-    # Pour toutes les autres routes (SPA), servir index.html
-    index_path = os.path.join(static_folder, 'index.html')
-    if os.path.exists(index_path):
-        return send_file(index_path)
+    # Fichier du manifeste, ou index.html pour les routes de la SPA
+    response = static_assets.serve(path, request)
+    if response is not None:
+        return response
     
     # Fallback si pas de frontend compilé
     return jsonify({
@@ -605,6 +899,10 @@ if __name__ == '__main__':
         except Exception as e:
             print(f"❌ Erreur lors de la création des tables: {e}")
     
+    # Emails restés en file au dernier arrêt
+    from src.email_service import email_service
+    email_service.start_worker()
+    
     port = int(os.environ.get('PORT', 8000))
     debug = os.environ.get('FLASK_ENV', 'production') == 'development'
     app.run(debug=debug, host='0.0.0.0', port=port)
@@ -0,0 +1,243 @@
+"""
+ASGI entry point for the API.
+
+Les routes coûteuses (/api/recommendations/<id>, /api/search, /api/trending)
+sont servies nativement en asynchrone : pendant qu'elles attendent TMDb ou
+Watchmode, la boucle d'événements sert les autres requêtes, si bien qu'un seul
+processus peut garder des centaines d'appels fournisseurs en vol.
+Toutes les autres routes sont déléguées à l'application Flask (WSGI).
+
+Lancement :
+    gunicorn -k uvicorn.workers.UvicornWorker -w 2 asgi:application
+    uvicorn asgi:application --host 0.0.0.0 --port 8000
+"""
+
+import asyncio
+import logging
+import re
+import time
+import uuid
+from urllib.parse import parse_qs
+
+from asgiref.wsgi import WsgiToAsgi
+
+from api import app, modular_engine, parse_recommendation_params, parse_limit_param
+from src import json_codec
+from src.auth import verify_jwt_token, token_cache, hash_token
+from src.email_service import email_service
+from src.admission import Overloaded, admission
+from src.logging_config import request_id_var
+from src.metrics import http_duration, http_requests, registry
+from src.tracing import finish_trace, start_trace
+from src.response_cache import CachedResponse, response_key, is_cacheable, render
+
+logger = logging.getLogger(__name__)
+
+_RECOMMENDATIONS_PATH = re.compile(r"^/api/recommendations/(\d+)$")
+
+class AsyncAPI:
+    """Application ASGI : routes asynchrones natives + repli sur Flask"""
+
+    def __init__(self, flask_app, engine):
+        self.flask_app = flask_app
+        self.wsgi = WsgiToAsgi(flask_app)
+        self.engine = engine
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            return await self._lifespan(receive, send)
+
+        if scope["type"] == "http" and scope["method"] == "GET":
+            route, handler = self._match(scope["path"])
+            if handler is not None:
+                return await self._handle(route, handler, scope, send)
+
+        return await self.wsgi(scope, receive, send)
+
+    def _match(self, path):
+        """(endpoint Flask équivalent, pour les métriques ; handler) ou (None, None)"""
+        match = _RECOMMENDATIONS_PATH.match(path)
+        if match:
+            user_id = int(match.group(1))
+            return "get_user_recommendations", lambda user, args: self._recommendations(user, user_id, args)
+        if path == "/api/search":
+            return "search_content", self._search
+        if path == "/api/trending":
+            return "get_trending_content", self._trending
+        return None, None
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Phase post-fork du moteur (tests réseau hors de la boucle d'événements)
+                await asyncio.get_running_loop().run_in_executor(None, self.engine.start)
+                registry.start_flusher()
+                email_service.start_worker()
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await self.engine.api_manager.close_async_sessions()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+    async def _handle(self, route, handler, scope, send):
+        start = time.perf_counter()
+        headers = {key.decode("latin-1").lower(): value.decode("latin-1") for key, value in scope["headers"]}
+        request_id = headers.get("x-request-id") or uuid.uuid4().hex
+        token = request_id_var.set(request_id)
+        trace_token = start_trace(request_id, f"GET {route}")
+        status = 500
+        response_headers = []
+
+        try:
+            user = await self._authenticate(headers)
+            if isinstance(user, tuple):
+                status, body = user
+            else:
+                query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+                args = {key: values[0] for key, values in query.items()}
+                status, body, *response_headers = await handler(user, args)
+        except Exception as e:
+            logger.exception("Erreur route ASGI", extra={"path": scope["path"]})
+            status, body = 500, {"error": f"Erreur interne: {str(e)}"}
+        finally:
+            trace = finish_trace(trace_token, status)
+            request_id_var.reset(token)
+
+        extra_headers = {"Server-Timing": trace.server_timing()}
+        if response_headers:
+            extra_headers.update(response_headers[0])
+        if isinstance(body, CachedResponse):
+            # Octets en cache : ni sérialisation ni compression, 304 si l'ETag est à jour
+            status, payload, cache_headers = render(body, headers.get("if-none-match"), headers.get("accept-encoding"))
+            extra_headers.update(cache_headers)
+        else:
+            payload = json_codec.dumps(body, sort_keys=True)
+        await send({
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(payload)).encode()),
+                (b"access-control-allow-origin", b"*"),
+                (b"x-request-id", request_id.encode("latin-1")),
+            ] + [(key.lower().encode(), value.encode("latin-1")) for key, value in extra_headers.items()],
+        })
+        await send({"type": "http.response.body", "body": payload})
+        http_duration.observe(time.perf_counter() - start, route=route, method="GET")
+        http_requests.inc(route=route, method="GET", status=status)
+
+    async def _cached(self, key, version, build, limit):
+        """
+        Même logique que cached_json_response (api.py) : réponse en cache
+        (CachedResponse) ou données calculées par build() si non cachables,
+        calcul soumis au contrôle d'admission du groupe `limit`
+
+        Returns:
+            (statut, corps, en-têtes supplémentaires) ; en cas de surcharge,
+            dernière réponse connue (X-Degraded) ou 503 avec Retry-After
+        """
+        cache_key = response_key(key, version)
+        entry = self.engine.response_cache.get(cache_key) if version is not None else None
+        extra_headers = {}
+        if entry is None:
+            try:
+                async with admission[limit].async_slot():
+                    data = await build()
+            except Overloaded as e:
+                entry = self.engine.response_cache.latest(key)
+                if entry is None:
+                    logger.warning("Requête refusée (surcharge)", extra={"limit": limit, "retry_after": e.retry_after})
+                    return 503, {
+                        "error": "Service temporairement surchargé, réessayez dans quelques secondes",
+                        "retry_after": e.retry_after
+                    }, {"Retry-After": str(e.retry_after)}
+                # Mode dégradé : dernière réponse connue plutôt qu'un refus
+                admission[limit].record_stale()
+                extra_headers["X-Degraded"] = "stale"
+            else:
+                if version is None or not is_cacheable(data):
+                    return 200, data, extra_headers
+                entry = self.engine.response_cache.store(cache_key, version, data, base_key=key)
+        return 200, entry, extra_headers
+
+    async def _authenticate(self, headers):
+        """Même vérification que le middleware Flask ; retourne l'utilisateur ou (statut, erreur)"""
+        auth_header = headers.get("authorization")
+        if not auth_header:
+            return 401, {"error": "Token d'authentification manquant"}
+
+        parts = auth_header.split(" ")
+        if len(parts) < 2 or not parts[1]:
+            return 401, {"error": "Format d'autorisation invalide"}
+
+        payload = token_cache.get(hash_token(parts[1]))
+        if payload is None:
+            # Décodage et contrôle de révocation (requête SQL) hors de la boucle d'événements
+            payload = await asyncio.get_running_loop().run_in_executor(None, verify_jwt_token, parts[1])
+        if payload is None:
+            return 401, {"error": "Token invalide ou expiré"}
+
+        return {"user_id": payload["user_id"], "username": payload["username"]}
+
+    async def _recommendations(self, user, user_id, args):
+        if user["user_id"] != user_id:
+            return 403, {"error": "Accès non autorisé à ce compte"}
+
+        try:
+            content_type, n, streaming_services = parse_recommendation_params(args)
+            return await self._cached(
+                response_key("recommendations", user_id, content_type, n, ",".join(streaming_services or [])),
+                self.engine.response_version(user_id),
+                lambda: self.engine.get_recommendations_async(
+                    user_id,
+                    n=n,
+                    content_type=content_type,
+                    streaming_services=streaming_services
+                ),
+                "recommendations"
+            )
+        except Exception as e:
+            return 500, {"error": f"Erreur lors de la récupération des recommandations: {str(e)}"}
+
+    async def _search(self, user, args):
+        try:
+            query = args.get("q", "").strip()
+            content_type = args.get("type", "all")
+            max_results = parse_limit_param(args)
+
+            if not query:
+                return 400, {"error": "Paramètre de recherche requis"}
+
+            return await self._cached(
+                response_key("search", query, content_type, max_results),
+                self.engine.response_version(),
+                lambda: self.engine.search_content_async(
+                    query=query,
+                    content_type=content_type,
+                    max_results=max_results
+                ),
+                "search"
+            )
+        except Exception as e:
+            return 500, {"error": f"Erreur lors de la recherche: {str(e)}"}
+
+    async def _trending(self, user, args):
+        try:
+            content_type = args.get("type", "all")
+            max_results = parse_limit_param(args)
+
+            return await self._cached(
+                response_key("trending", content_type, max_results),
+                self.engine.response_version(),
+                lambda: self.engine.get_trending_content_async(
+                    content_type=content_type,
+                    max_results=max_results
+                ),
+                "trending"
+            )
+        except Exception as e:
+            return 500, {"error": f"Erreur lors de la récupération du contenu tendance: {str(e)}"}
+
+# Expose the application for ASGI servers
+application = AsyncAPI(app, modular_engine)
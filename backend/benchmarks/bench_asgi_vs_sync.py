@@ -0,0 +1,203 @@
+"""
+Benchmark mode synchrone (workers gunicorn "sync") contre mode ASGI
+Les fournisseurs sont remplacés par des doublures à latence fixe, pour mesurer
+uniquement le modèle de concurrence : débit et latence p50/p99 sous la même charge
+
+- sync : N workers qui traitent chacun une requête à la fois (comme gunicorn sync)
+- asgi : une seule boucle d'événements qui sert toutes les requêtes (asgi.py)
+
+Usage: python benchmarks/bench_asgi_vs_sync.py [--route search|trending] [--workers 4]
+       [--clients 200] [--requests 1000] [--latency 0.2]
+"""
+
+import argparse
+import asyncio
+import os
+import queue
+import statistics
+import sys
+import threading
+import time
+import uuid
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from api import app, modular_engine
+from asgi import application
+from src.auth import generate_jwt_token
+
+class FakeProvider:
+    """Doublure de fournisseur : mêmes méthodes (sync et async), latence simulée"""
+
+    def __init__(self, name: str, latency: float):
+        self.name = name
+        self.latency = latency
+
+    def _results(self, query: str):
+        return {"results": [
+            {
+                "id": hash((self.name, query, i)) % 10_000_000,
+                "title": f"{query} {i}",
+                "year": "2020",
+                "rating": 7.0 + (i % 3),
+                "description": "Doublure de benchmark",
+                "popularity": 100 - i,
+                "vote_count": 1000,
+                "media_type": "movie",
+                "provider": self.name,
+            }
+            for i in range(10)
+        ]}
+
+    def search_content(self, query, content_type="multi", page=1):
+        time.sleep(self.latency)
+        return self._results(query)
+
+    async def search_content_async(self, session, query, content_type="multi", page=1):
+        await asyncio.sleep(self.latency)
+        return self._results(query)
+
+    def get_trending(self, content_type="all", time_window="week"):
+        time.sleep(self.latency)
+        return self._results("trending")
+
+    async def get_trending_async(self, session, content_type="all", time_window="week"):
+        await asyncio.sleep(self.latency)
+        return self._results("trending")
+
+    def get_details(self, item_id, content_type="movie"):
+        time.sleep(self.latency)
+        return {"id": item_id, "genres": []}
+
+    async def get_details_async(self, session, item_id, content_type="movie"):
+        await asyncio.sleep(self.latency)
+        return {"id": item_id, "genres": []}
+
+def install_fake_providers(latency: float):
+    manager = modular_engine.api_manager
+    manager.providers = {
+        "TMDb": FakeProvider("TMDb", latency),
+        "Watchmode": FakeProvider("Watchmode", latency),
+    }
+    manager.active_providers = ["TMDb", "Watchmode"]
+
+def make_path(route: str) -> str:
+    if route == "search":
+        # Requête unique : jamais servie par le cache
+        return f"/api/search?q={uuid.uuid4().hex[:8]}"
+    modular_engine.clear_cache()
+    return "/api/trending?limit=10"
+
+def summarize(name, latencies, elapsed, errors):
+    latencies = sorted(latencies)
+    p99 = latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))]
+    print(f"{name:<28} {len(latencies) / elapsed:8.1f} req/s   "
+          f"p50 {statistics.median(latencies) * 1000:8.1f} ms   p99 {p99 * 1000:8.1f} ms   "
+          f"erreurs {errors}")
+
+def run_sync(route, workers, clients, total, token):
+    """N workers sync ; les requêtes des clients attendent un worker libre"""
+    pending = queue.Queue()
+    latencies = []
+    errors = [0]
+    lock = threading.Lock()
+    headers = {"Authorization": f"Bearer {token}"}
+
+    def worker():
+        client = app.test_client()
+        while True:
+            job = pending.get()
+            if job is None:
+                return
+            issued_at, done = job
+            response = client.get(make_path(route), headers=headers)
+            with lock:
+                latencies.append(time.perf_counter() - issued_at)
+                if response.status_code != 200:
+                    errors[0] += 1
+            done.set()
+
+    def client_loop(count):
+        for _ in range(count):
+            done = threading.Event()
+            pending.put((time.perf_counter(), done))
+            done.wait()
+
+    worker_threads = [threading.Thread(target=worker) for _ in range(workers)]
+    client_threads = [threading.Thread(target=client_loop, args=(total // clients,)) for _ in range(clients)]
+
+    start = time.perf_counter()
+    for t in worker_threads + client_threads:
+        t.start()
+    for t in client_threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+    for _ in worker_threads:
+        pending.put(None)
+    for t in worker_threads:
+        t.join()
+
+    summarize(f"sync ({workers} workers)", latencies, elapsed, errors[0])
+
+async def run_asgi(route, clients, total, token):
+    """Une boucle d'événements ; chaque client enchaîne ses requêtes"""
+    latencies = []
+    errors = 0
+
+    async def call(path):
+        path, _, query_string = path.partition("?")
+        scope = {
+            "type": "http", "method": "GET", "path": path,
+            "query_string": query_string.encode(),
+            "headers": [(b"authorization", f"Bearer {token}".encode())],
+        }
+        status = {}
+
+        async def receive():
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        async def send(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+
+        await application(scope, receive, send)
+        return status.get("code")
+
+    async def client_loop(count):
+        nonlocal errors
+        for _ in range(count):
+            start = time.perf_counter()
+            code = await call(make_path(route))
+            latencies.append(time.perf_counter() - start)
+            if code != 200:
+                errors += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(client_loop(total // clients) for _ in range(clients)))
+    elapsed = time.perf_counter() - start
+    await modular_engine.api_manager.close_async_sessions()
+
+    summarize("asgi (1 processus)", latencies, elapsed, errors)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--route", choices=["search", "trending"], default="search")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--clients", type=int, default=200)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    args = parser.parse_args()
+
+    install_fake_providers(args.latency)
+    token = generate_jwt_token(1, "bench")
+
+    print(f"\nRoute /api/{args.route} - {args.clients} clients, {args.requests} requêtes, "
+          f"latence fournisseur {args.latency * 1000:.0f} ms")
+    print("-" * 100)
+    run_sync(args.route, args.workers, args.clients, args.requests, token)
+    asyncio.run(run_asgi(args.route, args.clients, args.requests, token))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark mémoire des workers forkés (copy-on-write)
+Précharge l'application et un jeu de données en lecture seule (taille
+variable), forke des workers qui exécutent des collections du GC et des
+allocations comme le feraient des requêtes, puis mesure la mémoire unique
+(USS) et partagée de chaque worker, avec et sans gc.freeze()
+
+Usage: python benchmarks/bench_fork_memory.py [--workers 4] [--sizes 50000,200000]
+"""
+
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+def run_mode(freeze: bool, size: int, workers: int):
+    """Exécuté dans un sous-processus propre : préchargement, fork, mesures"""
+    from src.memory import read_memory_usage
+
+    if freeze:
+        gc.disable()
+
+    import api  # noqa: F401  (préchargement comme gunicorn)
+
+    # Données en lecture seule chargées au démarrage (catalogue, candidats...)
+    catalog = tuple(
+        (i, f"Titre {i}", 5.0 + (i % 50) / 10, ("action", "drama")[i % 2], frozenset({"netflix", "hbo"}))
+        for i in range(size)
+    )
+
+    if freeze:
+        gc.freeze()
+
+    pipes = []
+    for _ in range(workers):
+        read_fd, write_fd = os.pipe()
+        pid = os.fork()
+        if pid == 0:
+            os.close(read_fd)
+            if freeze:
+                gc.enable()
+            # Activité d'un worker : lectures des données, allocations, collections
+            total = 0.0
+            for round_ in range(20):
+                garbage = [{"round": round_, "n": n} for n in range(5000)]
+                total += sum(item[2] for item in catalog[::100])
+                del garbage
+                gc.collect()
+            os.write(write_fd, json.dumps(read_memory_usage()).encode())
+            os._exit(0)
+        os.close(write_fd)
+        pipes.append((pid, read_fd))
+
+    results = []
+    for pid, read_fd in pipes:
+        with os.fdopen(read_fd) as f:
+            results.append(json.loads(f.read()))
+        os.waitpid(pid, 0)
+    print(json.dumps(results))
+
+def main():
+    if "--child" in sys.argv:
+        _, _, freeze, size, workers = sys.argv
+        return run_mode(freeze == "1", int(size), int(workers))
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--sizes", default="50000,200000")
+    args = parser.parse_args()
+
+    print(f"\n{args.workers} workers - mémoire moyenne par worker (Ko)")
+    print("-" * 72)
+    print(f"{'Taille données':>15} {'Mode':<14} {'unique':>10} {'partagée':>10} {'RSS':>10}")
+    for size in [int(s) for s in args.sizes.split(",")]:
+        for freeze in (False, True):
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", "1" if freeze else "0", str(size), str(args.workers)],
+                capture_output=True, text=True, check=True
+            ).stdout
+            results = json.loads(output.strip().splitlines()[-1])
+            avg = {key: sum(r[key] for r in results) // len(results) for key in ("unique", "shared", "rss")}
+            mode = "gc.freeze()" if freeze else "sans gel"
+            print(f"{size:>15} {mode:<14} {avg['unique']:>10} {avg['shared']:>10} {avg['rss']:>10}")
+
+if __name__ == "__main__":
+    main()
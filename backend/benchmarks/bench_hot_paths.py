@@ -0,0 +1,257 @@
+"""
+Microbenchmarks des chemins critiques du moteur de recommandation
+Entrées synthétiques (graine fixe) de 100 à 100 000 candidats, sans appel
+réseau, pour :
+  - RecommendationScorer.calculate_item_score (avec détails TMDb)
+  - RecommendationEngine._deduplicate_results
+  - MultiAPIManager._deduplicate_and_merge (doublons entre fournisseurs)
+  - RecommendationFormatter.format_recommendation_list
+  - CacheManager.get / set
+  - GenreManager.normalize_genre
+
+Chaque cas est chronométré `--repeat` fois ; la médiane et le minimum (en
+millisecondes par appel sur toute l'entrée) sont enregistrés dans une ligne
+de base JSON, que `compare` confronte à une autre exécution. La comparaison
+porte sur le minimum, moins sensible que la médiane aux autres processus de
+la machine :
+
+Usage: python benchmarks/bench_hot_paths.py run [--sizes 100,1000,10000,100000] [--repeat 5]
+           [--only scoring,format] [--output benchmarks/baselines/hot_paths.json]
+       python benchmarks/bench_hot_paths.py compare BASE.json NOUVEAU.json [--threshold 0.15]
+           (code de sortie 1 si un cas régresse de plus de threshold)
+"""
+
+import argparse
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from src.recommendation_scoring import RecommendationScorer, RecommendationEngine
+from src.recommendation_utils import CacheManager, GenreManager, RecommendationFormatter
+from src.api_providers.multi_api_manager import MultiAPIManager
+
+DEFAULT_SIZES = (100, 1000, 10_000, 100_000)
+DEFAULT_OUTPUT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baselines", "hot_paths.json")
+SEED = 42
+
+GENRES = ["Action", "Drama", "Comedy", "Thriller", "Science Fiction", "Horror", "Romance", "Animation",
+          "Crime", "Mystery", "Documentary", "Fantasy"]
+GENRE_SPELLINGS = ["action", " Drame ", "comédie", "Sci-Fi", "science-fiction", "THRILLER", "horreur",
+                   "romance", "animation", "policier", "inconnu", "Documentaire"]
+KEYWORDS = ["space", "heist", "revenge", "friendship", "dystopia", "time travel", "robot", "family"]
+DIRECTORS = ["Denis Villeneuve", "Christopher Nolan", "Greta Gerwig", "Bong Joon-ho", "Céline Sciamma"]
+SERVICES = ["Netflix", "Amazon Prime Video", "Disney Plus", "Canal+", "Apple TV Plus"]
+
+USER_PREFERENCES = {
+    "genres_likes": ["Science Fiction", "Thriller", "Drama"],
+    "genres_dislikes": ["Horror"],
+    "keywords_likes": ["space", "time travel", "heist"],
+    "directors_likes": ["Denis Villeneuve", "Bong Joon-ho"],
+    "streaming_services": ["netflix", "canal+"],
+    "rating_min": 6.5,
+    "history": [str(i) for i in range(0, 2000, 7)],
+}
+
+# --- Données synthétiques ---
+
+def make_candidates(size: int, rng: random.Random, duplicate_ratio: float = 0.3):
+    """Candidats au format des fournisseurs ; environ duplicate_ratio de doublons (titre, année, type)"""
+    unique = max(1, int(size * (1 - duplicate_ratio)))
+    candidates = []
+    for i in range(size):
+        base = i if i < unique else rng.randrange(unique)
+        provider = "TMDb" if i < unique or rng.random() < 0.5 else "Watchmode"
+        candidates.append({
+            "id": base,
+            "title": f"Titre {base} {KEYWORDS[base % len(KEYWORDS)]}",
+            "year": str(1980 + base % 45),
+            "media_type": "movie" if base % 3 else "tv",
+            "rating": round(rng.uniform(4.0, 9.5), 1),
+            "popularity": round(rng.uniform(0.5, 900.0), 1),
+            "vote_count": rng.randrange(5, 50_000),
+            "description": f"Une histoire de {KEYWORDS[rng.randrange(len(KEYWORDS))]} " * rng.randrange(1, 6),
+            "genre_ids": rng.sample([28, 18, 35, 53, 878, 27, 10749, 16], 2),
+            "provider": provider,
+            "poster_path": f"/p{base}.jpg",
+            **({"watchmode_id": 1_000_000 + base} if provider == "Watchmode" else {}),
+        })
+    return candidates
+
+def make_details(item, rng: random.Random):
+    """Détails TMDb enrichis (genres, mots-clés, équipe, fournisseurs FR)"""
+    return {
+        "genres": [{"id": index, "name": name} for index, name in enumerate(rng.sample(GENRES, 3))],
+        "keywords": {"keywords": [{"id": index, "name": name} for index, name in enumerate(rng.sample(KEYWORDS, 4))]},
+        "credits": {"crew": [
+            {"name": rng.choice(DIRECTORS), "job": "Director"},
+            {"name": "Personne", "job": "Writer"},
+            {"name": "Autre", "job": "Producer"},
+        ]},
+        "watch/providers": {"results": {"FR": {"flatrate": [
+            {"provider_name": name} for name in rng.sample(SERVICES, 2)
+        ]}}},
+    }
+
+def make_recommendations(candidates, details):
+    return [
+        {"item": item, "detailed_info": detail, "score": 3.5 + (index % 10) / 10, "type": item["media_type"]}
+        for index, (item, detail) in enumerate(zip(candidates, details))
+    ]
+
+# --- Cas mesurés ---
+
+def build_cases(size: int):
+    """Retourne {nom: fonction sans argument} pour une taille d'entrée"""
+    rng = random.Random(SEED + size)
+    candidates = make_candidates(size, rng)
+    details = [make_details(item, rng) for item in candidates]
+    recommendations = make_recommendations(candidates, details)
+    genre_inputs = [GENRE_SPELLINGS[rng.randrange(len(GENRE_SPELLINGS))] for _ in range(size)]
+    cache_keys = [f"tmdb_details_{item['id']}_{item['media_type']}" for item in candidates]
+
+    scorer = RecommendationScorer()
+    engine = RecommendationEngine(api_manager=None, scorer=scorer)
+    manager = MultiAPIManager(tmdb_key="")
+
+    def scoring():
+        for item, detail in zip(candidates, details):
+            scorer.calculate_item_score(item, USER_PREFERENCES, detail)
+
+    def dedup_results():
+        engine._deduplicate_results(candidates)
+
+    def dedup_merge():
+        # Copies : la fusion modifie les éléments gardés
+        manager._deduplicate_and_merge([dict(item) for item in candidates])
+
+    def format_list():
+        RecommendationFormatter.format_recommendation_list(recommendations)
+
+    cache = CacheManager(cache_duration_minutes=60)
+
+    def cache_set():
+        for key, item in zip(cache_keys, candidates):
+            cache.set(key, item)
+
+    def cache_get():
+        for key in cache_keys:
+            cache.get(key)
+
+    def normalize_genre():
+        for genre in genre_inputs:
+            GenreManager.normalize_genre(genre)
+
+    cache_set()  # cache_get lit des entrées présentes
+    return {
+        "scoring": scoring,
+        "dedup_results": dedup_results,
+        "dedup_merge": dedup_merge,
+        "format": format_list,
+        "cache_set": cache_set,
+        "cache_get": cache_get,
+        "normalize_genre": normalize_genre,
+    }
+
+def measure(function, repeat: int):
+    """Durées (secondes) de `repeat` exécutions, après une exécution d'échauffement"""
+    function()
+    durations = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        durations.append(time.perf_counter() - start)
+    return durations
+
+def run(sizes, repeat: int, only=None):
+    results = {}
+    for size in sizes:
+        for name, function in build_cases(size).items():
+            if only and name not in only:
+                continue
+            durations = measure(function, repeat)
+            key = f"{name}[{size}]"
+            results[key] = {
+                "case": name,
+                "size": size,
+                "median_ms": round(statistics.median(durations) * 1000, 4),
+                "min_ms": round(min(durations) * 1000, 4),
+                "per_item_us": round(statistics.median(durations) / size * 1e6, 4),
+            }
+            print(f"{key:<28} médiane {results[key]['median_ms']:10.3f} ms   "
+                  f"min {results[key]['min_ms']:10.3f} ms   {results[key]['per_item_us']:8.3f} µs/élément")
+    return {
+        "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "repeat": repeat,
+        "results": results,
+    }
+
+def compare(base, current, threshold: float):
+    """
+    Compare deux exécutions sur leurs cas communs (durées minimales)
+
+    Returns:
+        Liste des cas en régression : (clé, minimum de base, minimum actuel, ratio)
+    """
+    regressions = []
+    for key, baseline in base["results"].items():
+        measured = current["results"].get(key)
+        if measured is None or baseline["min_ms"] <= 0:
+            continue
+        ratio = measured["min_ms"] / baseline["min_ms"]
+        flag = "RÉGRESSION" if ratio > 1 + threshold else ("amélioration" if ratio < 1 - threshold else "")
+        print(f"{key:<28} {baseline['min_ms']:10.3f} -> {measured['min_ms']:10.3f} ms   "
+              f"{(ratio - 1) * 100:+7.1f} %   {flag}")
+        if ratio > 1 + threshold:
+            regressions.append((key, baseline["min_ms"], measured["min_ms"], ratio))
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Microbenchmarks des chemins critiques")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = subparsers.add_parser("run", help="Mesure et enregistre une ligne de base JSON")
+    run_parser.add_argument("--sizes", default=",".join(str(size) for size in DEFAULT_SIZES))
+    run_parser.add_argument("--repeat", type=int, default=5)
+    run_parser.add_argument("--only", default="", help="Cas à mesurer, séparés par des virgules")
+    run_parser.add_argument("--output", default=DEFAULT_OUTPUT)
+
+    compare_parser = subparsers.add_parser("compare", help="Compare une exécution à une ligne de base")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.15,
+                                help="Ralentissement toléré (0.15 = +15 %% sur le minimum)")
+    args = parser.parse_args()
+
+    if args.command == "run":
+        sizes = [int(size) for size in args.sizes.split(",") if size]
+        only = {name for name in args.only.split(",") if name}
+        report = run(sizes, args.repeat, only)
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"Ligne de base écrite dans {args.output}")
+        return 0
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    regressions = compare(base, current, args.threshold)
+    if regressions:
+        print(f"{len(regressions)} cas en régression (seuil +{args.threshold * 100:.0f} %)")
+        return 1
+    print("Aucune régression")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
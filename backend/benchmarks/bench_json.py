@@ -0,0 +1,147 @@
+"""
+Benchmark de la sérialisation JSON sur les plus gros payloads réels
+Compare le module json standard (réglages du fournisseur par défaut de
+Flask : clés triées, ASCII échappé, séparateurs compacts) avec le codec de
+src/json_codec.py (orjson), sur :
+  - la réponse /api/trending : 20 éléments avec les détails TMDb complets
+    (credits, keywords, watch/providers) ajoutés par l'enrichissement
+  - la réponse /api/recommendations (n=20)
+  - le fichier data/users.json (écriture indentée et lecture)
+
+Usage: python benchmarks/bench_json.py [--iterations 200] [--users 500]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from src import json_codec
+
+COUNTRIES = ["FR", "BE", "CH", "CA", "US", "GB", "DE", "ES", "IT", "NL", "PT", "BR", "MX", "JP", "KR",
+             "AU", "SE", "NO", "DK", "FI", "PL", "AT", "IE", "AR", "IN"]
+
+def _person(i, job=None):
+    person = {
+        "adult": False, "gender": i % 3, "id": 10000 + i, "known_for_department": "Acting",
+        "name": f"Personne {i} Élodie", "original_name": f"Person {i}", "popularity": 12.5 + i,
+        "profile_path": f"/p{i:06d}abcdef.jpg", "credit_id": f"52fe4{i:019d}",
+    }
+    if job:
+        person.update({"department": "Directing", "job": job})
+    else:
+        person.update({"cast_id": i, "character": f"Rôle {i}", "order": i})
+    return person
+
+def tmdb_details(item_id):
+    """Détails TMDb tels que renvoyés avec append_to_response=credits,keywords,watch/providers"""
+    provider = lambda pid, name: {"logo_path": f"/logo{pid}.jpg", "provider_id": pid,
+                                  "provider_name": name, "display_priority": pid % 20}
+    return {
+        "adult": False, "backdrop_path": f"/b{item_id}.jpg", "budget": 160000000,
+        "genres": [{"id": 28, "name": "Action"}, {"id": 878, "name": "Science-Fiction"}, {"id": 12, "name": "Aventure"}],
+        "homepage": "https://example.org", "id": item_id, "imdb_id": f"tt{item_id:07d}",
+        "original_language": "en", "original_title": f"Original {item_id}",
+        "overview": "Un voleur qui s'approprie des secrets d'entreprise grâce au partage de rêves. " * 4,
+        "popularity": 83.952, "poster_path": f"/p{item_id}.jpg",
+        "production_companies": [{"id": i, "logo_path": f"/c{i}.png", "name": f"Studio {i}", "origin_country": "US"} for i in range(4)],
+        "release_date": "2010-07-15", "revenue": 825532764, "runtime": 148, "status": "Released",
+        "tagline": "Votre esprit est la scène du crime.", "title": f"Film {item_id}",
+        "vote_average": 8.365, "vote_count": 35000,
+        "credits": {
+            "cast": [_person(i) for i in range(40)],
+            "crew": [_person(100 + i, "Director" if i == 0 else "Producer") for i in range(80)],
+        },
+        "keywords": {"keywords": [{"id": i, "name": f"mot-clé {i}"} for i in range(15)]},
+        "watch/providers": {"results": {
+            country: {
+                "link": f"https://www.themoviedb.org/movie/{item_id}/watch?locale={country}",
+                "flatrate": [provider(8, "Netflix"), provider(337, "Disney Plus")],
+                "rent": [provider(2, "Apple TV"), provider(3, "Google Play Movies")],
+                "buy": [provider(2, "Apple TV"), provider(3, "Google Play Movies"), provider(10, "Amazon Video")],
+            }
+            for country in COUNTRIES
+        }},
+    }
+
+def formatted_item(item_id):
+    return {
+        "id": item_id, "title": f"Film {item_id}", "year": "2010", "rating": 8.4,
+        "description": "Un voleur qui s'approprie des secrets d'entreprise grâce au partage de rêves. " * 2,
+        "type": "movie", "score": 0.87, "provider": "TMDb",
+        "poster_url": f"https://image.tmdb.org/t/p/w500/p{item_id}.jpg",
+        "backdrop_url": f"https://image.tmdb.org/t/p/w1280/b{item_id}.jpg",
+        "genres": ["Action", "Science-Fiction", "Aventure"], "director": "Christopher Nolan",
+        "streaming_services": ["netflix", "disney"], "media_type": "movie",
+    }
+
+def trending_payload():
+    results = [dict(formatted_item(27205 + i), detailed_info=tmdb_details(27205 + i)) for i in range(20)]
+    return {"results": results, "content_type": "all", "total_results": len(results)}
+
+def recommendations_payload():
+    return [formatted_item(550 + i) for i in range(20)]
+
+def users_payload(count):
+    return [
+        {
+            "id": i, "name": f"Utilisateur {i}", "email": f"user{i}@example.org",
+            "preferences": {
+                "genres_likes": ["Action", "Comédie", "Science-Fiction"], "genres_dislikes": ["Horreur"],
+                "directors_likes": ["Christopher Nolan"], "keywords_likes": ["espace", "rêve"],
+                "rating_min": 6.5, "streaming_services": ["netflix", "prime"],
+            },
+            "history": [str(100000 + j) for j in range(200)],
+        }
+        for i in range(count)
+    ]
+
+def measure(func, iterations):
+    """Médiane en microsecondes"""
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        func()
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--iterations", type=int, default=200)
+    parser.add_argument("--users", type=int, default=500)
+    args = parser.parse_args()
+
+    trending = trending_payload()
+    recommendations = recommendations_payload()
+    users = users_payload(args.users)
+    users_file = json.dumps(users, ensure_ascii=False, indent=4).encode("utf-8")
+
+    flask_default = lambda obj: json.dumps(obj, sort_keys=True, ensure_ascii=True, separators=(",", ":")).encode()
+    cases = [
+        ("trending (dumps)", trending,
+         lambda: flask_default(trending), lambda: json_codec.dumps(trending, sort_keys=True)),
+        ("recommandations (dumps)", recommendations,
+         lambda: flask_default(recommendations), lambda: json_codec.dumps(recommendations, sort_keys=True)),
+        ("users.json (écriture)", users,
+         lambda: json.dumps(users, ensure_ascii=False, indent=4).encode("utf-8"),
+         lambda: json_codec.dumps(users, indent=True)),
+        ("users.json (lecture)", users,
+         lambda: json.loads(users_file), lambda: json_codec.loads(users_file)),
+    ]
+
+    print(f"Codec : {json_codec.backend_name()} - {args.iterations} itérations, médianes\n")
+    print(f"{'payload':<26} {'taille':>9} {'json':>11} {'codec':>11} {'gain':>7}")
+    for name, payload, baseline, fast in cases:
+        size = len(flask_default(payload))
+        baseline_us = measure(baseline, args.iterations)
+        fast_us = measure(fast, args.iterations)
+        print(f"{name:<26} {size // 1024:>6} Ko {baseline_us:>8.0f} µs {fast_us:>8.0f} µs {baseline_us / fast_us:>6.1f}x")
+
+if __name__ == "__main__":
+    main()
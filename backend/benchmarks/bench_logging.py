@@ -0,0 +1,105 @@
+"""
+Benchmark du coût du logging sur le chemin critique d'une requête
+Compare les print() synchrones d'origine (middleware + route recommandations)
+avec le logging structuré asynchrone, avec et sans DEBUG activé
+
+Usage: python benchmarks/bench_logging.py [--iterations 20000]
+"""
+
+import argparse
+import contextlib
+import io
+import logging
+import os
+import sys
+import threading
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from src.logging_config import setup_logging, request_id_var
+
+class _SlowStream(io.TextIOBase):
+    """Flux simulant un stdout redirigé vers journald/un pipe (écriture bloquante, GIL relâché)"""
+
+    def write(self, s):
+        time.sleep(20e-6)
+        return len(s)
+
+    def flush(self):
+        pass
+
+def hot_path_print(user_id):
+    """Reproduit les print() d'origine d'une requête /api/recommendations"""
+    print(f"[MIDDLEWARE] Requête: GET /api/recommendations/{user_id}")
+    print(f"[MIDDLEWARE] Route API nécessitant authentification: /api/recommendations/{user_id}")
+    print(f"🔍 DEBUG API Recommendations:")
+    print(f"  - user_id: {user_id}")
+    print(f"  - content_type: all")
+    print(f"  - n: 5")
+    print(f"  - streaming_services: None")
+    print(f"✅ Recommandations générées: 5")
+
+def hot_path_logging(logger, user_id):
+    """Même chemin avec le logging structuré"""
+    logger.debug("Requête reçue", extra={"method": "GET", "path": f"/api/recommendations/{user_id}"})
+    logger.debug("Paramètres recommandations", extra={
+        "user_id": user_id, "content_type": "all", "n": 5, "streaming_services": None
+    })
+    logger.debug("Recommandations générées", extra={"count": 5})
+
+def measure(fn, iterations, threads=1):
+    """Retourne le coût moyen par appel en microsecondes"""
+    per_thread = iterations // threads
+
+    def run():
+        for i in range(per_thread):
+            fn(i)
+
+    workers = [threading.Thread(target=run) for _ in range(threads)]
+    start = time.perf_counter()
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join()
+    return (time.perf_counter() - start) / (per_thread * threads) * 1e6
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=20000)
+    parser.add_argument("--threads", type=int, default=4)
+    args = parser.parse_args()
+
+    logger = logging.getLogger("bench.hot_path")
+    request_id_var.set("bench")
+    results = {}
+
+    for threads in (1, args.threads):
+        sink = _SlowStream()
+        with contextlib.redirect_stdout(sink):
+            results[f"print x8 ({threads} thread(s))"] = measure(hot_path_print, args.iterations, threads)
+
+        handler = setup_logging(level="INFO", module_levels={}, stream=_SlowStream())
+        results[f"logging INFO, debug ignoré ({threads} thread(s))"] = measure(
+            lambda i: hot_path_logging(logger, i), args.iterations, threads)
+        handler.flush(timeout=30)
+
+        handler = setup_logging(level="DEBUG", module_levels={}, debug_sample_rate=0.1, stream=_SlowStream())
+        results[f"logging DEBUG échantillonné 10% ({threads} thread(s))"] = measure(
+            lambda i: hot_path_logging(logger, i), args.iterations, threads)
+        handler.flush(timeout=30)
+
+        handler = setup_logging(level="DEBUG", module_levels={}, debug_sample_rate=1.0, stream=_SlowStream())
+        results[f"logging DEBUG complet ({threads} thread(s))"] = measure(
+            lambda i: hot_path_logging(logger, i), args.iterations, threads)
+        handler.flush(timeout=30)
+
+    print(f"\nCoût du logging par requête ({args.iterations} requêtes simulées)")
+    print("-" * 60)
+    for name, micros in results.items():
+        print(f"{name:<50} {micros:8.2f} µs")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Benchmark hors ligne du pipeline de recommandation complet (cassettes)
+`record` exécute le pipeline une fois par utilisateur contre les vrais
+fournisseurs (ou le serveur de substitution, TMDB_BASE_URL=...) et enregistre
+chaque réponse dans les cassettes (src/api_providers/cassettes.py).
+`run` rejoue ensuite ces réponses sans réseau : recherches, tendances et
+détails ont leur taille réelle, seule la latence est contrôlée (--latency :
+0 = aucune, 1 = latence enregistrée). Le cache des résultats est vidé avant
+chaque passe pour mesurer le pipeline entier.
+
+Les utilisateurs viennent de USERS_FILE (défaut: data/users.json).
+
+Usage: python benchmarks/bench_pipeline.py record [--users 1,2,3] [--cassettes DOSSIER]
+       python benchmarks/bench_pipeline.py run [--users 1,2,3] [--repeat 5] [--latency 0] [--async]
+           [--cassettes DOSSIER]
+"""
+
+import argparse
+import asyncio
+import os
+import statistics
+import sys
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+def percentile(values, fraction: float) -> float:
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def main():
+    parser = argparse.ArgumentParser(description="Pipeline de recommandation rejoué depuis les cassettes")
+    parser.add_argument("command", choices=("record", "run"))
+    parser.add_argument("--users", default="", help="Ids séparés par des virgules (défaut: tous)")
+    parser.add_argument("--count", type=int, default=10, help="Recommandations par utilisateur")
+    parser.add_argument("--repeat", type=int, default=5, help="Passes (run)")
+    parser.add_argument("--latency", type=float, default=0.0, help="Facteur de la latence enregistrée (run)")
+    parser.add_argument("--async", dest="use_async", action="store_true", help="Pipeline asynchrone (ASGI)")
+    parser.add_argument("--cassettes", help="Dossier des cassettes (défaut: PROVIDER_CASSETTE_DIR)")
+    args = parser.parse_args()
+
+    # Lu à l'import des fournisseurs : à fixer avant
+    os.environ["PROVIDER_CASSETTES"] = "record" if args.command == "record" else "replay"
+    os.environ["PROVIDER_CASSETTE_LATENCY"] = str(args.latency)
+    if args.cassettes:
+        os.environ["PROVIDER_CASSETTE_DIR"] = args.cassettes
+
+    from src.api_providers.cassettes import get_store
+    from src.recommendation_engine_v2 import modular_engine as engine
+
+    engine.start()
+    user_ids = [int(user_id) for user_id in args.users.split(",") if user_id] or \
+        [user["id"] for user in engine.users]
+    store = get_store()
+    print(f"Cassettes : {store.directory} ({os.environ['PROVIDER_CASSETTES']}), {len(user_ids)} utilisateurs")
+
+    def recommend(user_id):
+        if args.use_async:
+            return asyncio.run(engine.get_recommendations_async(user_id, args.count))
+        return engine.get_recommendations(user_id, args.count)
+
+    passes = 1 if args.command == "record" else args.repeat
+    latencies = []
+    pass_durations = []
+    empty = 0
+    for _ in range(passes):
+        engine.cache_manager.clear()
+        pass_start = time.perf_counter()
+        for user_id in user_ids:
+            start = time.perf_counter()
+            if not recommend(user_id):
+                empty += 1
+            latencies.append(time.perf_counter() - start)
+        pass_durations.append(time.perf_counter() - pass_start)
+
+    stats = store.stats
+    if args.command == "record":
+        print(f"{stats['recorded']} réponses enregistrées en {pass_durations[0]:.1f} s")
+    else:
+        print(f"{len(latencies)} recommandations : p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+              f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, "
+              f"passe médiane {statistics.median(pass_durations):.2f} s")
+        print(f"Cassettes rejouées : {stats['hits']} ({stats['replayed_bytes'] / 1e6:.1f} Mo), "
+              f"absentes : {stats['misses']}")
+    if empty:
+        print(f"⚠️ {empty} réponses vides (cassettes manquantes ou fournisseurs en erreur)")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
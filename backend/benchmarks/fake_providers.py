@@ -0,0 +1,391 @@
+"""
+Serveur de substitution des API TMDb et Watchmode (tests de charge)
+Répond aux endpoints utilisés par src/api_providers avec des données
+synthétiques déterministes (mêmes paramètres, même réponse) et une latence
+réaliste : loi log-normale de médiane --latency et de dispersion --jitter,
+plus lente pour les détails (réponses volumineuses). Un taux d'erreurs 500
+et de timeouts peut être injecté.
+
+Avec --catalog (fichier catalog.jsonl de benchmarks/generate_data.py), les
+réponses viennent du catalogue généré : recherche par mots du titre (index
+inversé, résultats par popularité décroissante), tendances = titres les plus
+populaires, discover filtré par genre, détails et disponibilités du titre.
+
+L'application est pointée vers ce serveur par variables d'environnement :
+    TMDB_BASE_URL=http://127.0.0.1:8900/tmdb/3
+    WATCHMODE_BASE_URL=http://127.0.0.1:8900/watchmode/v1
+
+Usage: python benchmarks/fake_providers.py [--port 8900] [--latency 0.12] [--jitter 0.5]
+       [--error-rate 0.0] [--timeout-rate 0.0] [--catalog /tmp/whattowatch-data/catalog.jsonl]
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import sys
+import zlib
+
+from aiohttp import web
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from bench_json import tmdb_details as tmdb_details_payload
+
+# Latence relative par type d'endpoint (médiane = --latency x facteur)
+LATENCY_FACTORS = {"search": 1.0, "list": 1.0, "details": 1.6, "sources": 0.8, "static": 0.3}
+
+TMDB_GENRES = [(28, "Action"), (12, "Aventure"), (16, "Animation"), (35, "Comédie"), (80, "Crime"),
+               (99, "Documentaire"), (18, "Drame"), (10751, "Familial"), (14, "Fantastique"),
+               (27, "Horreur"), (9648, "Mystère"), (10749, "Romance"), (878, "Science-Fiction"),
+               (53, "Thriller")]
+# Genres supplémentaires des catalogues générés
+GENRE_NAMES = {**dict(TMDB_GENRES), 10765: "Science-Fiction & Fantastique", 10752: "Guerre", 37: "Western",
+               10402: "Musique", 36: "Histoire"}
+WATCHMODE_SOURCES = ["Netflix", "Disney+", "Amazon Prime", "HBO Max", "Apple TV+", "Paramount+"]
+WORDS = ["nuit", "dernier", "ombre", "voyage", "cité", "secret", "étoile", "retour", "froid", "empire",
+         "mémoire", "rivière", "silence", "héritage", "frontière", "orage"]
+
+def _rng(*parts) -> random.Random:
+    """Générateur dépendant uniquement des paramètres de la requête"""
+    return random.Random(zlib.crc32("|".join(str(part) for part in parts).encode()))
+
+def tmdb_item(rng: random.Random, media_type: str, query: str = ""):
+    item_id = rng.randrange(1, 900_000)
+    title = " ".join([query] + rng.sample(WORDS, 2)).strip().capitalize()
+    date = f"{rng.randrange(1970, 2026)}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}"
+    item = {
+        "id": item_id,
+        "media_type": media_type,
+        "overview": f"{title} : " + " ".join(rng.choices(WORDS, k=30)),
+        "poster_path": f"/p{item_id}.jpg",
+        "backdrop_path": f"/b{item_id}.jpg",
+        "genre_ids": [genre for genre, _ in rng.sample(TMDB_GENRES, 3)],
+        "popularity": round(rng.lognormvariate(3, 1.2), 3),
+        "vote_average": round(rng.uniform(4.5, 9.0), 1),
+        "vote_count": rng.randrange(10, 40_000),
+        "original_language": rng.choice(["fr", "en", "ko", "ja", "es"]),
+    }
+    if media_type == "tv":
+        item.update({"name": title, "first_air_date": date})
+    else:
+        item.update({"title": title, "release_date": date})
+    return item
+
+def tmdb_page(key, query: str = "", media_type: str = "multi", count: int = 20):
+    rng = _rng(*key)
+    results = [
+        tmdb_item(rng, media_type if media_type in ("movie", "tv") else rng.choice(["movie", "tv"]), query)
+        for _ in range(count)
+    ]
+    return {"page": 1, "results": results, "total_pages": 25, "total_results": 500}
+
+def watchmode_title(rng: random.Random, query: str = ""):
+    title_id = rng.randrange(1_000_000, 4_000_000)
+    return {
+        "id": title_id,
+        "name": " ".join([query] + rng.sample(WORDS, 2)).strip().capitalize(),
+        "type": rng.choice(["movie", "tv_series"]),
+        "year": rng.randrange(1970, 2026),
+        "imdb_id": f"tt{rng.randrange(1_000_000, 9_999_999)}",
+        "tmdb_id": rng.randrange(1, 900_000),
+        "tmdb_type": "movie",
+        "user_rating": round(rng.uniform(4.0, 9.0), 1),
+        "relevance_percentile": round(rng.uniform(10, 99), 2),
+        "plot_overview": " ".join(rng.choices(WORDS, k=25)),
+        "genre_names": [name for _, name in rng.sample(TMDB_GENRES, 2)],
+    }
+
+class Catalog:
+    """Catalogue généré chargé en mémoire, avec index de recherche et listes par popularité"""
+
+    PAGE_SIZE = 20
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            items = [json.loads(line) for line in f if line.strip()]
+        # Toutes les listes sont dans l'ordre de popularité décroissante
+        items.sort(key=lambda item: -item["popularity"])
+        self.items = items
+        self.by_id = {item["id"]: item for item in items}
+        self.by_watchmode_id = {item["watchmode_id"]: item for item in items}
+        # Mot du titre -> positions dans self.items (donc par popularité décroissante)
+        self.tokens = {}
+        self._token_sets = {}
+        self.by_genre = {}
+        self.by_media_type = {"movie": [], "tv": []}
+        for position, item in enumerate(items):
+            for token in set(item["title"].lower().split()):
+                self.tokens.setdefault(token, []).append(position)
+            for genre_id in item["genre_ids"]:
+                self.by_genre.setdefault((item["media_type"], genre_id), []).append(item)
+            self.by_media_type[item["media_type"]].append(item)
+
+    def _token_set(self, token: str):
+        if token not in self._token_sets:
+            self._token_sets[token] = frozenset(self.tokens.get(token, ()))
+        return self._token_sets[token]
+
+    def search(self, query: str, media_type: str = "multi"):
+        """Titres contenant tous les mots de la requête"""
+        tokens = sorted(set(query.lower().split()), key=lambda token: len(self.tokens.get(token, ())))
+        if not tokens:
+            return []
+        others = [self._token_set(token) for token in tokens[1:]]
+        items = (self.items[position] for position in self.tokens.get(tokens[0], ())
+                 if all(position in other for other in others))
+        if media_type in ("movie", "tv"):
+            return [item for item in items if item["media_type"] == media_type]
+        return list(items)
+
+    def discover(self, media_type: str, genres: str = ""):
+        genre_ids = [int(genre) for genre in genres.replace("|", ",").split(",") if genre.strip().isdigit()]
+        if not genre_ids:
+            return self.by_media_type.get(media_type, [])
+        candidates = self.by_genre.get((media_type, genre_ids[0]), [])
+        return [item for item in candidates if all(genre in item["genre_ids"] for genre in genre_ids[1:])]
+
+    def trending(self, media_type: str):
+        if media_type in self.by_media_type:
+            return self.by_media_type[media_type]
+        return self.items
+
+    @classmethod
+    def page(cls, items, page: str = "1"):
+        number = max(1, int(page)) if str(page).isdigit() else 1
+        start = (number - 1) * cls.PAGE_SIZE
+        return {
+            "page": number,
+            "results": [tmdb_result(item) for item in items[start:start + cls.PAGE_SIZE]],
+            "total_pages": max(1, math.ceil(len(items) / cls.PAGE_SIZE)),
+            "total_results": len(items),
+        }
+
+def tmdb_result(item):
+    """Élément de liste TMDb (recherche, tendances, discover) d'un titre du catalogue"""
+    result = {
+        "id": item["id"], "media_type": item["media_type"], "overview": item["overview"],
+        "poster_path": f"/p{item['id']}.jpg", "backdrop_path": f"/b{item['id']}.jpg",
+        "genre_ids": item["genre_ids"], "popularity": item["popularity"],
+        "vote_average": item["vote_average"], "vote_count": item["vote_count"],
+        "original_language": item["original_language"],
+    }
+    if item["media_type"] == "tv":
+        result.update({"name": item["title"], "first_air_date": item["release_date"]})
+    else:
+        result.update({"title": item["title"], "release_date": item["release_date"]})
+    return result
+
+def catalog_details(item):
+    """Détails TMDb (credits, keywords, watch/providers) d'un titre du catalogue"""
+    details = tmdb_details_payload(item["id"])
+    details.update({key: value for key, value in tmdb_result(item).items() if key not in ("genre_ids", "media_type")})
+    details["imdb_id"] = item["imdb_id"]
+    details["genres"] = [{"id": genre, "name": GENRE_NAMES.get(genre, "Autre")} for genre in item["genre_ids"]]
+    details["credits"]["crew"] = (
+        [{"id": index, "name": name, "job": "Director"} for index, name in enumerate(item["directors"])]
+        + [member for member in details["credits"]["crew"] if member["job"] != "Director"]
+    )
+    details["keywords"] = {"keywords": [{"id": index, "name": name} for index, name in enumerate(item["keywords"])]}
+    details["watch/providers"]["results"]["FR"]["flatrate"] = [
+        {"logo_path": f"/logo{index}.jpg", "provider_id": index, "provider_name": name, "display_priority": index}
+        for index, name in enumerate(item["providers"])
+    ]
+    if item["media_type"] == "tv":
+        details["created_by"] = [{"id": 1, "name": item["directors"][0]}]
+    return details
+
+def catalog_watchmode_title(item):
+    return {
+        "id": item["watchmode_id"], "name": item["title"],
+        "type": "tv_series" if item["media_type"] == "tv" else "movie",
+        "year": int(item["release_date"][:4]), "imdb_id": item["imdb_id"], "tmdb_id": item["id"],
+        "tmdb_type": item["media_type"], "user_rating": item["vote_average"],
+        "relevance_percentile": round(min(99.9, item["popularity"] / 20), 2),
+        "plot_overview": item["overview"],
+        "genre_names": [GENRE_NAMES.get(genre, "Autre") for genre in item["genre_ids"]],
+    }
+
+class FakeProviders:
+    """Application aiohttp ; compteurs d'appels par endpoint consultables sur /_stats"""
+
+    def __init__(self, latency: float, jitter: float, error_rate: float = 0.0, timeout_rate: float = 0.0,
+                 seed: int = 0, catalog: Catalog = None):
+        self.catalog = catalog
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.timeout_rate = timeout_rate
+        self.random = random.Random(seed)
+        self.calls = {}
+
+    async def _delay(self, kind: str, label: str):
+        """Latence simulée ; lève une erreur HTTP injectée le cas échéant"""
+        self.calls[label] = self.calls.get(label, 0) + 1
+        roll = self.random.random()
+        if roll < self.timeout_rate:
+            # Plus long que le timeout des fournisseurs (10 s)
+            await asyncio.sleep(15)
+        median = self.latency * LATENCY_FACTORS[kind]
+        if median > 0:
+            await asyncio.sleep(median * math.exp(self.random.gauss(0, self.jitter)))
+        if roll > 1 - self.error_rate:
+            raise web.HTTPInternalServerError(text='{"status_message": "Erreur simulée"}',
+                                              content_type="application/json")
+
+    # --- TMDb ---
+
+    async def tmdb_configuration(self, request):
+        await self._delay("static", "tmdb /configuration")
+        return web.json_response({"images": {"base_url": "http://image.tmdb.org/t/p/"}})
+
+    async def tmdb_search(self, request):
+        await self._delay("search", "tmdb /search")
+        query = request.query.get("query", "")
+        media_type = request.match_info["media_type"]
+        if self.catalog:
+            return web.json_response(Catalog.page(self.catalog.search(query, media_type),
+                                                  request.query.get("page", "1")))
+        return web.json_response(tmdb_page(("search", media_type, query, request.query.get("page", "1")),
+                                           query, media_type))
+
+    async def tmdb_trending(self, request):
+        await self._delay("list", "tmdb /trending")
+        media_type = request.match_info["media_type"]
+        if self.catalog:
+            return web.json_response(Catalog.page(self.catalog.trending(media_type), request.query.get("page", "1")))
+        return web.json_response(tmdb_page(("trending", media_type, request.match_info["window"]),
+                                           media_type=media_type))
+
+    async def tmdb_discover(self, request):
+        await self._delay("list", "tmdb /discover")
+        media_type = request.match_info["media_type"]
+        if self.catalog:
+            items = self.catalog.discover(media_type, request.query.get("with_genres", ""))
+            return web.json_response(Catalog.page(items, request.query.get("page", "1")))
+        return web.json_response(tmdb_page(("discover", media_type, sorted(request.query.items())),
+                                           media_type=media_type))
+
+    async def tmdb_genres(self, request):
+        await self._delay("static", "tmdb /genre/list")
+        return web.json_response({"genres": [{"id": genre, "name": name} for genre, name in TMDB_GENRES]})
+
+    async def tmdb_details(self, request):
+        await self._delay("details", "tmdb /{type}/{id}")
+        item_id = int(request.match_info["item_id"])
+        if self.catalog:
+            item = self.catalog.by_id.get(item_id)
+            if item is None:
+                raise web.HTTPNotFound(text='{"status_message": "Titre inconnu"}', content_type="application/json")
+            return web.json_response(catalog_details(item))
+        details = tmdb_details_payload(item_id)
+        if request.match_info["media_type"] == "tv":
+            details["name"] = details.pop("title")
+            details["created_by"] = [{"id": 1, "name": "Créatrice Synthétique"}]
+        return web.json_response(details)
+
+    # --- Watchmode ---
+
+    async def watchmode_regions(self, request):
+        await self._delay("static", "watchmode /regions")
+        return web.json_response([{"country": "FR", "name": "France"}, {"country": "US", "name": "United States"}])
+
+    async def watchmode_search(self, request):
+        await self._delay("search", "watchmode /search")
+        query = request.query.get("search_value", "")
+        if self.catalog:
+            items = self.catalog.search(query)[:10]
+            return web.json_response({"title_results": [catalog_watchmode_title(item) for item in items]})
+        rng = _rng("watchmode-search", query)
+        return web.json_response({"title_results": [watchmode_title(rng, query) for _ in range(10)]})
+
+    async def watchmode_list_titles(self, request):
+        await self._delay("list", "watchmode /list-titles")
+        if self.catalog:
+            titles = [catalog_watchmode_title(item) for item in self.catalog.items[:50]]
+            return web.json_response({"titles": titles, "page": 1, "total_results": len(titles), "total_pages": 1})
+        rng = _rng("watchmode-list", sorted(request.query.items()))
+        return web.json_response({"titles": [watchmode_title(rng) for _ in range(50)], "page": 1,
+                                  "total_results": 50, "total_pages": 1})
+
+    async def watchmode_details(self, request):
+        await self._delay("details", "watchmode /title/{id}/details")
+        if self.catalog:
+            item = self.catalog.by_watchmode_id.get(int(request.match_info["item_id"]))
+            if item is None:
+                raise web.HTTPNotFound(text='{"success": false}', content_type="application/json")
+            return web.json_response(catalog_watchmode_title(item))
+        return web.json_response(watchmode_title(_rng("watchmode-title", request.match_info["item_id"])))
+
+    async def watchmode_sources(self, request):
+        await self._delay("sources", "watchmode /title/{id}/sources")
+        rng = _rng("watchmode-sources", request.match_info["item_id"])
+        item = self.catalog.by_watchmode_id.get(int(request.match_info["item_id"])) if self.catalog else None
+        if item is not None:
+            sources = [
+                {"source_id": index, "name": name, "type": "subscription",
+                 "region": request.query.get("regions", "FR"), "web_url": f"https://example.org/{index}"}
+                for index, name in enumerate(item["providers"])
+            ]
+            return web.json_response({"sources": sources})
+        sources = [
+            {"source_id": index, "name": name, "type": rng.choice(["subscription", "rent", "buy"]),
+             "region": request.query.get("regions", "FR"), "web_url": f"https://example.org/{index}"}
+            for index, name in enumerate(rng.sample(WATCHMODE_SOURCES, rng.randrange(1, 4)))
+        ]
+        return web.json_response({"sources": sources})
+
+    async def watchmode_genres(self, request):
+        await self._delay("static", "watchmode /genres")
+        return web.json_response([{"id": genre, "name": name} for genre, name in TMDB_GENRES])
+
+    async def stats(self, request):
+        return web.json_response(self.calls)
+
+    def application(self) -> web.Application:
+        app = web.Application()
+        app.add_routes([
+            web.get("/tmdb/3/configuration", self.tmdb_configuration),
+            web.get("/tmdb/3/search/{media_type}", self.tmdb_search),
+            web.get("/tmdb/3/trending/{media_type}/{window}", self.tmdb_trending),
+            web.get("/tmdb/3/discover/{media_type}", self.tmdb_discover),
+            web.get("/tmdb/3/genre/{media_type}/list", self.tmdb_genres),
+            web.get(r"/tmdb/3/{media_type}/{item_id:\d+}", self.tmdb_details),
+            web.get("/watchmode/v1/regions/", self.watchmode_regions),
+            web.get("/watchmode/v1/search/", self.watchmode_search),
+            web.get("/watchmode/v1/list-titles/", self.watchmode_list_titles),
+            web.get(r"/watchmode/v1/title/{item_id:\d+}/details/", self.watchmode_details),
+            web.get(r"/watchmode/v1/title/{item_id:\d+}/sources/", self.watchmode_sources),
+            web.get("/watchmode/v1/genres/", self.watchmode_genres),
+            web.get("/_stats", self.stats),
+        ])
+        return app
+
+def provider_environment(host: str, port: int):
+    """Variables d'environnement qui pointent l'application vers le serveur de substitution"""
+    return {
+        "TMDB_BASE_URL": f"http://{host}:{port}/tmdb/3",
+        "WATCHMODE_BASE_URL": f"http://{host}:{port}/watchmode/v1",
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Serveur de substitution TMDb / Watchmode")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8900)
+    parser.add_argument("--latency", type=float, default=0.12, help="Latence médiane en secondes")
+    parser.add_argument("--jitter", type=float, default=0.5, help="Dispersion log-normale de la latence")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Proportion de réponses 500")
+    parser.add_argument("--timeout-rate", type=float, default=0.0, help="Proportion de réponses après 15 s")
+    parser.add_argument("--catalog", help="Catalogue généré (catalog.jsonl de generate_data.py)")
+    args = parser.parse_args()
+
+    catalog = Catalog(args.catalog) if args.catalog else None
+    providers = FakeProviders(args.latency, args.jitter, args.error_rate, args.timeout_rate, catalog=catalog)
+    web.run_app(providers.application(), host=args.host, port=args.port, print=None, access_log=None)
+
+if __name__ == "__main__":
+    main()
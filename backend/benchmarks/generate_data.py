@@ -0,0 +1,359 @@
+"""
+Générateur de données synthétiques à grande échelle (utilisateurs et catalogue)
+Produit, en flux (mémoire bornée, jusqu'à 1M d'utilisateurs et 500k titres) :
+  - catalog.jsonl : M titres au format TMDb (titre, dates, genre_ids,
+    popularité en loi de puissance, notes, réalisateurs, mots-clés,
+    fournisseurs de streaming FR, identifiants Watchmode/IMDb) ;
+  - users.jsonl : N utilisateurs (ids 1..N) aux préférences réalistes :
+    genres de GenreManager.GENRE_VARIATIONS (écrits avec leurs variantes,
+    les plus populaires plus souvent), services de STREAMING_SERVICES (parts
+    de marché), mots-clés et réalisateurs en loi de Zipf, note minimale, et
+    historique de visionnage en loi de puissance (quelques gros
+    utilisateurs, beaucoup de petits ; titres populaires surreprésentés).
+
+Chargements optionnels :
+  --load-db       utilisateurs insérés par lots dans la base (DATABASE_URL),
+                  tous avec le mot de passe --password (un seul hachage) ;
+  --users-file    profils au format de data/users.json (USERS_FILE du moteur) ;
+  --publish-catalog  caractéristiques du catalogue publiées dans le segment
+                  partagé (src/catalog_store.py, CATALOG_PATH) ;
+et le catalogue se sert par le serveur de substitution des fournisseurs :
+    python benchmarks/fake_providers.py --catalog DOSSIER/catalog.jsonl
+
+Usage: python benchmarks/generate_data.py --users 1000000 --titles 500000 --out /tmp/wtw-data
+           [--load-db] [--replace] [--users-file /tmp/wtw-data/users.json] [--publish-catalog] [--seed 1]
+"""
+
+import argparse
+import bisect
+import itertools
+import math
+import os
+import random
+import sys
+import time
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+from data.movies_series_database import STREAMING_SERVICES
+from src import json_codec
+from src.recommendation_utils import GenreManager
+
+# Lignes par lot d'insertion dans la base
+DB_BATCH_SIZE = 5000
+
+# Popularité relative des genres (préférences et catalogue)
+GENRE_WEIGHTS = {
+    "drama": 18, "comedy": 16, "action": 15, "thriller": 11, "science_fiction": 8, "crime": 8,
+    "romance": 7, "horror": 6, "animation": 6, "fantasy": 5, "mystery": 5, "documentary": 4,
+    "family": 4, "music": 2, "biography": 2, "war": 2, "western": 1,
+}
+# Genre standard -> genres TMDb correspondants (films, séries)
+TMDB_GENRE_IDS = {
+    "action": (28, 12), "comedy": (35,), "drama": (18,), "horror": (27,), "thriller": (53,),
+    "romance": (10749,), "science_fiction": (878, 10765), "fantasy": (14,), "animation": (16,),
+    "documentary": (99,), "crime": (80,), "mystery": (9648,), "war": (10752,), "western": (37,),
+    "music": (10402,), "family": (10751,), "biography": (36,),
+}
+# Parts de marché approximatives des services (nombre d'abonnés)
+SERVICE_WEIGHTS = {"netflix": 40, "amazon": 25, "disney": 18, "apple": 6, "hbo": 5, "paramount": 4,
+                   "hulu": 1, "peacock": 1}
+# Nom affiché par TMDb pour chaque service (watch/providers)
+SERVICE_PROVIDER_NAMES = {"netflix": "Netflix", "amazon": "Amazon Prime Video", "disney": "Disney Plus",
+                          "apple": "Apple TV Plus", "hbo": "HBO Max", "paramount": "Paramount Plus",
+                          "hulu": "Hulu", "peacock": "Peacock"}
+
+KEYWORDS = [
+    "espace", "rêve", "voyage", "famille", "vengeance", "robot", "amitié", "enquête", "guerre", "amour",
+    "trahison", "survie", "adolescence", "mafia", "magie", "apocalypse", "zombie", "héros", "complot",
+    "prison", "braquage", "sport", "musique", "cuisine", "politique", "intelligence artificielle",
+    "voyage dans le temps", "dystopie", "road movie", "huis clos", "tueur en série", "extraterrestre",
+    "super-héros", "biographie", "procès", "école", "mer", "montagne", "désert", "paris", "new york",
+    "tokyo", "futur", "moyen âge", "western", "vampire", "sorcière", "dragon", "pirate", "espionnage",
+]
+FIRST_NAMES = ["Camille", "Léa", "Hugo", "Louis", "Chloé", "Jules", "Inès", "Nathan", "Manon", "Lucas",
+               "Sofia", "Akira", "Greta", "Bong", "Denis", "Agnès", "Céline", "Jordan", "Ava", "Pedro"]
+LAST_NAMES = ["Martin", "Bernard", "Dubois", "Nolan", "Villeneuve", "Gerwig", "Sciamma", "Varda", "Kurosawa",
+              "Almodóvar", "Bigelow", "Peele", "DuVernay", "Miyazaki", "Park", "Audiard", "Ozon", "Ducournau",
+              "Tarantino", "Scorsese"]
+TITLE_WORDS = ["nuit", "dernier", "ombre", "voyage", "cité", "secret", "étoile", "retour", "froid", "empire",
+               "mémoire", "rivière", "silence", "héritage", "frontière", "orage", "jardin", "miroir", "loup",
+               "sable", "feu", "hiver", "royaume", "promesse", "lumière", "abîme", "chemin", "écho", "fleuve"]
+LANGUAGES = (("en", 55), ("fr", 15), ("ko", 6), ("ja", 8), ("es", 7), ("de", 4), ("it", 3), ("hi", 2))
+
+class WeightedSampler:
+    """Tirage pondéré en O(log n) (poids cumulés précalculés)"""
+
+    def __init__(self, items, weights):
+        self.items = list(items)
+        self.cumulative = list(itertools.accumulate(weights))
+        self.total = self.cumulative[-1]
+
+    def pick(self, rng: random.Random):
+        return self.items[bisect.bisect_right(self.cumulative, rng.random() * self.total)]
+
+    def pick_distinct(self, rng: random.Random, count: int):
+        count = min(count, len(self.items))
+        chosen = []
+        while len(chosen) < count:
+            item = self.pick(rng)
+            if item not in chosen:
+                chosen.append(item)
+        return chosen
+
+def zipf_sampler(items, exponent: float = 1.0) -> WeightedSampler:
+    return WeightedSampler(items, [1 / (rank + 1) ** exponent for rank in range(len(items))])
+
+DIRECTORS = [f"{first} {last}" for first in FIRST_NAMES for last in LAST_NAMES]
+
+# --- Catalogue ---
+
+def title_popularity(rank: int) -> float:
+    """Popularité TMDb en loi de puissance du rang (quelques succès, longue traîne)"""
+    return round(2000 / (rank + 1) ** 0.8 + 0.6, 3)
+
+def generate_catalog(count: int, rng: random.Random):
+    """
+    Titres synthétiques (ids 1..count) ; le rang de popularité est une
+    permutation aléatoire des ids, pour que popularité et id ne soient pas liés
+    """
+    genres = WeightedSampler(list(GENRE_WEIGHTS), list(GENRE_WEIGHTS.values()))
+    services = WeightedSampler(STREAMING_SERVICES, [SERVICE_WEIGHTS[service] for service in STREAMING_SERVICES])
+    languages = WeightedSampler([code for code, _ in LANGUAGES], [weight for _, weight in LANGUAGES])
+    keywords = zipf_sampler(KEYWORDS, 0.8)
+    directors = zipf_sampler(DIRECTORS, 0.9)
+    ranks = list(range(count))
+    rng.shuffle(ranks)
+
+    for index in range(count):
+        item_id = index + 1
+        rank = ranks[index]
+        popularity = title_popularity(rank)
+        media_type = "tv" if rng.random() < 0.3 else "movie"
+        year = min(2026, 2026 - int(rng.expovariate(1 / 12)))
+        standard_genres = genres.pick_distinct(rng, rng.choice((1, 2, 2, 3, 3)))
+        genre_ids = [rng.choice(TMDB_GENRE_IDS[genre]) for genre in standard_genres]
+        vote_average = round(min(9.6, max(1.5, rng.gauss(6.4, 1.0) + math.log10(popularity) * 0.2)), 1)
+        available = services.pick_distinct(rng, min(3, int(rng.expovariate(0.5))))
+        words = rng.sample(TITLE_WORDS, rng.choice((1, 2, 2, 3)))
+        yield {
+            "id": item_id,
+            "media_type": media_type,
+            "title": " ".join(words).capitalize() + ("" if rng.random() < 0.7 else f" {rng.randrange(2, 5)}"),
+            "release_date": f"{year}-{rng.randrange(1, 13):02d}-{rng.randrange(1, 29):02d}",
+            "original_language": languages.pick(rng),
+            "genre_ids": genre_ids,
+            "popularity": popularity,
+            "vote_average": vote_average,
+            "vote_count": int(popularity * rng.uniform(20, 120)),
+            "overview": " ".join(rng.choices(TITLE_WORDS + KEYWORDS, k=rng.randrange(15, 45))),
+            "directors": directors.pick_distinct(rng, 1 if rng.random() < 0.9 else 2),
+            "keywords": keywords.pick_distinct(rng, rng.randrange(2, 9)),
+            "providers": [SERVICE_PROVIDER_NAMES[service] for service in available],
+            "streaming_services": available,
+            "watchmode_id": 1_000_000 + item_id,
+            "imdb_id": f"tt{item_id + 1_000_000:07d}",
+            "rank": rank,
+        }
+
+# --- Utilisateurs ---
+
+def genre_spelling(standard: str, rng: random.Random) -> str:
+    """Un genre tel qu'un utilisateur l'écrit (variante de GenreManager.GENRE_VARIATIONS)"""
+    return rng.choice(GenreManager.GENRE_VARIATIONS[standard]).title()
+
+def history_length(rng: random.Random, maximum: int = 500) -> int:
+    """
+    Longueur d'historique : 10 % de nouveaux utilisateurs sans historique, puis
+    loi de Pareto (médiane ~6, quelques centaines pour les gros utilisateurs)
+    """
+    if rng.random() < 0.1:
+        return 0
+    return min(maximum, int(rng.paretovariate(1.2) * 6) - 5)
+
+def generate_users(count: int, rng: random.Random, ids_by_rank=(), media_types: bytes = b""):
+    """
+    Utilisateurs synthétiques (ids 1..count)
+
+    Args:
+        ids_by_rank: Ids du catalogue du plus populaire au moins populaire
+                     (historique tiré en loi de Zipf sur ce rang)
+        media_types: Type de chaque titre (octet "m" ou "t" à l'index id - 1)
+    """
+    genres = WeightedSampler(list(GENRE_WEIGHTS), list(GENRE_WEIGHTS.values()))
+    services = WeightedSampler(STREAMING_SERVICES, [SERVICE_WEIGHTS[service] for service in STREAMING_SERVICES])
+    keywords = zipf_sampler(KEYWORDS, 0.9)
+    directors = zipf_sampler(DIRECTORS, 1.0)
+    watched = zipf_sampler(ids_by_rank, 0.9) if ids_by_rank else None
+
+    for index in range(count):
+        user_id = index + 1
+        likes = genres.pick_distinct(rng, max(1, min(6, int(rng.gauss(3, 1.2)))))
+        dislikes = [genre for genre in genres.pick_distinct(rng, rng.choice((0, 1, 1, 2))) if genre not in likes]
+        preferences = {
+            "genres_likes": [genre_spelling(genre, rng) for genre in likes],
+            "genres_dislikes": [genre_spelling(genre, rng) for genre in dislikes],
+            "keywords_likes": keywords.pick_distinct(rng, int(rng.expovariate(0.4))),
+            "directors_likes": directors.pick_distinct(rng, int(rng.expovariate(0.8))),
+            "streaming_services": sorted(services.pick_distinct(rng, min(4, int(rng.expovariate(0.7)) + 1))),
+            "rating_min": min(8.5, max(5.0, round(rng.gauss(6.5, 0.8) * 2) / 2)),
+        }
+
+        history = []
+        if watched is not None:
+            seen = set()
+            for _ in range(history_length(rng)):
+                item_id = watched.pick(rng)
+                if item_id not in seen:
+                    seen.add(item_id)
+                    history.append(item_id)
+        if history:
+            preferences["watch_history"] = [
+                {"id": item_id, "content_type": "tv" if media_types[item_id - 1:item_id] == b"t" else "movie"}
+                for item_id in history
+            ]
+
+        yield {
+            "id": user_id,
+            "name": f"Utilisateur {user_id}",
+            "email": f"user{user_id}@example.org",
+            "preferences": preferences,
+            "history": [str(item_id) for item_id in history],
+        }
+
+# --- Écriture et chargements ---
+
+def write_jsonl(path: str, records, progress_label: str, total: int):
+    start = time.perf_counter()
+    with open(path, "wb") as f:
+        for count, record in enumerate(records, 1):
+            f.write(json_codec.dumps(record) + b"\n")
+            if count % 100_000 == 0 or count == total:
+                print(f"  {progress_label} : {count}/{total} ({time.perf_counter() - start:.1f} s)", flush=True)
+
+def read_jsonl(path: str):
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                yield json_codec.loads(line)
+
+def write_users_file(users_path: str, path: str):
+    """Profils au format de data/users.json (liste JSON), écrits en flux"""
+    with open(path, "wb") as f:
+        f.write(b"[\n")
+        for count, user in enumerate(read_jsonl(users_path)):
+            profile = {"id": user["id"], "name": user["name"], "preferences": user["preferences"],
+                       "history": user["history"]}
+            profile["preferences"] = {key: value for key, value in profile["preferences"].items()
+                                      if key != "watch_history"}
+            f.write((b",\n" if count else b"") + json_codec.dumps(profile))
+        f.write(b"\n]\n")
+
+def prepare_database(replace: bool):
+    """Crée les tables ; refuse (ou vide avec replace) une table users non vide, avant toute génération"""
+    import api
+    from models import User, UserSession
+
+    with api.app.app_context():
+        api.db.create_all()
+        if api.db.session.query(User.id).limit(1).first() is None:
+            return
+        if not replace:
+            raise SystemExit("La table users n'est pas vide : --replace pour la remplacer")
+        api.db.session.execute(UserSession.__table__.delete())
+        api.db.session.execute(User.__table__.delete())
+        api.db.session.commit()
+
+def load_database(users_path: str, password: str):
+    """Insère les utilisateurs par lots de DB_BATCH_SIZE (DATABASE_URL), un seul hachage de mot de passe"""
+    from werkzeug.security import generate_password_hash
+    import api
+    from models import User
+
+    # Même hachage que /api/register (vérifié par /api/login)
+    password_hash = generate_password_hash(password)
+    table = User.__table__
+    with api.app.app_context():
+        start = time.perf_counter()
+        batch = []
+        inserted = 0
+        for user in read_jsonl(users_path):
+            batch.append({"id": user["id"], "name": user["name"], "email": user["email"],
+                          "password_hash": password_hash, "password_salt": "",
+                          "preferences": user["preferences"]})
+            if len(batch) >= DB_BATCH_SIZE:
+                api.db.session.execute(table.insert(), batch)
+                api.db.session.commit()
+                inserted += len(batch)
+                batch = []
+                if inserted % 100_000 == 0:
+                    print(f"  base : {inserted} utilisateurs ({time.perf_counter() - start:.1f} s)", flush=True)
+        if batch:
+            api.db.session.execute(table.insert(), batch)
+            api.db.session.commit()
+            inserted += len(batch)
+        print(f"  base : {inserted} utilisateurs insérés en {time.perf_counter() - start:.1f} s")
+
+def publish_catalog(catalog_path: str):
+    from src.catalog_store import publish
+
+    records = (
+        {"id": item["id"], "media_type": item["media_type"], "rating": item["vote_average"],
+         "popularity": item["popularity"], "vote_count": item["vote_count"], "genre_ids": item["genre_ids"],
+         "streaming_services": item["streaming_services"]}
+        for item in read_jsonl(catalog_path)
+    )
+    version = publish(list(records))
+    print(f"  catalogue partagé : version {version} publiée")
+
+def main():
+    parser = argparse.ArgumentParser(description="Données synthétiques : utilisateurs et catalogue")
+    parser.add_argument("--users", type=int, default=10_000)
+    parser.add_argument("--titles", type=int, default=20_000)
+    parser.add_argument("--out", default="/tmp/whattowatch-data", help="Dossier des fichiers JSONL")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--load-db", action="store_true", help="Insérer les utilisateurs (DATABASE_URL)")
+    parser.add_argument("--replace", action="store_true", help="Vider la table users avant l'insertion")
+    parser.add_argument("--password", default="motdepasse-synthetique",
+                        help="Mot de passe commun des utilisateurs insérés")
+    parser.add_argument("--users-file", help="Profils au format data/users.json (USERS_FILE)")
+    parser.add_argument("--publish-catalog", action="store_true",
+                        help="Publier les caractéristiques dans le catalogue partagé (CATALOG_PATH)")
+    args = parser.parse_args()
+
+    if args.load_db:
+        prepare_database(args.replace)
+    os.makedirs(args.out, exist_ok=True)
+    catalog_path = os.path.join(args.out, "catalog.jsonl")
+    users_path = os.path.join(args.out, "users.jsonl")
+    rng = random.Random(args.seed)
+
+    print(f"Catalogue : {args.titles} titres")
+    media_types = bytearray(args.titles)
+    permutation = [0] * args.titles  # rang de popularité -> id
+
+    def catalog():
+        for item in generate_catalog(args.titles, rng):
+            media_types[item["id"] - 1] = ord("t" if item["media_type"] == "tv" else "m")
+            permutation[item.pop("rank")] = item["id"]
+            yield item
+
+    write_jsonl(catalog_path, catalog(), "titres", args.titles)
+
+    print(f"Utilisateurs : {args.users}")
+    write_jsonl(users_path, generate_users(args.users, rng, permutation, bytes(media_types)),
+                "utilisateurs", args.users)
+
+    if args.users_file:
+        write_users_file(users_path, args.users_file)
+        print(f"  profils du moteur écrits dans {args.users_file}")
+    if args.load_db:
+        load_database(users_path, args.password)
+    if args.publish_catalog:
+        publish_catalog(catalog_path)
+    print(f"Fichiers : {catalog_path}, {users_path}")
+
+if __name__ == "__main__":
+    main()
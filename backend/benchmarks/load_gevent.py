@@ -0,0 +1,142 @@
+"""
+Test de charge du mode gevent
+Démarre l'application sous gevent (fournisseurs simulés à latence fixe) puis
+la charge depuis un processus client séparé, à plusieurs niveaux de
+concurrence. Mesure le débit, la latence p50/p99 et le nombre maximal de
+requêtes réellement servies en même temps, pour valider la limite
+GEVENT_MAX_CONNECTIONS / worker_connections.
+
+Usage: python benchmarks/load_gevent.py [--limit 200] [--concurrency 50,200,500]
+       [--requests 2000] [--latency 0.2]
+"""
+
+import sys
+
+# Le processus client (aiohttp) ne doit pas être patché ; le serveur doit l'être avant tout import
+if "--drive" not in sys.argv:
+    from gevent import monkey
+    monkey.patch_all()
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import time
+import uuid
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if backend_dir not in sys.path:
+    sys.path.insert(0, backend_dir)
+
+def drive(url, token, concurrency, total):
+    """Processus client : `total` requêtes /api/search avec `concurrency` clients"""
+    import asyncio
+    import aiohttp
+
+    async def run():
+        latencies = []
+        errors = 0
+        headers = {"Authorization": f"Bearer {token}"}
+        connector = aiohttp.TCPConnector(limit=0)
+        timeout = aiohttp.ClientTimeout(total=60)
+
+        async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+            async def client(count):
+                nonlocal errors
+                for _ in range(count):
+                    start = time.perf_counter()
+                    try:
+                        # Requête unique : jamais servie par le cache
+                        async with session.get(f"{url}/api/search",
+                                               params={"q": uuid.uuid4().hex[:8]}, headers=headers) as response:
+                            await response.read()
+                            if response.status != 200:
+                                errors += 1
+                    except Exception:
+                        errors += 1
+                    latencies.append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            await asyncio.gather(*(client(total // concurrency) for _ in range(concurrency)))
+            elapsed = time.perf_counter() - start
+
+        latencies.sort()
+        return {
+            "throughput": len(latencies) / elapsed,
+            "p50": statistics.median(latencies),
+            "p99": latencies[min(len(latencies) - 1, int(len(latencies) * 0.99))],
+            "errors": errors,
+        }
+
+    print(json.dumps(asyncio.run(run())))
+
+class InFlightCounter:
+    """Middleware WSGI qui mesure le nombre maximal de requêtes simultanées"""
+
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+        self.current = 0
+        self.peak = 0
+
+    def __call__(self, environ, start_response):
+        self.current += 1
+        self.peak = max(self.peak, self.current)
+        try:
+            return list(self.wsgi_app(environ, start_response))
+        finally:
+            self.current -= 1
+
+def serve_and_load(args):
+    from gevent.pool import Pool
+    from gevent.pywsgi import WSGIServer
+
+    from api import app
+    from src.auth import generate_jwt_token
+    from src.concurrency import gevent_active
+    from bench_asgi_vs_sync import install_fake_providers
+    from server_gevent import KeepAliveTimeoutHandler
+
+    assert gevent_active(), "gevent doit patcher la bibliothèque standard"
+    install_fake_providers(args.latency)
+    token = generate_jwt_token(1, "bench")
+
+    counter = InFlightCounter(app)
+    server = WSGIServer(("127.0.0.1", 0), counter, spawn=Pool(args.limit),
+                        backlog=2048, handler_class=KeepAliveTimeoutHandler, log=None)
+    server.start()
+    url = f"http://127.0.0.1:{server.server_port}"
+
+    print(f"\nMode gevent - limite {args.limit} requêtes simultanées, "
+          f"latence fournisseur {args.latency * 1000:.0f} ms, {args.requests} requêtes par palier")
+    print("-" * 100)
+
+    for concurrency in [int(c) for c in args.concurrency.split(",")]:
+        counter.peak = 0
+        client = subprocess.Popen(
+            [sys.executable, os.path.abspath(__file__), "--drive", url, token, str(concurrency), str(args.requests)],
+            stdout=subprocess.PIPE, text=True
+        )
+        # communicate() est coopératif (subprocess patché) : le serveur continue de servir
+        output, _ = client.communicate()
+        stats = json.loads(output.strip().splitlines()[-1])
+        print(f"{concurrency:>5} clients   {stats['throughput']:8.1f} req/s   "
+              f"p50 {stats['p50'] * 1000:8.1f} ms   p99 {stats['p99'] * 1000:8.1f} ms   "
+              f"pic simultané {counter.peak:>4}   erreurs {stats['errors']}")
+
+    server.stop()
+
+def main():
+    if "--drive" in sys.argv:
+        _, _, url, token, concurrency, total = sys.argv
+        return drive(url, token, int(concurrency), int(total))
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--limit", type=int, default=200)
+    parser.add_argument("--concurrency", default="50,200,500")
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--latency", type=float, default=0.2)
+    serve_and_load(parser.parse_args())
+
+if __name__ == "__main__":
+    main()
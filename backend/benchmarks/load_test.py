@@ -0,0 +1,369 @@
+"""
+Test de charge de bout en bout de l'API HTTP (dimensionnement gunicorn)
+Pour chaque configuration "classe:workers" (sync, gevent, uvicorn) :
+  1. démarre le serveur de substitution des fournisseurs
+     (benchmarks/fake_providers.py, latence réaliste) ;
+  2. démarre gunicorn sur une base SQLite neuve, pointé vers ce serveur
+     (TMDB_BASE_URL / WATCHMODE_BASE_URL) ;
+  3. inscrit des utilisateurs synthétiques (/api/register), les connecte
+     (/api/login), puis rejoue pendant --duration secondes un mélange de
+     requêtes à débit cible (arrivées de Poisson, boucle ouverte) :
+     recommandations, recherche, tendances, ajouts à l'historique et mises à
+     jour des préférences ;
+  4. rapporte par route : débit, taux d'erreurs, refus 503, p50/p95/p99.
+La latence est mesurée depuis l'instant d'arrivée prévu : une requête
+retardée par un client saturé compte son attente (pas d'omission
+coordonnée).
+
+Les profils sont aussi écrits dans un fichier USERS_FILE lu par le moteur de
+recommandation, pour que /api/recommendations travaille sur de vrais profils.
+
+Usage: python benchmarks/load_test.py [--configs sync:4,gevent:2,uvicorn:2] [--rps 50]
+           [--duration 30] [--users 20] [--latency 0.12]
+           [--mix recommendations=25,search=35,trending=20,history=12,preferences=8]
+           [--output resultats.json]
+       python benchmarks/load_test.py --url http://127.0.0.1:8000 --rps 20
+           (serveur déjà démarré, pointé vers les fournisseurs de votre choix)
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+import aiohttp
+
+backend_dir = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+benchmarks_dir = os.path.dirname(os.path.abspath(__file__))
+
+from fake_providers import provider_environment
+
+# Commande gunicorn par classe de workers
+SERVER_COMMANDS = {
+    "sync": ["-c", "gunicorn.conf.py", "wsgi:app"],
+    "gevent": ["-c", "gunicorn_config.py", "wsgi:application"],
+    "uvicorn": ["-c", "gunicorn.conf.py", "-k", "uvicorn.workers.UvicornWorker", "asgi:application"],
+}
+DEFAULT_MIX = "recommendations=25,search=35,trending=20,history=12,preferences=8"
+
+GENRES = ["Action", "Aventure", "Animation", "Comédie", "Crime", "Documentaire", "Drame", "Fantastique",
+          "Horreur", "Mystère", "Romance", "Science-Fiction", "Thriller"]
+SERVICES = ["netflix", "disney", "amazon", "hbo", "apple", "paramount"]
+KEYWORDS = ["espace", "rêve", "voyage", "famille", "vengeance", "robot", "amitié", "enquête"]
+DIRECTORS = ["Christopher Nolan", "Denis Villeneuve", "Greta Gerwig", "Bong Joon-ho", "Céline Sciamma"]
+# Requêtes de recherche : quelques-unes très fréquentes, une longue traîne (loi de Zipf)
+SEARCH_TERMS = ["dune", "batman", "amélie", "matrix", "alien", "star wars", "inception", "parasite",
+                "le parrain", "titanic", "avatar", "interstellar", "joker", "oppenheimer", "barbie",
+                "arcane", "the office", "breaking bad", "dark", "lupin", "squid game", "chernobyl"]
+
+SETUP_DATABASE = "import api\nwith api.app.app_context():\n    api.db.create_all()\n"
+
+# --- Utilisateurs synthétiques ---
+
+def make_profile(index: int, rng: random.Random):
+    likes = rng.sample(GENRES, 3)
+    return {
+        "genres_likes": likes,
+        "genres_dislikes": rng.sample([genre for genre in GENRES if genre not in likes], 1),
+        "keywords_likes": rng.sample(KEYWORDS, 2),
+        "directors_likes": rng.sample(DIRECTORS, 1),
+        "streaming_services": rng.sample(SERVICES, 2),
+        "rating_min": rng.choice([6.0, 6.5, 7.0, 7.5]),
+    }
+
+def write_users_file(path: str, profiles):
+    """Profils lus par le moteur (ids 1..N : base SQLite neuve, inscriptions dans l'ordre)"""
+    users = [
+        {"id": index + 1, "name": f"charge{index}", "preferences": profile, "history": []}
+        for index, profile in enumerate(profiles)
+    ]
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(users, f, ensure_ascii=False)
+
+# --- Processus : fournisseurs et serveur ---
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+def wait_until_ready(url: str, timeout: float = 60.0, process=None):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process is not None and process.poll() is not None:
+            raise RuntimeError(f"Processus arrêté (code {process.returncode}) avant d'être prêt : {url}")
+        try:
+            with urllib.request.urlopen(url, timeout=2):
+                return
+        except Exception:
+            time.sleep(0.3)
+    raise RuntimeError(f"{url} ne répond pas après {timeout:.0f} s")
+
+def start_fake_providers(port: int, latency: float, jitter: float, error_rate: float, log, catalog: str = None):
+    command = [sys.executable, os.path.join(benchmarks_dir, "fake_providers.py"), "--port", str(port),
+               "--latency", str(latency), "--jitter", str(jitter), "--error-rate", str(error_rate)]
+    if catalog:
+        command += ["--catalog", catalog]
+    process = subprocess.Popen(command, stdout=log, stderr=subprocess.STDOUT)
+    # Un grand catalogue généré prend plusieurs dizaines de secondes à indexer
+    wait_until_ready(f"http://127.0.0.1:{port}/_stats", timeout=300 if catalog else 60, process=process)
+    return process
+
+def start_server(worker_class: str, workers: int, port: int, environment, log):
+    command = [sys.executable, "-m", "gunicorn", *SERVER_COMMANDS[worker_class],
+               "-w", str(workers), "-b", f"127.0.0.1:{port}"]
+    process = subprocess.Popen(command, cwd=backend_dir, env=environment, stdout=log, stderr=subprocess.STDOUT)
+    wait_until_ready(f"http://127.0.0.1:{port}/api/ping", timeout=90, process=process)
+    return process
+
+def stop(process):
+    if process is not None and process.poll() is None:
+        process.terminate()
+        try:
+            process.wait(timeout=30)
+        except subprocess.TimeoutExpired:
+            process.kill()
+
+# --- Charge ---
+
+def parse_mix(value: str):
+    mix = {}
+    for part in value.split(","):
+        name, _, weight = part.partition("=")
+        mix[name.strip()] = float(weight)
+    unknown = set(mix) - {"recommendations", "search", "trending", "history", "preferences"}
+    if unknown:
+        raise ValueError(f"Routes inconnues dans --mix : {', '.join(sorted(unknown))}")
+    return mix
+
+def zipf_choice(rng: random.Random, items):
+    weights = [1 / (rank + 1) for rank in range(len(items))]
+    return rng.choices(items, weights)[0]
+
+def build_request(route: str, user, rng: random.Random):
+    """(méthode, chemin, paramètres, corps) d'une requête du mélange"""
+    user_id = user["id"]
+    if route == "recommendations":
+        params = {"n": rng.choice([5, 10, 20]), "content_type": rng.choice(["all", "movie", "tv"])}
+        return "GET", f"/api/recommendations/{user_id}", params, None
+    if route == "search":
+        return "GET", "/api/search", {"q": zipf_choice(rng, SEARCH_TERMS), "limit": 20}, None
+    if route == "trending":
+        return "GET", "/api/trending", {"type": rng.choice(["all", "movie", "tv"]), "limit": 20}, None
+    if route == "history":
+        item = {"id": rng.randrange(1, 900_000), "content_type": rng.choice(["movie", "tv"]),
+                "title": zipf_choice(rng, SEARCH_TERMS)}
+        return "POST", f"/api/users/{user_id}/history", None, {"item": item}
+    profile = make_profile(user_id, rng)
+    return "PUT", f"/api/users/{user_id}", None, {"genres_likes": profile["genres_likes"],
+                                                  "rating_min": profile["rating_min"]}
+
+async def register_users(session, url: str, profiles):
+    """Inscrit puis connecte les utilisateurs synthétiques (dans l'ordre : ids 1..N)"""
+    users = []
+    run_id = os.urandom(3).hex()
+    for index, profile in enumerate(profiles):
+        email = f"charge{index}-{run_id}@example.org"
+        password = f"motdepasse-{index}"
+        async with session.post(f"{url}/api/register", json={
+            "username": f"charge{index}", "email": email, "password": password, "preferences": profile,
+        }) as response:
+            if response.status != 201:
+                raise RuntimeError(f"Inscription refusée ({response.status}) : {await response.text()}")
+        async with session.post(f"{url}/api/login", json={"email": email, "password": password}) as response:
+            data = await response.json()
+            if response.status != 200:
+                raise RuntimeError(f"Connexion refusée ({response.status}) : {data}")
+        users.append({"id": data["user"]["id"], "token": data["token"]})
+    return users
+
+async def generate_load(url: str, users, mix, rps: float, duration: float, max_in_flight: int, seed: int):
+    """Arrivées de Poisson à `rps` requêtes/s ; retourne les mesures par route"""
+    rng = random.Random(seed)
+    routes, weights = zip(*mix.items())
+    samples = {route: {"latencies": [], "errors": 0, "shed": 0, "dropped": 0} for route in routes}
+    in_flight = asyncio.Semaphore(max_in_flight)
+    tasks = set()
+
+    connector = aiohttp.TCPConnector(limit=max_in_flight)
+    timeout = aiohttp.ClientTimeout(total=60)
+    async with aiohttp.ClientSession(connector=connector, timeout=timeout) as session:
+        async def send(route, method, path, params, body, token, scheduled):
+            stats = samples[route]
+            try:
+                async with session.request(method, url + path, params=params, json=body,
+                                           headers={"Authorization": f"Bearer {token}"}) as response:
+                    await response.read()
+                    if response.status == 503:
+                        stats["shed"] += 1
+                    elif response.status >= 400:
+                        stats["errors"] += 1
+            except Exception:
+                stats["errors"] += 1
+            finally:
+                stats["latencies"].append(time.perf_counter() - scheduled)
+                in_flight.release()
+
+        start = time.perf_counter()
+        next_arrival = start
+        while next_arrival - start < duration:
+            delay = next_arrival - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            route = rng.choices(routes, weights)[0]
+            user = rng.choice(users)
+            if in_flight.locked():
+                # Client saturé : la requête est comptée comme perdue plutôt que retardée indéfiniment
+                samples[route]["dropped"] += 1
+            else:
+                await in_flight.acquire()
+                task = asyncio.ensure_future(send(route, *build_request(route, user, rng), user["token"], next_arrival))
+                tasks.add(task)
+                task.add_done_callback(tasks.discard)
+            next_arrival += rng.expovariate(rps)
+        if tasks:
+            await asyncio.wait(tasks)
+        elapsed = time.perf_counter() - start
+    return samples, elapsed
+
+def percentile(sorted_values, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * fraction))]
+
+def summarize(samples, elapsed: float):
+    report = {}
+    for route, stats in list(samples.items()) + [("total", None)]:
+        if stats is None:
+            stats = {
+                "latencies": [value for route_stats in samples.values() for value in route_stats["latencies"]],
+                **{key: sum(route_stats[key] for route_stats in samples.values())
+                   for key in ("errors", "shed", "dropped")},
+            }
+        latencies = sorted(stats["latencies"])
+        count = len(latencies)
+        report[route] = {
+            "requests": count,
+            "throughput": round(count / elapsed, 2),
+            "error_rate": round(stats["errors"] / count, 4) if count else 0.0,
+            "shed_rate": round(stats["shed"] / count, 4) if count else 0.0,
+            "dropped": stats["dropped"],
+            "p50_ms": round(percentile(latencies, 0.50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 0.95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 0.99) * 1000, 1),
+        }
+    return report
+
+def print_report(name: str, report):
+    print(f"\n=== {name} ===")
+    print(f"{'route':<16} {'requêtes':>9} {'req/s':>8} {'erreurs':>8} {'503':>7} {'perdues':>8} "
+          f"{'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for route, row in report.items():
+        print(f"{route:<16} {row['requests']:>9} {row['throughput']:>8.1f} {row['error_rate'] * 100:>7.1f}% "
+              f"{row['shed_rate'] * 100:>6.1f}% {row['dropped']:>8} {row['p50_ms']:>9.1f} "
+              f"{row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+
+def print_comparison(results):
+    print("\n=== Comparaison (toutes routes) ===")
+    print(f"{'configuration':<16} {'req/s':>8} {'erreurs':>8} {'503':>7} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9}")
+    for name, report in results.items():
+        row = report["total"]
+        print(f"{name:<16} {row['throughput']:>8.1f} {row['error_rate'] * 100:>7.1f}% {row['shed_rate'] * 100:>6.1f}% "
+              f"{row['p50_ms']:>9.1f} {row['p95_ms']:>9.1f} {row['p99_ms']:>9.1f}")
+
+async def run_load(url: str, args, profiles, profiles_file: bool = False):
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session:
+        users = await register_users(session, url, profiles)
+    if profiles_file and [user["id"] for user in users] != list(range(1, len(users) + 1)):
+        print("Attention : ids inattendus, les recommandations ne verront pas les profils de USERS_FILE")
+    samples, elapsed = await generate_load(url, users, parse_mix(args.mix), args.rps, args.duration,
+                                           args.max_in_flight, args.seed)
+    return summarize(samples, elapsed)
+
+def run_configuration(worker_class: str, workers: int, args, profiles, provider_port: int, log):
+    """Serveur neuf (base et profils) pour une configuration ; retourne son rapport"""
+    workdir = tempfile.mkdtemp(prefix="whattowatch-load-")
+    server = None
+    try:
+        users_file = os.path.join(workdir, "users.json")
+        write_users_file(users_file, profiles)
+        environment = {
+            **os.environ,
+            **provider_environment("127.0.0.1", provider_port),
+            "DATABASE_URL": f"sqlite:///{os.path.join(workdir, 'load.db')}",
+            "USERS_FILE": users_file,
+            "METRICS_DIR": os.path.join(workdir, "metrics"),
+            "PROFILE_DIR": os.path.join(workdir, "profiles"),
+        }
+        subprocess.run([sys.executable, "-c", SETUP_DATABASE], cwd=backend_dir, env=environment,
+                       stdout=log, stderr=subprocess.STDOUT, check=True)
+        port = free_port()
+        server = start_server(worker_class, workers, port, environment, log)
+        return asyncio.run(run_load(f"http://127.0.0.1:{port}", args, profiles, profiles_file=True))
+    finally:
+        stop(server)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+def main():
+    parser = argparse.ArgumentParser(description="Test de charge de bout en bout")
+    parser.add_argument("--configs", default="sync:4,gevent:2,uvicorn:2",
+                        help="Configurations classe:workers à comparer (sync, gevent, uvicorn)")
+    parser.add_argument("--url", help="Serveur déjà démarré (pas de fournisseurs ni de gunicorn lancés)")
+    parser.add_argument("--rps", type=float, default=50.0, help="Débit cible (requêtes/s)")
+    parser.add_argument("--duration", type=float, default=30.0, help="Durée de la charge (secondes)")
+    parser.add_argument("--users", type=int, default=20, help="Utilisateurs synthétiques")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Poids des routes")
+    parser.add_argument("--max-in-flight", type=int, default=500, help="Requêtes simultanées côté client")
+    parser.add_argument("--latency", type=float, default=0.12, help="Latence médiane des fournisseurs (s)")
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--provider-error-rate", type=float, default=0.0)
+    parser.add_argument("--catalog", help="Catalogue généré servi par les fournisseurs (generate_data.py)")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="Fichier JSON des rapports")
+    parser.add_argument("--log", default=os.path.join(tempfile.gettempdir(), "whattowatch-load.log"),
+                        help="Sortie des serveurs lancés")
+    args = parser.parse_args()
+    parse_mix(args.mix)
+
+    rng = random.Random(args.seed)
+    profiles = [make_profile(index, rng) for index in range(args.users)]
+    results = {}
+
+    if args.url:
+        results[args.url] = asyncio.run(run_load(args.url.rstrip("/"), args, profiles))
+        print_report(args.url, results[args.url])
+    else:
+        with open(args.log, "ab") as log:
+            provider_port = free_port()
+            providers = start_fake_providers(provider_port, args.latency, args.jitter, args.provider_error_rate, log,
+                                             args.catalog)
+            try:
+                for config in args.configs.split(","):
+                    worker_class, _, workers = config.partition(":")
+                    if worker_class not in SERVER_COMMANDS:
+                        parser.error(f"Classe de workers inconnue : {worker_class}")
+                    name = f"{worker_class}:{workers or 1}"
+                    print(f"{name} : démarrage ({args.rps:g} req/s pendant {args.duration:g} s)...", flush=True)
+                    results[name] = run_configuration(worker_class, int(workers or 1), args, profiles,
+                                                      provider_port, log)
+                    print_report(name, results[name])
+            finally:
+                stop(providers)
+        if len(results) > 1:
+            print_comparison(results)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"rps": args.rps, "duration": args.duration, "users": args.users, "mix": args.mix,
+                       "provider_latency": args.latency, "results": results}, f, indent=2, ensure_ascii=False)
+
+if __name__ == "__main__":
+    main()
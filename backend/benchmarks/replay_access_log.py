@@ -0,0 +1,355 @@
+"""
+Rejeu du trafic de production à partir des access logs gunicorn
+Trois étapes :
+
+  build    access log (format de gunicorn.conf.py) -> corpus de rejeu JSONL
+           anonymisé : adresses, user-agents et referers supprimés ;
+           utilisateurs remplacés par des numéros d'utilisateurs de test
+           (identifiant dans le chemin, sinon couple adresse + user-agent) ;
+           termes de recherche remplacés par des pseudonymes stables (une
+           même recherche reste identique, les hits de cache sont conservés).
+           Les corps des POST/PUT ne sont pas journalisés : ceux de
+           l'historique et des préférences sont synthétisés au rejeu ; les
+           routes d'authentification et les lots (/api/batch) sont écartés.
+  replay   inscrit les utilisateurs de test sur l'instance cible (jetons
+           synthétiques) et rejoue le corpus avec le rythme d'origine
+           (--speed 1), accéléré (--speed 10) ou au plus vite (--speed 0) ;
+           écrit la latence de chaque requête.
+  compare  écarts de latence par route (p50/p95/p99) entre deux rejeux,
+           par exemple deux versions de l'application ; code de sortie 1 si
+           une route régresse au-delà de --threshold.
+
+Usage: python benchmarks/replay_access_log.py build /tmp/whattowatch-access.log corpus.jsonl
+           [--users 50] [--keep-search-terms] [--users-file profils.json]
+       python benchmarks/replay_access_log.py replay corpus.jsonl --url http://127.0.0.1:8000
+           [--speed 10] [--concurrency 200] [--output avant.json]
+       python benchmarks/replay_access_log.py compare avant.json apres.json [--threshold 0.10]
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import random
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime
+from urllib.parse import parse_qsl, urlsplit
+
+import aiohttp
+
+from load_test import SEARCH_TERMS, make_profile, percentile, register_users, write_users_file
+
+# Ligne de access_log_format (gunicorn.conf.py) ; durée %(D)s (microsecondes) optionnelle en fin de ligne
+LOG_LINE = re.compile(
+    r'(?P<host>\S+) \S+ \S+ \[(?P<time>[^\]]+)\] "(?P<method>[A-Z]+) (?P<target>\S+) [^"]*" '
+    r'(?P<status>\d{3}) \S+ "[^"]*" "[^"]*"(?: (?P<duration>\d+))?\s*$'
+)
+TIME_FORMAT = "%d/%b/%Y:%H:%M:%S %z"
+
+# Chemins dont l'identifiant numérique est celui d'un utilisateur
+USER_PATHS = re.compile(r"^/api/(recommendations|users|history)/(\d+)(?=/|$)")
+# Non rejouables : identifiants, session, corps inconnu
+SKIPPED_PATHS = ("/api/login", "/api/register", "/api/logout", "/api/verify-token", "/api/change-password",
+                 "/api/batch", "/api/cache/clear", "/api/profiles")
+# Corps synthétisés au rejeu
+BODY_ROUTES = {
+    ("POST", "/api/users/{user}/history"): "history",
+    ("POST", "/api/history/{user}/{id}"): None,
+    ("PUT", "/api/users/{user}"): "preferences",
+}
+# Paramètres de requête conservés tels quels (les autres sont supprimés)
+KEPT_PARAMS = {"type", "content_type", "n", "limit", "page", "streaming_service", "streaming_services",
+               "time_window", "media_type"}
+SEARCH_PARAMS = {"q", "query"}
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+def route_label(method: str, path: str) -> str:
+    """Route pour les rapports : GET /api/recommendations/{id}"""
+    return f"{method} {_ID_SEGMENT.sub('/{id}', path.replace('{user}', '0'))}"
+
+def _digest(value: str, salt: str) -> int:
+    return int.from_bytes(hashlib.sha256(f"{salt}|{value}".encode()).digest()[:8], "big")
+
+class Anonymizer:
+    """Pseudonymes stables pour une construction de corpus (sel aléatoire, jamais écrit)"""
+
+    def __init__(self, users: int, keep_search_terms: bool = False):
+        self.users = users
+        self.keep_search_terms = keep_search_terms
+        self.salt = os.urandom(16).hex()
+        self._slots = {}
+
+    def user_slot(self, key: str) -> int:
+        """Numéro d'utilisateur de test (0..users-1), le même pour une même clé"""
+        if key not in self._slots:
+            # Dans l'ordre d'apparition : distincts tant qu'il reste des utilisateurs de test
+            self._slots[key] = len(self._slots) % self.users
+        return self._slots[key]
+
+    def search_term(self, term: str) -> str:
+        if self.keep_search_terms:
+            return term
+        digest = _digest(term.strip().lower(), self.salt)
+        return f"{SEARCH_TERMS[digest % len(SEARCH_TERMS)]} {digest % 997}"
+
+def parse_line(line: str):
+    match = LOG_LINE.match(line)
+    if match is None:
+        return None
+    entry = match.groupdict()
+    entry["time"] = datetime.strptime(entry["time"], TIME_FORMAT).timestamp()
+    entry["status"] = int(entry["status"])
+    entry["duration"] = int(entry["duration"]) / 1000 if entry["duration"] else None
+    return entry
+
+def build_corpus(log_path: str, corpus_path: str, users: int, keep_search_terms: bool = False):
+    """Convertit un access log en corpus ; retourne les compteurs de lignes écartées"""
+    anonymizer = Anonymizer(users, keep_search_terms)
+    skipped = Counter()
+    requests = []
+
+    with open(log_path, encoding="utf-8", errors="replace") as f:
+        for line in f:
+            entry = parse_line(line)
+            if entry is None:
+                skipped["illisible"] += 1
+                continue
+            target = urlsplit(entry["target"])
+            path = target.path
+            if not path.startswith("/api/"):
+                skipped["hors API"] += 1
+                continue
+            if path.startswith(SKIPPED_PATHS):
+                skipped["authentification ou lot"] += 1
+                continue
+            if entry["method"] not in ("GET", "POST", "PUT", "DELETE"):
+                skipped["méthode"] += 1
+                continue
+
+            user_match = USER_PATHS.match(path)
+            if user_match:
+                slot = anonymizer.user_slot(f"id:{user_match.group(2)}")
+                path = f"/api/{user_match.group(1)}/{{user}}" + path[user_match.end():]
+            else:
+                # Sans identifiant dans le chemin : une session = une adresse et un user-agent
+                slot = anonymizer.user_slot(f"client:{entry['host']}|{line.rsplit(chr(34), 2)[-2]}")
+
+            template = _ID_SEGMENT.sub("/{id}", path)
+            if entry["method"] != "GET" and (entry["method"], template) not in BODY_ROUTES:
+                skipped["corps inconnu"] += 1
+                continue
+
+            query = {}
+            for key, value in parse_qsl(target.query, keep_blank_values=True):
+                if key in KEPT_PARAMS:
+                    query[key] = value
+                elif key in SEARCH_PARAMS:
+                    query[key] = anonymizer.search_term(value)
+
+            requests.append({
+                "time": entry["time"],
+                "method": entry["method"],
+                "path": path,
+                "query": query,
+                "user": slot,
+                "route": route_label(entry["method"], path),
+                "status": entry["status"],
+                "duration_ms": entry["duration"],
+            })
+
+    # Horodatage à la seconde : les requêtes d'une même seconde sont étalées sur cette seconde
+    requests.sort(key=lambda request: request["time"])
+    per_second = Counter(request["time"] for request in requests)
+    seen = Counter()
+    for request in requests:
+        second = request["time"]
+        request["time"] = second + seen[second] / per_second[second]
+        seen[second] += 1
+    start = requests[0]["time"] if requests else 0.0
+    with open(corpus_path, "w", encoding="utf-8") as f:
+        f.write(json.dumps({"corpus": 1, "users": users, "requests": len(requests),
+                            "span_seconds": (requests[-1]["time"] - start) if requests else 0,
+                            "skipped": dict(skipped)}, ensure_ascii=False) + "\n")
+        for request in requests:
+            request["offset"] = round(request.pop("time") - start, 3)
+            f.write(json.dumps(request, ensure_ascii=False) + "\n")
+    return len(requests), skipped
+
+def load_corpus(path: str):
+    with open(path, encoding="utf-8") as f:
+        meta = json.loads(f.readline())
+        return meta, [json.loads(line) for line in f if line.strip()]
+
+def test_profiles(count: int, seed: int):
+    rng = random.Random(seed)
+    return [make_profile(index, rng) for index in range(count)]
+
+def request_body(request, rng: random.Random):
+    kind = BODY_ROUTES.get((request["method"], _ID_SEGMENT.sub("/{id}", request["path"])))
+    if kind == "history":
+        return {"item": {"id": rng.randrange(1, 900_000), "content_type": rng.choice(["movie", "tv"]),
+                         "title": rng.choice(SEARCH_TERMS)}}
+    if kind == "preferences":
+        profile = make_profile(0, rng)
+        return {"genres_likes": profile["genres_likes"], "rating_min": profile["rating_min"]}
+    return None
+
+async def replay(corpus, url: str, users, speed: float, concurrency: int, seed: int):
+    """Rejoue le corpus ; retourne une mesure par requête"""
+    rng = random.Random(seed)
+    results = []
+    slots = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+
+    async with aiohttp.ClientSession(connector=connector, timeout=aiohttp.ClientTimeout(total=60)) as session:
+        async def send(request, scheduled):
+            user = users[request["user"] % len(users)]
+            path = request["path"].replace("{user}", str(user["id"]))
+            status = None
+            try:
+                async with slots:
+                    # Rythme libre (--speed 0) : latence mesurée depuis l'envoi effectif
+                    scheduled = scheduled if scheduled is not None else time.perf_counter()
+                    async with session.request(request["method"], url + path, params=request["query"],
+                                               json=request_body(request, rng),
+                                               headers={"Authorization": f"Bearer {user['token']}"}) as response:
+                        await response.read()
+                        status = response.status
+            except Exception:
+                status = 0
+            results.append({"route": request["route"], "status": status,
+                            "original_status": request["status"],
+                            "latency_ms": round((time.perf_counter() - scheduled) * 1000, 2)})
+
+        start = time.perf_counter()
+        tasks = []
+        for request in corpus:
+            scheduled = start + (request["offset"] / speed if speed > 0 else 0.0)
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            tasks.append(asyncio.ensure_future(send(request, scheduled if speed > 0 else None)))
+        if tasks:
+            await asyncio.wait(tasks)
+    return results, time.perf_counter() - start
+
+def route_summary(results):
+    """p50/p95/p99, erreurs et statuts divergents par route"""
+    by_route = {}
+    for result in results:
+        by_route.setdefault(result["route"], []).append(result)
+    summary = {}
+    for route, items in sorted(by_route.items()):
+        latencies = sorted(item["latency_ms"] for item in items)
+        summary[route] = {
+            "requests": len(items),
+            "errors": sum(1 for item in items if item["status"] == 0 or item["status"] >= 500),
+            # Statut différent de la production (401 d'un jeton, 404 d'un id absent...)
+            "status_mismatch": sum(1 for item in items if item["status"] != item["original_status"]),
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+        }
+    return summary
+
+def compare(base, current, threshold: float, min_requests: int):
+    """Écarts par route ; retourne les routes dont p50 ou p95 régresse au-delà de threshold"""
+    regressions = []
+    print(f"{'route':<44} {'n':>6} {'p50 ms':>18} {'p95 ms':>18} {'p99 ms':>18}")
+    for route, before in base["routes"].items():
+        after = current["routes"].get(route)
+        if after is None:
+            continue
+        cells = []
+        regressed = False
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            delta = (after[key] - before[key]) / before[key] if before[key] else 0.0
+            cells.append(f"{before[key]:>7.1f}->{after[key]:<7.1f}{delta * 100:+4.0f}%")
+            if key != "p99_ms" and delta > threshold and min(before["requests"], after["requests"]) >= min_requests:
+                regressed = True
+        print(f"{route:<44} {after['requests']:>6} {' '.join(cells)}{'  RÉGRESSION' if regressed else ''}")
+        if regressed:
+            regressions.append(route)
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Rejeu des access logs de production")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    build_parser = subparsers.add_parser("build", help="Access log -> corpus anonymisé")
+    build_parser.add_argument("log")
+    build_parser.add_argument("corpus")
+    build_parser.add_argument("--users", type=int, default=50, help="Utilisateurs de test")
+    build_parser.add_argument("--keep-search-terms", action="store_true",
+                              help="Conserver les termes de recherche d'origine")
+    build_parser.add_argument("--users-file", help="Profils des utilisateurs de test (USERS_FILE de l'instance)")
+    build_parser.add_argument("--seed", type=int, default=1)
+
+    replay_parser = subparsers.add_parser("replay", help="Rejoue un corpus contre une instance de test")
+    replay_parser.add_argument("corpus")
+    replay_parser.add_argument("--url", default="http://127.0.0.1:8000")
+    replay_parser.add_argument("--speed", type=float, default=1.0,
+                               help="Accélération du rythme d'origine (0 : au plus vite)")
+    replay_parser.add_argument("--concurrency", type=int, default=200)
+    replay_parser.add_argument("--limit", type=int, default=0, help="N premières requêtes seulement")
+    replay_parser.add_argument("--seed", type=int, default=1)
+    replay_parser.add_argument("--output", default="replay.json")
+
+    compare_parser = subparsers.add_parser("compare", help="Écarts de latence par route entre deux rejeux")
+    compare_parser.add_argument("base")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.10)
+    compare_parser.add_argument("--min-requests", type=int, default=20,
+                                help="Routes ignorées en dessous de ce nombre de requêtes")
+    args = parser.parse_args()
+
+    if args.command == "build":
+        count, skipped = build_corpus(args.log, args.corpus, args.users, args.keep_search_terms)
+        print(f"{count} requêtes écrites dans {args.corpus}")
+        for reason, lines in skipped.most_common():
+            print(f"  écartées ({reason}) : {lines}")
+        if args.users_file:
+            write_users_file(args.users_file, test_profiles(args.users, args.seed))
+            print(f"Profils de test écrits dans {args.users_file}")
+        return 0
+
+    if args.command == "replay":
+        meta, corpus = load_corpus(args.corpus)
+        if args.limit:
+            corpus = corpus[:args.limit]
+        url = args.url.rstrip("/")
+
+        async def run():
+            async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=60)) as session:
+                users = await register_users(session, url, test_profiles(meta["users"], args.seed))
+            return await replay(corpus, url, users, args.speed, args.concurrency, args.seed)
+
+        results, elapsed = asyncio.run(run())
+        routes = route_summary(results)
+        for route, row in routes.items():
+            print(f"{route:<44} {row['requests']:>6}  p50 {row['p50_ms']:8.1f}  p95 {row['p95_ms']:8.1f}  "
+                  f"p99 {row['p99_ms']:8.1f} ms  erreurs {row['errors']}  statuts divergents {row['status_mismatch']}")
+        print(f"{len(results)} requêtes rejouées en {elapsed:.1f} s")
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump({"url": url, "corpus": args.corpus, "speed": args.speed, "elapsed": round(elapsed, 2),
+                       "routes": routes, "requests": results}, f, ensure_ascii=False)
+        return 0
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.current, encoding="utf-8") as f:
+        current = json.load(f)
+    regressions = compare(base, current, args.threshold, args.min_requests)
+    if regressions:
+        print(f"{len(regressions)} route(s) en régression (seuil +{args.threshold * 100:.0f} %)")
+        return 1
+    print("Aucune régression")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,11 +4,12 @@ Permet de sauvegarder et charger les profils utilisateurs dans un fichier.
 """
 
 import os
-import json
 import sys
 
-# Chemin du fichier de base de données utilisateurs
-DATABASE_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "users.json")
+from src import json_codec
+
+# Chemin du fichier de base de données utilisateurs (USERS_FILE : profils de test, tests de charge)
+DATABASE_FILE = os.environ.get("USERS_FILE") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "users.json")
 
 def load_users():
     """
@@ -27,15 +28,13 @@ def load_users():
             print("Fichier de base de données utilisateurs vide. Utilisation des utilisateurs par défaut.")
             return default_users
         
-        with open(DATABASE_FILE, 'r', encoding='utf-8') as f:
+        with open(DATABASE_FILE, 'rb') as f:
             content = f.read().strip()
-            if not content:
-                print("Fichier de base de données utilisateurs vide. Utilisation des utilisateurs par défaut.")
-                return default_users
-                
-            # Revenir au début du fichier pour le charger à nouveau
-            f.seek(0)
-            users = json.load(f)
+        if not content:
+            print("Fichier de base de données utilisateurs vide. Utilisation des utilisateurs par défaut.")
+            return default_users
+        
+        users = json_codec.loads(content)
             
         if not users:
             print("Aucun utilisateur trouvé dans la base de données. Utilisation des utilisateurs par défaut.")
@@ -43,7 +42,7 @@ def load_users():
             
         print(f"Base de données utilisateurs chargée: {len(users)} profils trouvés.")
         return users
-    except json.JSONDecodeError as e:
+    except json_codec.JSONDecodeError as e:
         print(f"Erreur de format JSON dans la base de données: {e}")
         print("Utilisation des utilisateurs par défaut.")
         return default_users
@@ -72,8 +71,8 @@ def save_users(users):
         
         # Sauvegarde dans un fichier temporaire d'abord pour éviter de corrompre le fichier original
         temp_file = DATABASE_FILE + '.tmp'
-        with open(temp_file, 'w', encoding='utf-8') as f:
-            json.dump(users, f, ensure_ascii=False, indent=4)
+        with open(temp_file, 'wb') as f:
+            f.write(json_codec.dumps(users, indent=True))
         
         # Vérifier que le fichier a bien été créé et qu'il contient des données
         if not os.path.exists(temp_file) or os.path.getsize(temp_file) == 0:
@@ -3,12 +3,29 @@
 
 import multiprocessing
 import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+# Instantanés des métriques des workers, additionnés par /metrics (avant l'import de src.metrics)
+os.environ.setdefault("METRICS_DIR", "/tmp/whattowatch-metrics")
+
+from src.memory import disable_gc_in_master, enable_gc_in_worker, freeze_before_fork, read_memory_usage
+from src.metrics import archive_worker, registry, reset_directory
+
+# Pages mémoire partagées entre master et workers (MEMORY_FREEZE=0 pour désactiver) :
+# pas de GC pendant le préchargement, gel des objets avant chaque fork
+disable_gc_in_master()
+
+# Rapport mémoire d'un worker toutes les N requêtes (0 : jamais)
+memory_report_every = int(os.environ.get("MEMORY_REPORT_EVERY", "1000"))
 
 # Configuration serveur
 bind = "0.0.0.0:8000"
 workers = min(4, multiprocessing.cpu_count() * 2 + 1)
 worker_class = "sync"
-worker_connections = 1000
+# worker_connections n'a d'effet qu'avec des workers gevent : voir gunicorn_config.py
 max_requests = 1000
 max_requests_jitter = 100
 
@@ -20,20 +37,60 @@ keepalive = 2
 loglevel = "info"
 accesslog = "/tmp/whattowatch-access.log"
 errorlog = "/tmp/whattowatch-error.log"
-access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s"'
+# Format "combined" suivi de la durée en microsecondes (benchmarks/replay_access_log.py)
+access_log_format = '%(h)s %(l)s %(u)s %(t)s "%(r)s" %(s)s %(b)s "%(f)s" "%(a)s" %(D)s'
 
 # Process naming
 proc_name = "whattowatch-backend"
 
-# Preload app
+# Preload app : le master importe l'application sans appel réseau ; les
+# connexions et tests des fournisseurs sont faits dans chaque worker (post_fork)
 preload_app = True
 
 # Démarrage/arrêt
 def on_starting(server):
     server.log.info("🚀 Démarrage de WhatToWatch Backend...")
+    reset_directory()
 
 def when_ready(server):
     server.log.info("✅ WhatToWatch Backend prêt à recevoir des connexions")
 
+def pre_fork(server, worker):
+    freeze_before_fork()
+
+def post_fork(server, worker):
+    # Phase post-fork du moteur : pools de connexions et de threads propres
+    # au worker, tests de connexion des fournisseurs
+    worker.boot_started_at = time.time()
+    enable_gc_in_worker()
+    from api import modular_engine
+    modular_engine.start()
+    registry.start_flusher()
+    # Worker d'emails : les emails en file ou à réessayer partent sans attendre un nouvel envoi
+    from src.email_service import email_service
+    email_service.start_worker()
+
+def post_worker_init(worker):
+    boot_ms = (time.time() - getattr(worker, "boot_started_at", time.time())) * 1000
+    worker.log.info(f"⏱️ Worker {worker.pid} prêt en {boot_ms:.0f} ms")
+    _log_memory(worker)
+
+def post_request(worker, req, environ, resp):
+    worker.requests_served = getattr(worker, "requests_served", 0) + 1
+    if memory_report_every and worker.requests_served % memory_report_every == 0:
+        _log_memory(worker)
+
+def _log_memory(worker):
+    usage = read_memory_usage()
+    if usage:
+        worker.log.info(
+            f"🧠 Worker {worker.pid} : {usage['unique']} Ko uniques, "
+            f"{usage['shared']} Ko partagés ({getattr(worker, 'requests_served', 0)} requêtes)"
+        )
+
+def child_exit(server, worker):
+    # Compteurs du worker arrêté conservés dans archive.json
+    archive_worker(worker.pid)
+
 def on_exit(server):
     server.log.info("🛑 Arrêt de WhatToWatch Backend")
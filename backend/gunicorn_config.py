@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Profil Gunicorn gevent : gunicorn -c gunicorn_config.py wsgi:application
+
+Reprend gunicorn.conf.py et remplace les workers sync par des workers gevent.
+Avec preload_app, l'application est importée par le master : le
+monkeypatching doit donc être fait ici, avant ce chargement.
+"""
+
+from gevent import monkey
+monkey.patch_all()
+
+import os
+import runpy
+
+_base = runpy.run_path(os.path.join(os.path.dirname(os.path.abspath(__file__)), "gunicorn.conf.py"))
+globals().update({name: value for name, value in _base.items() if not name.startswith("_")})
+
+worker_class = "gevent"
+
+# Requêtes simultanées par worker (greenlets). Limites mesurées avec
+# benchmarks/load_gevent.py : voir la section "Mode gevent" du README
+worker_connections = int(os.environ.get("GEVENT_WORKER_CONNECTIONS", "200"))
+
+# Un worker gevent sert des centaines de requêtes : peu de processus suffisent
+workers = int(os.environ.get("GUNICORN_WORKERS", "2"))
+
+# Les requêtes en attente des fournisseurs restent ouvertes plus longtemps
+keepalive = 5
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Serveur gevent autonome (sans gunicorn)
+
+Le monkeypatching doit avoir lieu avant tout autre import : socket, ssl et
+threading doivent être remplacés avant que requests, pymysql ou le moteur de
+recommandation ne les chargent, sinon leurs appels réseau bloquent tout le
+processus au lieu de céder la main aux autres greenlets.
+
+Usage: python server_gevent.py
+Variables: HOST (0.0.0.0), PORT (8000), GEVENT_MAX_CONNECTIONS (200),
+           GEVENT_BACKLOG (2048), GEVENT_KEEPALIVE (5 secondes)
+"""
+
+from gevent import monkey
+monkey.patch_all()
+
+import os
+import socket
+
+from gevent.pool import Pool
+from gevent.pywsgi import WSGIHandler, WSGIServer
+
+from api import app, modular_engine
+from src.email_service import email_service
+
+class KeepAliveTimeoutHandler(WSGIHandler):
+    """
+    Ferme les connexions keep-alive inactives
+
+    Le pool limite les connexions, pas les requêtes : sans délai, un client
+    qui garde sa connexion ouverte occupe une place indéfiniment et les
+    nouvelles connexions restent bloquées dans la file d'accept.
+    """
+
+    keepalive_timeout = float(os.environ.get("GEVENT_KEEPALIVE", "5"))
+
+    def read_requestline(self):
+        self.socket.settimeout(self.keepalive_timeout)
+        try:
+            return super().read_requestline()
+        except (socket.timeout, OSError):
+            return ""
+        finally:
+            self.socket.settimeout(None)
+
+def main():
+    host = os.environ.get("HOST", "0.0.0.0")
+    port = int(os.environ.get("PORT", "8000"))
+    # Nombre maximal de requêtes servies simultanément ; au-delà, les
+    # connexions attendent dans la file d'accept du système (GEVENT_BACKLOG,
+    # même valeur par défaut que gunicorn)
+    max_connections = int(os.environ.get("GEVENT_MAX_CONNECTIONS", "200"))
+    backlog = int(os.environ.get("GEVENT_BACKLOG", "2048"))
+
+    modular_engine.start()
+    email_service.start_worker()
+    server = WSGIServer((host, port), app, spawn=Pool(max_connections), backlog=backlog,
+                        handler_class=KeepAliveTimeoutHandler)
+    print(f"🚀 Serveur gevent sur http://{host}:{port} ({max_connections} connexions max)")
+    server.serve_forever()
+
+if __name__ == "__main__":
+    main()
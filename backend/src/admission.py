@@ -0,0 +1,198 @@
+"""
+Contrôle d'admission des routes coûteuses
+
+Quand TMDb ou Watchmode ralentissent, les requêtes de recommandations
+s'accumulent jusqu'au timeout de gunicorn (30 s) et affament les routes
+légères (/api/ping, /api/genres). Chaque groupe de routes coûteuses a donc :
+  - un nombre maximum d'exécutions simultanées par processus ;
+  - une file d'attente bornée, avec un délai d'attente court ;
+au-delà, la requête est refusée tout de suite (Overloaded) : l'appelant sert
+une réponse en cache, même périmée, ou répond 503 avec Retry-After.
+
+Seul le calcul (cache manqué) passe par l'admission : une réponse déjà en
+cache est servie sans attendre.
+
+Réglage par variable d'environnement, "simultanées,file,attente_en_secondes" :
+    ADMISSION_RECOMMENDATIONS=8,16,2
+"""
+
+import asyncio
+import math
+import os
+import threading
+import time
+from contextlib import asynccontextmanager, contextmanager
+from typing import Any, AsyncIterator, Dict, Iterator, Tuple
+
+from src.metrics import admission_decisions, registry
+
+# (simultanées, file d'attente, attente maximale en secondes) par défaut
+DEFAULT_LIMITS = {
+    "recommendations": (8, 16, 2.0),
+    "search": (16, 32, 1.0),
+    "trending": (8, 16, 1.0),
+}
+
+# Bornes du délai Retry-After proposé au client (secondes)
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 30
+
+class Overloaded(Exception):
+    """Requête refusée : trop d'exécutions en cours et file d'attente pleine ou trop lente"""
+
+    def __init__(self, name: str, retry_after: int):
+        super().__init__(f"Service {name} surchargé")
+        self.name = name
+        self.retry_after = retry_after
+
+class AdmissionLimit:
+    """Sémaphore avec file d'attente bornée et compteurs (sûr entre threads et greenlets)"""
+
+    def __init__(self, name: str, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.name = name
+        self.max_concurrent = max(1, max_concurrent)
+        self.max_queue = max(0, max_queue)
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._active = 0
+        self._waiting = 0
+        # Durée moyenne (glissante) d'une exécution, pour estimer Retry-After
+        self._average_duration = 1.0
+        self.counters = {
+            "admitted": 0,
+            "queued": 0,
+            "shed_queue_full": 0,
+            "shed_timeout": 0,
+            "served_stale": 0,
+        }
+
+    def acquire(self) -> bool:
+        """Attend une place ; False si la file est pleine ou si l'attente dépasse queue_timeout"""
+        decision = self._acquire()
+        admission_decisions.inc(limit=self.name, decision=decision)
+        return decision in ("admitted", "queued")
+
+    def _acquire(self) -> str:
+        with self._cond:
+            if self._active < self.max_concurrent:
+                self._active += 1
+                self.counters["admitted"] += 1
+                return "admitted"
+            if self._waiting >= self.max_queue:
+                self.counters["shed_queue_full"] += 1
+                return "shed_queue_full"
+
+            self._waiting += 1
+            self.counters["queued"] += 1
+            deadline = time.monotonic() + self.queue_timeout
+            try:
+                while self._active >= self.max_concurrent:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        self.counters["shed_timeout"] += 1
+                        return "shed_timeout"
+                    self._cond.wait(remaining)
+                self._active += 1
+                self.counters["admitted"] += 1
+                return "queued"
+            finally:
+                self._waiting -= 1
+
+    def release(self, duration: float):
+        with self._cond:
+            self._active -= 1
+            self._average_duration = 0.8 * self._average_duration + 0.2 * duration
+            self._cond.notify()
+
+    def retry_after(self) -> int:
+        """Secondes avant qu'une place se libère probablement (file actuelle comprise)"""
+        with self._cond:
+            rounds = (self._waiting + self._active) / self.max_concurrent
+            estimate = math.ceil(self._average_duration * max(1.0, rounds))
+        return max(MIN_RETRY_AFTER, min(MAX_RETRY_AFTER, estimate))
+
+    @contextmanager
+    def slot(self) -> Iterator[None]:
+        """
+        Exécute le bloc avec une place réservée
+
+        Raises:
+            Overloaded: Si aucune place ne se libère à temps
+        """
+        if not self.acquire():
+            raise Overloaded(self.name, self.retry_after())
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    @asynccontextmanager
+    async def async_slot(self) -> AsyncIterator[None]:
+        """
+        Version asynchrone de slot (mode ASGI) : l'attente en file se fait
+        dans un thread, sans bloquer la boucle d'événements
+
+        Raises:
+            Overloaded: Si aucune place ne se libère à temps
+        """
+        if not await asyncio.get_running_loop().run_in_executor(None, self.acquire):
+            raise Overloaded(self.name, self.retry_after())
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def record_stale(self):
+        """Compte une réponse périmée servie à la place d'un refus"""
+        with self._cond:
+            self.counters["served_stale"] += 1
+        admission_decisions.inc(limit=self.name, decision="served_stale")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                **self.counters,
+                "active": self._active,
+                "waiting": self._waiting,
+                "max_concurrent": self.max_concurrent,
+                "max_queue": self.max_queue,
+                "queue_timeout": self.queue_timeout,
+                "average_duration": round(self._average_duration, 3),
+            }
+
+def _parse_limit(value: str, default: Tuple[int, int, float]) -> Tuple[int, int, float]:
+    try:
+        concurrent, queue_size, timeout = value.split(",")
+        return int(concurrent), int(queue_size), float(timeout)
+    except ValueError:
+        return default
+
+class AdmissionController:
+    """Limites d'admission par groupe de routes (une instance par processus worker)"""
+
+    def __init__(self, limits: Dict[str, Tuple[int, int, float]] = None):
+        limits = limits if limits is not None else DEFAULT_LIMITS
+        self._limits = {}
+        for name, default in limits.items():
+            env_value = os.environ.get(f"ADMISSION_{name.upper()}")
+            config = _parse_limit(env_value, default) if env_value else default
+            self._limits[name] = AdmissionLimit(name, *config)
+
+    def __getitem__(self, name: str) -> AdmissionLimit:
+        return self._limits[name]
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {name: limit.stats() for name, limit in self._limits.items()}
+
+# Instance globale (une par processus worker)
+admission = AdmissionController()
+
+def _in_flight():
+    for name, stats in admission.stats().items():
+        yield (name, "active"), stats["active"]
+        yield (name, "waiting"), stats["waiting"]
+
+registry.gauge("whattowatch_admission_in_flight", "Requêtes en cours et en file d'attente",
+               ("limit", "state"), _in_flight)
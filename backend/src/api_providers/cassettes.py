@@ -0,0 +1,271 @@
+"""
+Enregistrement et rejeu des appels HTTP des fournisseurs (cassettes)
+PROVIDER_CASSETTES=record : chaque réponse réelle (hors 5xx) est enregistrée
+dans une cassette compressée (gzip), avec sa durée ; les clés d'API sont
+retirées de la requête comme de la réponse.
+PROVIDER_CASSETTES=replay : les réponses sont servies depuis les cassettes,
+sans réseau. Une requête jamais enregistrée lève CassetteMissError, traitée
+par les fournisseurs comme une panne réseau.
+
+Une cassette est identifiée par la requête normalisée : fournisseur,
+méthode, chemin relatif à l'URL de base du fournisseur et paramètres triés,
+sans les paramètres secrets. Des réponses enregistrées auprès du serveur de
+substitution (TMDB_BASE_URL=...) se rejouent donc avec les URL réelles.
+
+PROVIDER_CASSETTE_DIR : dossier des cassettes (défaut: backend/cassettes)
+PROVIDER_CASSETTE_LATENCY : facteur appliqué à la durée enregistrée lors du
+rejeu (0 = réponse immédiate, 1 = latence d'origine)
+"""
+
+import asyncio
+import gzip
+import hashlib
+import os
+import threading
+import time
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import aiohttp
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from src import json_codec
+
+CASSETTE_MODE = os.environ.get("PROVIDER_CASSETTES", "").strip().lower()
+CASSETTE_DIR = os.environ.get("PROVIDER_CASSETTE_DIR") or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__)))), "cassettes"
+)
+REPLAY_LATENCY = float(os.environ.get("PROVIDER_CASSETTE_LATENCY", "0"))
+
+MODES = ("record", "replay")
+# Paramètres et en-têtes jamais enregistrés (ni pris en compte dans la clé)
+SECRET_PARAMS = frozenset({"api_key", "apikey", "key", "token", "access_token"})
+SECRET_HEADERS = frozenset({"authorization", "x-rapidapi-key", "cookie"})
+# En-têtes de réponse conservés
+KEPT_HEADERS = ("content-type", "content-language", "cache-control")
+SCRUBBED = "***"
+
+class CassetteMissError(requests.exceptions.ConnectionError, aiohttp.ClientConnectionError):
+    """Requête absente des cassettes en mode rejeu"""
+
+def normalize_request(method: str, url: str, params: Optional[Dict[str, Any]] = None,
+                      provider: str = "", base_path: str = ""):
+    """
+    Forme canonique d'une requête
+
+    Args:
+        provider: Nom du fournisseur
+        base_path: Chemin de son URL de base, retiré du chemin de la requête
+
+    Returns:
+        (clé de la cassette, description lisible sans secret)
+    """
+    parts = urlsplit(url)
+    path = parts.path
+    if base_path and (path == base_path or path.startswith(base_path.rstrip("/") + "/")):
+        path = path[len(base_path.rstrip("/")):]
+    query = parse_qsl(parts.query, keep_blank_values=True)
+    if params:
+        query += [(key, str(value)) for key, value in params.items() if value is not None]
+    query = sorted((key, value) for key, value in query if key.lower() not in SECRET_PARAMS)
+    description = {"provider": provider, "method": method.upper(), "path": path or "/", "query": urlencode(query)}
+    canonical = f"{provider} {description['method']} {description['path']}?{description['query']}"
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:32], description
+
+def secret_values(url: str, headers=None):
+    """Valeurs secrètes d'une requête, à effacer de la réponse enregistrée"""
+    values = {value for key, value in parse_qsl(urlsplit(url).query) if key.lower() in SECRET_PARAMS}
+    values.update(value for key, value in (headers or {}).items() if key.lower() in SECRET_HEADERS)
+    return {value for value in values if len(value) >= 4}
+
+class CassetteStore:
+    """Cassettes gzip d'un dossier : <dossier>/<2 premiers caractères>/<clé>.json.gz"""
+
+    def __init__(self, directory: Optional[str] = None, latency_factor: Optional[float] = None):
+        self.directory = directory or CASSETTE_DIR
+        self.latency_factor = REPLAY_LATENCY if latency_factor is None else latency_factor
+        self._entries = {}
+        self._lock = threading.Lock()
+        self.stats = {"hits": 0, "misses": 0, "recorded": 0, "replayed_bytes": 0}
+
+    def path(self, key: str) -> str:
+        return os.path.join(self.directory, key[:2], f"{key}.json.gz")
+
+    def load(self, key: str) -> Optional[Dict[str, Any]]:
+        """Cassette de la clé (gardée en mémoire après la première lecture), None si absente"""
+        entry = self._entries.get(key)
+        if entry is None:
+            try:
+                with gzip.open(self.path(key), "rb") as f:
+                    entry = json_codec.loads(f.read())
+            except FileNotFoundError:
+                with self._lock:
+                    self.stats["misses"] += 1
+                return None
+            entry["content"] = entry.pop("body").encode("utf-8")
+            self._entries[key] = entry
+        with self._lock:
+            self.stats["hits"] += 1
+            self.stats["replayed_bytes"] += len(entry["content"])
+        return entry
+
+    def save(self, key: str, description: Dict[str, Any], status: int, headers, content: bytes,
+             duration: float, secrets=()):
+        """Enregistre une réponse ; écriture atomique (fichier temporaire puis renommage)"""
+        body = content.decode("utf-8", errors="replace")
+        for secret in secrets:
+            body = body.replace(secret, SCRUBBED)
+        entry = {
+            "request": description,
+            "status": status,
+            "headers": {name: headers[name] for name in KEPT_HEADERS if name in headers},
+            "duration": round(duration, 4),
+            "recorded_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "body": body,
+        }
+        path = self.path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        temporary = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with gzip.open(temporary, "wb", compresslevel=6) as f:
+            f.write(json_codec.dumps(entry))
+        os.replace(temporary, path)
+        self._entries.pop(key, None)
+        with self._lock:
+            self.stats["recorded"] += 1
+
+    def replay_delay(self, entry: Dict[str, Any]) -> float:
+        return entry.get("duration", 0) * self.latency_factor
+
+    def missing(self, description: Dict[str, Any]) -> CassetteMissError:
+        return CassetteMissError(
+            f"Aucune cassette {description['provider']} pour "
+            f"{description['method']} {description['path']}?{description['query']}"
+        )
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store() -> CassetteStore:
+    """Magasin de cassettes du processus (PROVIDER_CASSETTE_DIR)"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CassetteStore()
+    return _store
+
+# --- Client requests ---
+
+def replayed_response(entry: Dict[str, Any], request: requests.PreparedRequest) -> requests.Response:
+    response = requests.Response()
+    response.status_code = entry["status"]
+    response.headers = CaseInsensitiveDict(entry["headers"])
+    response._content = entry["content"]
+    response.encoding = "utf-8"
+    response.url = request.url
+    response.request = request
+    response.reason = "OK" if entry["status"] < 400 else "Cassette"
+    return response
+
+# --- Client aiohttp ---
+
+class CassetteResponse:
+    """Réponse aiohttp rejouée (status, headers, read/text/json)"""
+
+    def __init__(self, entry: Dict[str, Any], url: str):
+        self.status = entry["status"]
+        self.headers = dict(entry["headers"])
+        self.url = url
+        self._content = entry["content"]
+
+    async def read(self) -> bytes:
+        return self._content
+
+    async def text(self, encoding: str = "utf-8") -> str:
+        return self._content.decode(encoding)
+
+    async def json(self, **kwargs) -> Any:
+        return json_codec.loads(self._content)
+
+    def release(self):
+        pass
+
+class _CassetteRequest:
+    def __init__(self, session: "CassetteClientSession", method: str, url: str, kwargs):
+        self.session = session
+        self.method = method
+        self.url = url
+        self.kwargs = kwargs
+
+    async def __aenter__(self) -> CassetteResponse:
+        return await self.session._request(self.method, self.url, **self.kwargs)
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+class CassetteClientSession:
+    """
+    Remplace la session aiohttp des fournisseurs : rejoue les cassettes, ou
+    en mode enregistrement passe par la vraie session et enregistre la réponse
+
+    Args:
+        store: Magasin de cassettes
+        session: Vraie session aiohttp (mode enregistrement), None en rejeu
+        observer: Appelé avec (url, début, durée, statut) à chaque appel rejoué
+        base_paths: Chemin de l'URL de base -> nom du fournisseur
+    """
+
+    def __init__(self, store: CassetteStore, session: Optional[aiohttp.ClientSession] = None, observer=None,
+                 base_paths: Optional[Dict[str, str]] = None):
+        self.store = store
+        self.session = session
+        self.observer = observer
+        # Le plus long préfixe d'abord
+        self.base_paths = sorted((base_paths or {}).items(), key=lambda item: -len(item[0]))
+        self._closed = False
+
+    @property
+    def closed(self) -> bool:
+        return self.session.closed if self.session is not None else self._closed
+
+    async def close(self):
+        self._closed = True
+        if self.session is not None:
+            await self.session.close()
+
+    def get(self, url: str, **kwargs) -> _CassetteRequest:
+        return _CassetteRequest(self, "GET", url, kwargs)
+
+    def _provider(self, url: str):
+        path = urlsplit(url).path
+        for base_path, provider in self.base_paths:
+            if path == base_path or path.startswith(base_path.rstrip("/") + "/"):
+                return provider, base_path
+        return "", ""
+
+    async def _request(self, method: str, url: str, params=None, headers=None, **kwargs) -> CassetteResponse:
+        key, description = normalize_request(method, url, params, *self._provider(url))
+        if self.session is None:
+            start = time.perf_counter()
+            entry = self.store.load(key)
+            if entry is None:
+                raise self.store.missing(description)
+            delay = self.store.replay_delay(entry)
+            if delay > 0:
+                await asyncio.sleep(delay)
+            if self.observer is not None:
+                self.observer(url, start, time.perf_counter() - start, entry["status"])
+            return CassetteResponse(entry, url)
+
+        start = time.perf_counter()
+        async with self.session.request(method, url, params=params, headers=headers, **kwargs) as response:
+            content = await response.read()
+            status = response.status
+            response_headers = {name.lower(): value for name, value in response.headers.items()}
+        duration = time.perf_counter() - start
+        full_url = f"{url}?{urlencode(params)}" if params else url
+        if status < 500:
+            self.store.save(key, description, status, response_headers, content, duration,
+                            secret_values(full_url, headers))
+        return CassetteResponse({"status": status, "headers": response_headers, "content": content}, url)
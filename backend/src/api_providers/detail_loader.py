@@ -0,0 +1,137 @@
+"""
+Chargement groupé des détails TMDb (crédits, mots-clés, disponibilité)
+Les détails déjà connus viennent d'un cache partagé par les requêtes du
+worker (tendances, détails enrichis des recommandations) ; les autres sont
+demandés en parallèle, DETAIL_CONCURRENCY appels au plus à la fois.
+
+Une requête n'attend pas plus de DETAIL_DEADLINE secondes : elle repart avec
+les détails arrivés à temps. En mode threads et ASGI, les appels en retard
+terminent en arrière-plan et remplissent le cache pour les requêtes
+suivantes (en mode gevent, les greenlets en retard sont arrêtés).
+
+DETAIL_CACHE_MINUTES : durée de vie d'un détail en cache (les erreurs ne
+sont jamais gardées)
+"""
+
+import asyncio
+import os
+from collections import namedtuple
+from functools import partial
+from typing import Any, Dict, Iterable, Optional, Tuple
+
+import aiohttp
+
+from src.concurrency import iter_concurrently
+from src.recommendation_utils import CacheManager
+from src import tracing
+
+DETAIL_CACHE_MINUTES = int(os.environ.get("DETAIL_CACHE_MINUTES", "360"))
+DETAIL_CONCURRENCY = int(os.environ.get("DETAIL_CONCURRENCY", "20"))
+DETAIL_DEADLINE = float(os.environ.get("DETAIL_DEADLINE", "1.5"))
+
+# details : (id, type) -> détails reçus ; pending : appels non terminés à l'échéance
+DetailBatch = namedtuple("DetailBatch", ["details", "pending"])
+
+class DetailLoader:
+    """
+    Détails TMDb par lot, avec cache partagé et échéance
+
+    Args:
+        provider: TMDbProvider (get_details / get_details_async)
+        cache: Cache des détails (défaut: cache dédié du loader)
+        max_concurrency: Appels simultanés au plus pour un lot
+        deadline: Attente maximale d'un lot, en secondes
+    """
+
+    def __init__(self, provider, cache: Optional[CacheManager] = None,
+                 max_concurrency: int = DETAIL_CONCURRENCY, deadline: float = DETAIL_DEADLINE):
+        self.provider = provider
+        self.cache = cache or CacheManager(cache_duration_minutes=DETAIL_CACHE_MINUTES, namespace="details")
+        self.max_concurrency = max(1, max_concurrency)
+        self.deadline = deadline
+
+    @staticmethod
+    def _cache_key(item_id: Any, content_type: str) -> str:
+        return f"{content_type}:{item_id}"
+
+    def _store(self, item_id: Any, content_type: str, details: Dict[str, Any]) -> Dict[str, Any]:
+        if "error" not in details:
+            self.cache.set(self._cache_key(item_id, content_type), details)
+        return details
+
+    def _split(self, keys: Iterable[Tuple[Any, str]]):
+        """(détails en cache, clés à demander), sans doublons"""
+        found = {}
+        missing = []
+        for key in dict.fromkeys(keys):
+            details = self.cache.get(self._cache_key(*key))
+            if details is not None:
+                found[key] = details
+            else:
+                missing.append(key)
+        return found, missing
+
+    def get(self, item_id: Any, content_type: str) -> Dict[str, Any]:
+        """Détails d'un élément (cache, sinon un appel) ; dictionnaire partagé, à copier avant modification"""
+        details = self.cache.get(self._cache_key(item_id, content_type))
+        return details if details is not None else self._fetch(item_id, content_type)
+
+    def _fetch(self, item_id: Any, content_type: str) -> Dict[str, Any]:
+        return self._store(item_id, content_type, self.provider.get_details(item_id, content_type))
+
+    def load_many(self, keys: Iterable[Tuple[Any, str]], deadline: Optional[float] = None) -> DetailBatch:
+        """
+        Détails de plusieurs éléments, en une seule attente bornée
+
+        Args:
+            keys: (id, 'movie' ou 'tv') des éléments
+            deadline: Attente maximale en secondes (défaut: celle du loader)
+
+        Returns:
+            DetailBatch(details, pending) ; les éléments en erreur ou en retard
+            sont absents de details
+        """
+        found, missing = self._split(keys)
+        if not missing:
+            return DetailBatch(found, 0)
+
+        pending = len(missing)
+        with tracing.stage("details", count=len(missing)):
+            tasks = [partial(self._fetch, *key) for key in missing]
+            for index, details, error in iter_concurrently(
+                tasks, max_workers=self.max_concurrency, timeout=self.deadline if deadline is None else deadline
+            ):
+                pending -= 1
+                if error is None and "error" not in details:
+                    found[missing[index]] = details
+        return DetailBatch(found, pending)
+
+    async def get_async(self, session: aiohttp.ClientSession, item_id: Any, content_type: str) -> Dict[str, Any]:
+        """Version asynchrone de get (mode ASGI)"""
+        details = self.cache.get(self._cache_key(item_id, content_type))
+        if details is None:
+            details = self._store(item_id, content_type,
+                                  await self.provider.get_details_async(session, item_id, content_type))
+        return details
+
+    async def load_many_async(self, session: aiohttp.ClientSession, keys: Iterable[Tuple[Any, str]],
+                              deadline: Optional[float] = None) -> DetailBatch:
+        """Version asynchrone de load_many (mode ASGI)"""
+        found, missing = self._split(keys)
+        if not missing:
+            return DetailBatch(found, 0)
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def fetch(item_id, content_type):
+            async with semaphore:
+                details = await self.provider.get_details_async(session, item_id, content_type)
+            return self._store(item_id, content_type, details)
+
+        tasks = {asyncio.ensure_future(fetch(*key)): key for key in missing}
+        # Les tâches en retard ne sont pas annulées : elles remplissent le cache
+        done, not_done = await asyncio.wait(tasks, timeout=self.deadline if deadline is None else deadline)
+        for task in done:
+            if task.exception() is None and "error" not in task.result():
+                found[tasks[task]] = task.result()
+        return DetailBatch(found, len(not_done))
@@ -0,0 +1,127 @@
+"""
+Session HTTP partagée par les appels d'un fournisseur
+Une session requests (pool de connexions keep-alive) par processus : une
+session créée avant un fork n'est jamais réutilisée par les workers.
+Chaque appel est mesuré (src/metrics.py) par fournisseur et endpoint, et
+ajouté comme span à la trace de la requête (src/tracing.py). Avec
+PROVIDER_CASSETTES=record|replay, les appels sont enregistrés ou rejoués
+(cassettes.py).
+"""
+
+import os
+import re
+import threading
+import time
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from src import tracing
+from src.metrics import record_provider_call
+from . import cassettes
+
+# Connexions gardées ouvertes par hôte et par worker
+POOL_SIZE = int(os.environ.get("PROVIDER_POOL_SIZE", "20"))
+
+_ID_SEGMENT = re.compile(r"/\d+(?=/|$)")
+
+def endpoint_label(path: str, base_path: str = "") -> str:
+    """Endpoint d'un appel pour les métriques : /movie/550?... -> /movie/{id}"""
+    path = path.split("?", 1)[0]
+    if base_path and path.startswith(base_path):
+        path = path[len(base_path):]
+    return _ID_SEGMENT.sub("/{id}", path).rstrip("/") or "/"
+
+class InstrumentedAdapter(HTTPAdapter):
+    """Adaptateur requests qui mesure chaque appel (durée, statut ou erreur)"""
+
+    def __init__(self, provider: str, base_path: str = "", **kwargs):
+        self.provider = provider
+        self.base_path = base_path
+        super().__init__(**kwargs)
+
+    def send(self, request, **kwargs):
+        endpoint = endpoint_label(request.path_url, self.base_path)
+        start = time.perf_counter()
+        try:
+            with tracing.span(f"http.{self.provider}", endpoint=endpoint):
+                response = self._transport(request, **kwargs)
+        except Exception:
+            record_provider_call(self.provider, endpoint, "error", time.perf_counter() - start)
+            raise
+        record_provider_call(self.provider, endpoint, f"{response.status_code // 100}xx", time.perf_counter() - start)
+        return response
+
+    def _transport(self, request, **kwargs):
+        return super().send(request, **kwargs)
+
+class CassetteAdapter(InstrumentedAdapter):
+    """Adaptateur instrumenté qui enregistre ("record") ou rejoue ("replay") les réponses"""
+
+    def __init__(self, provider: str, base_path: str = "", mode: str = "replay",
+                 store: cassettes.CassetteStore = None, **kwargs):
+        self.mode = mode
+        self.store = store or cassettes.get_store()
+        super().__init__(provider, base_path, **kwargs)
+
+    def _transport(self, request, **kwargs):
+        key, description = cassettes.normalize_request(request.method, request.url,
+                                                        provider=self.provider, base_path=self.base_path)
+        if self.mode == "replay":
+            entry = self.store.load(key)
+            if entry is None:
+                raise self.store.missing(description)
+            delay = self.store.replay_delay(entry)
+            if delay > 0:
+                time.sleep(delay)
+            return cassettes.replayed_response(entry, request)
+
+        start = time.perf_counter()
+        response = super()._transport(request, **kwargs)
+        content = response.content
+        if response.status_code < 500:
+            self.store.save(key, description, response.status_code,
+                            {name.lower(): value for name, value in response.headers.items()},
+                            content, time.perf_counter() - start,
+                            cassettes.secret_values(request.url, request.headers))
+        return response
+
+class PooledSessionMixin:
+    """Ajoute une propriété `session` (requests.Session) propre au processus courant"""
+
+    _session = None
+    _session_pid = None
+    _session_lock = threading.Lock()
+
+    @property
+    def session(self) -> requests.Session:
+        if self._session_pid != os.getpid():
+            with self._session_lock:
+                if self._session_pid != os.getpid():
+                    self._session = self._create_session()
+                    self._session_pid = os.getpid()
+        return self._session
+
+    def _create_session(self) -> requests.Session:
+        session = requests.Session()
+        provider = getattr(self, "name", type(self).__name__)
+        base_path = urlparse(getattr(self, "base_url", "")).path
+        if cassettes.CASSETTE_MODE in cassettes.MODES:
+            adapter = CassetteAdapter(provider, base_path, mode=cassettes.CASSETTE_MODE,
+                                      pool_connections=4, pool_maxsize=POOL_SIZE)
+        else:
+            adapter = InstrumentedAdapter(provider, base_path, pool_connections=4, pool_maxsize=POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+        return session
+
+    def reset_session(self):
+        """Abandonne la session courante (la suivante est créée à la demande)"""
+        session, pid = self._session, self._session_pid
+        self._session = None
+        self._session_pid = None
+        # Les sockets héritées du parent ne sont pas fermées côté worker :
+        # elles appartiennent encore au processus qui les a ouvertes
+        if session is not None and pid == os.getpid():
+            session.close()
@@ -5,19 +5,48 @@ Architecture modulaire pour gérer plusieurs fournisseurs d'API de manière opti
 
 import asyncio
 import aiohttp
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import logging
+import os
+import yarl
+import threading
+from functools import partial
 from typing import Dict, List, Optional, Any, Union
+from urllib.parse import urlparse
 import time
 
+from . import cassettes
+from .detail_loader import DetailLoader
+from .http_session import endpoint_label
 from .tmdb_provider import TMDbProvider
 from .watchmode_provider import WatchmodeProvider
+from src.concurrency import run_concurrently, start_thread_pool
+from src.metrics import record_provider_call
+from src import tracing
+
+logger = logging.getLogger(__name__)
+
+# Délai maximal d'une recherche parallèle sur l'ensemble des fournisseurs
+PROVIDER_TIMEOUT = 10
+
+# Délai maximal des tests de connexion au démarrage d'un worker
+PROBE_TIMEOUT = 6
 
 class MultiAPIManager:
-    """Gestionnaire centralisé pour tous les fournisseurs d'API"""
+    """
+    Gestionnaire centralisé pour tous les fournisseurs d'API
+    
+    La construction ne fait aucun appel réseau (elle peut avoir lieu dans le
+    master gunicorn avant le fork). Pools de connexions, pool de threads et
+    tests de connexion sont mis en place par start(), une fois par processus :
+    depuis le hook post_fork, ou à la première utilisation.
+    """
     
     def __init__(self, tmdb_key: str, watchmode_key: str = "", rapidapi_key: str = ""):
         self.providers = {}
-        self.active_providers = []
+        self._active_providers = []
+        self._started_pid = None
+        self._start_lock = threading.Lock()
+        self.startup_time = None
         
         # Initialiser les fournisseurs
         if tmdb_key:
@@ -29,22 +58,76 @@ class MultiAPIManager:
         elif rapidapi_key:
             self.providers["Watchmode"] = WatchmodeProvider(rapidapi_key, use_rapidapi=True)
         
-        # Tester les connexions
-        self._test_providers()
+        self._detail_loader = None
+        
+        # Sessions HTTP asynchrones (mode ASGI), une par boucle d'événements
+        self._async_sessions = {}
+    
+    @property
+    def active_providers(self) -> List[str]:
+        """Fournisseurs joignables (tests de connexion faits au premier accès du processus)"""
+        self.ensure_started()
+        return self._active_providers
+    
+    @active_providers.setter
+    def active_providers(self, names: List[str]):
+        self._active_providers = list(names)
+        self._started_pid = os.getpid()
+    
+    @property
+    def detail_loader(self) -> Optional[DetailLoader]:
+        """Détails TMDb par lot, cache partagé par les tendances et les recommandations (None sans TMDb)"""
+        provider = self.providers.get("TMDb")
+        if provider is None:
+            return None
+        if self._detail_loader is None or self._detail_loader.provider is not provider:
+            self._detail_loader = DetailLoader(provider)
+        return self._detail_loader
     
-    def _test_providers(self):
-        """Teste la connexion de tous les fournisseurs"""
-        self.active_providers = []
+    def ensure_started(self):
+        """Lance start() si ce processus ne l'a pas encore fait"""
+        if self._started_pid != os.getpid():
+            with self._start_lock:
+                if self._started_pid != os.getpid():
+                    self.start()
+    
+    def start(self):
+        """
+        Phase post-fork : ressources propres au processus et tests de connexion
         
-        for name, provider in self.providers.items():
-            try:
-                if provider.test_connection():
-                    self.active_providers.append(name)
-                    print(f"✅ {name}: Connecté")
-                else:
-                    print(f"❌ {name}: Connexion échouée")
-            except Exception as e:
-                print(f"❌ {name}: Erreur - {e}")
+        Les sessions HTTP héritées du master sont abandonnées, le pool de
+        threads est créé, puis les fournisseurs sont testés en parallèle.
+        """
+        start_time = time.time()
+        
+        for provider in self.providers.values():
+            if hasattr(provider, 'reset_session'):
+                provider.reset_session()
+        self._async_sessions = {}
+        start_thread_pool()
+        
+        self._active_providers = self._test_providers()
+        self._started_pid = os.getpid()
+        self.startup_time = time.time() - start_time
+    
+    def _test_providers(self) -> List[str]:
+        """Teste la connexion de tous les fournisseurs (en parallèle)"""
+        names = list(self.providers)
+        outcomes = run_concurrently(
+            [self.providers[name].test_connection for name in names],
+            timeout=PROBE_TIMEOUT
+        )
+        
+        active = []
+        for name, (connected, error) in zip(names, outcomes):
+            if error is not None:
+                print(f"❌ {name}: Erreur - {error}")
+            elif connected:
+                active.append(name)
+                print(f"✅ {name}: Connecté")
+            else:
+                print(f"❌ {name}: Connexion échouée")
+        return active
     
     def get_provider_status(self) -> Dict[str, Dict[str, Any]]:
         """Retourne le statut de tous les fournisseurs"""
@@ -61,7 +144,8 @@ class MultiAPIManager:
         return {
             "provider_status": status,
             "active_providers": self.active_providers,
-            "total_providers": len(self.providers)
+            "total_providers": len(self.providers),
+            "startup_time": self.startup_time
         }
     
     def search_content_parallel(self, query: str, content_type: str = "all", 
@@ -88,40 +172,25 @@ class MultiAPIManager:
         providers_used = []
         errors = []
         
-        # Exécution parallèle des recherches
-        with ThreadPoolExecutor(max_workers=len(self.active_providers)) as executor:
-            # Lancer les recherches
-            future_to_provider = {}
-            for provider_name in self.active_providers:
-                provider = self.providers[provider_name]
-                future = executor.submit(provider.search_content, query, content_type)
-                future_to_provider[future] = provider_name
-            
-            # Collecter les résultats
-            for future in as_completed(future_to_provider):
-                provider_name = future_to_provider[future]
-                try:
-                    result = future.result(timeout=10)  # Timeout de 10 secondes
-                    
-                    if "error" in result:
-                        errors.append(f"{provider_name}: {result['error']}")
-                    else:
-                        all_results.extend(result.get("results", []))
-                        providers_used.append(provider_name)
-                        
-                except Exception as e:
-                    errors.append(f"{provider_name}: Exception - {str(e)}")
+        # Exécution parallèle des recherches (greenlets en mode gevent, threads sinon)
+        provider_names = list(self.active_providers)
+        outcomes = run_concurrently(
+            [partial(self.providers[name].search_content, query, content_type) for name in provider_names],
+            timeout=PROVIDER_TIMEOUT
+        )
         
-        # Déduplication et tri des résultats
-        deduplicated_results = self._deduplicate_and_merge(all_results)
+        # Collecter les résultats
+        for provider_name, (result, error) in zip(provider_names, outcomes):
+            if error is not None:
+                errors.append(f"{provider_name}: Exception - {str(error)}")
+            elif "error" in result:
+                errors.append(f"{provider_name}: {result['error']}")
+            else:
+                all_results.extend(result.get("results", []))
+                providers_used.append(provider_name)
         
-        # Tri par pertinence (rating + popularité)
-        sorted_results = sorted(
-            deduplicated_results,
-            key=lambda x: (x.get("rating", 0) * 0.7 + 
-                          min(x.get("popularity", 0) / 100, 5) * 0.3),
-            reverse=True
-        )
+        # Déduplication et tri par pertinence (rating + popularité)
+        sorted_results = self._rank_results(all_results, rating_weight=0.7, popularity_cap=5)
         
         return {
             "results": sorted_results[:max_results],
@@ -154,39 +223,27 @@ class MultiAPIManager:
         errors = []
         
         # Exécution parallèle
-        with ThreadPoolExecutor(max_workers=len(self.active_providers)) as executor:
-            future_to_provider = {}
-            for provider_name in self.active_providers:
-                provider = self.providers[provider_name]
-                if hasattr(provider, 'get_trending'):
-                    future = executor.submit(provider.get_trending, content_type)
-                    future_to_provider[future] = provider_name
-            
-            # Collecter les résultats
-            for future in as_completed(future_to_provider):
-                provider_name = future_to_provider[future]
-                try:
-                    result = future.result(timeout=10)
-                    
-                    if "error" in result:
-                        errors.append(f"{provider_name}: {result['error']}")
-                    else:
-                        all_results.extend(result.get("results", []))
-                        providers_used.append(provider_name)
-                        
-                except Exception as e:
-                    errors.append(f"{provider_name}: Exception - {str(e)}")
+        provider_names = [
+            name for name in self.active_providers
+            if hasattr(self.providers[name], 'get_trending')
+        ]
+        outcomes = run_concurrently(
+            [partial(self.providers[name].get_trending, content_type) for name in provider_names],
+            timeout=PROVIDER_TIMEOUT
+        )
         
-        # Déduplication et tri
-        deduplicated_results = self._deduplicate_and_merge(all_results)
+        # Collecter les résultats
+        for provider_name, (result, error) in zip(provider_names, outcomes):
+            if error is not None:
+                errors.append(f"{provider_name}: Exception - {str(error)}")
+            elif "error" in result:
+                errors.append(f"{provider_name}: {result['error']}")
+            else:
+                all_results.extend(result.get("results", []))
+                providers_used.append(provider_name)
         
-        # Tri par rating et popularité
-        sorted_results = sorted(
-            deduplicated_results,
-            key=lambda x: (x.get("rating", 0) * 0.6 + 
-                          min(x.get("popularity", 0) / 100, 4) * 0.4),
-            reverse=True
-        )
+        # Déduplication et tri par rating et popularité
+        sorted_results = self._rank_results(all_results, rating_weight=0.6, popularity_cap=4)
         
         return {
             "results": sorted_results[:max_results],
@@ -213,11 +270,16 @@ class MultiAPIManager:
         if not provider:
             return {"error": "Aucun fournisseur disponible"}
         
+        with tracing.stage("details", item_id=item_id):
+            return self._get_enhanced_details(item_id, content_type, provider)
+    
+    def _get_enhanced_details(self, item_id: int, content_type: str, provider: str) -> Dict[str, Any]:
         # Récupérer les détails du fournisseur principal
         main_provider = self.providers[provider]
         
         if provider == "TMDb":
-            details = main_provider.get_details(item_id, content_type)
+            # Copie : le détail en cache est partagé, enhanced_streaming est propre à l'appel
+            details = dict(self.detail_loader.get(item_id, content_type))
         else:
             details = main_provider.get_details(item_id)
         
@@ -228,27 +290,230 @@ class MultiAPIManager:
         if "Watchmode" in self.active_providers and provider == "TMDb":
             try:
                 watchmode_provider = self.providers["Watchmode"]
-                # Rechercher l'élément sur Watchmode pour obtenir son ID
+                with tracing.stage("watchmode", item_id=item_id):
+                    # Rechercher l'élément sur Watchmode pour obtenir son ID
+                    search_query = details.get("title", details.get("name", ""))
+                    watchmode_search = watchmode_provider.search_content(search_query, content_type)
+                    
+                    if not watchmode_search.get("error") and watchmode_search.get("results"):
+                        # Prendre le premier résultat qui correspond
+                        for result in watchmode_search["results"][:3]:  # Vérifier les 3 premiers
+                            if (result.get("title", "").lower() == search_query.lower() or
+                                abs(result.get("rating", 0) - details.get("vote_average", 0)) < 1.0):
+                                
+                                # Récupérer les sources de streaming
+                                streaming_info = watchmode_provider.get_streaming_sources(result["id"])
+                                if not streaming_info.get("error"):
+                                    details["enhanced_streaming"] = streaming_info
+                                break
+                            
+            except Exception as e:
+                print(f"Erreur enrichissement Watchmode: {e}")
+        
+        return details
+    
+    def get_async_session(self) -> aiohttp.ClientSession:
+        """
+        Retourne la session aiohttp de la boucle d'événements courante
+        
+        La session (et son pool de connexions) est partagée par toutes les
+        requêtes servies par cette boucle en mode ASGI.
+        """
+        loop = asyncio.get_running_loop()
+        session = self._async_sessions.get(loop)
+        if session is None or session.closed:
+            base_paths = {urlparse(getattr(provider, 'base_url', '')).path: name
+                          for name, provider in self.providers.items()}
+            if cassettes.CASSETTE_MODE == "replay":
+                session = cassettes.CassetteClientSession(cassettes.get_store(), observer=self._replay_observer(),
+                                                          base_paths=base_paths)
+            else:
+                connector = aiohttp.TCPConnector(limit=200, ttl_dns_cache=300)
+                session = aiohttp.ClientSession(connector=connector, trace_configs=[self._metrics_trace_config()])
+                if cassettes.CASSETTE_MODE == "record":
+                    session = cassettes.CassetteClientSession(cassettes.get_store(), session, base_paths=base_paths)
+            self._async_sessions[loop] = session
+        return session
+    
+    def _call_labels(self):
+        """Fonction URL (yarl) -> (fournisseur, endpoint) pour les métriques des appels aiohttp"""
+        hosts = {}
+        for name, provider in self.providers.items():
+            base_url = urlparse(getattr(provider, 'base_url', ''))
+            hosts[base_url.netloc] = (name, base_url.path)
+        
+        def labels(url):
+            provider, base_path = hosts.get(url.host if url.port in (None, 80, 443) else f"{url.host}:{url.port}",
+                                            (url.host, ""))
+            return provider, endpoint_label(url.path, base_path)
+        
+        return labels
+    
+    def _replay_observer(self):
+        """Mesure les appels rejoués depuis les cassettes comme les appels réels"""
+        labels = self._call_labels()
+        
+        def observe(url, start, duration, status):
+            provider, endpoint = labels(yarl.URL(url))
+            record_provider_call(provider, endpoint, f"{status // 100}xx", duration)
+            tracing.record_span(f"http.{provider}", start, duration, endpoint=endpoint, status=status)
+        
+        return observe
+    
+    def _metrics_trace_config(self) -> aiohttp.TraceConfig:
+        """Mesure les appels aiohttp comme InstrumentedAdapter le fait pour requests"""
+        labels = self._call_labels()
+        
+        async def on_start(session, ctx, params):
+            ctx.start = time.perf_counter()
+        
+        async def on_end(session, ctx, params):
+            provider, endpoint = labels(params.url)
+            duration = time.perf_counter() - ctx.start
+            record_provider_call(provider, endpoint, f"{params.response.status // 100}xx", duration)
+            tracing.record_span(f"http.{provider}", ctx.start, duration, endpoint=endpoint,
+                                status=params.response.status)
+        
+        async def on_exception(session, ctx, params):
+            provider, endpoint = labels(params.url)
+            duration = time.perf_counter() - ctx.start
+            record_provider_call(provider, endpoint, "error", duration)
+            tracing.record_span(f"http.{provider}", ctx.start, duration, endpoint=endpoint, error=True)
+        
+        trace_config = aiohttp.TraceConfig()
+        trace_config.on_request_start.append(on_start)
+        trace_config.on_request_end.append(on_end)
+        trace_config.on_request_exception.append(on_exception)
+        return trace_config
+    
+    async def close_async_sessions(self):
+        """Ferme les sessions aiohttp (arrêt du serveur ASGI)"""
+        sessions, self._async_sessions = self._async_sessions, {}
+        for session in sessions.values():
+            if not session.closed:
+                await session.close()
+    
+    async def _gather_from_providers(self, method_name: str, *args) -> tuple:
+        """
+        Appelle une méthode asynchrone sur tous les fournisseurs actifs en parallèle
+        
+        Returns:
+            (résultats combinés, fournisseurs utilisés, erreurs)
+        """
+        session = self.get_async_session()
+        names = [
+            name for name in self.active_providers
+            if hasattr(self.providers[name], method_name)
+        ]
+        responses = await asyncio.gather(
+            *(asyncio.wait_for(getattr(self.providers[name], method_name)(session, *args), timeout=10)
+              for name in names),
+            return_exceptions=True
+        )
+        
+        all_results = []
+        providers_used = []
+        errors = []
+        for provider_name, result in zip(names, responses):
+            if isinstance(result, BaseException):
+                errors.append(f"{provider_name}: Exception - {str(result)}")
+            elif "error" in result:
+                errors.append(f"{provider_name}: {result['error']}")
+            else:
+                all_results.extend(result.get("results", []))
+                providers_used.append(provider_name)
+        
+        return all_results, providers_used, errors
+    
+    async def search_content_async(self, query: str, content_type: str = "all",
+                                   max_results: int = 20) -> Dict[str, Any]:
+        """Version asynchrone de search_content_parallel (mode ASGI)"""
+        if not self.active_providers:
+            return {
+                "error": "Aucun fournisseur d'API disponible",
+                "results": [],
+                "providers_used": []
+            }
+        
+        all_results, providers_used, errors = await self._gather_from_providers(
+            "search_content_async", query, content_type
+        )
+        sorted_results = self._rank_results(all_results, rating_weight=0.7, popularity_cap=5)
+        
+        return {
+            "results": sorted_results[:max_results],
+            "total_results": len(sorted_results),
+            "providers_used": providers_used,
+            "errors": errors if errors else None
+        }
+    
+    async def get_trending_async(self, content_type: str = "all",
+                                 max_results: int = 20) -> Dict[str, Any]:
+        """Version asynchrone de get_trending_parallel (mode ASGI)"""
+        if not self.active_providers:
+            return {
+                "error": "Aucun fournisseur d'API disponible",
+                "results": [],
+                "providers_used": []
+            }
+        
+        all_results, providers_used, errors = await self._gather_from_providers(
+            "get_trending_async", content_type
+        )
+        sorted_results = self._rank_results(all_results, rating_weight=0.6, popularity_cap=4)
+        
+        return {
+            "results": sorted_results[:max_results],
+            "providers_used": providers_used,
+            "errors": errors if errors else None
+        }
+    
+    async def get_enhanced_details_async(self, item_id: int, content_type: str) -> Dict[str, Any]:
+        """Version asynchrone de get_enhanced_details (TMDb + streaming Watchmode)"""
+        if "TMDb" not in self.active_providers:
+            return {"error": "Aucun fournisseur disponible"}
+        
+        session = self.get_async_session()
+        details = dict(await self.detail_loader.get_async(session, item_id, content_type))
+        if "error" in details:
+            return details
+        
+        if "Watchmode" in self.active_providers:
+            try:
+                watchmode_provider = self.providers["Watchmode"]
                 search_query = details.get("title", details.get("name", ""))
-                watchmode_search = watchmode_provider.search_content(search_query, content_type)
+                watchmode_search = await watchmode_provider.search_content_async(
+                    session, search_query, content_type
+                )
                 
                 if not watchmode_search.get("error") and watchmode_search.get("results"):
-                    # Prendre le premier résultat qui correspond
-                    for result in watchmode_search["results"][:3]:  # Vérifier les 3 premiers
+                    for result in watchmode_search["results"][:3]:
                         if (result.get("title", "").lower() == search_query.lower() or
                             abs(result.get("rating", 0) - details.get("vote_average", 0)) < 1.0):
                             
-                            # Récupérer les sources de streaming
-                            streaming_info = watchmode_provider.get_streaming_sources(result["id"])
+                            streaming_info = await watchmode_provider.get_streaming_sources_async(
+                                session, result["id"]
+                            )
                             if not streaming_info.get("error"):
                                 details["enhanced_streaming"] = streaming_info
                             break
                             
             except Exception as e:
-                print(f"Erreur enrichissement Watchmode: {e}")
+                logger.warning("Erreur enrichissement Watchmode", extra={"item_id": item_id, "error": str(e)})
         
         return details
     
+    def _rank_results(self, results: List[Dict[str, Any]], rating_weight: float,
+                      popularity_cap: float) -> List[Dict[str, Any]]:
+        """Déduplique puis trie les résultats par note et popularité pondérées"""
+        popularity_weight = 1 - rating_weight
+        return sorted(
+            self._deduplicate_and_merge(results),
+            key=lambda x: (x.get("rating", 0) * rating_weight + 
+                          min(x.get("popularity", 0) / 100, popularity_cap) * popularity_weight),
+            reverse=True
+        )
+    
     def _deduplicate_and_merge(self, results: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
         """
         Déduplique et fusionne les résultats de différents fournisseurs
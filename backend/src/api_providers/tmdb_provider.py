@@ -3,21 +3,26 @@ TMDb API Provider
 Gère les requêtes vers l'API The Movie Database
 """
 
-import requests
+import os
+
+import aiohttp
 from typing import Dict, List, Optional, Any
 
-class TMDbProvider:
+from .http_session import PooledSessionMixin
+
+class TMDbProvider(PooledSessionMixin):
     """Fournisseur pour l'API TMDb"""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, base_url: Optional[str] = None):
         self.api_key = api_key
-        self.base_url = "https://api.themoviedb.org/3"
+        # TMDB_BASE_URL : serveur de substitution (tests de charge, benchmarks/fake_providers.py)
+        self.base_url = (base_url or os.environ.get("TMDB_BASE_URL") or "https://api.themoviedb.org/3").rstrip("/")
         self.name = "TMDb"
         
     def test_connection(self) -> bool:
         """Teste la connexion à l'API TMDb"""
         try:
-            response = requests.get(
+            response = self.session.get(
                 f"{self.base_url}/configuration",
                 params={"api_key": self.api_key},
                 timeout=5
@@ -49,7 +54,7 @@ class TMDbProvider:
         }
         
         try:
-            response = requests.get(endpoint, params=params, timeout=10)
+            response = self.session.get(endpoint, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 results = []
@@ -70,13 +75,14 @@ class TMDbProvider:
         except Exception as e:
             return {"error": f"Exception TMDb: {str(e)}"}
     
-    def get_trending(self, content_type: str = "all", time_window: str = "week") -> Dict[str, Any]:
+    def get_trending(self, content_type: str = "all", time_window: str = "week", page: int = 1) -> Dict[str, Any]:
         """
         Récupère le contenu tendance de TMDb
         
         Args:
             content_type: Type de contenu ('movie', 'tv', 'all')
             time_window: Période ('day', 'week')
+            page: Numéro de page
             
         Returns:
             Contenu tendance formaté
@@ -84,11 +90,12 @@ class TMDbProvider:
         endpoint = f"{self.base_url}/trending/{content_type}/{time_window}"
         params = {
             "api_key": self.api_key,
-            "language": "fr-FR"
+            "language": "fr-FR",
+            "page": page
         }
         
         try:
-            response = requests.get(endpoint, params=params, timeout=10)
+            response = self.session.get(endpoint, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 results = []
@@ -123,7 +130,7 @@ class TMDbProvider:
         }
         
         try:
-            response = requests.get(endpoint, params=params, timeout=10)
+            response = self.session.get(endpoint, params=params, timeout=10)
             if response.status_code == 200:
                 return response.json()
             else:
@@ -131,6 +138,67 @@ class TMDbProvider:
         except Exception as e:
             return {"error": f"Exception détails TMDb: {str(e)}"}
     
+    async def search_content_async(self, session: aiohttp.ClientSession, query: str,
+                                   content_type: str = "multi", page: int = 1) -> Dict[str, Any]:
+        """Version asynchrone de search_content (mode ASGI)"""
+        endpoint = f"{self.base_url}/search/{content_type}"
+        params = {
+            "api_key": self.api_key,
+            "language": "fr-FR",
+            "query": query,
+            "page": page,
+            "include_adult": "false"
+        }
+        
+        try:
+            async with session.get(endpoint, params=params, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    return {
+                        "results": self._format_results(data),
+                        "total_results": data.get("total_results", 0),
+                        "total_pages": data.get("total_pages", 0),
+                        "current_page": page
+                    }
+                return {"error": f"Erreur TMDb: {response.status}"}
+        except Exception as e:
+            return {"error": f"Exception TMDb: {str(e)}"}
+    
+    async def get_trending_async(self, session: aiohttp.ClientSession, content_type: str = "all",
+                                 time_window: str = "week") -> Dict[str, Any]:
+        """Version asynchrone de get_trending (mode ASGI)"""
+        endpoint = f"{self.base_url}/trending/{content_type}/{time_window}"
+        params = {
+            "api_key": self.api_key,
+            "language": "fr-FR"
+        }
+        
+        try:
+            async with session.get(endpoint, params=params, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status == 200:
+                    return {"results": self._format_results(await response.json())}
+                return {"error": f"Erreur TMDb trending: {response.status}"}
+        except Exception as e:
+            return {"error": f"Exception TMDb trending: {str(e)}"}
+    
+    async def get_details_async(self, session: aiohttp.ClientSession, item_id: int,
+                                content_type: str) -> Dict[str, Any]:
+        """Version asynchrone de get_details (mode ASGI)"""
+        endpoint = f"{self.base_url}/{content_type}/{item_id}"
+        params = {
+            "api_key": self.api_key,
+            "language": "fr-FR",
+            "append_to_response": "credits,keywords,watch/providers"
+        }
+        
+        try:
+            async with session.get(endpoint, params=params, timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status == 200:
+                    return await response.json()
+                return {"error": f"Erreur détails TMDb: {response.status}"}
+        except Exception as e:
+            return {"error": f"Exception détails TMDb: {str(e)}"}
+    
     def get_genre_list(self, content_type: str = "movie") -> Dict[int, str]:
         """Récupère la liste des genres"""
         endpoint = f"{self.base_url}/genre/{content_type}/list"
@@ -140,7 +208,7 @@ class TMDbProvider:
         }
         
         try:
-            response = requests.get(endpoint, params=params, timeout=10)
+            response = self.session.get(endpoint, params=params, timeout=10)
             if response.status_code == 200:
                 genres = response.json().get("genres", [])
                 return {genre["id"]: genre["name"] for genre in genres}
@@ -168,7 +236,7 @@ class TMDbProvider:
         }
         
         try:
-            response = requests.get(endpoint, params=params, timeout=10)
+            response = self.session.get(endpoint, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 results = []
@@ -184,6 +252,15 @@ class TMDbProvider:
         except Exception as e:
             return {"error": f"Exception découverte TMDb: {str(e)}"}
     
+    def _format_results(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Formate la liste "results" d'une réponse TMDb"""
+        results = []
+        for item in data.get("results", []):
+            formatted_item = self._format_search_result(item)
+            if formatted_item:
+                results.append(formatted_item)
+        return results
+    
     def _format_search_result(self, item: Dict[str, Any]) -> Optional[Dict[str, Any]]:
         """Formate un résultat de recherche TMDb"""
         try:
@@ -205,6 +282,7 @@ class TMDbProvider:
             return {
                 "id": item.get("id"),
                 "title": title,
+                "original_title": item.get("original_title") or item.get("original_name"),
                 "year": year,
                 "rating": item.get("vote_average", 0),
                 "description": item.get("overview", "Pas de description disponible"),
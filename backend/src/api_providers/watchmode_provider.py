@@ -3,13 +3,17 @@ Watchmode API Provider via RapidAPI
 Gère les requêtes vers l'API Watchmode pour enrichir les données de films et séries
 """
 
-import requests
+import os
+
+import aiohttp
 from typing import Dict, List, Optional, Any
 
-class WatchmodeProvider:
+from .http_session import PooledSessionMixin
+
+class WatchmodeProvider(PooledSessionMixin):
     """Fournisseur pour l'API Watchmode directe"""
     
-    def __init__(self, api_key: str, use_rapidapi: bool = False):
+    def __init__(self, api_key: str, use_rapidapi: bool = False, base_url: Optional[str] = None):
         self.api_key = api_key
         self.name = "Watchmode"
         
@@ -21,8 +25,8 @@ class WatchmodeProvider:
                 "X-RapidAPI-Host": "watchmode.p.rapidapi.com"
             }
         else:
-            # Configuration API directe
-            self.base_url = "https://api.watchmode.com/v1"
+            # Configuration API directe (WATCHMODE_BASE_URL : serveur de substitution)
+            self.base_url = (base_url or os.environ.get("WATCHMODE_BASE_URL") or "https://api.watchmode.com/v1").rstrip("/")
             self.headers = {}
         
     def test_connection(self) -> bool:
@@ -30,14 +34,14 @@ class WatchmodeProvider:
         try:
             if "rapidapi" in self.base_url:
                 # Test RapidAPI
-                response = requests.get(
+                response = self.session.get(
                     f"{self.base_url}/regions/",
                     headers=self.headers,
                     timeout=5
                 )
             else:
                 # Test API directe
-                response = requests.get(
+                response = self.session.get(
                     f"{self.base_url}/regions/?apikey={self.api_key}",
                     headers=self.headers,
                     timeout=5
@@ -79,7 +83,7 @@ class WatchmodeProvider:
             params["types"] = watchmode_type
         
         try:
-            response = requests.get(endpoint, headers=self.headers, params=params, timeout=10)
+            response = self.session.get(endpoint, headers=self.headers, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 results = []
@@ -128,7 +132,7 @@ class WatchmodeProvider:
             params["types"] = watchmode_type
         
         try:
-            response = requests.get(endpoint, headers=self.headers, params=params, timeout=10)
+            response = self.session.get(endpoint, headers=self.headers, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 results = []
@@ -157,7 +161,7 @@ class WatchmodeProvider:
         endpoint = f"{self.base_url}/title/{item_id}/details/"
         
         try:
-            response = requests.get(endpoint, headers=self.headers, timeout=10)
+            response = self.session.get(endpoint, headers=self.headers, timeout=10)
             if response.status_code == 200:
                 return response.json()
             else:
@@ -180,7 +184,7 @@ class WatchmodeProvider:
         params = {"regions": region}
         
         try:
-            response = requests.get(endpoint, headers=self.headers, params=params, timeout=10)
+            response = self.session.get(endpoint, headers=self.headers, params=params, timeout=10)
             if response.status_code == 200:
                 data = response.json()
                 return self._format_streaming_sources(data)
@@ -189,12 +193,98 @@ class WatchmodeProvider:
         except Exception as e:
             return {"error": f"Exception sources Watchmode: {str(e)}"}
     
+    async def search_content_async(self, session: aiohttp.ClientSession, query: str,
+                                   content_type: str = "all", page: int = 1) -> Dict[str, Any]:
+        """Version asynchrone de search_content (mode ASGI)"""
+        endpoint = f"{self.base_url}/search/"
+        type_mapping = {
+            "movie": "movie",
+            "tv": "tv_series",
+            "all": ""
+        }
+        watchmode_type = type_mapping.get(content_type, "")
+        
+        params = {
+            "search_field": "name",
+            "search_value": query,
+            "page": page
+        }
+        if watchmode_type:
+            params["types"] = watchmode_type
+        
+        try:
+            async with session.get(endpoint, headers=self.headers, params=params,
+                                   timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    results = [
+                        formatted for formatted in
+                        (self._format_search_result(item) for item in data.get("title_results", []))
+                        if formatted
+                    ]
+                    return {
+                        "results": results,
+                        "total_results": len(results),
+                        "current_page": page
+                    }
+                return {"error": f"Erreur Watchmode: {response.status}"}
+        except Exception as e:
+            return {"error": f"Exception Watchmode: {str(e)}"}
+    
+    async def get_trending_async(self, session: aiohttp.ClientSession,
+                                 content_type: str = "all") -> Dict[str, Any]:
+        """Version asynchrone de get_trending (mode ASGI)"""
+        endpoint = f"{self.base_url}/list-titles/"
+        type_mapping = {
+            "movie": "movie",
+            "tv": "tv_series",
+            "all": ""
+        }
+        watchmode_type = type_mapping.get(content_type, "")
+        
+        params = {
+            "page": 1,
+            "sort_by": "popularity_desc"
+        }
+        if watchmode_type:
+            params["types"] = watchmode_type
+        
+        try:
+            async with session.get(endpoint, headers=self.headers, params=params,
+                                   timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status == 200:
+                    data = await response.json()
+                    results = [
+                        formatted for formatted in
+                        (self._format_search_result(item) for item in data.get("titles", []))
+                        if formatted
+                    ]
+                    return {"results": results[:20]}
+                return {"error": f"Erreur Watchmode trending: {response.status}"}
+        except Exception as e:
+            return {"error": f"Exception Watchmode trending: {str(e)}"}
+    
+    async def get_streaming_sources_async(self, session: aiohttp.ClientSession, item_id: int,
+                                          region: str = "FR") -> Dict[str, Any]:
+        """Version asynchrone de get_streaming_sources (mode ASGI)"""
+        endpoint = f"{self.base_url}/title/{item_id}/sources/"
+        params = {"regions": region}
+        
+        try:
+            async with session.get(endpoint, headers=self.headers, params=params,
+                                   timeout=aiohttp.ClientTimeout(total=10)) as response:
+                if response.status == 200:
+                    return self._format_streaming_sources(await response.json())
+                return {"error": f"Erreur sources Watchmode: {response.status}"}
+        except Exception as e:
+            return {"error": f"Exception sources Watchmode: {str(e)}"}
+    
     def get_genres(self) -> Dict[str, Any]:
         """Récupère la liste des genres Watchmode"""
         endpoint = f"{self.base_url}/genres/"
         
         try:
-            response = requests.get(endpoint, headers=self.headers, timeout=10)
+            response = self.session.get(endpoint, headers=self.headers, timeout=10)
             if response.status_code == 200:
                 return response.json()
             return {}
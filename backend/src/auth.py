@@ -6,14 +6,130 @@ Gère l'inscription, la connexion et la sécurisation des mots de passe.
 import hashlib
 import secrets
 import json
+import logging
+import threading
+import time
 import jwt
+from collections import OrderedDict
 from datetime import datetime, timedelta
 from functools import wraps
 from flask import request, jsonify, current_app
 
+from src.metrics import record_cache
+
+logger = logging.getLogger(__name__)
+
 # Clé secrète pour JWT (à changer en production)
 JWT_SECRET_KEY = "votre-cle-secrete-super-complexe-ici"
 
+class TokenCache:
+    """
+    Cache borné des tokens JWT déjà vérifiés.
+    
+    Associe l'empreinte SHA-256 d'un token à son payload décodé jusqu'à son
+    expiration, pour éviter un jwt.decode à chaque requête d'une même page.
+    Les entrées sont revérifiées périodiquement auprès du hook de révocation
+    afin qu'une révocation faite par un autre worker soit prise en compte.
+    """
+    
+    def __init__(self, max_entries: int = 1024, recheck_seconds: int = 300):
+        self.max_entries = max_entries
+        self.recheck_seconds = recheck_seconds
+        self._entries = OrderedDict()  # token_hash -> (payload, valid_until)
+        self._revoked = {}  # token_hash -> timestamp d'expiration
+        self._revocation_check = None
+        self._lock = threading.Lock()
+    
+    def set_revocation_check(self, check):
+        """Enregistre une fonction check(token_hash) -> bool appelée à chaque décodage."""
+        self._revocation_check = check
+    
+    def get(self, token_hash: str) -> dict:
+        """Retourne le payload en cache s'il est encore valide, None sinon."""
+        payload = self._get(token_hash)
+        record_cache("tokens", payload is not None)
+        return payload
+    
+    def _get(self, token_hash: str) -> dict:
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(token_hash)
+            if entry is None:
+                return None
+            payload, valid_until = entry
+            if now >= valid_until:
+                del self._entries[token_hash]
+                return None
+            self._entries.move_to_end(token_hash)
+            return payload
+    
+    def set(self, token_hash: str, payload: dict):
+        """Stocke un payload vérifié jusqu'à son exp (ou la prochaine revérification)."""
+        valid_until = min(payload.get('exp', 0), time.time() + self.recheck_seconds)
+        with self._lock:
+            self._entries[token_hash] = (payload, valid_until)
+            self._entries.move_to_end(token_hash)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+    
+    def is_revoked(self, token_hash: str) -> bool:
+        """Indique si le token a été révoqué (localement ou via le hook)."""
+        with self._lock:
+            expires_at = self._revoked.get(token_hash)
+            if expires_at is not None and expires_at <= time.time():
+                del self._revoked[token_hash]
+                expires_at = None
+        if expires_at is not None:
+            return True
+        if self._revocation_check is not None:
+            try:
+                return bool(self._revocation_check(token_hash))
+            except Exception as e:
+                # Base injoignable : le token est refusé plutôt qu'accepté sans vérification
+                logger.warning("Erreur vérification révocation token", extra={'error': str(e)})
+                return True
+        return False
+    
+    def revoke(self, token_hash: str, expires_at: float = None):
+        """
+        Retire un token du cache et le refuse jusqu'à son expiration.
+
+        La liste locale est purgée des tokens expirés et bornée à max_entries
+        (les révocations les plus proches de l'expiration partent en premier ;
+        le hook de révocation reste la référence pour ces tokens).
+        """
+        now = time.time()
+        with self._lock:
+            self._entries.pop(token_hash, None)
+            self._revoked[token_hash] = expires_at or (now + 24 * 3600)
+            for expired in [h for h, exp in self._revoked.items() if exp <= now]:
+                del self._revoked[expired]
+            excess = len(self._revoked) - self.max_entries
+            if excess > 0:
+                for oldest in sorted(self._revoked, key=self._revoked.get)[:excess]:
+                    del self._revoked[oldest]
+    
+    def clear(self):
+        """Vide le cache et la liste de révocation locale."""
+        with self._lock:
+            self._entries.clear()
+            self._revoked.clear()
+
+# Instance globale du cache de tokens (une par processus worker)
+token_cache = TokenCache()
+
+def hash_token(token: str) -> str:
+    """
+    Calcule l'empreinte d'un token JWT (clé du cache et de UserSession.token_hash).
+    
+    Args:
+        token: Le token JWT
+    
+    Returns:
+        str: Empreinte SHA-256 hexadécimale
+    """
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
 def hash_password(password: str, salt: str = None) -> tuple:
     """
     Hash un mot de passe avec un salt.
@@ -79,13 +195,39 @@ def verify_jwt_token(token: str) -> dict:
     Returns:
         dict: Payload du token si valide, None sinon
     """
+    token_hash = hash_token(token)
+    
+    # Token déjà vérifié récemment : pas de nouveau décodage
+    payload = token_cache.get(token_hash)
+    if payload is not None:
+        return payload
+    
     try:
         payload = jwt.decode(token, JWT_SECRET_KEY, algorithms=['HS256'])
-        return payload
     except jwt.ExpiredSignatureError:
         return None
     except jwt.InvalidTokenError:
         return None
+    
+    if token_cache.is_revoked(token_hash):
+        return None
+    
+    token_cache.set(token_hash, payload)
+    return payload
+
+def revoke_token(token: str) -> dict:
+    """
+    Révoque un token JWT dans le cache du processus courant.
+    
+    Args:
+        token: Le token JWT à révoquer
+    
+    Returns:
+        dict: Payload du token révoqué, None s'il était déjà invalide
+    """
+    payload = verify_jwt_token(token)
+    token_cache.revoke(hash_token(token), payload.get('exp') if payload else None)
+    return payload
 
 def require_auth(f):
     """
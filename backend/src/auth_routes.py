@@ -14,7 +14,7 @@ if backend_dir not in sys.path:
 
 from src.auth import authenticate_user, create_user_with_password, generate_jwt_token, hash_password, verify_password
 from models import db, User
-from src.middleware import get_current_user, require_auth_for_user
+from src.middleware import get_current_user, get_current_user_record, require_auth_for_user, revoke_user_session
 
 # Créer un blueprint pour les routes d'authentification
 auth_bp = Blueprint('auth', __name__)
@@ -149,16 +149,9 @@ def register():
             db.session.add(user)
             db.session.commit()
             
-            # TODO: Ajouter le service d'email plus tard
-            # try:
-            #     email_sent = email_service.send_welcome_email(user.email, user.name)
-            #     if email_sent:
-            #         print(f"✅ Email de bienvenue envoyé à {user.email}")
-            #     else:
-            #         print(f"⚠️  Email de bienvenue non envoyé à {user.email}")
-            # except Exception as email_error:
-            #     print(f"❌ Erreur lors de l'envoi de l'email de bienvenue: {str(email_error)}")
-            #     # Ne pas faire échouer l'inscription si l'email ne peut pas être envoyé
+            # Email de bienvenue mis en file : envoyé en arrière-plan, sans bloquer l'inscription
+            from src.email_service import email_service
+            email_service.send_welcome_email(user.email, user.name)
             
             # Générer un token JWT
             token = generate_jwt_token(user.id, user.name)
@@ -187,9 +180,13 @@ def register():
 def logout():
     """
     Endpoint de déconnexion utilisateur.
-    Note: Avec JWT, la déconnexion côté serveur est optionnelle
-    car les tokens ont une durée de vie limitée.
+    Le token est révoqué via sa UserSession, ce qui l'invalide aussi dans
+    le cache de tokens des workers.
     """
+    auth_header = request.headers.get('Authorization', '')
+    token = auth_header.split(" ")[1] if " " in auth_header else None
+    if token:
+        revoke_user_session(token)
     return jsonify({'message': 'Déconnexion réussie'}), 200
 
 @auth_bp.route('/api/verify-token', methods=['GET'])
@@ -204,8 +201,8 @@ def verify_token():
     if not current_user:
         return jsonify({'error': 'Token invalide'}), 401
     
-    # Récupérer les informations complètes de l'utilisateur depuis la base de données
-    user = User.query.get(current_user['user_id'])
+    # Récupérer les informations complètes de l'utilisateur (cache requête + worker)
+    user = get_current_user_record()
     if user:
         user_info = {
             'id': user.id,
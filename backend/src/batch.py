@@ -0,0 +1,181 @@
+"""
+Requêtes groupées (POST /api/batch)
+
+Exécute plusieurs sous-requêtes de l'API dans une seule requête HTTP, par
+exemple tout ce dont une page a besoin au chargement. Les sous-requêtes
+partagent le contexte de la requête englobante : utilisateur authentifié
+(g.current_user, token vérifié une seule fois par le middleware), caches de
+la requête et session SQLAlchemy. Les hooks before/after_request ne sont
+pas rejoués : authentification, compression et logs valent pour tout le lot.
+
+Les GET vers des routes sans accès à la base (fournisseurs, listes fixes)
+s'exécutent en parallèle ; les autres sous-requêtes s'exécutent dans l'ordre,
+dans le thread de la requête, la session SQLAlchemy ne pouvant pas être
+utilisée par plusieurs threads à la fois.
+
+Format :
+    {"requests": [{"id": "genres", "method": "GET", "path": "/api/genres",
+                   "params": {...}, "body": {...}}, ...]}
+    -> {"responses": [{"id": "genres", "status": 200, "body": ...}, ...]}
+"""
+
+import contextvars
+import os
+from typing import Any, Dict, Iterable, List, Optional
+
+from werkzeug.exceptions import HTTPException
+
+from src import json_codec
+from src.concurrency import run_concurrently
+
+# Nombre maximum de sous-requêtes par lot
+MAX_REQUESTS = int(os.environ.get("BATCH_MAX_REQUESTS", "10"))
+ALLOWED_METHODS = ("GET", "POST", "PUT", "DELETE")
+
+class BatchError(ValueError):
+    """Lot invalide (réponse 400)"""
+
+def parse_batch(payload: Any) -> List[Dict[str, Any]]:
+    """
+    Valide le corps d'une requête /api/batch
+
+    Returns:
+        Sous-requêtes normalisées (id, method, path, params, body)
+
+    Raises:
+        BatchError: Si le lot est mal formé
+    """
+    if not isinstance(payload, dict) or not isinstance(payload.get("requests"), list):
+        raise BatchError("Corps attendu : {\"requests\": [...]}")
+
+    requests = payload["requests"]
+    if not requests:
+        raise BatchError("Aucune sous-requête")
+    if len(requests) > MAX_REQUESTS:
+        raise BatchError(f"Au plus {MAX_REQUESTS} sous-requêtes par lot")
+
+    subrequests = []
+    for index, sub in enumerate(requests):
+        if not isinstance(sub, dict):
+            raise BatchError(f"Sous-requête {index} invalide")
+        path = sub.get("path")
+        method = str(sub.get("method", "GET")).upper()
+        params = sub.get("params") or {}
+        if not isinstance(path, str) or not path.startswith("/api/"):
+            raise BatchError(f"Sous-requête {index} : chemin /api/... requis")
+        if "?" in path:
+            raise BatchError(f"Sous-requête {index} : paramètres à passer dans params")
+        if method not in ALLOWED_METHODS:
+            raise BatchError(f"Sous-requête {index} : méthode {method} non supportée")
+        if not isinstance(params, dict):
+            raise BatchError(f"Sous-requête {index} : params doit être un objet")
+        subrequests.append({
+            "id": sub.get("id", index),
+            "method": method,
+            "path": path,
+            "params": params,
+            "body": sub.get("body"),
+        })
+    return subrequests
+
+class BatchRunner:
+    """Exécute les sous-requêtes d'un lot dans le contexte de la requête courante"""
+
+    def __init__(self, app, concurrent_endpoints: Iterable[str], excluded_endpoints: Iterable[str],
+                 fallback_endpoint: Optional[str] = None):
+        """
+        Args:
+            app: Instance Flask
+            concurrent_endpoints: Routes sans accès à la base, exécutables en parallèle (GET)
+            excluded_endpoints: Routes refusées dans un lot (flux, lot imbriqué...)
+            fallback_endpoint: Route attrape-tout (frontend) : 404 dans un lot
+        """
+        self.app = app
+        self.concurrent_endpoints = frozenset(concurrent_endpoints)
+        self.excluded_endpoints = frozenset(excluded_endpoints)
+        self.fallback_endpoint = fallback_endpoint
+
+    def run(self, subrequests: List[Dict[str, Any]], headers: Optional[Dict[str, str]] = None) -> bytes:
+        """
+        Exécute un lot ; appelé pendant la requête /api/batch
+
+        Args:
+            subrequests: Sous-requêtes validées par parse_batch
+            headers: En-têtes transmis à chaque sous-requête (Authorization)
+
+        Returns:
+            Corps JSON de la réponse du lot
+        """
+        headers = {key: value for key, value in (headers or {}).items() if value}
+        results: List[Optional[tuple]] = [None] * len(subrequests)
+        stage: List[int] = []
+
+        def run_stage():
+            if len(stage) == 1:
+                results[stage[0]] = self._dispatch(subrequests[stage[0]], headers)
+            elif stage:
+                # Chaque tâche reçoit une copie du contexte : même application, même g
+                tasks = [
+                    lambda sub=subrequests[index], ctx=contextvars.copy_context(): ctx.run(self._dispatch, sub, headers)
+                    for index in stage
+                ]
+                for index, (result, error) in zip(stage, run_concurrently(tasks)):
+                    results[index] = result if error is None else self._error(500, f"Erreur interne: {error}")
+            stage.clear()
+
+        # Ordre respecté : les GET parallélisables consécutifs forment une étape
+        for index, sub in enumerate(subrequests):
+            if sub["method"] == "GET" and self._endpoint(sub) in self.concurrent_endpoints:
+                stage.append(index)
+            else:
+                run_stage()
+                results[index] = self._dispatch(sub, headers)
+        run_stage()
+
+        parts = [
+            b'{"id":' + json_codec.dumps(sub["id"]) + b',"status":' + str(status).encode() + b',"body":' + body + b"}"
+            for sub, (status, body) in zip(subrequests, results)
+        ]
+        return b'{"responses":[' + b",".join(parts) + b"]}"
+
+    def _endpoint(self, sub: Dict[str, Any]) -> Optional[str]:
+        try:
+            endpoint, _ = self.app.url_map.bind("localhost").match(sub["path"], method=sub["method"])
+            return endpoint
+        except HTTPException:
+            return None
+
+    def _dispatch(self, sub: Dict[str, Any], headers: Dict[str, str]):
+        """Exécute une sous-requête ; retourne (statut, corps JSON)"""
+        body = sub["body"] if sub["method"] != "GET" and sub["body"] is not None else None
+        with self.app.test_request_context(
+            sub["path"],
+            method=sub["method"],
+            query_string=sub["params"],
+            headers=headers,
+            json=body,
+        ) as ctx:
+            try:
+                endpoint = ctx.request.url_rule.endpoint if ctx.request.url_rule is not None else None
+                if endpoint is not None and endpoint == self.fallback_endpoint:
+                    return self._error(404, "Route inconnue")
+                if endpoint in self.excluded_endpoints:
+                    return self._error(400, "Route non disponible dans un lot")
+                response = self.app.make_response(self.app.dispatch_request())
+            except HTTPException as e:
+                return self._error(e.code, e.description)
+            except Exception as e:
+                try:
+                    # Gestionnaires d'erreurs de l'application (AuthError...)
+                    response = self.app.make_response(self.app.handle_user_exception(e))
+                except Exception as unhandled:
+                    return self._error(500, f"Erreur interne: {str(unhandled)}")
+
+            data = response.get_data()
+            if response.mimetype != "application/json":
+                data = json_codec.dumps(data.decode("utf-8", "replace"))
+            return response.status_code, data.rstrip(b"\n") or b"null"
+
+    @staticmethod
+    def _error(status: int, message: str):
+        return status, json_codec.dumps({"error": message})
@@ -0,0 +1,329 @@
+"""
+Catalogue de caractéristiques partagé entre les workers
+
+Les caractéristiques du catalogue (note, popularité, genres, disponibilité
+streaming) sont publiées dans un fichier binaire versionné, projeté en mémoire
+(mmap) par chaque worker : les tableaux NumPy pointent directement dans les
+pages du fichier, partagées par tous les processus, sans copie.
+
+Publication atomique : le rafraîchisseur écrit une nouvelle version dans un
+fichier temporaire puis le renomme (os.replace). Les workers détectent le
+changement au plus tard CHECK_INTERVAL secondes après et projettent la
+nouvelle version ; l'ancienne reste valide tant qu'un lecteur la référence.
+
+Usage (rafraîchisseur) :
+    python -m src.catalog_store refresh [--pages 5] [--with-providers] [--loop 3600]
+    python -m src.catalog_store info
+"""
+
+import argparse
+import json
+import mmap
+import os
+import struct
+import sys
+import time
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from data.movies_series_database import STREAMING_SERVICES
+
+# Chemin par défaut du segment (surchargeable via CATALOG_PATH)
+DEFAULT_CATALOG_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "catalog_features.bin"
+)
+
+# 02 : lignes triées par (type, identifiant), un film et une série pouvant partager un id TMDb
+MAGIC = b"WTWCAT02"
+_PREFIX = struct.Struct("<8sI")  # magic, taille de l'en-tête JSON
+_ALIGN = 64
+
+# Un bit par genre TMDb (films et séries)
+GENRE_BITS = (
+    28, 12, 16, 35, 80, 99, 18, 10751, 14, 36, 27, 10402, 9648, 10749,
+    878, 10770, 53, 10752, 37, 10759, 10762, 10763, 10764, 10765, 10766, 10767, 10768,
+)
+_GENRE_BIT = {gid: bit for bit, gid in enumerate(GENRE_BITS)}
+
+# Un bit par service de streaming
+_SERVICE_BIT = {service: bit for bit, service in enumerate(STREAMING_SERVICES)}
+
+MEDIA_TYPES = ("movie", "tv")
+
+# Colonnes du segment, triées par type puis par identifiant
+COLUMNS = (
+    ("id", np.int64),
+    ("media_type", np.uint8),
+    ("rating", np.float32),
+    ("popularity", np.float32),
+    ("vote_count", np.int32),
+    ("genre_mask", np.uint32),
+    ("availability", np.uint16),
+)
+
+def genre_mask(genre_ids: Iterable[int]) -> int:
+    mask = 0
+    for gid in genre_ids or ():
+        bit = _GENRE_BIT.get(gid)
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+def availability_mask(services: Iterable[str]) -> int:
+    mask = 0
+    for service in services or ():
+        bit = _SERVICE_BIT.get(service)
+        if bit is not None:
+            mask |= 1 << bit
+    return mask
+
+def _media_type_code(media_type: Optional[str]) -> int:
+    return MEDIA_TYPES.index(media_type) if media_type in MEDIA_TYPES else 0
+
+class CatalogFeatures:
+    """Une version du catalogue projetée en mémoire (lecture seule)"""
+
+    def __init__(self, path: str):
+        with open(path, "rb") as f:
+            self._mmap = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            stat = os.fstat(f.fileno())
+        self.inode = (stat.st_dev, stat.st_ino)
+
+        magic, header_size = _PREFIX.unpack_from(self._mmap, 0)
+        if magic != MAGIC:
+            raise ValueError(f"Segment de catalogue invalide: {path}")
+        header = json.loads(self._mmap[_PREFIX.size:_PREFIX.size + header_size])
+
+        self.version = header["version"]
+        self.created_at = header["created_at"]
+        self.count = header["count"]
+        self.columns = {
+            name: np.frombuffer(self._mmap, dtype=np.dtype(spec["dtype"]), count=self.count, offset=spec["offset"])
+            for name, spec in header["columns"].items()
+        }
+        # Plage de lignes de chaque type (colonne media_type triée)
+        types = self.columns["media_type"]
+        self._type_rows = [
+            (int(np.searchsorted(types, code, "left")), int(np.searchsorted(types, code, "right")))
+            for code in range(len(MEDIA_TYPES))
+        ]
+
+    def __len__(self):
+        return self.count
+
+    def find(self, item_id: int, media_type: str = "movie") -> Optional[int]:
+        """Indice de l'élément (recherche dichotomique sur les identifiants triés de son type)"""
+        start, end = self._type_rows[_media_type_code(media_type)]
+        ids = self.columns["id"][start:end]
+        row = int(np.searchsorted(ids, item_id))
+        if row < len(ids) and ids[row] == item_id:
+            return start + row
+        return None
+
+    def lookup(self, item_id: int, media_type: str = "movie") -> Optional[Dict[str, Any]]:
+        """Caractéristiques d'un élément ('movie' ou 'tv'), ou None s'il n'est pas au catalogue"""
+        row = self.find(item_id, media_type)
+        if row is None:
+            return None
+
+        mask = int(self.columns["genre_mask"][row])
+        availability = int(self.columns["availability"][row])
+        return {
+            "id": item_id,
+            "media_type": MEDIA_TYPES[self.columns["media_type"][row]],
+            "rating": round(float(self.columns["rating"][row]), 3),
+            "popularity": round(float(self.columns["popularity"][row]), 3),
+            "vote_count": int(self.columns["vote_count"][row]),
+            "genre_ids": [gid for bit, gid in enumerate(GENRE_BITS) if mask >> bit & 1],
+            "streaming_services": [s for s, bit in _SERVICE_BIT.items() if availability >> bit & 1],
+        }
+
+def publish(records: List[Dict[str, Any]], path: Optional[str] = None, version: Optional[int] = None) -> int:
+    """
+    Écrit une nouvelle version du catalogue et la rend visible atomiquement
+
+    Args:
+        records: Éléments (id, media_type, rating, popularity, vote_count,
+                 genre_ids, streaming_services)
+        path: Fichier du segment (défaut: CATALOG_PATH)
+        version: Numéro de version (défaut: version courante + 1)
+
+    Returns:
+        Version publiée
+    """
+    path = path or os.environ.get("CATALOG_PATH", DEFAULT_CATALOG_PATH)
+    if version is None:
+        try:
+            version = CatalogFeatures(path).version + 1
+        except (OSError, ValueError):
+            version = 1
+
+    # Un seul enregistrement par (type, identifiant) : un film et une série TMDb
+    # peuvent avoir le même id. Triés pour la recherche dichotomique
+    by_key = {(_media_type_code(r.get("media_type")), int(r["id"])): r for r in records if r.get("id") is not None}
+    keys = sorted(by_key)
+    rows = [by_key[key] for key in keys]
+    values = {
+        "id": [item_id for _, item_id in keys],
+        "media_type": [code for code, _ in keys],
+        "rating": [r.get("rating") or 0 for r in rows],
+        "popularity": [r.get("popularity") or 0 for r in rows],
+        "vote_count": [r.get("vote_count") or 0 for r in rows],
+        "genre_mask": [genre_mask(r.get("genre_ids")) for r in rows],
+        "availability": [availability_mask(r.get("streaming_services")) for r in rows],
+    }
+    arrays = {name: np.asarray(values[name], dtype=dtype) for name, dtype in COLUMNS}
+
+    # En-tête JSON (taille fixée avant de calculer les décalages des colonnes)
+    columns = {name: {"dtype": np.dtype(dtype).str, "offset": 0} for name, dtype in COLUMNS}
+    header = {"version": version, "created_at": time.time(), "count": len(keys), "columns": columns}
+    header_size = len(json.dumps(header)) + 16 * len(COLUMNS) + 32
+    offset = _PREFIX.size + header_size
+    for name, _ in COLUMNS:
+        offset = -(-offset // _ALIGN) * _ALIGN
+        columns[name]["offset"] = offset
+        offset += arrays[name].nbytes
+    header_bytes = json.dumps(header).encode().ljust(header_size)
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_PREFIX.pack(MAGIC, header_size))
+        f.write(header_bytes)
+        for name, _ in COLUMNS:
+            f.seek(columns[name]["offset"])
+            f.write(arrays[name].tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
+    return version
+
+class CatalogStore:
+    """
+    Accès à la version courante du catalogue, par processus
+
+    Vérifie au plus toutes les CHECK_INTERVAL secondes si une nouvelle version
+    a été publiée ; sans fichier de catalogue, current() retourne None.
+    """
+
+    CHECK_INTERVAL = 5.0
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or os.environ.get("CATALOG_PATH", DEFAULT_CATALOG_PATH)
+        self._features: Optional[CatalogFeatures] = None
+        self._checked_at = 0.0
+
+    def current(self) -> Optional[CatalogFeatures]:
+        now = time.monotonic()
+        if now - self._checked_at >= self.CHECK_INTERVAL:
+            self._checked_at = now
+            self._reload_if_changed()
+        return self._features
+
+    def _reload_if_changed(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            self._features = None
+            return
+
+        if self._features is not None and self._features.inode == (stat.st_dev, stat.st_ino):
+            return
+        try:
+            # Remplacement de la référence : les lecteurs en cours gardent l'ancienne version
+            self._features = CatalogFeatures(self.path)
+        except (OSError, ValueError) as e:
+            print(f"❌ Erreur chargement catalogue: {e}")
+
+    def enrich(self, item: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Complète un élément avec les genres et la disponibilité du catalogue
+
+        Le catalogue est indexé par identifiant TMDb : un élément d'un autre
+        fournisseur (id Watchmode) n'est complété que s'il porte un tmdb_id.
+        """
+        features = self.current()
+        tmdb_id = item.get("tmdb_id") or (item.get("id") if item.get("provider") == "TMDb" else None)
+        if features is None or tmdb_id is None:
+            return item
+        try:
+            row = features.lookup(int(tmdb_id), item.get("media_type") or "movie")
+        except (TypeError, ValueError):
+            return item
+        if row is None:
+            return item
+
+        enriched = dict(item)
+        if row["genre_ids"] and not enriched.get("genre_ids") and "genre_names" not in enriched:
+            enriched["genre_ids"] = row["genre_ids"]
+        if "streaming_services" not in enriched and row["streaming_services"]:
+            enriched["streaming_services"] = row["streaming_services"]
+        return enriched
+
+# Instance globale (un mmap par worker, pages partagées entre workers)
+catalog_store = CatalogStore()
+
+def _fetch_records(pages: int, with_providers: bool) -> List[Dict[str, Any]]:
+    """Construit les enregistrements depuis les tendances TMDb"""
+    from src.api_providers.tmdb_provider import TMDbProvider
+    from src.recommendation_utils import StreamingServiceMapper
+    try:
+        from config import TMDB_API_KEY
+    except ImportError:
+        TMDB_API_KEY = os.environ.get("TMDB_API_KEY", "")
+
+    provider = TMDbProvider(TMDB_API_KEY)
+    records = {}
+    for content_type in MEDIA_TYPES:
+        for page in range(1, pages + 1):
+            result = provider.get_trending(content_type, "week", page=page)
+            if "error" in result:
+                print(f"❌ {content_type} page {page}: {result['error']}")
+                break
+            for item in result.get("results", []):
+                item["media_type"] = content_type
+                records[(content_type, item["id"])] = item
+
+    if with_providers:
+        for item in records.values():
+            details = provider.get_details(item["id"], item["media_type"])
+            providers_fr = details.get("watch/providers", {}).get("results", {}).get("FR", {})
+            item["streaming_services"] = sorted({
+                StreamingServiceMapper.normalize_service_name(p.get("provider_name", ""))
+                for p in providers_fr.get("flatrate", [])
+            })
+
+    return list(records.values())
+
+def main():
+    parser = argparse.ArgumentParser(description="Rafraîchisseur du catalogue partagé")
+    parser.add_argument("command", choices=["refresh", "info"])
+    parser.add_argument("--path", default=None)
+    parser.add_argument("--pages", type=int, default=5, help="Pages de tendances TMDb par type")
+    parser.add_argument("--with-providers", action="store_true", help="Récupérer la disponibilité streaming (1 appel par élément)")
+    parser.add_argument("--loop", type=float, default=0, help="Rafraîchir toutes les N secondes")
+    args = parser.parse_args()
+
+    if args.command == "info":
+        features = CatalogStore(args.path).current()
+        if features is None:
+            print("Aucun catalogue publié")
+            sys.exit(1)
+        print(f"Version {features.version} - {len(features)} éléments - "
+              f"publiée le {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(features.created_at))}")
+        return
+
+    while True:
+        records = _fetch_records(args.pages, args.with_providers)
+        if records:
+            version = publish(records, args.path)
+            print(f"✅ Catalogue version {version} publié ({len(records)} éléments)")
+        else:
+            print("❌ Aucun élément récupéré, catalogue inchangé")
+        if not args.loop:
+            break
+        time.sleep(args.loop)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Compression des réponses JSON de l'API
+gzip ou brotli selon l'en-tête Accept-Encoding du client, au-delà d'une
+taille minimale (les petites réponses ne gagnent rien à être compressées)
+"""
+
+import gzip
+import os
+from typing import Optional
+
+try:
+    import brotli
+except ImportError:  # brotli est optionnel : gzip seul
+    brotli = None
+
+# Taille minimale (octets) d'une réponse compressée
+MIN_SIZE = int(os.environ.get("COMPRESS_MIN_SIZE", "1024"))
+GZIP_LEVEL = int(os.environ.get("COMPRESS_GZIP_LEVEL", "6"))
+# Qualité brotli à la volée : 4 compresse mieux que gzip 6 pour un coût CPU comparable
+BROTLI_QUALITY = int(os.environ.get("COMPRESS_BROTLI_QUALITY", "4"))
+
+def parse_accept_encoding(header: Optional[str]) -> dict:
+    """Accept-Encoding -> {encodage: q}"""
+    encodings = {}
+    for part in (header or "").split(","):
+        name, _, params = part.strip().partition(";")
+        if not name:
+            continue
+        q = 1.0
+        params = params.strip()
+        if params.startswith("q="):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        encodings[name.strip().lower()] = q
+    return encodings
+
+def choose_encoding(header: Optional[str], available=("br", "gzip")) -> Optional[str]:
+    """Meilleur encodage accepté par le client parmi `available` (br prioritaire)"""
+    accepted = parse_accept_encoding(header)
+    for encoding in available:
+        if encoding == "br" and brotli is None:
+            continue
+        q = accepted.get(encoding, accepted.get("*", 0.0))
+        if q > 0:
+            return encoding
+    return None
+
+def compress(data: bytes, encoding: str) -> bytes:
+    if encoding == "br":
+        return brotli.compress(data, quality=BROTLI_QUALITY)
+    return gzip.compress(data, compresslevel=GZIP_LEVEL)
+
+def init_compression(app, min_size: int = None):
+    """
+    Compresse les réponses JSON de l'application Flask
+
+    Args:
+        app: Instance Flask
+        min_size: Taille minimale en octets (défaut: COMPRESS_MIN_SIZE)
+    """
+    from flask import request
+
+    threshold = MIN_SIZE if min_size is None else min_size
+
+    @app.after_request
+    def compress_json_response(response):
+        if (response.mimetype != "application/json"
+                or response.direct_passthrough
+                or response.is_streamed
+                or response.status_code < 200 or response.status_code in (204, 304)
+                or "Content-Encoding" in response.headers):
+            return response
+
+        response.vary.add("Accept-Encoding")
+        data = response.get_data()
+        if len(data) < threshold:
+            return response
+
+        encoding = choose_encoding(request.headers.get("Accept-Encoding"))
+        if encoding is None:
+            return response
+
+        response.set_data(compress(data, encoding))
+        response.headers["Content-Encoding"] = encoding
+        return response
@@ -0,0 +1,262 @@
+"""
+Exécution concurrente des appels fournisseurs
+Utilise un pool de greenlets quand gevent a patché la bibliothèque standard
+(mode server_gevent.py / gunicorn_config.py), sinon un pool de threads
+partagé, créé une fois par processus (après le fork des workers gunicorn).
+Chaque tâche s'exécute dans une copie du contexte de l'appelant : identifiant
+de requête des logs et trace en cours la suivent dans le pool, ainsi que
+l'enveloppe éventuelle des tâches (profilage à la demande, src/profiling.py).
+"""
+
+import concurrent.futures
+import contextvars
+import logging
+import os
+import queue
+import threading
+import time
+from typing import Any, Callable, Iterator, List, Optional, Tuple
+
+try:
+    import gevent
+    import gevent.pool
+    import gevent.queue
+    from gevent import monkey
+except ImportError:  # gevent est optionnel en mode sync/ASGI
+    gevent = None
+
+logger = logging.getLogger(__name__)
+
+# Threads du pool partagé d'un worker
+THREAD_POOL_SIZE = int(os.environ.get("PROVIDER_THREAD_POOL_SIZE", "32"))
+_THREAD_NAME_PREFIX = "provider-pool"
+
+# Enveloppe appliquée à chaque tâche soumise depuis ce contexte (ou None)
+task_wrapper_var = contextvars.ContextVar("task_wrapper", default=None)
+
+_executor: Optional[concurrent.futures.ThreadPoolExecutor] = None
+_executor_pid: Optional[int] = None
+_executor_lock = threading.Lock()
+
+def gevent_active() -> bool:
+    """Vrai si la bibliothèque standard a été patchée par gevent"""
+    return gevent is not None and monkey.is_module_patched("socket")
+
+def run_concurrently(tasks: List[Callable[[], Any]], max_workers: Optional[int] = None,
+                     timeout: Optional[float] = None) -> List[Tuple[Any, Optional[BaseException]]]:
+    """
+    Exécute des fonctions sans argument en parallèle
+
+    Args:
+        tasks: Fonctions à exécuter
+        max_workers: Nombre maximum d'exécutions simultanées (défaut: toutes)
+        timeout: Délai global en secondes ; les tâches non terminées sont abandonnées
+
+    Returns:
+        Liste de (résultat, exception) dans l'ordre des tâches
+    """
+    if not tasks:
+        return []
+
+    tasks = [_bind_context(task) for task in tasks]
+    size = max(1, min(max_workers or len(tasks), len(tasks)))
+    if gevent_active():
+        return _run_greenlets(tasks, size, timeout)
+    return _run_threads(tasks, size, timeout)
+
+def iter_concurrently(tasks: List[Callable[[], Any]], max_workers: Optional[int] = None,
+                      timeout: Optional[float] = None) -> Iterator[Tuple[int, Any, Optional[BaseException]]]:
+    """
+    Comme run_concurrently, mais rend chaque résultat dès que sa tâche se termine
+
+    Args:
+        tasks: Fonctions à exécuter
+        max_workers: Nombre maximum d'exécutions simultanées (défaut: toutes)
+        timeout: Délai global en secondes ; les tâches non terminées sont abandonnées
+
+    Yields:
+        (indice de la tâche, résultat, exception) dans l'ordre de fin
+    """
+    if not tasks:
+        return
+
+    tasks = [_bind_context(task) for task in tasks]
+    size = max(1, min(max_workers or len(tasks), len(tasks)))
+    if gevent_active():
+        yield from _iter_greenlets(tasks, size, timeout)
+    else:
+        yield from _iter_threads(tasks, size, timeout)
+
+def _iter_greenlets(tasks, size, timeout):
+    pool = gevent.pool.Pool(size)
+    done = gevent.queue.Queue()
+
+    def spawn_all():
+        # Bloque sur le pool plein ici, pas dans le consommateur
+        for index, task in enumerate(tasks):
+            pool.spawn(_capture, task).link(lambda greenlet, index=index: done.put((index, *greenlet.value)))
+
+    spawner = gevent.spawn(spawn_all)
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        for _ in tasks:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                yield done.get(timeout=remaining)
+            except gevent.queue.Empty:
+                return
+    finally:
+        spawner.kill(block=False)
+        pool.kill(block=False)
+
+def _iter_threads(tasks, size, timeout):
+    dedicated = threading.current_thread().name.startswith(_THREAD_NAME_PREFIX)
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=size) if dedicated else start_thread_pool()
+    done = queue.Queue()
+    pending = iter(enumerate(tasks))
+    submit_lock = threading.Lock()
+    stopped = threading.Event()
+
+    def submit_next():
+        # Une tâche terminée libère sa place pour la suivante (au plus `size` en vol)
+        with submit_lock:
+            if stopped.is_set():
+                return
+            item = next(pending, None)
+        if item is not None:
+            index, task = item
+            executor.submit(_capture, task).add_done_callback(
+                lambda future, index=index: (done.put((index, *future.result())), submit_next())
+            )
+
+    for _ in range(size):
+        submit_next()
+
+    deadline = None if timeout is None else time.monotonic() + timeout
+    try:
+        for _ in tasks:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            try:
+                yield done.get(timeout=remaining)
+            except queue.Empty:
+                return
+    finally:
+        # Consommateur parti (délai, client déconnecté) : plus de nouvelles tâches
+        stopped.set()
+        if dedicated:
+            executor.shutdown(wait=False)
+
+def _bind_context(task: Callable[[], Any]) -> Callable[[], Any]:
+    # Copie prise dans le thread appelant, au moment de la soumission
+    context = contextvars.copy_context()
+    wrapper = task_wrapper_var.get()
+    if wrapper is not None:
+        task = wrapper(task)
+    return lambda: context.run(task)
+
+def _capture(task):
+    # Exception capturée ici : sinon le hub gevent l'affiche comme une erreur non gérée
+    try:
+        return task(), None
+    except Exception as e:
+        return None, e
+
+def _run_greenlets(tasks, size, timeout):
+    pool = gevent.pool.Pool(size)
+    greenlets = [pool.spawn(_capture, task) for task in tasks]
+    gevent.joinall(greenlets, timeout=timeout)
+
+    outcomes = []
+    for greenlet in greenlets:
+        if greenlet.ready():
+            outcomes.append(greenlet.value)
+        else:
+            greenlet.kill(block=False)
+            outcomes.append((None, TimeoutError("Délai dépassé")))
+    return outcomes
+
+def run_in_background(task: Callable[[], Any], name: str = "tâche") -> None:
+    """
+    Lance une fonction sans argument sans attendre son résultat
+
+    Greenlet en mode gevent, thread du pool partagé sinon ; une exception est
+    journalisée et n'atteint jamais l'appelant. La tâche garde le contexte de
+    l'appelant (identifiant de requête des logs) mais pas l'enveloppe de
+    profilage : elle peut se terminer après la requête.
+    """
+    context = contextvars.copy_context()
+
+    def unwrapped():
+        task_wrapper_var.set(None)
+        return task()
+
+    def run():
+        _, error = _capture(lambda: context.run(unwrapped))
+        if error is not None:
+            logger.warning("Échec de la tâche d'arrière-plan %s : %s", name, error)
+
+    if gevent_active():
+        gevent.spawn(run)
+    else:
+        start_thread_pool().submit(run)
+
+def start_thread_pool() -> Optional[concurrent.futures.ThreadPoolExecutor]:
+    """
+    Crée le pool de threads du processus courant (idempotent)
+
+    Appelé après le fork : les threads ne survivent pas à un fork, un pool
+    créé dans le master serait inutilisable dans les workers.
+    """
+    global _executor, _executor_pid
+    if gevent_active():
+        return None
+    if _executor_pid != os.getpid():
+        with _executor_lock:
+            if _executor_pid != os.getpid():
+                _executor = concurrent.futures.ThreadPoolExecutor(
+                    max_workers=THREAD_POOL_SIZE, thread_name_prefix=_THREAD_NAME_PREFIX
+                )
+                _executor_pid = os.getpid()
+    return _executor
+
+def _run_threads(tasks, size, timeout):
+    if threading.current_thread().name.startswith(_THREAD_NAME_PREFIX):
+        # Appel imbriqué depuis une tâche du pool partagé : un pool dédié évite
+        # que la tâche parente attende des tâches bloquées derrière elle. Pas de
+        # `with` : sa sortie attendrait les tâches en retard malgré le timeout
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=size)
+        try:
+            return _submit_and_wait(executor, tasks, size, timeout)
+        finally:
+            executor.shutdown(wait=False)
+    return _submit_and_wait(start_thread_pool(), tasks, size, timeout)
+
+def _submit_and_wait(executor, tasks, size, timeout):
+    deadline = None if timeout is None else time.monotonic() + timeout
+    slots = threading.BoundedSemaphore(size)
+
+    def remaining():
+        return None if deadline is None else max(0.0, deadline - time.monotonic())
+
+    # Au plus `size` tâches de cet appel en même temps dans le pool partagé
+    futures = []
+    for task in tasks:
+        if not slots.acquire(timeout=remaining()):
+            futures.append(None)
+            continue
+        future = executor.submit(task)
+        future.add_done_callback(lambda _: slots.release())
+        futures.append(future)
+
+    concurrent.futures.wait([f for f in futures if f is not None], timeout=remaining())
+
+    outcomes = []
+    for future in futures:
+        if future is None or not future.done():
+            # Les tâches en retard continuent en arrière-plan ; la requête répond sans elles
+            outcomes.append((None, TimeoutError("Délai dépassé")))
+        elif future.exception() is not None:
+            outcomes.append((None, future.exception()))
+        else:
+            outcomes.append((future.result(), None))
+    return outcomes
@@ -0,0 +1,249 @@
+"""
+File d'attente durable pour l'envoi d'emails
+Les emails sont stockés dans une base SQLite locale et envoyés par un thread
+de fond qui réutilise une seule connexion SMTP authentifiée
+"""
+
+import logging
+import os
+import smtplib
+import sqlite3
+import threading
+import time
+from contextlib import closing
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Chemin par défaut de la file (surchargeable via EMAIL_QUEUE_PATH)
+DEFAULT_QUEUE_PATH = os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "data", "email_queue.sqlite3"
+)
+
+class EmailQueue:
+    """File d'emails persistée dans SQLite (survit aux redémarrages des workers)"""
+
+    # Un email "en cours d'envoi" depuis plus longtemps est considéré abandonné
+    # (worker tué pendant l'envoi) et remis en file
+    STALE_CLAIM_SECONDS = 300
+
+    def __init__(self, db_path: str = None):
+        self.db_path = db_path or os.environ.get("EMAIL_QUEUE_PATH", DEFAULT_QUEUE_PATH)
+        os.makedirs(os.path.dirname(os.path.abspath(self.db_path)), exist_ok=True)
+        with closing(self._connect()) as conn:
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS emails (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    sender TEXT NOT NULL,
+                    recipient TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    next_attempt_at REAL NOT NULL,
+                    claimed_at REAL,
+                    last_error TEXT,
+                    created_at REAL NOT NULL
+                )
+            """)
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS idx_emails_pending ON emails (status, next_attempt_at)"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        # Une connexion par opération : sûr entre threads et après un fork
+        conn = sqlite3.connect(self.db_path, timeout=10, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.row_factory = sqlite3.Row
+        return conn
+
+    def enqueue(self, sender: str, recipient: str, payload: str) -> int:
+        """Ajoute un email à envoyer et retourne son identifiant"""
+        now = time.time()
+        with closing(self._connect()) as conn:
+            cursor = conn.execute(
+                "INSERT INTO emails (sender, recipient, payload, next_attempt_at, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (sender, recipient, payload, now, now)
+            )
+            return cursor.lastrowid
+
+    def claim_batch(self, limit: int = 20) -> List[Dict]:
+        """
+        Réserve atomiquement un lot d'emails prêts à partir
+
+        Plusieurs workers gunicorn peuvent vider la même file : la réservation
+        se fait dans une transaction IMMEDIATE pour qu'un email ne parte qu'une fois.
+        """
+        now = time.time()
+        conn = self._connect()
+        try:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.execute(
+                "UPDATE emails SET status = 'pending' WHERE status = 'sending' AND claimed_at < ?",
+                (now - self.STALE_CLAIM_SECONDS,)
+            )
+            rows = conn.execute(
+                "SELECT id, sender, recipient, payload, attempts FROM emails "
+                "WHERE status = 'pending' AND next_attempt_at <= ? ORDER BY id LIMIT ?",
+                (now, limit)
+            ).fetchall()
+            if rows:
+                conn.executemany(
+                    "UPDATE emails SET status = 'sending', claimed_at = ? WHERE id = ?",
+                    [(now, row["id"]) for row in rows]
+                )
+            conn.execute("COMMIT")
+            return [dict(row) for row in rows]
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+
+    def mark_sent(self, email_id: int):
+        with closing(self._connect()) as conn:
+            conn.execute("UPDATE emails SET status = 'sent', last_error = NULL WHERE id = ?", (email_id,))
+
+    def mark_retry(self, email_id: int, error: str, delay: float):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE emails SET status = 'pending', attempts = attempts + 1, "
+                "next_attempt_at = ?, last_error = ? WHERE id = ?",
+                (time.time() + delay, error, email_id)
+            )
+
+    def mark_failed(self, email_id: int, error: str):
+        with closing(self._connect()) as conn:
+            conn.execute(
+                "UPDATE emails SET status = 'failed', attempts = attempts + 1, last_error = ? WHERE id = ?",
+                (error, email_id)
+            )
+
+    def counts(self) -> Dict[str, int]:
+        """Nombre d'emails par statut"""
+        with closing(self._connect()) as conn:
+            rows = conn.execute("SELECT status, COUNT(*) AS n FROM emails GROUP BY status").fetchall()
+        return {row["status"]: row["n"] for row in rows}
+
+class EmailWorker:
+    """
+    Thread de fond qui vide la file d'emails
+
+    Garde une connexion SMTP authentifiée ouverte entre les envois (fermée
+    après une période d'inactivité), envoie par lots et réessaie les échecs
+    avec un délai exponentiel.
+    """
+
+    def __init__(self, email_queue: EmailQueue, smtp_factory: Callable[[], smtplib.SMTP],
+                 batch_size: int = 20, poll_interval: float = 2.0, max_attempts: int = 5,
+                 base_retry_delay: float = 30.0, max_retry_delay: float = 3600.0,
+                 idle_timeout: float = 60.0):
+        self.queue = email_queue
+        self.smtp_factory = smtp_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.base_retry_delay = base_retry_delay
+        self.max_retry_delay = max_retry_delay
+        self.idle_timeout = idle_timeout
+
+        self._smtp: Optional[smtplib.SMTP] = None
+        self._last_used = 0.0
+        self._wakeup = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def ensure_started(self):
+        """Démarre le thread (une fois par processus, y compris après un fork)"""
+        if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._pid == os.getpid() and self._thread and self._thread.is_alive():
+                return
+            # Après un fork, la connexion SMTP du parent ne doit pas être réutilisée
+            self._smtp = None
+            self._stop.clear()
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name="email-worker", daemon=True)
+            self._thread.start()
+
+    def wake(self):
+        """Signale qu'un email vient d'être ajouté"""
+        self._wakeup.set()
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        self._wakeup.set()
+        if self._thread:
+            self._thread.join(timeout=timeout)
+        self._close_connection()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                sent = self.process_batch()
+            except Exception:
+                logger.exception("Erreur du worker email")
+                sent = 0
+
+            if sent == 0:
+                if self._smtp and time.time() - self._last_used > self.idle_timeout:
+                    self._close_connection()
+                self._wakeup.wait(self.poll_interval)
+                self._wakeup.clear()
+
+    def process_batch(self) -> int:
+        """Envoie un lot d'emails prêts ; retourne le nombre d'emails traités"""
+        batch = self.queue.claim_batch(self.batch_size)
+        for email in batch:
+            self._send_one(email)
+        return len(batch)
+
+    def _send_one(self, email: Dict):
+        try:
+            self._sendmail(email)
+            self.queue.mark_sent(email["id"])
+            logger.info("Email envoyé", extra={"email_id": email["id"], "recipient": email["recipient"]})
+        except smtplib.SMTPRecipientsRefused as e:
+            # Destinataire refusé : inutile de réessayer
+            self.queue.mark_failed(email["id"], str(e))
+            logger.warning("Email refusé", extra={"email_id": email["id"], "error": str(e)})
+        except Exception as e:
+            self._close_connection()
+            attempts = email["attempts"] + 1
+            if attempts >= self.max_attempts:
+                self.queue.mark_failed(email["id"], str(e))
+                logger.error("Email abandonné", extra={"email_id": email["id"], "error": str(e)})
+            else:
+                delay = min(self.base_retry_delay * (2 ** (attempts - 1)), self.max_retry_delay)
+                self.queue.mark_retry(email["id"], str(e), delay)
+                logger.warning("Email reporté", extra={
+                    "email_id": email["id"], "attempts": attempts, "retry_in": delay, "error": str(e)
+                })
+
+    def _sendmail(self, email: Dict):
+        smtp = self._get_connection()
+        try:
+            smtp.sendmail(email["sender"], email["recipient"], email["payload"])
+        except smtplib.SMTPServerDisconnected:
+            # Connexion fermée par le serveur pendant l'inactivité : une reconnexion
+            self._close_connection()
+            smtp = self._get_connection()
+            smtp.sendmail(email["sender"], email["recipient"], email["payload"])
+        self._last_used = time.time()
+
+    def _get_connection(self) -> smtplib.SMTP:
+        if self._smtp is None:
+            self._smtp = self.smtp_factory()
+            self._last_used = time.time()
+        return self._smtp
+
+    def _close_connection(self):
+        if self._smtp is not None:
+            try:
+                self._smtp.quit()
+            except Exception:
+                pass
+            self._smtp = None
@@ -10,8 +10,10 @@ from email.mime.multipart import MIMEMultipart
 from datetime import datetime
 import os
 
+from src.email_queue import EmailQueue, EmailWorker
+
 class EmailService:
-    def __init__(self):
+    def __init__(self, email_queue=None):
         # Configuration SMTP - vous pouvez modifier ces valeurs
         self.smtp_server = "smtp.gmail.com"  # Pour Gmail
         self.smtp_port = 587  # Port pour TLS
@@ -25,6 +27,33 @@ class EmailService:
         # Configuration de sécurité
         self.context = ssl.create_default_context()
         
+        # File d'envoi en arrière-plan (créée au premier email)
+        self._email_queue = email_queue
+        self._worker = None
+    
+    @property
+    def email_queue(self):
+        if self._email_queue is None:
+            self._email_queue = EmailQueue()
+        return self._email_queue
+    
+    @property
+    def worker(self):
+        if self._worker is None:
+            self._worker = EmailWorker(self.email_queue, self._open_smtp_connection)
+        return self._worker
+        
+    def start_worker(self):
+        """
+        Démarre le worker de fond au démarrage du processus : les emails restés
+        en file ou en attente de réessai partent sans attendre un nouvel email.
+        """
+        if not self.sender_email or self.sender_email == 'votre-email@gmail.com':
+            return False
+        self.worker.ensure_started()
+        self.worker.wake()
+        return True
+        
     def send_welcome_email(self, user_email, user_name):
         """
         Envoie un email de bienvenue après l'inscription.
@@ -178,6 +207,8 @@ class EmailService:
     def _send_email(self, message, recipient_email):
         """
         Méthode privée pour envoyer un email.
+        L'email est mis dans la file durable et envoyé par le worker de fond :
+        la requête qui le déclenche n'attend pas le serveur SMTP.
         """
         try:
             # Vérifier la configuration
@@ -186,28 +217,24 @@ class EmailService:
                 print("💡 Configurez SENDER_EMAIL et SENDER_PASSWORD dans vos variables d'environnement")
                 return False
             
-            # Connexion au serveur SMTP
-            with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
-                server.starttls(context=self.context)
-                server.login(self.sender_email, self.sender_password)
-                
-                # Envoyer l'email
-                text = message.as_string()
-                server.sendmail(self.sender_email, recipient_email, text)
-                
-            print(f"✅ Email envoyé avec succès à {recipient_email}")
+            self.email_queue.enqueue(self.sender_email, recipient_email, message.as_string())
+            self.worker.ensure_started()
+            self.worker.wake()
             return True
             
-        except smtplib.SMTPAuthenticationError:
-            print("❌ Erreur d'authentification SMTP. Vérifiez vos identifiants.")
-            return False
-        except smtplib.SMTPException as e:
-            print(f"❌ Erreur SMTP: {str(e)}")
-            return False
         except Exception as e:
-            print(f"❌ Erreur lors de l'envoi de l'email: {str(e)}")
+            print(f"❌ Erreur lors de la mise en file de l'email: {str(e)}")
             return False
     
+    def _open_smtp_connection(self):
+        """
+        Ouvre une connexion SMTP authentifiée (réutilisée par le worker de fond).
+        """
+        server = smtplib.SMTP(self.smtp_server, self.smtp_port, timeout=30)
+        server.starttls(context=self.context)
+        server.login(self.sender_email, self.sender_password)
+        return server
+    
     def test_email_configuration(self):
         """
         Teste la configuration email.
@@ -0,0 +1,102 @@
+"""
+Sérialisation JSON rapide (orjson), avec repli sur le module json standard
+
+Un seul codec pour les réponses de l'API (fournisseur JSON de Flask), le cache
+des réponses sérialisées et le fichier des utilisateurs (data/users.json).
+Sans orjson, ou pour un objet qu'il ne sait pas encoder (entier de plus de
+64 bits...), le module json produit un résultat équivalent.
+"""
+
+import json
+from typing import Any, Callable, Optional, Union
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # orjson est optionnel : module json standard
+    orjson = None
+
+# orjson.JSONDecodeError hérite de json.JSONDecodeError
+JSONDecodeError = json.JSONDecodeError
+
+def dumps(obj: Any, sort_keys: bool = False, indent: bool = False,
+          default: Optional[Callable[[Any], Any]] = None) -> bytes:
+    """
+    Encode `obj` en JSON UTF-8
+
+    Args:
+        obj: Objet à encoder
+        sort_keys: Trier les clés des dictionnaires
+        indent: Indenter (2 espaces) pour un fichier lisible
+        default: Conversion des types non JSON ; reçoit aussi les dates,
+                 comme avec le module json
+
+    Returns:
+        JSON encodé (bytes)
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        if default is not None:
+            option |= orjson.OPT_PASSTHROUGH_DATETIME
+        try:
+            return orjson.dumps(obj, default=default, option=option)
+        except orjson.JSONEncodeError:
+            pass  # Repli sur json (qui lèvera l'erreur si l'objet n'est vraiment pas encodable)
+
+    return json.dumps(
+        obj,
+        ensure_ascii=False,
+        sort_keys=sort_keys,
+        indent=2 if indent else None,
+        separators=None if indent else (",", ":"),
+        default=default,
+    ).encode("utf-8")
+
+def loads(data: Union[bytes, bytearray, str]) -> Any:
+    """Décode un document JSON (bytes ou str)"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+def backend_name() -> str:
+    return "orjson" if orjson is not None else "json"
+
+class FastJSONProvider(DefaultJSONProvider):
+    """
+    Fournisseur JSON de Flask basé sur le codec : jsonify, request.json
+    et app.json.dumps passent par orjson quand il est installé.
+    Mêmes conventions que le fournisseur par défaut (clés triées, dates au
+    format HTTP via default), mais en UTF-8 sans échappement.
+    """
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        if set(kwargs) - {"indent", "separators", "sort_keys"}:
+            return super().dumps(obj, **kwargs)
+        return dumps(
+            obj,
+            sort_keys=kwargs.get("sort_keys", self.sort_keys),
+            indent=bool(kwargs.get("indent")),
+            default=self.default,
+        ).decode("utf-8")
+
+    def loads(self, s: Union[str, bytes], **kwargs: Any) -> Any:
+        if kwargs:
+            return super().loads(s, **kwargs)
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        # Octets directement, sans chaîne intermédiaire
+        obj = self._prepare_response_obj(args, kwargs)
+        indent = (self.compact is None and self._app.debug) or self.compact is False
+        body = dumps(obj, sort_keys=self.sort_keys, indent=indent, default=self.default)
+        return self._app.response_class(body + b"\n", mimetype=self.mimetype)
+
+def init_json_provider(app):
+    """Installe le fournisseur JSON rapide sur l'application Flask"""
+    app.json_provider_class = FastJSONProvider
+    app.json = FastJSONProvider(app)
@@ -0,0 +1,242 @@
+"""
+Configuration du logging structuré
+Logs au format JSON (une ligne par événement), écrits par un thread dédié
+pour ne pas bloquer les requêtes, avec corrélation par identifiant de requête
+"""
+
+import contextvars
+import json
+import logging
+import os
+import queue
+import random
+import sys
+import threading
+import time
+import uuid
+from logging.handlers import QueueHandler
+from typing import Dict, Optional
+
+# Identifiant de la requête en cours (propagé aux logs de tous les modules)
+request_id_var = contextvars.ContextVar("request_id", default=None)
+
+# Attributs standards d'un LogRecord, exclus des champs "extra" du JSON
+_RESERVED_ATTRS = set(vars(logging.LogRecord("", 0, "", 0, "", (), None))) | {"message", "request_id"}
+
+class JsonFormatter(logging.Formatter):
+    """Formate un LogRecord en une ligne JSON"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+
+        request_id = getattr(record, "request_id", None)
+        if request_id:
+            entry["request_id"] = request_id
+
+        # Champs structurés passés via extra={...}
+        for key, value in record.__dict__.items():
+            if key not in _RESERVED_ATTRS and not key.startswith("_"):
+                entry[key] = value
+
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry["exc"] = record.exc_text
+
+        return json.dumps(entry, ensure_ascii=False, default=str)
+
+class RequestIdFilter(logging.Filter):
+    """Ajoute l'identifiant de la requête courante à chaque LogRecord"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id_var.get()
+        return True
+
+class DebugSamplingFilter(logging.Filter):
+    """Ne laisse passer qu'une fraction des logs DEBUG (les autres niveaux passent tous)"""
+
+    def __init__(self, rate: float = 1.0):
+        super().__init__()
+        self.rate = rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno > logging.DEBUG or self.rate >= 1.0:
+            return True
+        return random.random() < self.rate
+
+class AsyncBatchHandler(QueueHandler):
+    """
+    Handler non bloquant : les logs sont mis dans une file bornée et écrits
+    par lots par un thread dédié. Si la file est pleine, le log est abandonné
+    (et compté) plutôt que de ralentir la requête.
+    """
+
+    _STOP = object()
+
+    def __init__(self, stream=None, max_queue_size: int = 10000, batch_size: int = 256):
+        super().__init__(queue.Queue(maxsize=max_queue_size))
+        self.stream = stream or sys.stdout
+        self.batch_size = batch_size
+        self.dropped = 0
+        self._writer = None
+        self._writer_pid = None
+        self._writer_lock = threading.Lock()
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        """Fige le message (et la trace éventuelle) sans formater le JSON dans la requête"""
+        record.msg = record.getMessage()
+        record.args = None
+        if record.exc_info:
+            if not record.exc_text:
+                record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord):
+        self._ensure_writer()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+    def _ensure_writer(self):
+        """Démarre le thread d'écriture (une fois par processus, y compris après un fork)"""
+        if self._writer_pid == os.getpid():
+            return
+        with self._writer_lock:
+            if self._writer_pid == os.getpid():
+                return
+            if self._writer_pid is not None:
+                # Processus forké : la file et le thread du parent ne sont pas utilisables
+                self.queue = queue.Queue(maxsize=self.queue.maxsize)
+            self._writer = threading.Thread(target=self._drain, name="log-writer", daemon=True)
+            self._writer_pid = os.getpid()
+            self._writer.start()
+
+    def _drain(self):
+        formatter = self.formatter or JsonFormatter()
+        while True:
+            record = self.queue.get()
+            if record is self._STOP:
+                return
+
+            batch = [record]
+            while len(batch) < self.batch_size:
+                try:
+                    record = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if record is self._STOP:
+                    self._write(batch, formatter)
+                    return
+                batch.append(record)
+
+            self._write(batch, formatter)
+
+    def _write(self, batch, formatter):
+        try:
+            self.stream.write("\n".join(formatter.format(r) for r in batch) + "\n")
+            self.stream.flush()
+        except Exception:
+            pass
+
+    def flush(self, timeout: float = 2.0):
+        """Attend que la file soit vidée (utile en test et à l'arrêt)"""
+        deadline = time.time() + timeout
+        while not self.queue.empty() and time.time() < deadline:
+            time.sleep(0.01)
+
+    def close(self):
+        if self._writer is not None and self._writer_pid == os.getpid():
+            self.queue.put(self._STOP)
+            self._writer.join(timeout=2.0)
+            self._writer = None
+            self._writer_pid = None
+        super().close()
+
+def _parse_module_levels(spec: str) -> Dict[str, str]:
+    """Parse LOG_LEVELS="src.middleware=WARNING,api=DEBUG" """
+    levels = {}
+    for part in spec.split(","):
+        if "=" in part:
+            name, level = part.split("=", 1)
+            levels[name.strip()] = level.strip().upper()
+    return levels
+
+_handler: Optional[AsyncBatchHandler] = None
+
+def setup_logging(level: Optional[str] = None, module_levels: Optional[Dict[str, str]] = None,
+                  debug_sample_rate: Optional[float] = None, stream=None) -> AsyncBatchHandler:
+    """
+    Configure le logging de l'application (idempotent)
+
+    Args:
+        level: Niveau global (défaut: LOG_LEVEL ou INFO)
+        module_levels: Niveaux par module (défaut: LOG_LEVELS)
+        debug_sample_rate: Fraction des logs DEBUG conservés (défaut: LOG_DEBUG_SAMPLE_RATE ou 0.1)
+        stream: Flux de sortie (défaut: stdout)
+
+    Returns:
+        Handler asynchrone installé sur le logger racine
+    """
+    global _handler
+
+    level = level or os.environ.get("LOG_LEVEL", "INFO")
+    if module_levels is None:
+        module_levels = _parse_module_levels(os.environ.get("LOG_LEVELS", ""))
+    if debug_sample_rate is None:
+        debug_sample_rate = float(os.environ.get("LOG_DEBUG_SAMPLE_RATE", "0.1"))
+
+    root = logging.getLogger()
+    if _handler is not None:
+        root.removeHandler(_handler)
+        _handler.close()
+
+    _handler = AsyncBatchHandler(stream=stream)
+    _handler.setFormatter(JsonFormatter())
+    _handler.addFilter(RequestIdFilter())
+    _handler.addFilter(DebugSamplingFilter(debug_sample_rate))
+
+    root.addHandler(_handler)
+    root.setLevel(level.upper())
+
+    for name, module_level in module_levels.items():
+        logging.getLogger(name).setLevel(module_level)
+
+    return _handler
+
+def init_request_logging(app):
+    """
+    Associe un identifiant à chaque requête Flask (en-tête X-Request-ID
+    repris s'il est fourni) et le renvoie dans la réponse.
+
+    Args:
+        app: Instance Flask
+    """
+    from flask import request, g
+
+    @app.before_request
+    def assign_request_id():
+        request_id = request.headers.get("X-Request-ID") or uuid.uuid4().hex
+        g.request_id = request_id
+        # Jeton rangé sur la requête et non dans g : g est partagé avec les
+        # sous-requêtes de /api/batch, dont le teardown ne doit pas le consommer
+        request.environ["request_id_token"] = request_id_var.set(request_id)
+
+    @app.after_request
+    def expose_request_id(response):
+        request_id = g.get("request_id")
+        if request_id:
+            response.headers["X-Request-ID"] = request_id
+        return response
+
+    @app.teardown_request
+    def reset_request_id(exc=None):
+        token = request.environ.pop("request_id_token", None)
+        if token is not None:
+            request_id_var.reset(token)
@@ -0,0 +1,106 @@
+"""
+Mémoire des workers forkés depuis un master préchargé
+
+Après le fork, les pages du master restent partagées tant qu'aucun worker ne
+les modifie. Le ramasse-miettes cyclique écrit dans l'en-tête de chaque objet
+qu'il parcourt : sans précaution, chaque worker finit par copier toutes les
+pages des données chargées au démarrage. gc.freeze() déplace ces objets dans
+une génération permanente que le GC ne parcourt plus.
+
+Usage (rapport mémoire d'un master gunicorn et de ses workers) :
+    python -m src.memory <pid_du_master>
+"""
+
+import gc
+import os
+import sys
+from typing import Dict, List, Optional
+
+def freeze_enabled() -> bool:
+    """Mode activé par défaut, désactivable avec MEMORY_FREEZE=0"""
+    return os.environ.get("MEMORY_FREEZE", "1") != "0"
+
+def disable_gc_in_master():
+    """
+    À appeler avant le préchargement : sans collection pendant le chargement,
+    les objets libérés ne laissent pas de trous dans les pages partagées
+    """
+    if freeze_enabled():
+        gc.disable()
+
+def freeze_before_fork():
+    """À appeler dans le master juste avant chaque fork (hook pre_fork)"""
+    if freeze_enabled():
+        # Charger les données de référence avant le gel
+        import src.static_data  # noqa: F401
+        gc.freeze()
+
+def enable_gc_in_worker():
+    """À appeler au début de chaque worker (hook post_fork)"""
+    if freeze_enabled():
+        gc.enable()
+
+def read_memory_usage(pid: Optional[int] = None) -> Optional[Dict[str, int]]:
+    """
+    Mémoire d'un processus en Ko (Linux, /proc/<pid>/smaps_rollup)
+
+    Returns:
+        rss, pss, shared (pages partagées avec d'autres processus) et
+        unique (USS : pages propres au processus, libérées à sa mort),
+        ou None si l'information n'est pas disponible
+    """
+    path = f"/proc/{pid or os.getpid()}/smaps_rollup"
+    try:
+        with open(path) as f:
+            fields = {}
+            for line in f:
+                parts = line.split()
+                if len(parts) >= 2 and parts[0].endswith(":") and parts[1].isdigit():
+                    fields[parts[0][:-1]] = int(parts[1])
+    except OSError:
+        return None
+
+    return {
+        "rss": fields.get("Rss", 0),
+        "pss": fields.get("Pss", 0),
+        "shared": fields.get("Shared_Clean", 0) + fields.get("Shared_Dirty", 0),
+        "unique": fields.get("Private_Clean", 0) + fields.get("Private_Dirty", 0),
+    }
+
+def _children(pid: int) -> List[int]:
+    children = []
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat") as f:
+                # Le nom du processus (2e champ) peut contenir des espaces
+                ppid = int(f.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        if ppid == pid:
+            children.append(int(entry))
+    return sorted(children)
+
+def report(master_pid: int) -> List[Dict[str, int]]:
+    """Mémoire du master et de chacun de ses workers"""
+    rows = []
+    for pid in [master_pid] + _children(master_pid):
+        usage = read_memory_usage(pid)
+        if usage:
+            rows.append({"pid": pid, **usage})
+    return rows
+
+def main():
+    if len(sys.argv) != 2:
+        print(__doc__)
+        sys.exit(1)
+
+    rows = report(int(sys.argv[1]))
+    print(f"{'PID':>8} {'RSS':>10} {'partagée':>10} {'unique':>10} {'PSS':>10}  (Ko)")
+    for i, row in enumerate(rows):
+        role = "master" if i == 0 else "worker"
+        print(f"{row['pid']:>8} {row['rss']:>10} {row['shared']:>10} {row['unique']:>10} {row['pss']:>10}  {role}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,455 @@
+"""
+Métriques au format d'exposition Prometheus (GET /metrics)
+
+Compteurs et histogrammes de latence, sûrs entre threads et greenlets, avec
+en plus des fenêtres glissantes de 1 et 5 minutes (tranches de 5 secondes) :
+  - routes de l'API (route, méthode, statut) ;
+  - appels fournisseurs (fournisseur, endpoint, résultat) ;
+  - caches (espace de noms, hit/miss) ;
+  - étapes du pipeline de recommandation ;
+  - contrôle d'admission (décisions, places occupées, file d'attente).
+
+Agrégation entre workers gunicorn : avec METRICS_DIR, chaque worker écrit
+régulièrement un instantané de ses métriques dans ce répertoire
+(<pid>.json) ; /metrics additionne les instantanés de tous les workers
+(le sien étant pris en direct). Le master replie les métriques d'un worker
+arrêté dans archive.json : les compteurs ne reculent jamais.
+Sans METRICS_DIR, /metrics ne montre que le processus courant.
+"""
+
+import bisect
+import glob
+import math
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from src import json_codec
+
+# Bornes des histogrammes de latence (secondes)
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Fenêtres glissantes : tranches de SLOT_SECONDS, WINDOWS en secondes
+SLOT_SECONDS = 5
+WINDOWS = {"1m": 60, "5m": 300}
+_MAX_SLOTS = max(WINDOWS.values()) // SLOT_SECONDS
+QUANTILES = (0.5, 0.95, 0.99)
+
+METRICS_DIR = os.environ.get("METRICS_DIR", "")
+FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", "5"))
+ARCHIVE_FILE = "archive.json"
+
+def _current_slot() -> int:
+    return int(time.time() // SLOT_SECONDS)
+
+def _prune(slots: Dict[int, Any], current: int):
+    for slot in [slot for slot in slots if slot <= current - _MAX_SLOTS]:
+        del slots[slot]
+
+class Counter:
+    """Compteur monotone par combinaison de labels"""
+
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._slots: Dict[Tuple[str, ...], Dict[int, float]] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, **labels: Any):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        slot = _current_slot()
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+            slots = self._slots.setdefault(key, {})
+            slots[slot] = slots.get(slot, 0.0) + amount
+            if len(slots) > _MAX_SLOTS:
+                _prune(slots, slot)
+
+    def snapshot(self) -> List[list]:
+        with self._lock:
+            return [
+                [list(key), value, {str(slot): amount for slot, amount in self._slots.get(key, {}).items()}]
+                for key, value in self._values.items()
+            ]
+
+class Histogram:
+    """Histogramme de latence par combinaison de labels"""
+
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str],
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(buckets)
+        # labels -> [comptes par tranche (non cumulés, +Inf en dernier), somme, nombre]
+        self._series: Dict[Tuple[str, ...], list] = {}
+        self._slots: Dict[Tuple[str, ...], Dict[int, list]] = {}
+        self._lock = threading.Lock()
+
+    def _empty(self) -> list:
+        return [[0] * (len(self.buckets) + 1), 0.0, 0]
+
+    def observe(self, value: float, **labels: Any):
+        key = tuple(str(labels.get(name, "")) for name in self.labelnames)
+        index = bisect.bisect_left(self.buckets, value)
+        slot = _current_slot()
+        with self._lock:
+            slots = self._slots.setdefault(key, {})
+            for series in (self._series.setdefault(key, self._empty()), slots.setdefault(slot, self._empty())):
+                series[0][index] += 1
+                series[1] += value
+                series[2] += 1
+            if len(slots) > _MAX_SLOTS:
+                _prune(slots, slot)
+
+    @contextmanager
+    def time(self, **labels: Any) -> Iterator[None]:
+        """Mesure la durée du bloc (exceptions comprises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, **labels)
+
+    def snapshot(self) -> List[list]:
+        with self._lock:
+            return [
+                [list(key), list(series[0]), series[1], series[2],
+                 {str(slot): [list(data[0]), data[1], data[2]] for slot, data in self._slots.get(key, {}).items()}]
+                for key, series in self._series.items()
+            ]
+
+class Registry:
+    """Ensemble des métriques d'un processus"""
+
+    def __init__(self):
+        self._metrics: Dict[str, Any] = {}
+        # Jauges lues à la demande : nom -> (aide, labels, fonction -> [(valeurs des labels, valeur)])
+        self._gauges: Dict[str, Tuple[str, Tuple[str, ...], Callable[[], Iterable[Tuple[Sequence[str], float]]]]] = {}
+        self._lock = threading.Lock()
+        self._flusher_pid: Optional[int] = None
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter(name, documentation, labelnames))
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str],
+              collect: Callable[[], Iterable[Tuple[Sequence[str], float]]]):
+        """Jauge dont les valeurs sont lues à chaque export (workers vivants uniquement)"""
+        with self._lock:
+            self._gauges[name] = (documentation, tuple(labelnames), collect)
+
+    def _register(self, metric):
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Instantané sérialisable (JSON) des métriques du processus"""
+        with self._lock:
+            metrics = list(self._metrics.values())
+            gauges = dict(self._gauges)
+
+        snapshot = {"pid": os.getpid(), "time": time.time(), "metrics": {}, "gauges": {}}
+        for metric in metrics:
+            entry = {"type": metric.kind, "help": metric.documentation,
+                     "labels": list(metric.labelnames), "series": metric.snapshot()}
+            if metric.kind == "histogram":
+                entry["buckets"] = list(metric.buckets)
+            snapshot["metrics"][metric.name] = entry
+        for name, (documentation, labelnames, collect) in gauges.items():
+            try:
+                series = [[list(map(str, values)), float(value)] for values, value in collect()]
+            except Exception:
+                series = []
+            snapshot["gauges"][name] = {"help": documentation, "labels": list(labelnames), "series": series}
+        return snapshot
+
+    def start_flusher(self, directory: str = METRICS_DIR, interval: float = FLUSH_INTERVAL):
+        """Écrit l'instantané du worker dans `directory` toutes les `interval` secondes"""
+        if not directory or self._flusher_pid == os.getpid():
+            return
+        self._flusher_pid = os.getpid()
+
+        def loop():
+            while True:
+                time.sleep(interval)
+                try:
+                    write_snapshot(self.snapshot(), directory)
+                except OSError:
+                    pass
+
+        threading.Thread(target=loop, name="metrics-flusher", daemon=True).start()
+
+    def render(self, directory: str = METRICS_DIR) -> str:
+        """Texte d'exposition : ce processus + instantanés des autres workers"""
+        snapshots = [self.snapshot()]
+        if directory:
+            snapshots += [snapshot for snapshot in read_snapshots(directory) if snapshot.get("pid") != os.getpid()]
+        return render_text(merge_snapshots(snapshots))
+
+# --- Instantanés des workers ---
+
+def write_snapshot(snapshot: Dict[str, Any], directory: str, filename: Optional[str] = None):
+    """Écriture atomique (fichier temporaire puis rename)"""
+    os.makedirs(directory, exist_ok=True)
+    path = os.path.join(directory, filename or f"{snapshot['pid']}.json")
+    temporary = f"{path}.{os.getpid()}.tmp"
+    with open(temporary, "wb") as f:
+        f.write(json_codec.dumps(snapshot))
+    os.replace(temporary, path)
+
+def read_snapshots(directory: str) -> List[Dict[str, Any]]:
+    snapshots = []
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        try:
+            with open(path, "rb") as f:
+                snapshots.append(json_codec.loads(f.read()))
+        except (OSError, ValueError):
+            continue  # Fichier en cours de remplacement ou disparu
+    return snapshots
+
+def _pid_alive(pid: Optional[int]) -> bool:
+    if pid is None:
+        return False
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+def merge_snapshots(snapshots: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    """
+    Additionne des instantanés : compteurs, histogrammes et tranches des
+    fenêtres glissantes de tous les fichiers, jauges des workers vivants
+    """
+    merged = {"metrics": {}, "gauges": {}}
+    for snapshot in snapshots:
+        for name, entry in snapshot.get("metrics", {}).items():
+            target = merged["metrics"].setdefault(name, {key: value for key, value in entry.items() if key != "series"})
+            series = target.setdefault("series_by_key", {})
+            for item in entry["series"]:
+                key = tuple(item[0])
+                if entry["type"] == "counter":
+                    total, slots = series.get(key, (0.0, {}))
+                    for slot, amount in item[2].items():
+                        slots[int(slot)] = slots.get(int(slot), 0.0) + amount
+                    series[key] = (total + item[1], slots)
+                else:
+                    counts, total, count, slots = series.get(key, ([0] * len(item[1]), 0.0, 0, {}))
+                    counts = [a + b for a, b in zip(counts, item[1])]
+                    for slot, data in item[4].items():
+                        previous = slots.get(int(slot), [[0] * len(data[0]), 0.0, 0])
+                        slots[int(slot)] = [[a + b for a, b in zip(previous[0], data[0])],
+                                            previous[1] + data[1], previous[2] + data[2]]
+                    series[key] = (counts, total + item[2], count + item[3], slots)
+
+        if snapshot.get("archive") or not _pid_alive(snapshot.get("pid")):
+            continue
+        for name, entry in snapshot.get("gauges", {}).items():
+            target = merged["gauges"].setdefault(name, {"help": entry["help"], "labels": entry["labels"], "values": {}})
+            for values, value in entry["series"]:
+                key = tuple(values)
+                target["values"][key] = target["values"].get(key, 0.0) + value
+    return merged
+
+def archive_worker(pid: int, directory: str = METRICS_DIR):
+    """
+    Replie l'instantané d'un worker arrêté dans archive.json (hook child_exit
+    du master) : compteurs et histogrammes conservés, jauges abandonnées
+    """
+    if not directory:
+        return
+    path = os.path.join(directory, f"{pid}.json")
+    archive_path = os.path.join(directory, ARCHIVE_FILE)
+    snapshots = []
+    for source in (archive_path, path):
+        try:
+            with open(source, "rb") as f:
+                snapshots.append(json_codec.loads(f.read()))
+        except (OSError, ValueError):
+            continue
+    if not snapshots:
+        return
+
+    merged = merge_snapshots([dict(snapshot, gauges={}) for snapshot in snapshots])
+    archive = {"pid": None, "archive": True, "time": time.time(), "metrics": {}, "gauges": {}}
+    for name, entry in merged["metrics"].items():
+        series = []
+        for key, data in entry["series_by_key"].items():
+            if entry["type"] == "counter":
+                series.append([list(key), data[0], {str(slot): amount for slot, amount in data[1].items()}])
+            else:
+                series.append([list(key), data[0], data[1], data[2],
+                               {str(slot): values for slot, values in data[3].items()}])
+        archive["metrics"][name] = {key: value for key, value in entry.items() if key != "series_by_key"}
+        archive["metrics"][name]["series"] = series
+    write_snapshot(archive, directory, ARCHIVE_FILE)
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+def reset_directory(directory: str = METRICS_DIR):
+    """Vide le répertoire des instantanés (démarrage du master)"""
+    if not directory:
+        return
+    os.makedirs(directory, exist_ok=True)
+    for path in glob.glob(os.path.join(directory, "*.json")):
+        os.remove(path)
+
+# --- Format d'exposition ---
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: Sequence[Tuple[str, str]] = ()) -> str:
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in pairs) + "}"
+
+def _number(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+def _window_slots(slots: Dict[int, Any], seconds: int, current: int) -> List[Any]:
+    first = current - seconds // SLOT_SECONDS
+    return [data for slot, data in slots.items() if slot > first]
+
+def quantile(q: float, buckets: Sequence[float], counts: Sequence[int]) -> float:
+    """Quantile estimé par interpolation linéaire dans les tranches (comme histogram_quantile)"""
+    total = sum(counts)
+    if total == 0:
+        return math.nan
+    rank = q * total
+    cumulative = 0
+    for index, count in enumerate(counts):
+        if cumulative + count >= rank and count:
+            lower = buckets[index - 1] if index > 0 else 0.0
+            if index >= len(buckets):
+                return buckets[-1]
+            return lower + (buckets[index] - lower) * (rank - cumulative) / count
+        cumulative += count
+    return buckets[-1]
+
+def render_text(merged: Dict[str, Any]) -> str:
+    """Texte d'exposition Prometheus (version 0.0.4) des métriques fusionnées"""
+    current = _current_slot()
+    lines = []
+    for name in sorted(merged["metrics"]):
+        entry = merged["metrics"][name]
+        labelnames = entry["labels"]
+        series = sorted(entry.get("series_by_key", {}).items())
+        lines += [f"# HELP {name} {entry['help']}", f"# TYPE {name} {entry['type']}"]
+
+        if entry["type"] == "counter":
+            for key, (total, _) in series:
+                lines.append(f"{name}{_labels(labelnames, key)} {_number(total)}")
+            window_name = (name[:-len("_total")] if name.endswith("_total") else name) + "_window"
+            lines += [f"# HELP {window_name} {entry['help']} (fenêtre glissante)", f"# TYPE {window_name} gauge"]
+            for key, (_, slots) in series:
+                for window, seconds in WINDOWS.items():
+                    amount = sum(_window_slots(slots, seconds, current))
+                    lines.append(f"{window_name}{_labels(labelnames, key, [('window', window)])} {_number(amount)}")
+            continue
+
+        buckets = entry["buckets"]
+        for key, (counts, total, count, _) in series:
+            cumulative = 0
+            for bound, bucket_count in zip(list(buckets) + [math.inf], counts):
+                cumulative += bucket_count
+                lines.append(f"{name}_bucket{_labels(labelnames, key, [('le', _number(bound))])} {cumulative}")
+            lines.append(f"{name}_sum{_labels(labelnames, key)} {_number(total)}")
+            lines.append(f"{name}_count{_labels(labelnames, key)} {count}")
+
+        window_name = f"{name}_window"
+        lines += [f"# HELP {window_name} {entry['help']} (fenêtre glissante)", f"# TYPE {window_name} summary"]
+        for key, (_, _, _, slots) in series:
+            for window, seconds in WINDOWS.items():
+                data = _window_slots(slots, seconds, current)
+                counts = [sum(values) for values in zip(*(item[0] for item in data))] if data else []
+                for q in QUANTILES:
+                    value = quantile(q, buckets, counts) if counts else math.nan
+                    extra = [("window", window), ("quantile", str(q))]
+                    lines.append(f"{window_name}{_labels(labelnames, key, extra)} {'NaN' if math.isnan(value) else _number(value)}")
+                extra = [("window", window)]
+                lines.append(f"{window_name}_sum{_labels(labelnames, key, extra)} {_number(sum(item[1] for item in data))}")
+                lines.append(f"{window_name}_count{_labels(labelnames, key, extra)} {sum(item[2] for item in data)}")
+
+    for name in sorted(merged["gauges"]):
+        entry = merged["gauges"][name]
+        lines += [f"# HELP {name} {entry['help']}", f"# TYPE {name} gauge"]
+        for key, value in sorted(entry["values"].items()):
+            lines.append(f"{name}{_labels(entry['labels'], key)} {_number(value)}")
+    return "\n".join(lines) + "\n"
+
+# --- Instance globale et métriques de l'application ---
+
+registry = Registry()
+
+http_requests = registry.counter(
+    "whattowatch_http_requests_total", "Requêtes HTTP servies", ("route", "method", "status"))
+http_duration = registry.histogram(
+    "whattowatch_http_request_duration_seconds", "Durée des requêtes HTTP (jusqu'aux en-têtes)", ("route", "method"))
+provider_requests = registry.counter(
+    "whattowatch_provider_requests_total", "Appels aux fournisseurs", ("provider", "endpoint", "outcome"))
+provider_duration = registry.histogram(
+    "whattowatch_provider_request_duration_seconds", "Durée des appels aux fournisseurs", ("provider", "endpoint"))
+cache_requests = registry.counter(
+    "whattowatch_cache_requests_total", "Lectures de cache", ("namespace", "result"))
+stage_duration = registry.histogram(
+    "whattowatch_pipeline_stage_duration_seconds", "Durée des étapes du pipeline de recommandation", ("stage",))
+candidate_search_failures = registry.counter(
+    "whattowatch_candidate_search_failures_total", "Recherches de candidats en échec (recommandations)", ("source",))
+admission_decisions = registry.counter(
+    "whattowatch_admission_decisions_total", "Décisions du contrôle d'admission", ("limit", "decision"))
+
+def record_cache(namespace: str, hit: bool):
+    cache_requests.inc(namespace=namespace, result="hit" if hit else "miss")
+
+def record_provider_call(provider: str, endpoint: str, outcome: str, seconds: float):
+    """Appel fournisseur terminé ; outcome : classe du statut HTTP ("2xx"...) ou "error" """
+    provider_requests.inc(provider=provider, endpoint=endpoint, outcome=outcome)
+    provider_duration.observe(seconds, provider=provider, endpoint=endpoint)
+
+def init_metrics(app):
+    """Mesure chaque requête Flask et expose GET /metrics"""
+    from flask import request
+
+    @app.before_request
+    def start_timer():
+        # Dans l'environ WSGI : les sous-requêtes d'un lot (/api/batch) partagent g
+        request.environ["metrics_start"] = time.perf_counter()
+
+    @app.after_request
+    def record_request(response):
+        start = request.environ.get("metrics_start")
+        if start is not None:
+            route = request.url_rule.endpoint if request.url_rule is not None else "unmatched"
+            http_duration.observe(time.perf_counter() - start, route=route, method=request.method)
+            http_requests.inc(route=route, method=request.method, status=response.status_code)
+        return response
+
+    @app.route("/metrics", methods=["GET"])
+    def metrics():
+        return app.response_class(registry.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
@@ -3,9 +3,108 @@ Middleware d'authentification pour l'API Flask.
 Gère la vérification des tokens et l'autorisation d'accès.
 """
 
-from flask import request, jsonify, g
-from functools import wraps
-from src.auth import verify_jwt_token
+import copy
+import logging
+import threading
+import time
+from datetime import datetime, timezone
+from flask import request, jsonify, g, has_app_context
+from functools import partial, wraps
+from sqlalchemy import event
+from sqlalchemy.orm import make_transient_to_detached
+from src.auth import verify_jwt_token, token_cache, hash_token
+from src.metrics import record_cache
+from models import db, User, UserSession
+
+logger = logging.getLogger(__name__)
+
+class UserRecordCache:
+    """
+    Cache à courte durée de vie des lignes User, partagé entre les requêtes d'un worker.
+    
+    Stocke un instantané des colonnes (et non l'instance SQLAlchemy, liée à la
+    session de la requête qui l'a chargée). L'instantané est rattaché à la
+    session courante sans requête SQL via merge(load=False).
+    """
+    
+    def __init__(self, ttl_seconds: int = 30, max_entries: int = 512):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self._entries = {}  # user_id -> (snapshot, expires_at)
+        self._lock = threading.Lock()
+    
+    def get(self, user_id: int):
+        """Retourne une copie de l'instantané si elle n'a pas expiré."""
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is None:
+                return None
+            snapshot, expires_at = entry
+            if time.time() >= expires_at:
+                del self._entries[user_id]
+                return None
+        return copy.deepcopy(snapshot)
+    
+    def set(self, user: User):
+        """Mémorise l'état courant d'un utilisateur."""
+        snapshot = {
+            column.key: copy.deepcopy(getattr(user, column.key))
+            for column in User.__table__.columns
+        }
+        with self._lock:
+            if len(self._entries) >= self.max_entries:
+                self._entries.pop(next(iter(self._entries)))
+            self._entries[user.id] = (snapshot, time.time() + self.ttl_seconds)
+    
+    def invalidate(self, user_id: int):
+        """Supprime l'utilisateur du cache (après une modification)."""
+        with self._lock:
+            self._entries.pop(user_id, None)
+    
+    def clear(self):
+        """Vide le cache."""
+        with self._lock:
+            self._entries.clear()
+
+# Instance globale du cache des utilisateurs (une par processus worker)
+user_record_cache = UserRecordCache()
+
+def _is_token_revoked_in_db(app, token_hash: str) -> bool:
+    """Hook de révocation : un token est révoqué si sa UserSession est inactive."""
+    if not has_app_context():
+        # Appel hors requête Flask (routes ASGI natives) : contexte applicatif dédié
+        with app.app_context():
+            return _is_token_revoked_in_db(app, token_hash)
+    try:
+        session = UserSession.query.filter_by(token_hash=token_hash, is_active=False).first()
+    except Exception:
+        db.session.rollback()
+        raise
+    return session is not None
+
+def _register_cache_invalidation():
+    """Branche l'invalidation des caches sur les événements SQLAlchemy."""
+    if event.contains(User, 'after_update', _on_user_changed):
+        return
+    
+    event.listen(User, 'after_update', _on_user_changed)
+    event.listen(User, 'after_delete', _on_user_changed)
+    event.listen(UserSession, 'after_insert', _on_session_changed)
+    event.listen(UserSession, 'after_update', _on_session_changed)
+    event.listen(UserSession, 'after_delete', _on_session_deleted)
+
+def _on_user_changed(mapper, connection, target):
+    user_record_cache.invalidate(target.id)
+
+def _on_session_changed(mapper, connection, target):
+    if not target.is_active:
+        _on_session_deleted(mapper, connection, target)
+
+def _on_session_deleted(mapper, connection, target):
+    expires_at = None
+    if target.expires_at:
+        expires_at = target.expires_at.replace(tzinfo=timezone.utc).timestamp()
+    token_cache.revoke(target.token_hash, expires_at)
 
 def init_auth_middleware(app):
     """
@@ -14,13 +113,15 @@ def init_auth_middleware(app):
     Args:
         app: Instance Flask
     """
+    token_cache.set_revocation_check(partial(_is_token_revoked_in_db, app))
+    _register_cache_invalidation()
     
     @app.before_request
     def before_request():
         """
         Exécuté avant chaque requête pour gérer l'authentification.
         """
-        print(f"[MIDDLEWARE] Requête: {request.method} {request.path}")
+        logger.debug("Requête reçue", extra={'method': request.method, 'path': request.path})
         
         # Routes publiques qui ne nécessitent pas d'authentification (EXACTES)
         exact_public_routes = [
@@ -34,7 +135,6 @@ def init_auth_middleware(app):
         
         # Vérifier si la route est exactement publique
         if request.path in exact_public_routes:
-            print(f"[MIDDLEWARE] Route publique exacte: {request.path}")
             return
         
         # Vérifier si la route commence par une route publique (pour les sous-routes autorisées)
@@ -49,12 +149,10 @@ def init_auth_middleware(app):
         # ATTENTION: /api/users/ID n'est PAS public - nécessite une authentification !
         for prefix in public_prefixes:
             if request.path.startswith(prefix):
-                print(f"[MIDDLEWARE] Route publique par préfixe: {request.path} (préfixe: {prefix})")
                 return
         
         # Pour les autres routes, vérifier l'authentification
         if request.path.startswith('/api/'):
-            print(f"[MIDDLEWARE] Route API nécessitant authentification: {request.path}")
             token = None
             
             # Récupérer le token depuis l'en-tête Authorization
@@ -103,6 +201,81 @@ def get_current_user():
     """
     return getattr(g, 'current_user', None)
 
+def get_user_record(user_id: int):
+    """
+    Retourne la ligne User d'un utilisateur, en la chargeant au plus une fois.
+    
+    Cherche d'abord dans le cache de la requête, puis dans le cache à courte
+    durée de vie du worker, et n'interroge la base qu'en dernier recours.
+    
+    Args:
+        user_id: ID de l'utilisateur
+    
+    Returns:
+        User: Instance attachée à la session courante, ou None
+    """
+    records = g.setdefault('_user_records', {})
+    if user_id in records:
+        return records[user_id]
+    
+    snapshot = user_record_cache.get(user_id)
+    record_cache("users", snapshot is not None)
+    if snapshot is not None:
+        user = User(**snapshot)
+        make_transient_to_detached(user)
+        user = db.session.merge(user, load=False)
+    else:
+        user = db.session.get(User, user_id)
+        if user is not None:
+            user_record_cache.set(user)
+    
+    records[user_id] = user
+    return user
+
+def get_current_user_record():
+    """
+    Retourne la ligne User de l'utilisateur connecté.
+    
+    Returns:
+        User: Utilisateur connecté ou None
+    """
+    current_user = get_current_user()
+    if not current_user:
+        return None
+    return get_user_record(current_user['user_id'])
+
+def revoke_user_session(token: str) -> bool:
+    """
+    Révoque un token en désactivant sa UserSession (créée si nécessaire).
+    
+    Args:
+        token: Token JWT à révoquer
+    
+    Returns:
+        bool: True si le token a été révoqué
+    """
+    payload = verify_jwt_token(token)
+    if payload is None:
+        return False
+    
+    token_hash = hash_token(token)
+    session = UserSession.query.filter_by(token_hash=token_hash).first()
+    if session is None:
+        session = UserSession(
+            user_id=payload['user_id'],
+            token_hash=token_hash,
+            expires_at=datetime.utcfromtimestamp(payload['exp']),
+            is_active=False
+        )
+        db.session.add(session)
+    else:
+        session.is_active = False
+    db.session.commit()
+    
+    # Le hook SQLAlchemy révoque déjà le token ; on le garantit en cas d'échec du listener
+    token_cache.revoke(token_hash, payload['exp'])
+    return True
+
 class AuthError(Exception):
     """
     Exception personnalisée pour les erreurs d'authentification.
@@ -0,0 +1,353 @@
+"""
+Profilage d'une requête à la demande, en production
+
+Une requête portant un jeton signé (en-tête X-Profile ou paramètre
+?_profile=) est exécutée sous un profileur, sans redémarrer les workers :
+  - cprofile : profileur déterministe (cProfile), tâches parallèles du pool
+    comprises ; artefact pstats (.prof, lisible avec snakeviz ou pstats) ;
+  - sample : échantillonnage des piles toutes les PROFILE_SAMPLE_INTERVAL
+    secondes par un thread natif ; artefact en piles repliées (.collapsed,
+    pour flamegraph.pl ou speedscope).
+
+L'artefact est écrit dans PROFILE_DIR (partagé par les workers) avec un
+résumé JSON : route, durée, fonctions les plus coûteuses et appels sortants
+vers les fournisseurs (spans http.* de la trace de la requête). La réponse
+profilée porte l'en-tête X-Profile-Id.
+
+Jetons : HMAC-SHA256 avec PROFILING_SECRET (profilage désactivé sans ce
+secret), limités dans le temps. Les routes /api/profiles exigent aussi un
+jeton valide (mode "admin" ou autre) :
+    python -m src.profiling token --mode cprofile --ttl 600
+"""
+
+import _thread
+import argparse
+import cProfile
+import hashlib
+import hmac
+import io
+import os
+import pstats
+import sys
+import time
+import uuid
+from collections import Counter
+from typing import Any, Dict, List, Optional
+
+from src import json_codec, tracing
+from src.concurrency import gevent_active, task_wrapper_var, _THREAD_NAME_PREFIX
+
+PROFILING_SECRET = os.environ.get("PROFILING_SECRET", "")
+PROFILE_DIR = os.environ.get("PROFILE_DIR", "/tmp/whattowatch-profiles")
+# Artefacts gardés (les plus anciens sont supprimés)
+PROFILE_KEEP = int(os.environ.get("PROFILE_KEEP", "50"))
+PROFILE_SAMPLE_INTERVAL = float(os.environ.get("PROFILE_SAMPLE_INTERVAL", "0.005"))
+
+MODES = ("cprofile", "sample")
+TOKEN_VERSION = "v1"
+HEADER = "X-Profile"
+QUERY_PARAM = "_profile"
+
+_BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# --- Jetons signés ---
+
+def _signature(payload: str, secret: str) -> str:
+    return hmac.new(secret.encode(), payload.encode(), hashlib.sha256).hexdigest()
+
+def make_token(mode: str, ttl_seconds: int = 600, secret: Optional[str] = None) -> str:
+    """Jeton v1.<expiration>.<mode>.<signature>"""
+    secret = secret if secret is not None else PROFILING_SECRET
+    if not secret:
+        raise ValueError("PROFILING_SECRET non défini")
+    if mode not in MODES + ("admin",):
+        raise ValueError(f"Mode inconnu : {mode}")
+    payload = f"{TOKEN_VERSION}.{int(time.time()) + ttl_seconds}.{mode}"
+    return f"{payload}.{_signature(payload, secret)}"
+
+def verify_token(token: Optional[str], secret: Optional[str] = None) -> Optional[str]:
+    """Mode du jeton s'il est signé et non expiré, None sinon"""
+    secret = secret if secret is not None else PROFILING_SECRET
+    if not secret or not token:
+        return None
+    try:
+        version, expires, mode, signature = token.split(".")
+    except ValueError:
+        return None
+    payload = f"{version}.{expires}.{mode}"
+    if version != TOKEN_VERSION or not hmac.compare_digest(signature, _signature(payload, secret)):
+        return None
+    if not expires.isdigit() or int(expires) < time.time():
+        return None
+    return mode
+
+# --- Profileurs ---
+
+class SamplingProfiler:
+    """
+    Échantillonne les piles du thread de la requête et des threads du pool
+    de fournisseurs depuis un thread natif (hors gevent : sous gevent, la
+    pile échantillonnée est celle du greenlet en cours, quelle que soit la
+    requête qu'il sert)
+    """
+
+    def __init__(self, interval: float = PROFILE_SAMPLE_INTERVAL):
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._running = False
+        self._done = None
+
+    def start(self):
+        target_thread = _thread.get_ident()
+        if gevent_active():
+            from gevent import monkey
+            start_new_thread = monkey.get_original("_thread", "start_new_thread")
+            sleep = monkey.get_original("time", "sleep")
+            allocate_lock = monkey.get_original("_thread", "allocate_lock")
+        else:
+            start_new_thread, sleep, allocate_lock = _thread.start_new_thread, time.sleep, _thread.allocate_lock
+
+        self._running = True
+        self._done = allocate_lock()
+        self._done.acquire()
+
+        def loop():
+            import threading
+            sampler_thread = _thread.get_ident()
+            try:
+                while self._running:
+                    names = {thread.ident: thread.name for thread in threading.enumerate()}
+                    for thread_id, frame in sys._current_frames().items():
+                        if thread_id == sampler_thread:
+                            continue
+                        if thread_id == target_thread or names.get(thread_id, "").startswith(_THREAD_NAME_PREFIX):
+                            self.samples[_collapse(frame)] += 1
+                    sleep(self.interval)
+            finally:
+                self._done.release()
+
+        start_new_thread(loop, ())
+
+    def stop(self):
+        self._running = False
+        if self._done is not None:
+            self._done.acquire()
+
+    def collapsed(self) -> str:
+        """Une ligne par pile : "racine;...;feuille nombre" """
+        return "".join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+def _frame_name(code) -> str:
+    filename = code.co_filename
+    if filename.startswith(_BACKEND_DIR):
+        filename = os.path.relpath(filename, _BACKEND_DIR)
+    else:
+        filename = os.path.basename(filename)
+    return f"{filename}:{code.co_name}"
+
+def _collapse(frame) -> str:
+    names = []
+    while frame is not None:
+        names.append(_frame_name(frame.f_code))
+        frame = frame.f_back
+    return ";".join(reversed(names))
+
+class DeterministicProfiler:
+    """cProfile du thread de la requête et de chaque tâche parallèle, fusionnés"""
+
+    def __init__(self):
+        self.profiles: List[cProfile.Profile] = []
+        self._main = cProfile.Profile()
+        self._token = None
+
+    def _wrap(self, task):
+        def profiled():
+            profile = cProfile.Profile()
+            self.profiles.append(profile)
+            return profile.runcall(task)
+        return profiled
+
+    def start(self):
+        self._token = task_wrapper_var.set(self._wrap)
+        self.profiles.append(self._main)
+        self._main.enable()
+
+    def stop(self):
+        self._main.disable()
+        task_wrapper_var.reset(self._token)
+
+    def stats(self) -> pstats.Stats:
+        stats = pstats.Stats(self._main)
+        for profile in self.profiles[1:]:
+            try:
+                stats.add(profile)
+            except TypeError:
+                continue  # Tâche abandonnée encore en cours (aucune donnée)
+        return stats
+
+def _top_functions(stats: pstats.Stats, limit: int = 25) -> List[Dict[str, Any]]:
+    rows = []
+    for (filename, line, name), (calls, _, own, cumulative, _) in stats.stats.items():
+        rows.append({
+            "function": f"{os.path.relpath(filename, _BACKEND_DIR) if filename.startswith(_BACKEND_DIR) else filename}:{line}:{name}",
+            "calls": calls,
+            "own_ms": round(own * 1000, 2),
+            "cumulative_ms": round(cumulative * 1000, 2),
+        })
+    rows.sort(key=lambda row: row["cumulative_ms"], reverse=True)
+    return rows[:limit]
+
+# --- Artefacts ---
+
+def _prune(directory: str):
+    summaries = sorted(
+        (path for path in os.listdir(directory) if path.endswith(".json")),
+        key=lambda name: os.path.getmtime(os.path.join(directory, name))
+    )
+    for name in summaries[:max(0, len(summaries) - PROFILE_KEEP)]:
+        profile_id = name[:-len(".json")]
+        for extension in (".json", ".prof", ".collapsed"):
+            try:
+                os.remove(os.path.join(directory, profile_id + extension))
+            except OSError:
+                pass
+
+def _outbound_calls(trace) -> List[Dict[str, Any]]:
+    if trace is None:
+        return []
+    return [
+        {"name": span["name"], "start_ms": span["start_ms"], "duration_ms": span["duration_ms"], **span.get("attrs", {})}
+        for span in trace.to_dict()["spans"] if span["name"].startswith("http.")
+    ]
+
+class RequestProfile:
+    """Profilage d'une requête : démarré avant la vue, enregistré après"""
+
+    def __init__(self, mode: str, method: str, path: str):
+        self.id = f"{time.strftime('%Y%m%d-%H%M%S')}-{uuid.uuid4().hex[:8]}"
+        self.mode = mode
+        self.method = method
+        self.path = path
+        self.profiler = DeterministicProfiler() if mode == "cprofile" else SamplingProfiler()
+        self.start = time.perf_counter()
+
+    def begin(self):
+        self.start = time.perf_counter()
+        self.profiler.start()
+
+    def save(self, status: Optional[int], directory: str = PROFILE_DIR) -> Dict[str, Any]:
+        """Arrête le profileur et écrit l'artefact et son résumé"""
+        self.profiler.stop()
+        duration = time.perf_counter() - self.start
+        trace = tracing.current_trace()
+        os.makedirs(directory, exist_ok=True)
+
+        summary = {
+            "id": self.id,
+            "mode": self.mode,
+            "method": self.method,
+            "path": self.path,
+            "status": status,
+            "created_at": time.time(),
+            "duration_ms": round(duration * 1000, 1),
+            "pid": os.getpid(),
+            "trace_id": trace.trace_id if trace is not None else None,
+            "outbound_calls": _outbound_calls(trace),
+        }
+        if self.mode == "cprofile":
+            stats = self.profiler.stats()
+            stats.dump_stats(os.path.join(directory, f"{self.id}.prof"))
+            summary["artifact"] = f"{self.id}.prof"
+            summary["top_functions"] = _top_functions(stats)
+        else:
+            with open(os.path.join(directory, f"{self.id}.collapsed"), "w", encoding="utf-8") as f:
+                f.write(self.profiler.collapsed())
+            summary["artifact"] = f"{self.id}.collapsed"
+            summary["samples"] = sum(self.profiler.samples.values())
+
+        with open(os.path.join(directory, f"{self.id}.json"), "wb") as f:
+            f.write(json_codec.dumps(summary, indent=True))
+        _prune(directory)
+        return summary
+
+def list_profiles(directory: str = PROFILE_DIR) -> List[Dict[str, Any]]:
+    """Résumés des profils (sans le détail des fonctions), du plus récent au plus ancien"""
+    if not os.path.isdir(directory):
+        return []
+    profiles = []
+    for name in os.listdir(directory):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(directory, name), "rb") as f:
+                summary = json_codec.loads(f.read())
+        except (OSError, ValueError):
+            continue
+        summary.pop("top_functions", None)
+        summary["outbound_calls"] = len(summary.get("outbound_calls", []))
+        profiles.append(summary)
+    profiles.sort(key=lambda summary: summary["created_at"], reverse=True)
+    return profiles
+
+def load_profile(profile_id: str, directory: str = PROFILE_DIR) -> Optional[Dict[str, Any]]:
+    if not _valid_id(profile_id):
+        return None
+    try:
+        with open(os.path.join(directory, f"{profile_id}.json"), "rb") as f:
+            return json_codec.loads(f.read())
+    except (OSError, ValueError):
+        return None
+
+def artifact_path(profile_id: str, directory: str = PROFILE_DIR) -> Optional[str]:
+    summary = load_profile(profile_id, directory)
+    if summary is None:
+        return None
+    path = os.path.join(directory, summary["artifact"])
+    return path if os.path.isfile(path) else None
+
+def _valid_id(profile_id: str) -> bool:
+    return bool(profile_id) and all(char.isalnum() or char == "-" for char in profile_id)
+
+def request_token(request) -> Optional[str]:
+    return request.headers.get(HEADER) or request.args.get(QUERY_PARAM)
+
+def init_profiling(app):
+    """Profile les requêtes portant un jeton signé (X-Profile ou ?_profile=)"""
+    from flask import request
+
+    @app.before_request
+    def start_profile():
+        token = request_token(request)
+        if token is None:
+            return
+        mode = verify_token(token)
+        if mode in MODES:
+            profile = RequestProfile(mode, request.method, request.full_path.rstrip("?"))
+            request.environ["request_profile"] = profile
+            profile.begin()
+
+    @app.after_request
+    def save_profile(response):
+        profile = request.environ.pop("request_profile", None)
+        if profile is not None:
+            summary = profile.save(response.status_code)
+            response.headers["X-Profile-Id"] = summary["id"]
+        return response
+
+    @app.teardown_request
+    def drop_profile(exc=None):
+        profile = request.environ.pop("request_profile", None)
+        if profile is not None:
+            profile.save(500)
+
+def main():
+    parser = argparse.ArgumentParser(description="Jetons de profilage des requêtes")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+    token_parser = subparsers.add_parser("token", help="Génère un jeton signé (PROFILING_SECRET)")
+    token_parser.add_argument("--mode", choices=MODES + ("admin",), default="cprofile")
+    token_parser.add_argument("--ttl", type=int, default=600, help="Validité en secondes")
+    args = parser.parse_args()
+    print(make_token(args.mode, args.ttl))
+
+if __name__ == "__main__":
+    main()
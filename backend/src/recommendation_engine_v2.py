@@ -5,6 +5,12 @@ Architecture basée sur des composants séparés pour une meilleure maintenabili
 
 import sys
 import os
+import asyncio
+import hashlib
+import json
+import logging
+import threading
+from functools import partial
 from typing import Dict, List, Any, Optional
 
 # Ajouter le répertoire parent au chemin
@@ -19,10 +25,23 @@ from data.movies_series_database import STREAMING_SERVICES
 # Import des nouveaux modules modulaires
 from src.api_providers.multi_api_manager import MultiAPIManager
 from src.recommendation_scoring import RecommendationEngine, RecommendationScorer
+from src.static_data import TMDB_GENRE_NAMES
 from src.recommendation_utils import (
     CacheManager, StreamingServiceMapper, ContentTypeConverter,
     GenreManager, RecommendationFormatter, PerformanceMonitor
 )
+from src.response_cache import ResponseCache, response_key
+from src.search_index import SEARCH_CATALOG_FILE, document_key, read_catalog, search_index
+from src.suggest_index import suggest_index
+from src.concurrency import run_in_background
+from src import tracing
+
+try:
+    from src.catalog_store import catalog_store
+except ImportError:  # NumPy absent : pas de catalogue partagé
+    catalog_store = None
+
+logger = logging.getLogger(__name__)
 
 # Import de la configuration
 try:
@@ -41,14 +60,34 @@ class ModularRecommendationEngine:
         self.api_manager = MultiAPIManager(TMDB_API_KEY, WATCHMODE_API_KEY, RAPIDAPI_KEY)
         self.scorer = RecommendationScorer()
         self.recommendation_engine = RecommendationEngine(self.api_manager, self.scorer)
-        self.cache_manager = CacheManager(cache_duration_minutes=30)
+        self.cache_manager = CacheManager(cache_duration_minutes=30, namespace="results")
+        # Réponses HTTP déjà sérialisées (même durée que le cache des résultats)
+        self.response_cache = ResponseCache(cache_duration_minutes=30)
         self.performance_monitor = PerformanceMonitor()
+        # Index local de recherche (titres vus chez les fournisseurs, catalogue)
+        self.search_index = search_index
+        self.suggest_index = suggest_index
+        self._search_refreshes = set()
+        self._search_refreshes_lock = threading.Lock()
+        self._search_refresh_tasks = set()
         
         # Charger les utilisateurs
         self.users = load_users()
         
+        # Aucun appel réseau ici : les fournisseurs sont testés par start(),
+        # après le fork des workers (ou à la première requête)
         print(f"🚀 Moteur de recommandation modulaire initialisé")
-        print(f"📊 Fournisseurs actifs: {', '.join(self.api_manager.active_providers)}")
+    
+    def start(self):
+        """Phase post-fork : connexions, pool de threads et tests des fournisseurs"""
+        self.api_manager.ensure_started()
+        if SEARCH_CATALOG_FILE and not len(self.search_index):
+            run_in_background(partial(self._index_items, read_catalog(SEARCH_CATALOG_FILE)), "catalogue de recherche")
+        logger.info("Moteur prêt", extra={
+            "pid": os.getpid(),
+            "active_providers": self.api_manager.active_providers,
+            "startup_ms": round((self.api_manager.startup_time or 0) * 1000, 1)
+        })
     
     def get_recommendations(self, user_id: int, n: int = 5, content_type: str = 'all', 
                           streaming_services: Optional[List[str]] = None) -> List[Dict[str, Any]]:
@@ -68,34 +107,54 @@ class ModularRecommendationEngine:
         start_time = time.time()
         
         try:
-            print(f"🔍 DEBUG Engine - get_recommendations called:")
-            print(f"  - user_id: {user_id}")
-            print(f"  - n: {n}")
-            print(f"  - content_type: {content_type}")
-            print(f"  - streaming_services: {streaming_services}")
-            
-            # Trouver l'utilisateur
-            user = self._get_user_by_id(user_id)
-            if not user:
-                print(f"❌ Utilisateur {user_id} non trouvé")
+            context = self._prepare_recommendation_request(user_id, n, content_type, streaming_services)
+            if context is None:
                 return []
+            user_preferences, internal_content_type, cache_key = context
             
-            print(f"✅ Utilisateur trouvé: {user.get('name', 'Sans nom')}")
+            cached_result = self.cache_manager.get(cache_key)
+            if cached_result:
+                self.performance_monitor.record_cache_hit()
+                return cached_result
             
-            # Préparer les préférences utilisateur
-            user_preferences = self._prepare_user_preferences(user, streaming_services)
-            print(f"✅ Préférences préparées: {list(user_preferences.keys())}")
+            self.performance_monitor.record_cache_miss()
             
-            # Convertir le type de contenu
-            internal_content_type = ContentTypeConverter.convert_type(
-                content_type, "external", "internal"
+            # Générer les recommandations
+            recommendations = self.recommendation_engine.get_personalized_recommendations(
+                user_preferences=user_preferences,
+                content_type=internal_content_type,
+                max_results=n
             )
             
-            # Vérifier le cache
-            cache_key = self.cache_manager.get_cache_key(
-                user_id, n, internal_content_type, ",".join(streaming_services) if streaming_services else ""
+            formatted_recommendations = self._finalize_recommendations(
+                recommendations, streaming_services, cache_key
             )
             
+            # Enregistrer les métriques
+            response_time = time.time() - start_time
+            self.performance_monitor.record_api_call(response_time, True)
+            
+            return formatted_recommendations[:n]
+            
+        except Exception as e:
+            logger.exception("Erreur génération recommandations", extra={"user_id": user_id})
+            
+            response_time = time.time() - start_time
+            self.performance_monitor.record_api_call(response_time, False)
+            return []
+    
+    async def get_recommendations_async(self, user_id: int, n: int = 5, content_type: str = 'all',
+                                        streaming_services: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+        """Version asynchrone de get_recommendations (mode ASGI)"""
+        import time
+        start_time = time.time()
+        
+        try:
+            context = self._prepare_recommendation_request(user_id, n, content_type, streaming_services)
+            if context is None:
+                return []
+            user_preferences, internal_content_type, cache_key = context
+            
             cached_result = self.cache_manager.get(cache_key)
             if cached_result:
                 self.performance_monitor.record_cache_hit()
@@ -103,47 +162,96 @@ class ModularRecommendationEngine:
             
             self.performance_monitor.record_cache_miss()
             
-            # Générer les recommandations
-            recommendations = self.recommendation_engine.get_personalized_recommendations(
+            recommendations = await self.recommendation_engine.get_personalized_recommendations_async(
                 user_preferences=user_preferences,
                 content_type=internal_content_type,
                 max_results=n
             )
             
-            # Formater les recommandations
-            formatted_recommendations = RecommendationFormatter.format_recommendation_list(
-                recommendations
+            formatted_recommendations = self._finalize_recommendations(
+                recommendations, streaming_services, cache_key
             )
             
-            # Filtrer par services de streaming si spécifiés
-            if streaming_services:
-                normalized_services = [StreamingServiceMapper.normalize_service_name(s) for s in streaming_services]
-                formatted_recommendations = [
-                    rec for rec in formatted_recommendations
-                    if any(service in rec.get("streaming_services", []) for service in normalized_services)
-                ]
-            
-            # Mettre en cache
-            self.cache_manager.set(cache_key, formatted_recommendations)
-            
-            # Enregistrer les métriques
             response_time = time.time() - start_time
             self.performance_monitor.record_api_call(response_time, True)
             
             return formatted_recommendations[:n]
             
         except Exception as e:
-            print(f"❌ Erreur génération recommandations: {e}")
-            print(f"   Type d'erreur: {type(e).__name__}")
-            
-            # Afficher la stack trace complète pour débugger
-            import traceback
-            traceback.print_exc()
+            logger.exception("Erreur génération recommandations", extra={"user_id": user_id})
             
             response_time = time.time() - start_time
             self.performance_monitor.record_api_call(response_time, False)
             return []
     
+    def stream_recommendations(self, user_id: int, n: int = 5, content_type: str = 'all',
+                               streaming_services: Optional[List[str]] = None):
+        """
+        Recommandations progressives (flux SSE de /api/recommendations/<id>/stream)
+        
+        Un premier classement provisoire est rendu dès que les candidats sont
+        connus, puis un nouveau à chaque changement d'ordre pendant l'arrivée
+        des détails. Le délai avant le premier élément est la mesure de
+        latence principale de ce mode.
+        
+        Yields:
+            ("ranking", données) pour chaque classement provisoire, puis
+            ("complete", données) avec le classement final, ou ("error", données)
+        """
+        import time
+        start_time = time.time()
+        
+        def elapsed_ms():
+            return round((time.time() - start_time) * 1000, 1)
+        
+        context = self._prepare_recommendation_request(user_id, n, content_type, streaming_services)
+        if context is None:
+            yield "complete", {"items": [], "time_to_first_item_ms": None, "total_ms": elapsed_ms()}
+            return
+        user_preferences, internal_content_type, cache_key = context
+        
+        cached_result = self.cache_manager.get(cache_key)
+        if cached_result:
+            self.performance_monitor.record_cache_hit()
+            self.performance_monitor.record_time_to_first_item(time.time() - start_time)
+            yield "complete", {"items": cached_result, "cached": True,
+                               "time_to_first_item_ms": elapsed_ms(), "total_ms": elapsed_ms()}
+            return
+        
+        self.performance_monitor.record_cache_miss()
+        
+        time_to_first_item_ms = None
+        formatted_recommendations = []
+        try:
+            for recommendations, progress in self.recommendation_engine.iter_personalized_recommendations(
+                user_preferences=user_preferences,
+                content_type=internal_content_type,
+                max_results=n
+            ):
+                formatted_recommendations = self._format_recommendations(recommendations, streaming_services)
+                if time_to_first_item_ms is None and formatted_recommendations:
+                    time_to_first_item_ms = elapsed_ms()
+                    self.performance_monitor.record_time_to_first_item(time_to_first_item_ms / 1000)
+                yield "ranking", {"items": formatted_recommendations, "provisional": True, **progress}
+        except Exception as e:
+            logger.exception("Erreur flux recommandations", extra={"user_id": user_id})
+            self.performance_monitor.record_api_call(time.time() - start_time, False)
+            yield "error", {"error": f"Erreur lors de la récupération des recommandations: {str(e)}"}
+            return
+        
+        # Classement final : mêmes données et même cache que get_recommendations
+        self.cache_manager.set(cache_key, formatted_recommendations)
+        self.performance_monitor.record_api_call(time.time() - start_time, True)
+        
+        logger.info("Flux recommandations terminé", extra={
+            "user_id": user_id,
+            "count": len(formatted_recommendations),
+            "time_to_first_item_ms": time_to_first_item_ms,
+            "total_ms": elapsed_ms()
+        })
+        yield "complete", {"items": formatted_recommendations,
+                           "time_to_first_item_ms": time_to_first_item_ms, "total_ms": elapsed_ms()}
+    
     def search_content(self, query: str, content_type: str = "all", 
                       max_results: int = 20) -> Dict[str, Any]:
         """
@@ -178,48 +286,25 @@ class ModularRecommendationEngine:
                 content_type, "external", "internal"
             )
             
-            # Effectuer la recherche
+            # Index local d'abord ; les fournisseurs le rafraîchissent en arrière-plan
+            hits = self.search_index.search(query, api_content_type, max_results)
+            if hits.confident:
+                refresh = partial(self._refresh_search, query, content_type, api_content_type, max_results, cache_key)
+                if self._claim_search_refresh(cache_key):
+                    run_in_background(refresh, "rafraîchissement recherche")
+                return self._build_search_response(
+                    {"results": hits.results, "providers_used": ["index"]}, query, content_type, cache_key, start_time
+                )
+            
+            # Requête froide ou peu sûre : fournisseurs, fusionnés avec l'index
             results = self.api_manager.search_content_parallel(
                 query=query,
                 content_type=api_content_type,
                 max_results=max_results
             )
+            results = self._merge_with_index(results, hits, max_results)
             
-            # Formater les résultats
-            if not results.get("error") and results.get("results"):
-                formatted_results = []
-                for item in results["results"]:
-                    formatted_item = self._format_search_item(item)
-                    if formatted_item:
-                        formatted_results.append(formatted_item)
-                
-                response = {
-                    "results": formatted_results,
-                    "total_results": len(formatted_results),
-                    "providers_used": results.get("providers_used", []),
-                    "query": query,
-                    "content_type": content_type
-                }
-                
-                # Mettre en cache
-                self.cache_manager.set(cache_key, response)
-                
-                # Métriques
-                response_time = time.time() - start_time
-                self.performance_monitor.record_api_call(response_time, True)
-                
-                return response
-            else:
-                error_response = {
-                    "error": results.get("error", "Aucun résultat trouvé"),
-                    "results": [],
-                    "query": query
-                }
-                
-                response_time = time.time() - start_time
-                self.performance_monitor.record_api_call(response_time, False)
-                
-                return error_response
+            return self._build_search_response(results, query, content_type, cache_key, start_time)
                 
         except Exception as e:
             print(f"❌ Erreur recherche: {e}")
@@ -232,6 +317,61 @@ class ModularRecommendationEngine:
                 "query": query
             }
     
+    async def search_content_async(self, query: str, content_type: str = "all",
+                                   max_results: int = 20) -> Dict[str, Any]:
+        """Version asynchrone de search_content (mode ASGI)"""
+        import time
+        start_time = time.time()
+        
+        try:
+            cache_key = self.cache_manager.get_cache_key(
+                "search", query, content_type, max_results
+            )
+            
+            cached_result = self.cache_manager.get(cache_key)
+            if cached_result:
+                self.performance_monitor.record_cache_hit()
+                return cached_result
+            
+            self.performance_monitor.record_cache_miss()
+            
+            api_content_type = ContentTypeConverter.convert_type(
+                content_type, "external", "internal"
+            )
+            
+            hits = self.search_index.search(query, api_content_type, max_results)
+            if hits.confident:
+                if self._claim_search_refresh(cache_key):
+                    task = asyncio.get_running_loop().create_task(
+                        self._refresh_search_async(query, content_type, api_content_type, max_results, cache_key)
+                    )
+                    # Référence gardée jusqu'à la fin de la tâche
+                    self._search_refresh_tasks.add(task)
+                    task.add_done_callback(self._search_refresh_tasks.discard)
+                return self._build_search_response(
+                    {"results": hits.results, "providers_used": ["index"]}, query, content_type, cache_key, start_time
+                )
+            
+            results = await self.api_manager.search_content_async(
+                query=query,
+                content_type=api_content_type,
+                max_results=max_results
+            )
+            results = self._merge_with_index(results, hits, max_results)
+            
+            return self._build_search_response(results, query, content_type, cache_key, start_time)
+                
+        except Exception as e:
+            logger.exception("Erreur recherche", extra={"query": query})
+            response_time = time.time() - start_time
+            self.performance_monitor.record_api_call(response_time, False)
+            
+            return {
+                "error": f"Erreur lors de la recherche: {str(e)}",
+                "results": [],
+                "query": query
+            }
+    
     def get_trending_content(self, content_type: str = "all", 
                            max_results: int = 20) -> Dict[str, Any]:
         """
@@ -273,43 +413,21 @@ class ModularRecommendationEngine:
             
             # Formater
             if not results.get("error") and results.get("results"):
-                formatted_results = []
-                for item in results["results"]:
-                    formatted_item = self._format_search_item(item)
-                    if formatted_item:
-                        formatted_results.append(formatted_item)
+                self._index_items(results["results"])
+                formatted_results = self._format_search_items(results["results"])
 
-                # Enrichir chaque recommandation avec les détails TMDb si provider = TMDb
-                tmdb_provider = self.api_manager.providers.get("TMDb")
-                enriched_recommendations = []
-                for rec in formatted_results:
-                    item = rec.get("item", rec)
-                    if item.get("provider") == "TMDb" and tmdb_provider:
-                        details = tmdb_provider.get_details(item.get("id"), item.get("media_type", "movie"))
-                        rec["detailed_info"] = details
-                    enriched_recommendations.append(rec)
+                # Détails TMDb : cache partagé, puis un seul lot d'appels parallèles borné par DETAIL_DEADLINE
+                to_enrich = [rec for rec in formatted_results if rec.get("provider") == "TMDb"]
+                detail_loader = self.api_manager.detail_loader
+                incomplete = False
+                if to_enrich and detail_loader is not None:
+                    batch = detail_loader.load_many(self._detail_key(rec) for rec in to_enrich)
+                    incomplete = self._attach_details(to_enrich, batch)
 
-                # Cache et retour des résultats
-                response_time = time.time() - start_time
-                self.performance_monitor.record_api_call(response_time, True)
-                
-                result = {
-                    "results": enriched_recommendations,
-                    "content_type": content_type,
-                    "total_results": len(enriched_recommendations)
-                }
-                
-                self.cache_manager.set(cache_key, result)
-                return result
+                return self._build_trending_response(formatted_results, content_type, cache_key, start_time,
+                                                     incomplete)
             else:
-                # Aucun résultat trouvé
-                response_time = time.time() - start_time
-                self.performance_monitor.record_api_call(response_time, True)
-                return {
-                    "results": [],
-                    "content_type": content_type,
-                    "total_results": 0
-                }
+                return self._build_trending_response([], content_type, None, start_time)
 
                 
         except Exception as e:
@@ -323,6 +441,298 @@ class ModularRecommendationEngine:
                 "content_type": content_type
             }
     
+    async def get_trending_content_async(self, content_type: str = "all",
+                                         max_results: int = 20) -> Dict[str, Any]:
+        """Version asynchrone de get_trending_content"""
+        import time
+        start_time = time.time()
+        
+        try:
+            cache_key = self.cache_manager.get_cache_key(
+                "trending", content_type, max_results
+            )
+            
+            cached_result = self.cache_manager.get(cache_key)
+            if cached_result:
+                self.performance_monitor.record_cache_hit()
+                return cached_result
+            
+            self.performance_monitor.record_cache_miss()
+            
+            api_content_type = ContentTypeConverter.convert_type(
+                content_type, "external", "internal"
+            )
+            
+            results = await self.api_manager.get_trending_async(
+                content_type=api_content_type,
+                max_results=max_results
+            )
+            
+            if not results.get("error") and results.get("results"):
+                self._index_items(results["results"])
+                formatted_results = self._format_search_items(results["results"])
+                
+                to_enrich = [rec for rec in formatted_results if rec.get("provider") == "TMDb"]
+                detail_loader = self.api_manager.detail_loader
+                incomplete = False
+                if to_enrich and detail_loader is not None:
+                    batch = await detail_loader.load_many_async(
+                        self.api_manager.get_async_session(), (self._detail_key(rec) for rec in to_enrich)
+                    )
+                    incomplete = self._attach_details(to_enrich, batch)
+                
+                return self._build_trending_response(formatted_results, content_type, cache_key, start_time,
+                                                     incomplete)
+            else:
+                return self._build_trending_response([], content_type, None, start_time)
+                
+        except Exception as e:
+            logger.exception("Erreur contenu tendance", extra={"content_type": content_type})
+            response_time = time.time() - start_time
+            self.performance_monitor.record_api_call(response_time, False)
+            
+            return {
+                "error": f"Erreur lors de la récupération: {str(e)}",
+                "results": [],
+                "content_type": content_type
+            }
+    
+    def _prepare_recommendation_request(self, user_id: int, n: int, content_type: str,
+                                        streaming_services: Optional[List[str]]):
+        """
+        Prépare une demande de recommandations (préférences, type, clé de cache)
+        
+        Returns:
+            (préférences, type interne, clé de cache), ou None si l'utilisateur est inconnu
+        """
+        logger.debug("get_recommendations", extra={
+            "user_id": user_id, "n": n, "content_type": content_type,
+            "streaming_services": streaming_services
+        })
+        
+        # Trouver l'utilisateur
+        user = self._get_user_by_id(user_id)
+        if not user:
+            logger.info("Utilisateur introuvable", extra={"user_id": user_id})
+            return None
+        
+        # Préparer les préférences utilisateur
+        user_preferences = self._prepare_user_preferences(user, streaming_services)
+        logger.debug("Préférences préparées", extra={"keys": list(user_preferences.keys())})
+        
+        # Convertir le type de contenu
+        internal_content_type = ContentTypeConverter.convert_type(
+            content_type, "external", "internal"
+        )
+        
+        cache_key = self.cache_manager.get_cache_key(
+            user_id, n, internal_content_type, ",".join(streaming_services) if streaming_services else ""
+        )
+        
+        return user_preferences, internal_content_type, cache_key
+    
+    def _format_recommendations(self, recommendations: List[Dict[str, Any]],
+                                streaming_services: Optional[List[str]]) -> List[Dict[str, Any]]:
+        """Formate et filtre par service de streaming les recommandations"""
+        formatted_recommendations = RecommendationFormatter.format_recommendation_list(
+            recommendations
+        )
+        
+        # Filtrer par services de streaming si spécifiés
+        if streaming_services:
+            normalized_services = [StreamingServiceMapper.normalize_service_name(s) for s in streaming_services]
+            formatted_recommendations = [
+                rec for rec in formatted_recommendations
+                if any(service in rec.get("streaming_services", []) for service in normalized_services)
+            ]
+        return formatted_recommendations
+    
+    def _finalize_recommendations(self, recommendations: List[Dict[str, Any]],
+                                  streaming_services: Optional[List[str]],
+                                  cache_key: str) -> List[Dict[str, Any]]:
+        """Formate, filtre par service de streaming et met en cache les recommandations"""
+        with tracing.stage("format"):
+            formatted_recommendations = self._format_recommendations(recommendations, streaming_services)
+        
+        # Mettre en cache
+        self.cache_manager.set(cache_key, formatted_recommendations)
+        return formatted_recommendations
+    
+    def _index_items(self, items):
+        """Ajoute des éléments de fournisseurs à l'index de recherche et aux suggestions (un seul passage)"""
+        self.suggest_index.add_many(item for item in items if self.search_index.add(item))
+    
+    def suggest_titles(self, query: str, content_type: str = "all", limit: int = 8) -> List[Dict[str, Any]]:
+        """Suggestions de titres pour une saisie partielle (index en mémoire, sans appel fournisseur)"""
+        # 'movies' / 'series' (API) ou 'movie' / 'tv' (TMDb)
+        tmdb_content_type = ContentTypeConverter.convert_type(content_type, "internal", "tmdb")
+        return self.suggest_index.suggest(query, tmdb_content_type, limit)
+    
+    def _merge_with_index(self, results: Dict[str, Any], hits, max_results: int) -> Dict[str, Any]:
+        """
+        Indexe les résultats des fournisseurs puis les complète avec ceux de
+        l'index (ordre des fournisseurs conservé, doublons retirés)
+        """
+        provider_items = results.get("results") or []
+        self._index_items(provider_items)
+        if not hits.results:
+            return results
+        
+        seen = {document_key(item) for item in provider_items}
+        extra = [item for item in hits.results if document_key(item) not in seen]
+        merged = (provider_items + extra)[:max_results]
+        return {
+            **{key: value for key, value in results.items() if key != "error"},
+            "results": merged,
+            "providers_used": list(results.get("providers_used") or []) + ["index"]
+        }
+    
+    def _claim_search_refresh(self, cache_key: str) -> bool:
+        """Vrai si aucun rafraîchissement de cette recherche n'est déjà en cours"""
+        with self._search_refreshes_lock:
+            if cache_key in self._search_refreshes:
+                return False
+            self._search_refreshes.add(cache_key)
+            return True
+    
+    def _store_refreshed_search(self, results: Dict[str, Any], query: str, content_type: str,
+                                api_content_type: str, max_results: int, cache_key: str):
+        """Indexe les résultats frais et remplace la réponse en cache par le nouveau classement"""
+        if results.get("error") or not results.get("results"):
+            return
+        self._index_items(results["results"])
+        hits = self.search_index.search(query, api_content_type, max_results)
+        merged = self._merge_with_index({"results": [], "providers_used": results.get("providers_used", [])},
+                                        hits, max_results)
+        formatted_results = self._format_search_items(merged["results"])
+        if formatted_results:
+            response = {
+                "results": formatted_results,
+                "total_results": len(formatted_results),
+                "providers_used": merged["providers_used"],
+                "query": query,
+                "content_type": content_type
+            }
+            self.cache_manager.set(cache_key, response)
+            # Remplace aussi les octets servis par /api/search (et la dernière réponse
+            # connue du mode dégradé) : sans cela, la réponse de l'index resterait servie
+            # jusqu'à l'expiration du cache de réponses
+            route_key = response_key("search", query, content_type, max_results)
+            version = self.response_version()
+            self.response_cache.store(response_key(route_key, version), version, response, base_key=route_key)
+    
+    def _refresh_search(self, query: str, content_type: str, api_content_type: str, max_results: int,
+                        cache_key: str):
+        """Recherche fournisseurs d'une requête servie par l'index (arrière-plan)"""
+        try:
+            results = self.api_manager.search_content_parallel(
+                query=query, content_type=api_content_type, max_results=max_results
+            )
+            self._store_refreshed_search(results, query, content_type, api_content_type, max_results, cache_key)
+        finally:
+            with self._search_refreshes_lock:
+                self._search_refreshes.discard(cache_key)
+    
+    async def _refresh_search_async(self, query: str, content_type: str, api_content_type: str,
+                                    max_results: int, cache_key: str):
+        """Version asynchrone de _refresh_search (tâche de la boucle ASGI)"""
+        try:
+            results = await self.api_manager.search_content_async(
+                query=query, content_type=api_content_type, max_results=max_results
+            )
+            self._store_refreshed_search(results, query, content_type, api_content_type, max_results, cache_key)
+        except Exception as e:
+            logger.warning("Échec du rafraîchissement de la recherche : %s", e)
+        finally:
+            with self._search_refreshes_lock:
+                self._search_refreshes.discard(cache_key)
+    
+    def _build_search_response(self, results: Dict[str, Any], query: str, content_type: str,
+                               cache_key: str, start_time: float) -> Dict[str, Any]:
+        """Formate la réponse de recherche, la met en cache et enregistre les métriques"""
+        import time
+        
+        if not results.get("error") and results.get("results"):
+            formatted_results = self._format_search_items(results["results"])
+            
+            response = {
+                "results": formatted_results,
+                "total_results": len(formatted_results),
+                "providers_used": results.get("providers_used", []),
+                "query": query,
+                "content_type": content_type
+            }
+            
+            # Mettre en cache
+            self.cache_manager.set(cache_key, response)
+            
+            # Métriques
+            response_time = time.time() - start_time
+            self.performance_monitor.record_api_call(response_time, True)
+            
+            return response
+        
+        error_response = {
+            "error": results.get("error", "Aucun résultat trouvé"),
+            "results": [],
+            "query": query
+        }
+        
+        response_time = time.time() - start_time
+        self.performance_monitor.record_api_call(response_time, False)
+        
+        return error_response
+    
+    def _build_trending_response(self, results: List[Dict[str, Any]], content_type: str,
+                                 cache_key: Optional[str], start_time: float,
+                                 incomplete: bool = False) -> Dict[str, Any]:
+        """
+        Construit la réponse tendance (mise en cache seulement si non vide)
+        
+        Une réponse dont des détails TMDb sont arrivés trop tard est marquée
+        partial et n'est pas mise en cache : la suivante les trouvera dans le
+        cache des détails.
+        """
+        import time
+        
+        response_time = time.time() - start_time
+        self.performance_monitor.record_api_call(response_time, True)
+        
+        result = {
+            "results": results,
+            "content_type": content_type,
+            "total_results": len(results)
+        }
+        if incomplete:
+            result["partial"] = True
+        
+        if cache_key and results and not incomplete:
+            self.cache_manager.set(cache_key, result)
+        return result
+    
+    @staticmethod
+    def _detail_key(rec: Dict[str, Any]) -> tuple:
+        """(id, type TMDb) d'un élément formaté ('series' -> 'tv')"""
+        return rec.get("id"), "movie" if rec.get("type") == "movie" else "tv"
+    
+    def _attach_details(self, formatted_results: List[Dict[str, Any]], batch) -> bool:
+        """Ajoute detailed_info aux éléments dont les détails sont arrivés ; vrai s'il en manque par manque de temps"""
+        for rec in formatted_results:
+            details = batch.details.get(self._detail_key(rec))
+            if details is not None:
+                rec["detailed_info"] = details
+        return batch.pending > 0
+    
+    def _format_search_items(self, items: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Formate une liste d'éléments de recherche (les éléments invalides sont ignorés)"""
+        formatted_results = []
+        for item in items:
+            formatted_item = self._format_search_item(item)
+            if formatted_item:
+                formatted_results.append(formatted_item)
+        return formatted_results
+    
+
     def get_api_status(self) -> Dict[str, Any]:
         """Retourne le statut des APIs et les métriques de performance"""
         status = self.api_manager.get_provider_status()
@@ -370,9 +780,37 @@ class ModularRecommendationEngine:
     
     def clear_cache(self):
         """Vide le cache"""
-        self.cache_manager.cache.clear()
+        self.cache_manager.clear()
+        self.response_cache.clear()
+        if self.api_manager.detail_loader is not None:
+            self.api_manager.detail_loader.cache.clear()
         print("🧹 Cache vidé")
     
+    def response_version(self, user_id: Optional[int] = None) -> Optional[str]:
+        """
+        Version des données d'une réponse, pour son ETag et sa clé de cache
+        
+        Combine la version du catalogue partagé et, pour une réponse
+        personnalisée, une empreinte du profil (préférences + historique) :
+        modifier le profil ou publier un catalogue change la version.
+        
+        Returns:
+            Version, ou None si l'utilisateur est inconnu
+        """
+        features = catalog_store.current() if catalog_store is not None else None
+        version = f"c{features.version if features is not None else 0}"
+        if user_id is None:
+            return version
+        
+        user = self._get_user_by_id(user_id)
+        if not user:
+            return None
+        profile = json.dumps(
+            [user.get('preferences', {}), user.get('history', [])],
+            sort_keys=True, default=str
+        )
+        return f"p{hashlib.md5(profile.encode()).hexdigest()[:12]}.{version}"
+    
     def get_supported_streaming_services(self) -> List[str]:
         """Retourne la liste des services de streaming supportés"""
         return StreamingServiceMapper.get_supported_services()
@@ -440,13 +878,8 @@ class ModularRecommendationEngine:
                 formatted["genres"] = item["genre_names"]
             elif "genre_ids" in item:
                 # Conversion basique des IDs de genres TMDb
-                genre_map = {
-                    28: "Action", 18: "Drama", 35: "Comedy", 80: "Crime",
-                    99: "Documentary", 878: "Science Fiction", 53: "Thriller",
-                    16: "Animation", 10749: "Romance", 27: "Horror"
-                }
                 formatted["genres"] = [
-                    genre_map.get(gid, "Unknown") for gid in item["genre_ids"]
+                    TMDB_GENRE_NAMES.get(gid, "Unknown") for gid in item["genre_ids"]
                 ]
             else:
                 formatted["genres"] = []
@@ -459,13 +892,7 @@ class ModularRecommendationEngine:
     
     def _invalidate_user_cache(self, user_id: int):
         """Invalide le cache pour un utilisateur spécifique"""
-        keys_to_remove = []
-        for key in self.cache_manager.cache.keys():
-            if str(user_id) in key:
-                keys_to_remove.append(key)
-        
-        for key in keys_to_remove:
-            del self.cache_manager.cache[key]
+        self.cache_manager.delete_matching(lambda key: str(user_id) in key)
 
 # Instance globale du moteur de recommandation
 modular_engine = ModularRecommendationEngine()
@@ -4,9 +4,23 @@ Algorithmes avancés pour calculer la pertinence des recommandations
 """
 
 from typing import Dict, List, Any, Optional
-from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+import asyncio
+import logging
 import math
 
+from src import tracing
+from src.concurrency import iter_concurrently, run_concurrently
+from src.metrics import candidate_search_failures
+from src.static_data import TMDB_SCORING_GENRES
+
+try:
+    from src.catalog_store import catalog_store
+except ImportError:  # NumPy absent : pas de catalogue partagé
+    catalog_store = None
+
+logger = logging.getLogger(__name__)
+
 class RecommendationScorer:
     """Classe pour calculer les scores de recommandation"""
     
@@ -120,11 +134,7 @@ class RecommendationScorer:
         # Fallback depuis les IDs de genres
         elif "genre_ids" in item:
             # Conversion basique des IDs courants
-            genre_map = {
-                28: "action", 18: "drama", 35: "comedy", 80: "crime",
-                99: "documentary", 878: "science fiction", 53: "thriller"
-            }
-            item_genres = [genre_map.get(gid, "").lower() for gid in item["genre_ids"]]
+            item_genres = [TMDB_SCORING_GENRES.get(gid, "") for gid in item["genre_ids"]]
             item_genres = [g for g in item_genres if g]
         
         if not item_genres:
@@ -337,32 +347,151 @@ class RecommendationEngine:
         recommendations = []
         
         try:
-            # 1. Recherche basée sur les genres préférés
-            genre_results = self._search_by_genres(user_preferences, content_type)
+            with tracing.stage("candidates"):
+                # 1. Recherche basée sur les genres préférés
+                genre_results = self._search_by_genres(user_preferences, content_type)
+                
+                # 2. Recherche basée sur les mots-clés
+                keyword_results = self._search_by_keywords(user_preferences, content_type)
+                
+                # 3. Contenu tendance filtré
+                trending_results = self._get_filtered_trending(user_preferences, content_type)
+                
+                # 4. Combiner tous les résultats
+                all_candidates = genre_results + keyword_results + trending_results
+                
+                # 5. Déduplication
+                unique_candidates = self._deduplicate_results(all_candidates)
             
-            # 2. Recherche basée sur les mots-clés
-            keyword_results = self._search_by_keywords(user_preferences, content_type)
+            # 6. Scoring parallèle (détails compris)
+            with tracing.stage("scoring"):
+                recommendations = self._score_candidates_parallel(unique_candidates, user_preferences)
             
-            # 3. Contenu tendance filtré
-            trending_results = self._get_filtered_trending(user_preferences, content_type)
+            # 7. Tri et sélection finale
+            recommendations.sort(key=lambda x: x["score"], reverse=True)
             
-            # 4. Combiner tous les résultats
-            all_candidates = genre_results + keyword_results + trending_results
+        except Exception as e:
+            print(f"Erreur génération recommandations: {e}")
+        
+        return recommendations[:max_results]
+    
+    async def get_personalized_recommendations_async(self, user_preferences: Dict[str, Any],
+                                                     content_type: str = "all",
+                                                     max_results: int = 10) -> List[Dict[str, Any]]:
+        """
+        Version asynchrone de get_personalized_recommendations (mode ASGI)
+        
+        Les recherches par genre, par mot-clé et les tendances partent toutes
+        en même temps au lieu d'être enchaînées.
+        """
+        recommendations = []
+        
+        try:
+            queries = [(genre, 10) for genre in user_preferences.get("genres_likes", [])[:3]]
+            queries += [(keyword, 8) for keyword in user_preferences.get("keywords_likes", [])[:2]]
             
-            # 5. Déduplication
-            unique_candidates = self._deduplicate_results(all_candidates)
+            searches = [
+                self.api_manager.search_content_async(query=query, content_type=content_type,
+                                                      max_results=limit)
+                for query, limit in queries
+            ]
+            searches.append(self.api_manager.get_trending_async(content_type=content_type, max_results=15))
+            sources = ["search"] * len(queries) + ["trending"]
             
-            # 6. Scoring parallèle
-            recommendations = self._score_candidates_parallel(unique_candidates, user_preferences)
+            all_candidates = []
+            with tracing.stage("candidates"):
+                responses = await asyncio.gather(*searches, return_exceptions=True)
+                for source, response in zip(sources, responses):
+                    if isinstance(response, BaseException):
+                        candidate_search_failures.inc(source=source)
+                        logger.warning("Erreur recherche candidats", extra={"source": source, "error": str(response)})
+                    elif response.get("error"):
+                        candidate_search_failures.inc(source=source)
+                    else:
+                        all_candidates.extend(response.get("results", []))
+                
+                unique_candidates = self._deduplicate_results(all_candidates)
             
-            # 7. Tri et sélection finale
+            with tracing.stage("scoring"):
+                recommendations = await self._score_candidates_async(unique_candidates, user_preferences)
             recommendations.sort(key=lambda x: x["score"], reverse=True)
             
         except Exception as e:
-            print(f"Erreur génération recommandations: {e}")
+            logger.exception("Erreur génération recommandations")
         
         return recommendations[:max_results]
     
+    def iter_personalized_recommendations(self, user_preferences: Dict[str, Any],
+                                          content_type: str = "all",
+                                          max_results: int = 10):
+        """
+        Version progressive de get_personalized_recommendations (flux SSE)
+        
+        Les candidats sont d'abord classés sans leurs détails (classement
+        provisoire immédiat), puis reclassés à mesure que les détails arrivent.
+        Un classement n'est rendu que s'il diffère du précédent ; le dernier
+        rendu est le classement final, identique à celui de la version bloquante.
+        
+        Yields:
+            (recommandations scorées et triées, progression {"detailed", "total"})
+        """
+        # Recherches par genre, par mot-clé et tendances en même temps
+        with tracing.stage("candidates"):
+            outcomes = run_concurrently([
+                partial(self._search_by_genres, user_preferences, content_type),
+                partial(self._search_by_keywords, user_preferences, content_type),
+                partial(self._get_filtered_trending, user_preferences, content_type),
+            ])
+            all_candidates = [item for results, _ in outcomes for item in (results or [])]
+            candidates = self._deduplicate_results(all_candidates)
+        
+        # Score provisoire sans détails (calcul local, sans appel réseau)
+        scored = {}
+        for index, item in enumerate(candidates):
+            try:
+                scored[index] = self._build_scored_item(item, user_preferences, None)
+            except Exception as e:
+                logger.warning("Erreur scoring item", extra={"title": item.get("title"), "error": str(e)})
+        
+        to_detail = [
+            index for index, item in enumerate(candidates)
+            if item.get("provider") == "TMDb" and item.get("id")
+        ]
+        progress = {"detailed": 0, "total": len(to_detail)}
+        
+        def ranking():
+            # Ordre de la version bloquante : score décroissant, puis ordre des candidats
+            ranked = sorted(
+                (index for index, rec in scored.items() if rec["score"] > 0),
+                key=lambda index: (-scored[index]["score"], index)
+            )[:max_results]
+            return [scored[index] for index in ranked], tuple((i, scored[i]["score"]) for i in ranked)
+        
+        recommendations, signature = ranking()
+        yield recommendations, dict(progress)
+        
+        tasks = [
+            partial(self.api_manager.get_enhanced_details,
+                    candidates[index]["id"], candidates[index].get("media_type", "movie"))
+            for index in to_detail
+        ]
+        for task_index, detailed_info, error in iter_concurrently(tasks, max_workers=5):
+            index = to_detail[task_index]
+            progress["detailed"] += 1
+            try:
+                if error is not None:
+                    raise error
+                scored[index] = self._build_scored_item(candidates[index], user_preferences, detailed_info)
+            except Exception as e:
+                # Comme la version bloquante : un candidat en erreur est écarté
+                logger.warning("Erreur scoring item", extra={"title": candidates[index].get("title"), "error": str(e)})
+                scored.pop(index, None)
+            
+            recommendations, new_signature = ranking()
+            if new_signature != signature or progress["detailed"] == progress["total"]:
+                signature = new_signature
+                yield recommendations, dict(progress)
+    
     def _search_by_genres(self, user_preferences: Dict[str, Any], 
                          content_type: str) -> List[Dict[str, Any]]:
         """Recherche basée sur les genres préférés"""
@@ -371,11 +500,12 @@ class RecommendationEngine:
         
         for genre in genres_likes[:3]:  # Limiter à 3 genres pour éviter trop de requêtes
             try:
-                search_results = self.api_manager.search_content_parallel(
-                    query=genre, 
-                    content_type=content_type, 
-                    max_results=10
-                )
+                with tracing.stage("genres", query=genre):
+                    search_results = self.api_manager.search_content_parallel(
+                        query=genre, 
+                        content_type=content_type, 
+                        max_results=10
+                    )
                 
                 if not search_results.get("error"):
                     results.extend(search_results.get("results", []))
@@ -393,11 +523,12 @@ class RecommendationEngine:
         
         for keyword in keywords[:2]:  # Limiter à 2 mots-clés
             try:
-                search_results = self.api_manager.search_content_parallel(
-                    query=keyword, 
-                    content_type=content_type, 
-                    max_results=8
-                )
+                with tracing.stage("keywords", query=keyword):
+                    search_results = self.api_manager.search_content_parallel(
+                        query=keyword, 
+                        content_type=content_type, 
+                        max_results=8
+                    )
                 
                 if not search_results.get("error"):
                     results.extend(search_results.get("results", []))
@@ -411,10 +542,11 @@ class RecommendationEngine:
                               content_type: str) -> List[Dict[str, Any]]:
         """Récupère le contenu tendance filtré"""
         try:
-            trending_results = self.api_manager.get_trending_parallel(
-                content_type=content_type, 
-                max_results=15
-            )
+            with tracing.stage("trending"):
+                trending_results = self.api_manager.get_trending_parallel(
+                    content_type=content_type, 
+                    max_results=15
+                )
             
             if not trending_results.get("error"):
                 return trending_results.get("results", [])
@@ -454,25 +586,59 @@ class RecommendationEngine:
                         item.get("media_type", "movie")
                     )
                 
-                # Calculer le score
-                score = self.scorer.calculate_item_score(item, user_preferences, detailed_info)
-                
-                return {
-                    "item": item,
-                    "score": score,
-                    "type": "movie" if item.get("media_type") == "movie" else "series",
-                    "detailed_info": detailed_info
-                }
+                return self._build_scored_item(item, user_preferences, detailed_info)
                 
             except Exception as e:
                 print(f"Erreur scoring item {item.get('title', 'Unknown')}: {e}")
                 return None
         
-        # Exécution parallèle du scoring
-        with ThreadPoolExecutor(max_workers=5) as executor:
-            results = list(executor.map(score_item, candidates))
+        # Exécution parallèle du scoring (greenlets en mode gevent, threads sinon)
+        outcomes = run_concurrently([partial(score_item, item) for item in candidates], max_workers=5)
+        results = [result for result, _ in outcomes]
         
         # Filtrer les résultats None
         recommendations = [r for r in results if r and r["score"] > 0]
         
         return recommendations
+    
+    async def _score_candidates_async(self, candidates: List[Dict[str, Any]],
+                                      user_preferences: Dict[str, Any],
+                                      max_concurrency: int = 20) -> List[Dict[str, Any]]:
+        """Score les candidats avec des appels de détails concurrents (bornés)"""
+        semaphore = asyncio.Semaphore(max_concurrency)
+        
+        async def score_item(item):
+            try:
+                detailed_info = None
+                if item.get("provider") == "TMDb" and item.get("id"):
+                    async with semaphore:
+                        detailed_info = await self.api_manager.get_enhanced_details_async(
+                            item["id"],
+                            item.get("media_type", "movie")
+                        )
+                
+                return self._build_scored_item(item, user_preferences, detailed_info)
+                
+            except Exception as e:
+                logger.warning("Erreur scoring item", extra={"title": item.get("title"), "error": str(e)})
+                return None
+        
+        results = await asyncio.gather(*(score_item(item) for item in candidates))
+        return [r for r in results if r and r["score"] > 0]
+    
+    def _build_scored_item(self, item: Dict[str, Any], user_preferences: Dict[str, Any],
+                           detailed_info: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+        """Calcule le score d'un candidat et construit la recommandation brute"""
+        # Genres et disponibilité du catalogue partagé quand le fournisseur ne les donne pas
+        if catalog_store is not None:
+            item = catalog_store.enrich(item)
+        
+        with tracing.span("score_item"):
+            score = self.scorer.calculate_item_score(item, user_preferences, detailed_info)
+        
+        return {
+            "item": item,
+            "score": score,
+            "type": "movie" if item.get("media_type") == "movie" else "series",
+            "detailed_info": detailed_info
+        }
@@ -5,16 +5,29 @@ Fonctions helper et outils communs
 
 import json
 import hashlib
+import threading
 import time
 from typing import Dict, List, Any, Optional
 from datetime import datetime, timedelta
 
+from src.static_data import GENRE_LOOKUP, GENRE_VARIATIONS, SERVICE_MAPPING, SUPPORTED_SERVICES
+from src.metrics import record_cache
+
 class CacheManager:
-    """Gestionnaire de cache pour les requêtes API"""
+    """
+    Gestionnaire de cache pour les requêtes API
+    
+    Partagé par les requêtes simultanées d'un worker (threads ou greenlets
+    gevent, threading étant alors patché) : les accès passent par un verrou.
+    Avec un espace de noms, chaque lecture est comptée (hit/miss) dans les
+    métriques (src/metrics.py).
+    """
     
-    def __init__(self, cache_duration_minutes: int = 60):
+    def __init__(self, cache_duration_minutes: int = 60, namespace: Optional[str] = None):
         self.cache = {}
         self.cache_duration = timedelta(minutes=cache_duration_minutes)
+        self.namespace = namespace
+        self._lock = threading.Lock()
     
     def get_cache_key(self, *args) -> str:
         """Génère une clé de cache basée sur les arguments"""
@@ -23,74 +36,60 @@ class CacheManager:
     
     def get(self, key: str) -> Optional[Any]:
         """Récupère une valeur du cache si elle est valide"""
-        if key in self.cache:
-            cached_item = self.cache[key]
+        data = self._get(key)
+        if self.namespace is not None:
+            record_cache(self.namespace, data is not None)
+        return data
+    
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            cached_item = self.cache.get(key)
+            if cached_item is None:
+                return None
             if datetime.now() - cached_item["timestamp"] < self.cache_duration:
                 return cached_item["data"]
-            else:
-                # Supprimer l'entrée expirée
-                del self.cache[key]
+            # Supprimer l'entrée expirée
+            del self.cache[key]
         return None
     
     def set(self, key: str, data: Any):
         """Stocke une valeur dans le cache"""
-        self.cache[key] = {
-            "data": data,
-            "timestamp": datetime.now()
-        }
+        with self._lock:
+            self.cache[key] = {
+                "data": data,
+                "timestamp": datetime.now()
+            }
+    
+    def delete_matching(self, predicate) -> int:
+        """Supprime les entrées dont la clé vérifie predicate ; retourne leur nombre"""
+        with self._lock:
+            keys_to_remove = [key for key in self.cache if predicate(key)]
+            for key in keys_to_remove:
+                del self.cache[key]
+        return len(keys_to_remove)
+    
+    def clear(self):
+        """Vide le cache"""
+        with self._lock:
+            self.cache.clear()
     
     def clear_expired(self):
         """Nettoie les entrées expirées du cache"""
         current_time = datetime.now()
-        expired_keys = [
-            key for key, item in self.cache.items()
-            if current_time - item["timestamp"] >= self.cache_duration
-        ]
-        
-        for key in expired_keys:
-            del self.cache[key]
+        with self._lock:
+            expired_keys = [
+                key for key, item in self.cache.items()
+                if current_time - item["timestamp"] >= self.cache_duration
+            ]
+            
+            for key in expired_keys:
+                del self.cache[key]
 
 class StreamingServiceMapper:
     """Mapper pour normaliser les noms des services de streaming"""
     
-    # Mapping des noms de services vers des identifiants normalisés
-    SERVICE_MAPPING = {
-        # Netflix variations
-        "netflix": "netflix",
-        "netflix france": "netflix",
-        "netflix fr": "netflix",
-        
-        # Disney+ variations
-        "disney+": "disney",
-        "disney plus": "disney", 
-        "disney+ france": "disney",
-        "walt disney pictures": "disney",
-        
-        # Amazon Prime variations
-        "amazon prime video": "amazon",
-        "amazon prime": "amazon",
-        "prime video": "amazon",
-        "amazon": "amazon",
-        
-        # HBO variations
-        "hbo max": "hbo",
-        "hbo": "hbo",
-        "hbo france": "hbo",
-        
-        # Apple TV+ variations
-        "apple tv+": "apple",
-        "apple tv plus": "apple",
-        "apple": "apple",
-        
-        # Paramount+ variations
-        "paramount+": "paramount",
-        "paramount plus": "paramount",
-        "paramount": "paramount",
-        
-        # Autres services
-        "hulu": "hulu",
-        "peacock": "peacock"
-    }
+    # Mapping des noms de services vers des identifiants normalisés (src/static_data.py)
+    SERVICE_MAPPING = SERVICE_MAPPING
     
     @classmethod
     def normalize_service_name(cls, service_name: str) -> str:
@@ -104,7 +103,7 @@ class StreamingServiceMapper:
     @classmethod
     def get_supported_services(cls) -> List[str]:
         """Retourne la liste des services supportés"""
-        return list(set(cls.SERVICE_MAPPING.values()))
+        return list(SUPPORTED_SERVICES)
 
 class ContentTypeConverter:
     """Convertisseur pour les types de contenu entre différentes APIs"""
@@ -155,26 +154,8 @@ class ContentTypeConverter:
 class GenreManager:
     """Gestionnaire pour les genres et leur mapping"""
     
-    # Genres standards avec leurs variations
-    GENRE_VARIATIONS = {
-        "action": ["action", "adventure", "aventure"],
-        "comedy": ["comedy", "comédie", "comedie"],
-        "drama": ["drama", "drame"],
-        "horror": ["horror", "horreur", "épouvante"],
-        "thriller": ["thriller", "suspense"],
-        "romance": ["romance", "romantique"],
-        "science_fiction": ["science fiction", "sci-fi", "science-fiction", "sf"],
-        "fantasy": ["fantasy", "fantastique", "fantaisie"],
-        "animation": ["animation", "anime", "animé"],
-        "documentary": ["documentary", "documentaire"],
-        "crime": ["crime", "criminel", "polar"],
-        "mystery": ["mystery", "mystère", "mystere"],
-        "war": ["war", "guerre"],
-        "western": ["western"],
-        "music": ["music", "musical", "musique"],
-        "family": ["family", "famille", "familial"],
-        "biography": ["biography", "biographie", "biopic"]
-    }
+    # Genres standards avec leurs variations (src/static_data.py)
+    GENRE_VARIATIONS = GENRE_VARIATIONS
     
     @classmethod
     def normalize_genre(cls, genre: str) -> Optional[str]:
@@ -183,19 +164,14 @@ class GenreManager:
             return None
         
         genre_lower = genre.lower().strip()
-        
-        for standard_genre, variations in cls.GENRE_VARIATIONS.items():
-            if genre_lower in variations:
-                return standard_genre
-        
-        return genre_lower
+        return GENRE_LOOKUP.get(genre_lower, genre_lower)
     
     @classmethod
     def get_genre_variations(cls, genre: str) -> List[str]:
         """Retourne toutes les variations d'un genre"""
         normalized = cls.normalize_genre(genre)
         if normalized and normalized in cls.GENRE_VARIATIONS:
-            return cls.GENRE_VARIATIONS[normalized]
+            return list(cls.GENRE_VARIATIONS[normalized])
         return [genre] if genre else []
 
 class RecommendationFormatter:
@@ -302,7 +278,7 @@ class RecommendationFormatter:
         ]
 
 class PerformanceMonitor:
-    """Moniteur de performance pour les requêtes API"""
+    """Moniteur de performance pour les requêtes API (sûr entre threads et greenlets)"""
     
     def __init__(self):
         self.metrics = {
@@ -310,54 +286,86 @@ class PerformanceMonitor:
             "total_response_time": 0,
             "errors": 0,
             "cache_hits": 0,
-            "cache_misses": 0
+            "cache_misses": 0,
+            "streams": 0,
+            "total_time_to_first_item": 0
         }
+        self._lock = threading.Lock()
     
     def record_api_call(self, response_time: float, success: bool = True):
         """Enregistre une requête API"""
-        self.metrics["api_calls"] += 1
-        self.metrics["total_response_time"] += response_time
-        
-        if not success:
-            self.metrics["errors"] += 1
+        with self._lock:
+            self.metrics["api_calls"] += 1
+            self.metrics["total_response_time"] += response_time
+            
+            if not success:
+                self.metrics["errors"] += 1
+    
+    def record_time_to_first_item(self, seconds: float):
+        """Enregistre le délai avant le premier élément d'un flux de recommandations"""
+        with self._lock:
+            self.metrics["streams"] += 1
+            self.metrics["total_time_to_first_item"] += seconds
     
     def record_cache_hit(self):
         """Enregistre un hit de cache"""
-        self.metrics["cache_hits"] += 1
+        with self._lock:
+            self.metrics["cache_hits"] += 1
     
     def record_cache_miss(self):
         """Enregistre une miss de cache"""
-        self.metrics["cache_misses"] += 1
+        with self._lock:
+            self.metrics["cache_misses"] += 1
     
     def get_average_response_time(self) -> float:
         """Calcule le temps de réponse moyen"""
+        with self._lock:
+            return self._average_response_time()
+    
+    def get_error_rate(self) -> float:
+        """Calcule le taux d'erreur"""
+        with self._lock:
+            return self._error_rate()
+    
+    def get_cache_hit_rate(self) -> float:
+        """Calcule le taux de hit de cache"""
+        with self._lock:
+            return self._cache_hit_rate()
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """Retourne toutes les statistiques (instantané cohérent)"""
+        with self._lock:
+            return {
+                **self.metrics,
+                "average_response_time": self._average_response_time(),
+                "error_rate": self._error_rate(),
+                "cache_hit_rate": self._cache_hit_rate(),
+                "average_time_to_first_item": self._average_time_to_first_item()
+            }
+    
+    def reset(self):
+        """Remet à zéro toutes les métriques"""
+        with self._lock:
+            for key in self.metrics:
+                self.metrics[key] = 0
+    
+    def _average_response_time(self) -> float:
         if self.metrics["api_calls"] > 0:
             return self.metrics["total_response_time"] / self.metrics["api_calls"]
         return 0.0
     
-    def get_error_rate(self) -> float:
-        """Calcule le taux d'erreur"""
+    def _average_time_to_first_item(self) -> float:
+        if self.metrics["streams"] > 0:
+            return self.metrics["total_time_to_first_item"] / self.metrics["streams"]
+        return 0.0
+    
+    def _error_rate(self) -> float:
         if self.metrics["api_calls"] > 0:
             return self.metrics["errors"] / self.metrics["api_calls"]
         return 0.0
     
-    def get_cache_hit_rate(self) -> float:
-        """Calcule le taux de hit de cache"""
+    def _cache_hit_rate(self) -> float:
         total_cache_requests = self.metrics["cache_hits"] + self.metrics["cache_misses"]
         if total_cache_requests > 0:
             return self.metrics["cache_hits"] / total_cache_requests
         return 0.0
-    
-    def get_stats(self) -> Dict[str, Any]:
-        """Retourne toutes les statistiques"""
-        return {
-            **self.metrics,
-            "average_response_time": self.get_average_response_time(),
-            "error_rate": self.get_error_rate(),
-            "cache_hit_rate": self.get_cache_hit_rate()
-        }
-    
-    def reset(self):
-        """Remet à zéro toutes les métriques"""
-        for key in self.metrics:
-            self.metrics[key] = 0
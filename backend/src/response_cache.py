@@ -0,0 +1,166 @@
+"""
+Cache des réponses JSON déjà sérialisées
+
+Pour /api/recommendations, /api/search et /api/trending, le cache garde les
+octets finaux de la réponse (et leurs variantes compressées, calculées à la
+première demande) au lieu des objets Python : un succès de cache ne repasse
+ni par la sérialisation ni par la compression.
+
+Chaque réponse porte un ETag fort :
+    "<version>-<empreinte du contenu>[-<encodage>]"
+où la version combine la version du profil (préférences + historique) et la
+version du catalogue partagé. Le suffixe d'encodage (gzip, br) distingue les
+corps compressés, comme pour les fichiers statiques. Un client qui renvoie
+l'un de ces ETags dans If-None-Match reçoit un 304 sans corps, portant
+l'ETag de la variante choisie pour la requête.
+
+La dernière réponse de chaque route et jeu de paramètres reste disponible,
+même périmée (autre version, entrée expirée) : elle est servie quand le
+contrôle d'admission refuse un nouveau calcul (src/admission.py).
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from src import json_codec
+from src.compression import MIN_SIZE, choose_encoding, compress
+from src.recommendation_utils import CacheManager
+
+# Encodages proposés (br prioritaire), suffixes de l'ETag
+ENCODINGS = ("br", "gzip")
+
+# Réponses personnelles (authentifiées) : le navigateur revalide à chaque visite
+CACHE_CONTROL = "private, no-cache"
+
+# Dernières réponses gardées pour le mode dégradé (les plus anciennes sont évincées)
+MAX_STALE_ENTRIES = int(os.environ.get("RESPONSE_CACHE_MAX_STALE", "2048"))
+
+class CachedResponse:
+    """Corps sérialisé d'une réponse, son ETag et ses variantes compressées"""
+
+    __slots__ = ("body", "etag", "_encoded", "_lock")
+
+    def __init__(self, body: bytes, etag: str):
+        self.body = body
+        self.etag = etag
+        self._encoded: Dict[str, bytes] = {}
+        self._lock = threading.Lock()
+
+    def encoded(self, encoding: Optional[str]) -> bytes:
+        """Corps compressé avec `encoding` (calculé une seule fois), ou brut si None"""
+        if encoding is None:
+            return self.body
+        data = self._encoded.get(encoding)
+        if data is None:
+            with self._lock:
+                data = self._encoded.get(encoding)
+                if data is None:
+                    data = compress(self.body, encoding)
+                    self._encoded[encoding] = data
+        return data
+
+def response_key(*parts) -> str:
+    """Clé de cache d'une réponse : route, paramètres et version"""
+    return "|".join(str(part) for part in parts)
+
+def is_cacheable(data: Any) -> bool:
+    """Seuls les résultats non vides, complets et sans erreur sont gardés (comme le cache du moteur)"""
+    if isinstance(data, dict):
+        return not data.get("error") and not data.get("partial") and bool(data.get("results"))
+    return bool(data)
+
+def make_etag(version: str, body: bytes) -> str:
+    return f"{version}-{hashlib.sha256(body).hexdigest()[:16]}"
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Comparaison If-None-Match (faible, comme le veut la RFC 9110)
+
+    `etag` est l'ETag du contenu, sans suffixe : l'ETag d'une de ses variantes
+    compressées (« etag-gzip », « etag-br ») correspond aussi.
+    """
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*":
+            return True
+        if candidate.startswith("W/"):
+            candidate = candidate[2:]
+        candidate = candidate.strip('"')
+        if candidate == etag:
+            return True
+        base, _, encoding = candidate.rpartition("-")
+        if base == etag and encoding in ENCODINGS:
+            return True
+    return False
+
+class ResponseCache:
+    """Réponses sérialisées indexées par route, paramètres et version"""
+
+    def __init__(self, cache_duration_minutes: int = 30):
+        self._entries = CacheManager(cache_duration_minutes=cache_duration_minutes, namespace="responses")
+        self._latest: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._latest_lock = threading.Lock()
+
+    def get(self, key: str) -> Optional[CachedResponse]:
+        return self._entries.get(key)
+
+    def store(self, key: str, version: str, data: Any, base_key: Optional[str] = None) -> CachedResponse:
+        """
+        Sérialise `data` une fois (clés triées, comme jsonify) et met la réponse en cache
+
+        Args:
+            base_key: Route et paramètres sans la version : la réponse devient
+                      la dernière connue pour latest()
+        """
+        body = json_codec.dumps(data, sort_keys=True)
+        entry = CachedResponse(body, make_etag(version, body))
+        self._entries.set(key, entry)
+        if base_key is not None:
+            with self._latest_lock:
+                self._latest[base_key] = entry
+                self._latest.move_to_end(base_key)
+                while len(self._latest) > MAX_STALE_ENTRIES:
+                    self._latest.popitem(last=False)
+        return entry
+
+    def latest(self, base_key: str) -> Optional[CachedResponse]:
+        """Dernière réponse connue pour une route et ses paramètres, éventuellement périmée"""
+        with self._latest_lock:
+            return self._latest.get(base_key)
+
+    def clear(self):
+        self._entries.clear()
+        with self._latest_lock:
+            self._latest.clear()
+
+    def __len__(self):
+        return len(self._entries.cache)
+
+def render(entry: CachedResponse, if_none_match: Optional[str],
+           accept_encoding: Optional[str]) -> Tuple[int, bytes, Dict[str, str]]:
+    """
+    Statut, corps et en-têtes HTTP d'une réponse en cache
+
+    Returns:
+        (304, b"", en-têtes) si le client a déjà cette version, sinon
+        (200, corps éventuellement compressé, en-têtes)
+    """
+    encoding = choose_encoding(accept_encoding, available=ENCODINGS) if len(entry.body) >= MIN_SIZE else None
+    # ETag propre à chaque encodage : un cache ne réutilise pas un corps gzip pour un client sans gzip
+    etag = f"{entry.etag}-{encoding}" if encoding else entry.etag
+    headers = {
+        "ETag": f'"{etag}"',
+        "Cache-Control": CACHE_CONTROL,
+        "Vary": "Accept-Encoding",
+    }
+    if etag_matches(if_none_match, entry.etag):
+        return 304, b"", headers
+
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return 200, entry.encoded(encoding), headers
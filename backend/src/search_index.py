@@ -0,0 +1,237 @@
+"""
+Index plein texte local pour la recherche de contenu (/api/search)
+Index inversé en mémoire des titres déjà vus (réponses des fournisseurs,
+tendances) et du catalogue éventuel (SEARCH_CATALOG_FILE, JSONL au format
+TMDb) : titre, titre original et résumé.
+
+- Normalisation pour un public francophone : minuscules, accents retirés
+  (« Amélie » = « amelie »), ligatures (œ -> oe), apostrophes élidées
+  (« l'été » -> « ete ») et mots vides français/anglais ignorés.
+- Classement BM25 sur les champs pondérés (titre > titre original > résumé),
+  bonus quand le titre contient tous les termes, puis bonus de popularité
+  logarithmique.
+- Une recherche est « confiante » si le meilleur résultat contient tous les
+  termes de la requête et qu'il y a assez de résultats ; sinon le moteur
+  interroge les fournisseurs.
+
+Taille bornée (SEARCH_INDEX_MAX_DOCS) : les titres les plus anciens de
+l'index sont retirés en premier.
+"""
+
+import heapq
+import math
+import os
+import re
+import threading
+import unicodedata
+from collections import OrderedDict, namedtuple
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+from src import json_codec
+
+SEARCH_INDEX_MAX_DOCS = int(os.environ.get("SEARCH_INDEX_MAX_DOCS", "100000"))
+SEARCH_CATALOG_FILE = os.environ.get("SEARCH_CATALOG_FILE", "")
+# Résultats minimum pour répondre depuis l'index sans interroger les fournisseurs
+SEARCH_INDEX_MIN_RESULTS = int(os.environ.get("SEARCH_INDEX_MIN_RESULTS", "5"))
+
+FIELD_WEIGHTS = (("title", 3.0), ("original_title", 2.0), ("description", 1.0))
+BM25_K1 = 1.2
+BM25_B = 0.75
+# La saturation de BM25 atténue le poids du titre : bonus si le titre contient tous les termes
+TITLE_MATCH_BOOST = 1.5
+# Au-delà de cette proportion des titres, un terme secondaire n'ajoute pas de candidats
+FULL_SCAN_FRACTION = 0.05
+# Bonus maximal (x1.5) atteint pour une popularité de POPULARITY_SCALE
+POPULARITY_WEIGHT = 0.5
+POPULARITY_SCALE = 1000.0
+
+STOPWORDS = frozenset({
+    "le", "la", "les", "l", "un", "une", "des", "de", "du", "d", "et", "en", "au", "aux", "a", "pour",
+    "par", "sur", "dans", "the", "of", "and", "an", "in", "on", "to", "for",
+})
+_LIGATURES = str.maketrans({"œ": "oe", "Œ": "oe", "æ": "ae", "Æ": "ae", "ß": "ss"})
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+SearchHits = namedtuple("SearchHits", ["results", "confident", "total"])
+
+def fold(text: str) -> str:
+    """Minuscules sans accents ni ligatures"""
+    if text.isascii():
+        return text.lower()
+    text = unicodedata.normalize("NFKD", text.translate(_LIGATURES).lower())
+    return "".join(char for char in text if not unicodedata.combining(char))
+
+def tokenize(text: Optional[str]) -> List[str]:
+    """Termes indexés d'un texte (élisions et mots vides retirés)"""
+    if not text:
+        return []
+    return [token for token in _TOKEN.findall(fold(text)) if token not in STOPWORDS]
+
+def document_key(item: Dict[str, Any]) -> Optional[str]:
+    if item.get("id") is None:
+        return None
+    return f"{item.get('provider', 'TMDb')}:{item.get('media_type', 'movie')}:{item['id']}"
+
+def popularity_boost(popularity) -> float:
+    popularity = max(0.0, float(popularity or 0))
+    return 1 + POPULARITY_WEIGHT * min(1.0, math.log1p(popularity) / math.log1p(POPULARITY_SCALE))
+
+class _Document:
+    """Élément indexé et valeurs précalculées pour le classement"""
+
+    __slots__ = ("item", "frequencies", "length", "title_terms", "boost", "identity")
+
+    def __init__(self, item: Dict[str, Any], frequencies: Dict[str, float]):
+        self.item = item
+        self.frequencies = frequencies
+        self.length = sum(frequencies.values())
+        self.title_terms = frozenset(tokenize(item.get("title")))
+        self.boost = popularity_boost(item.get("popularity"))
+        # Doublons entre fournisseurs : même titre, année et type
+        self.identity = (fold(item.get("title", "")), str(item.get("year", "")), item.get("media_type"))
+
+class SearchIndex:
+    """Index inversé BM25 thread-safe des éléments de fournisseurs (format des résultats de recherche)"""
+
+    def __init__(self, max_documents: int = SEARCH_INDEX_MAX_DOCS, min_results: int = SEARCH_INDEX_MIN_RESULTS):
+        self.max_documents = max_documents
+        self.min_results = min_results
+        # clé -> _Document, dans l'ordre d'indexation
+        self._documents = OrderedDict()
+        # terme -> {clé: fréquence pondérée}
+        self._postings = {}
+        self._total_length = 0.0
+        self._lock = threading.RLock()
+
+    def __len__(self) -> int:
+        return len(self._documents)
+
+    def add(self, item: Dict[str, Any]) -> bool:
+        """Indexe (ou réindexe) un élément ; retourne False s'il n'a ni id ni titre"""
+        key = document_key(item)
+        if key is None or not item.get("title"):
+            return False
+        frequencies = {}
+        for field, weight in FIELD_WEIGHTS:
+            for token in tokenize(item.get(field)):
+                frequencies[token] = frequencies.get(token, 0.0) + weight
+        document = _Document(dict(item), frequencies)
+        with self._lock:
+            self._remove(key)
+            self._documents[key] = document
+            for token, frequency in frequencies.items():
+                self._postings.setdefault(token, {})[key] = frequency
+            self._total_length += document.length
+            while len(self._documents) > self.max_documents:
+                self._remove(next(iter(self._documents)))
+        return True
+
+    def add_many(self, items: Iterable[Dict[str, Any]]) -> int:
+        return sum(1 for item in items if self.add(item))
+
+    def _remove(self, key: str):
+        document = self._documents.pop(key, None)
+        if document is None:
+            return
+        for token in document.frequencies:
+            posting = self._postings.get(token)
+            if posting is not None:
+                posting.pop(key, None)
+                if not posting:
+                    del self._postings[token]
+        self._total_length -= document.length
+
+    def clear(self):
+        with self._lock:
+            self._documents.clear()
+            self._postings.clear()
+            self._total_length = 0.0
+
+    def search(self, query: str, content_type: str = "all", limit: int = 20) -> SearchHits:
+        """
+        Recherche BM25 avec bonus de titre et de popularité
+
+        Les termes sont traités du plus rare au plus fréquent ; un terme présent
+        dans plus de FULL_SCAN_FRACTION des titres n'ajoute pas de candidats, il
+        ne fait que compléter le score de ceux des termes plus rares.
+
+        Args:
+            query: Texte recherché
+            content_type: 'movie', 'tv' ou 'all'
+            limit: Nombre maximum de résultats
+
+        Returns:
+            SearchHits(results, confident, total) ; les doublons entre
+            fournisseurs (même titre, année et type) sont retirés des résultats
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return SearchHits([], False, 0)
+
+        with self._lock:
+            documents = self._documents
+            count = len(documents)
+            if not count:
+                return SearchHits([], False, 0)
+            average_length = self._total_length / count
+            postings = sorted((self._postings.get(term, {}) for term in terms), key=len)
+            scores = {}
+            matched = {}
+            for rank, posting in enumerate(postings):
+                if not posting:
+                    continue
+                idf = math.log(1 + (count - len(posting) + 0.5) / (len(posting) + 0.5))
+                if rank and scores and len(posting) > FULL_SCAN_FRACTION * count:
+                    pairs = ((key, posting[key]) for key in list(scores) if key in posting)
+                else:
+                    pairs = posting.items()
+                for key, frequency in pairs:
+                    norm = frequency + BM25_K1 * (1 - BM25_B + BM25_B * documents[key].length / average_length)
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (BM25_K1 + 1) / norm
+                    matched[key] = matched.get(key, 0) + 1
+
+            ranked = []
+            for key, score in scores.items():
+                document = documents[key]
+                if content_type in ("movie", "tv") and document.item.get("media_type") != content_type:
+                    continue
+                if document.title_terms.issuperset(terms):
+                    score *= TITLE_MATCH_BOOST
+                ranked.append((score * document.boost, key))
+            total = len(ranked)
+
+            # Les doublons sont rares : quelques candidats de plus que `limit` suffisent
+            results = []
+            seen = set()
+            complete = False
+            for score, key in heapq.nlargest(limit * 2 + self.min_results, ranked):
+                document = documents[key]
+                if document.identity in seen:
+                    total -= 1
+                    continue
+                seen.add(document.identity)
+                if not results:
+                    complete = matched[key] == len(terms)
+                if len(results) < limit:
+                    results.append(dict(document.item, search_score=round(score, 4)))
+
+        confident = complete and total >= min(self.min_results, limit)
+        return SearchHits(results, confident, total)
+
+    def load_catalog(self, path: str) -> int:
+        """Indexe un catalogue JSONL au format TMDb (benchmarks/generate_data.py, export TMDb)"""
+        return self.add_many(read_catalog(path))
+
+def read_catalog(path: str) -> Iterator[Dict[str, Any]]:
+    """Éléments d'un catalogue JSONL au format TMDb, au format des résultats de recherche"""
+    from src.api_providers.tmdb_provider import TMDbProvider
+
+    formatter = TMDbProvider("")
+    with open(path, "rb") as f:
+        for line in f:
+            if line.strip():
+                item = formatter._format_search_result(json_codec.loads(line))
+                if item:
+                    yield item
+
+search_index = SearchIndex()
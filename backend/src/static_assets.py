@@ -0,0 +1,181 @@
+"""
+Service des fichiers statiques du frontend
+
+Au build, un manifeste (static/manifest.json) recense chaque fichier avec son
+ETag et ses variantes précompressées (.gz/.br). Au démarrage, le manifeste est
+chargé une fois : aucune requête ne touche le disque pour savoir si un fichier
+existe. Les fichiers au nom haché (app.be0d6ff9.js) sont servis avec un cache
+"immutable" d'un an ; index.html est revalidé à chaque visite.
+
+Déchargement optionnel (STATIC_OFFLOAD) : avec "x-accel", nginx envoie le
+fichier (en-tête X-Accel-Redirect) ; avec "x-sendfile", Apache/lighttpd.
+
+Usage (build) :
+    python -m src.static_assets build [dossier_static]
+"""
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import re
+import sys
+from typing import Any, Dict, Optional
+
+from src.compression import brotli, choose_encoding
+
+MANIFEST_NAME = "manifest.json"
+
+# Extensions compressibles (les images et polices sont déjà compressées)
+COMPRESSIBLE = (".html", ".js", ".css", ".map", ".json", ".svg", ".txt", ".xml", ".ico")
+MIN_COMPRESS_SIZE = 512
+
+# Noms produits par le build avec un hash de contenu : app.be0d6ff9.js
+HASHED_NAME = re.compile(r"\.[0-9a-f]{8,}\.[a-z0-9]+$")
+
+IMMUTABLE_CACHE = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE = "no-cache"
+
+_VARIANT_SUFFIX = {"br": ".br", "gzip": ".gz"}
+
+def build_manifest(static_dir: str, precompress: bool = True) -> Dict[str, Any]:
+    """
+    Recense les fichiers statiques et écrit leurs variantes précompressées
+
+    Args:
+        static_dir: Dossier des fichiers du frontend
+        precompress: Écrire les fichiers .gz/.br à côté des originaux
+
+    Returns:
+        Manifeste {chemin relatif: métadonnées}
+    """
+    manifest = {}
+    for root, _, files in os.walk(static_dir):
+        for name in sorted(files):
+            if name == MANIFEST_NAME or name.endswith((".gz", ".br")):
+                continue
+            full_path = os.path.join(root, name)
+            rel_path = os.path.relpath(full_path, static_dir).replace(os.sep, "/")
+            with open(full_path, "rb") as f:
+                data = f.read()
+
+            entry = {
+                "size": len(data),
+                "etag": hashlib.sha256(data).hexdigest()[:32],
+                "content_type": mimetypes.guess_type(name)[0] or "application/octet-stream",
+                "immutable": bool(HASHED_NAME.search(name)),
+                "variants": {},
+            }
+
+            if precompress and name.endswith(COMPRESSIBLE) and len(data) >= MIN_COMPRESS_SIZE:
+                variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+                if brotli is not None:
+                    variants["br"] = brotli.compress(data, quality=11)
+                for encoding, compressed in variants.items():
+                    # Variante inutile si elle ne fait pas gagner au moins 5 %
+                    if len(compressed) < len(data) * 0.95:
+                        with open(full_path + _VARIANT_SUFFIX[encoding], "wb") as f:
+                            f.write(compressed)
+                        entry["variants"][encoding] = len(compressed)
+
+            manifest[rel_path] = entry
+    return manifest
+
+def write_manifest(static_dir: str) -> Dict[str, Any]:
+    manifest = build_manifest(static_dir)
+    with open(os.path.join(static_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+class StaticAssets:
+    """Fichiers du frontend servis depuis le manifeste chargé au démarrage"""
+
+    def __init__(self, static_dir: str, offload: Optional[str] = None, accel_prefix: Optional[str] = None):
+        self.static_dir = static_dir
+        self.offload = (offload if offload is not None else os.environ.get("STATIC_OFFLOAD", "")).lower()
+        self.accel_prefix = (accel_prefix or os.environ.get("STATIC_ACCEL_PREFIX", "/_static/")).rstrip("/") + "/"
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self) -> Dict[str, Any]:
+        path = os.path.join(self.static_dir, MANIFEST_NAME)
+        try:
+            with open(path, encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            # Pas de build avec manifeste : inventaire au démarrage, sans variantes
+            if os.path.isdir(self.static_dir):
+                return build_manifest(self.static_dir, precompress=False)
+            return {}
+        except (OSError, ValueError) as e:
+            print(f"❌ Manifeste statique illisible: {e}")
+            return {}
+
+    def serve(self, path: str, request):
+        """
+        Réponse Flask pour `path`, index.html pour les routes de la SPA,
+        ou None si aucun frontend n'est installé
+        """
+        entry = self.manifest.get(path) if path else None
+        if entry is None:
+            path = "index.html"
+            entry = self.manifest.get(path)
+            if entry is None:
+                return None
+
+        return self._file_response(path, entry, request)
+
+    def _file_response(self, path: str, entry: Dict[str, Any], request):
+        from flask import Response, send_file
+
+        etag = entry["etag"]
+        cache_control = IMMUTABLE_CACHE if entry["immutable"] else REVALIDATE_CACHE
+
+        encoding = None
+        if entry["variants"]:
+            encoding = choose_encoding(request.headers.get("Accept-Encoding"), available=tuple(entry["variants"]))
+
+        headers = {"Cache-Control": cache_control}
+        if entry["variants"]:
+            headers["Vary"] = "Accept-Encoding"
+        if encoding:
+            headers["Content-Encoding"] = encoding
+            etag = f"{etag}-{encoding}"
+
+        if request.if_none_match.contains(etag):
+            return Response(status=304, headers={**headers, "ETag": f'"{etag}"'})
+
+        file_path = path + _VARIANT_SUFFIX[encoding] if encoding else path
+
+        if self.offload == "x-accel":
+            # nginx lit le fichier lui-même (location interne pointant sur le dossier static)
+            headers["X-Accel-Redirect"] = self.accel_prefix + file_path
+            headers["ETag"] = f'"{etag}"'
+            return Response(status=200, headers=headers, content_type=entry["content_type"])
+
+        # Avec USE_X_SENDFILE (STATIC_OFFLOAD=x-sendfile), Flask n'envoie que l'en-tête X-Sendfile
+        response = send_file(
+            os.path.abspath(os.path.join(self.static_dir, file_path)),
+            mimetype=entry["content_type"],
+            etag=etag,
+            conditional=True,
+            max_age=None,
+        )
+        response.headers.update(headers)
+        return response
+
+def main():
+    if len(sys.argv) < 2 or sys.argv[1] != "build":
+        print(__doc__)
+        sys.exit(1)
+
+    static_dir = sys.argv[2] if len(sys.argv) > 2 else os.path.join(
+        os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "static"
+    )
+    manifest = write_manifest(static_dir)
+    original = sum(e["size"] for e in manifest.values())
+    compressed = sum(min([e["size"], *e["variants"].values()]) for e in manifest.values())
+    print(f"✅ {len(manifest)} fichiers, {original // 1024} Ko -> {compressed // 1024} Ko précompressés")
+
+if __name__ == "__main__":
+    main()
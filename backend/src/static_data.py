@@ -0,0 +1,99 @@
+"""
+Données de référence en lecture seule
+Chargées une fois dans le master gunicorn (preload) puis partagées par les
+workers : structures immuables (tuples, frozenset, MappingProxyType) créées à
+l'import, jamais modifiées ensuite, pour que leurs pages mémoire restent
+partagées après le fork (voir src/memory.py)
+"""
+
+from types import MappingProxyType
+
+# Genres standards avec leurs variations
+GENRE_VARIATIONS = MappingProxyType({
+    "action": ("action", "adventure", "aventure"),
+    "comedy": ("comedy", "comédie", "comedie"),
+    "drama": ("drama", "drame"),
+    "horror": ("horror", "horreur", "épouvante"),
+    "thriller": ("thriller", "suspense"),
+    "romance": ("romance", "romantique"),
+    "science_fiction": ("science fiction", "sci-fi", "science-fiction", "sf"),
+    "fantasy": ("fantasy", "fantastique", "fantaisie"),
+    "animation": ("animation", "anime", "animé"),
+    "documentary": ("documentary", "documentaire"),
+    "crime": ("crime", "criminel", "polar"),
+    "mystery": ("mystery", "mystère", "mystere"),
+    "war": ("war", "guerre"),
+    "western": ("western",),
+    "music": ("music", "musical", "musique"),
+    "family": ("family", "famille", "familial"),
+    "biography": ("biography", "biographie", "biopic"),
+})
+
+# Index inverse variation -> genre standard (première occurrence, comme un parcours de GENRE_VARIATIONS)
+_genre_lookup = {}
+for _standard, _variations in GENRE_VARIATIONS.items():
+    for _variation in _variations:
+        _genre_lookup.setdefault(_variation, _standard)
+GENRE_LOOKUP = MappingProxyType(_genre_lookup)
+del _genre_lookup, _standard, _variations, _variation
+
+# Genres TMDb (id -> nom) pour les résultats qui n'ont que genre_ids
+TMDB_GENRE_NAMES = MappingProxyType({
+    28: "Action", 18: "Drama", 35: "Comedy", 80: "Crime",
+    99: "Documentary", 878: "Science Fiction", 53: "Thriller",
+    16: "Animation", 10749: "Romance", 27: "Horror",
+})
+
+# Sous-ensemble utilisé par le scoring (noms en minuscules)
+TMDB_SCORING_GENRES = MappingProxyType({
+    gid: TMDB_GENRE_NAMES[gid].lower() for gid in (28, 18, 35, 80, 99, 878, 53)
+})
+
+# Mapping des noms de services vers des identifiants normalisés
+SERVICE_MAPPING = MappingProxyType({
+    # Netflix variations
+    "netflix": "netflix",
+    "netflix france": "netflix",
+    "netflix fr": "netflix",
+
+    # Disney+ variations
+    "disney+": "disney",
+    "disney plus": "disney",
+    "disney+ france": "disney",
+    "walt disney pictures": "disney",
+
+    # Amazon Prime variations
+    "amazon prime video": "amazon",
+    "amazon prime": "amazon",
+    "prime video": "amazon",
+    "amazon": "amazon",
+
+    # HBO variations
+    "hbo max": "hbo",
+    "hbo": "hbo",
+    "hbo france": "hbo",
+
+    # Apple TV+ variations
+    "apple tv+": "apple",
+    "apple tv plus": "apple",
+    "apple": "apple",
+
+    # Paramount+ variations
+    "paramount+": "paramount",
+    "paramount plus": "paramount",
+    "paramount": "paramount",
+
+    # Autres services
+    "hulu": "hulu",
+    "peacock": "peacock"
+})
+
+SUPPORTED_SERVICES = frozenset(SERVICE_MAPPING.values())
+
+# Genres proposés dans l'interface
+DEFAULT_GENRES = (
+    "Action", "Aventure", "Animation", "Comédie", "Crime",
+    "Documentaire", "Drame", "Famille", "Fantaisie", "Histoire",
+    "Horreur", "Musique", "Mystère", "Romance", "Science-Fiction",
+    "Thriller", "Guerre", "Western",
+)
@@ -0,0 +1,369 @@
+"""
+Suggestions de titres pendant la saisie (/api/search/suggest)
+Tableau trié en mémoire des titres normalisés (mêmes règles que l'index de
+recherche : minuscules, sans accents ni ponctuation), interrogé par
+recherche dichotomique sur le préfixe saisi. Chaque titre est aussi indexé à
+partir de ses premiers mots significatifs : « masque » propose « Le Masque
+de Zorro ».
+
+- Classement par popularité ; un préfixe très court (« l ») correspond à des
+  dizaines de milliers d'entrées : son classement (SUGGEST_TOP premiers) est
+  calculé une fois puis gardé en cache (SUGGEST_CACHE_SIZE préfixes).
+- Mise à jour incrémentale : les titres vus chez les fournisseurs (recherches,
+  tendances) sont insérés à leur place dans le tableau et dans les
+  classements en cache ; les gros lots (catalogue) sont fusionnés par un seul
+  tri et vident les classements.
+- Taille bornée (SUGGEST_MAX_TITLES) : au-delà, les titres les moins
+  populaires sont retirés par lots de 10 %.
+"""
+
+import bisect
+import heapq
+import os
+import re
+import threading
+from collections import OrderedDict
+from itertools import islice
+from typing import Any, Dict, Iterable, List, Optional
+
+from src.search_index import STOPWORDS, document_key, fold
+
+SUGGEST_MAX_TITLES = int(os.environ.get("SUGGEST_MAX_TITLES", "200000"))
+# Préfixes courants dont le classement est gardé en mémoire
+SUGGEST_CACHE_SIZE = int(os.environ.get("SUGGEST_CACHE_SIZE", "4096"))
+# Au-delà de ce nombre d'entrées, le classement d'un préfixe est gardé en cache
+SUGGEST_SCAN_LIMIT = 512
+# Titres gardés par classement (de quoi écarter les doublons d'un limit de 20)
+SUGGEST_TOP = 40
+# Débuts de saisie indexés par titre : le titre entier puis ses premiers mots significatifs
+SUGGEST_WORD_STARTS = 3
+# Longueur indexée des clés (au-delà, le préfixe saisi est tronqué)
+SUGGEST_KEY_LENGTH = 48
+# Lot d'insertion au-delà duquel le tableau est retrié plutôt que complété entrée par entrée
+BULK_INSERT = 64
+EVICTION_FRACTION = 0.1
+
+_WORD = re.compile(r"[a-z0-9]+")
+_SEPARATOR = "\x00"
+# Caractères d'une clé normalisée, et un caractère supérieur à tous
+_ALPHABET = " 0123456789abcdefghijklmnopqrstuvwxyz"
+_UPPER = "\x7f"
+
+def normalize_title(text: Optional[str]) -> str:
+    """Titre ou saisie normalisé : mots en minuscules sans accents, séparés par une espace"""
+    if not text:
+        return ""
+    return " ".join(_WORD.findall(fold(text)))[:SUGGEST_KEY_LENGTH]
+
+def title_prefixes(normalized: str) -> List[str]:
+    """Débuts de saisie indexés : titre entier et titre à partir de ses premiers mots significatifs"""
+    words = normalized.split(" ")
+    prefixes = [normalized]
+    for position in range(1, len(words)):
+        if len(prefixes) >= SUGGEST_WORD_STARTS:
+            break
+        if words[position] not in STOPWORDS:
+            prefixes.append(" ".join(words[position:]))
+    return list(dict.fromkeys(prefixes))
+
+class _Title:
+    """Titre proposé et ses clés dans le tableau trié"""
+
+    __slots__ = ("key", "id", "title", "year", "media_type", "provider", "popularity", "poster_path",
+                 "keys", "identity")
+
+    def __init__(self, item: Dict[str, Any], key: str, normalized: str):
+        self.key = key
+        self.id = item["id"]
+        self.title = item["title"]
+        self.year = str(item.get("year") or "")
+        self.media_type = item.get("media_type", "movie")
+        self.provider = item.get("provider", "TMDb")
+        self.popularity = float(item.get("popularity") or 0)
+        self.poster_path = item.get("poster_path")
+        self.keys = tuple(f"{prefix}{_SEPARATOR}{key}" for prefix in title_prefixes(normalized))
+        # Doublons entre fournisseurs : même titre, année et type
+        self.identity = (normalized, self.year, self.media_type)
+
+    def as_dict(self) -> Dict[str, Any]:
+        suggestion = {
+            "id": self.id,
+            "title": self.title,
+            "year": self.year,
+            "type": "movie" if self.media_type == "movie" else "series",
+            "provider": self.provider,
+            "popularity": self.popularity,
+        }
+        if self.poster_path:
+            suggestion["poster_url"] = f"https://image.tmdb.org/t/p/w92{self.poster_path}"
+        return suggestion
+
+def _rebuild(keys: List[str], added: List[str], removed: List[str], bulk: bool) -> List[str]:
+    """Copie triée de `keys`, avec les entrées `added` et sans les entrées `removed`"""
+    added.sort()
+    if bulk:
+        removed = set(removed)
+        rebuilt = [entry for entry in keys if entry not in removed] if removed else list(keys)
+        rebuilt.extend(added)
+        # Deux séquences triées : fusion linéaire par le tri de Python
+        rebuilt.sort()
+        return rebuilt
+
+    # Petit lot : positions par dichotomie, puis copie des tranches intermédiaires
+    # (insertions avant suppression à une même position)
+    changes = [(bisect.bisect_left(keys, entry), 0, entry) for entry in added]
+    for entry in removed:
+        position = bisect.bisect_left(keys, entry)
+        if position < len(keys) and keys[position] == entry:
+            changes.append((position, 1, entry))
+    changes.sort()
+    rebuilt = []
+    last = 0
+    for position, removal, entry in changes:
+        rebuilt += keys[last:position]
+        if removal:
+            last = position + 1
+        else:
+            rebuilt.append(entry)
+            last = position
+    rebuilt += keys[last:]
+    return rebuilt
+
+class SuggestIndex:
+    """Préfixes de titres triés, thread-safe, classés par popularité"""
+
+    def __init__(self, max_titles: int = SUGGEST_MAX_TITLES, cache_size: int = SUGGEST_CACHE_SIZE):
+        self.max_titles = max_titles
+        self.cache_size = cache_size
+        # clé de document -> _Title
+        self._titles = {}
+        # « préfixe\x00clé de document », triées ; jamais modifiée en place (copie
+        # sur écriture) : une lecture garde la liste prise sous le verrou
+        self._keys = []
+        # (préfixe, type) -> [(-popularité, clé de document)] triés, pour les préfixes courants
+        self._top = OrderedDict()
+        # Incrémentée à chaque modification : un classement calculé hors verrou n'est gardé que s'il est à jour
+        self._version = 0
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._titles)
+
+    def add(self, item: Dict[str, Any]) -> bool:
+        """Ajoute (ou met à jour) un titre ; retourne False s'il n'a ni id ni titre"""
+        return self.add_many([item]) == 1
+
+    def add_many(self, items: Iterable[Dict[str, Any]], batch_size: int = 10000) -> int:
+        """Ajoute des titres par lots (un catalogue entier peut être passé en itérateur)"""
+        items = iter(items)
+        count = 0
+        while True:
+            batch = list(islice(items, batch_size))
+            if not batch:
+                break
+            count += self._add_batch(batch)
+        if count > BULK_INSERT:
+            # Les gros lots vident les classements : recalcul avant les premières saisies
+            self.warm()
+        return count
+
+    def _add_batch(self, items: List[Dict[str, Any]]) -> int:
+        # Un même titre plusieurs fois dans le lot : la dernière version l'emporte
+        titles = {}
+        for item in items:
+            key = document_key(item)
+            normalized = normalize_title(item.get("title"))
+            if key is not None and normalized:
+                titles[key] = _Title(item, key, normalized)
+
+        with self._lock:
+            self._version += 1
+            bulk = len(titles) > BULK_INSERT
+            if bulk:
+                # Gros lot (catalogue) : les classements en cache sont recalculés à la demande
+                self._top.clear()
+            new_keys = []
+            removed_keys = []
+            for key, title in titles.items():
+                current = self._titles.get(key)
+                if current is not None and current.keys == title.keys:
+                    # Même titre : seule la popularité peut changer
+                    if current.popularity != title.popularity:
+                        self._invalidate(current)
+                        current.popularity = title.popularity
+                        self._promote(current)
+                    continue
+                if current is not None:
+                    removed_keys.extend(self._remove(key))
+                self._titles[key] = title
+                new_keys.extend(title.keys)
+                if not bulk:
+                    self._promote(title)
+
+            if new_keys or removed_keys:
+                # Nouvelle liste, remplacée d'un coup : les lectures en cours gardent l'ancienne
+                self._keys = _rebuild(self._keys, new_keys, removed_keys, bulk)
+
+            if len(self._titles) > self.max_titles:
+                self._evict(len(self._titles) - int(self.max_titles * (1 - EVICTION_FRACTION)))
+        return len(titles)
+
+    def _cached_rankings(self, title: _Title):
+        """Classements en cache dont le préfixe correspond au titre"""
+        if not self._top:
+            return
+        for entry in title.keys:
+            prefix = entry.partition(_SEPARATOR)[0]
+            for length in range(1, len(prefix) + 1):
+                for content_type in ("all", title.media_type):
+                    cache_key = (prefix[:length], content_type)
+                    ranking = self._top.get(cache_key)
+                    if ranking is not None:
+                        yield cache_key, ranking
+
+    def _promote(self, title: _Title):
+        """Place un titre nouveau (ou plus populaire) dans les classements en cache"""
+        entry = (-title.popularity, title.key)
+        for _, ranking in self._cached_rankings(title):
+            if entry in ranking:
+                continue
+            if len(ranking) < SUGGEST_TOP or entry < ranking[-1]:
+                bisect.insort(ranking, entry)
+                if len(ranking) > SUGGEST_TOP:
+                    ranking.pop()
+
+    def _invalidate(self, title: _Title):
+        """Oublie les classements en cache où figure un titre retiré ou moins populaire"""
+        entry = (-title.popularity, title.key)
+        stale = [cache_key for cache_key, ranking in self._cached_rankings(title) if entry in ranking]
+        for cache_key in stale:
+            self._top.pop(cache_key, None)
+
+    def _remove(self, key: str) -> tuple:
+        """Retire un titre ; retourne ses entrées, à retirer du tableau par l'appelant"""
+        title = self._titles.pop(key, None)
+        if title is None:
+            return ()
+        self._invalidate(title)
+        return title.keys
+
+    def _evict(self, count: int):
+        """Retire les `count` titres les moins populaires (une seule passe sur le tableau)"""
+        removed = {key for _, key in heapq.nsmallest(count, ((title.popularity, key)
+                                                           for key, title in self._titles.items()))}
+        for key in removed:
+            del self._titles[key]
+        self._keys = [entry for entry in self._keys if entry.partition(_SEPARATOR)[2] not in removed]
+        self._top.clear()
+
+    def clear(self):
+        with self._lock:
+            self._version += 1
+            self._titles.clear()
+            self._keys = []
+            self._top.clear()
+
+    def _ranking(self, prefix: str, content_type: str) -> List[tuple]:
+        """
+        (-popularité, clé) des SUGGEST_TOP titres les plus populaires du préfixe
+
+        Calculé hors du verrou (les autres saisies ne l'attendent pas) ; les
+        classements des préfixes courants ne sont gardés en cache que si aucun
+        titre n'a été ajouté entre-temps.
+        """
+        cache_key = (prefix, content_type)
+        with self._lock:
+            ranking = self._top.get(cache_key)
+            if ranking is not None:
+                self._top.move_to_end(cache_key)
+                return list(ranking)
+            version = self._version
+            keys = self._keys
+
+        computed = {}
+        ranking = self._compute(prefix, content_type, computed, keys)
+        if computed:
+            with self._lock:
+                if version == self._version:
+                    self._top.update(computed)
+                    while len(self._top) > self.cache_size:
+                        self._top.popitem(last=False)
+        return ranking
+
+    def _compute(self, prefix: str, content_type: str, computed: Dict[tuple, List[tuple]],
+                 keys: List[str]) -> List[tuple]:
+        """
+        Classement d'un préfixe dans `keys` (tableau pris sous le verrou) :
+        parcours direct d'un petit intervalle, sinon fusion des classements
+        des préfixes d'un caractère de plus (calculés récursivement et ajoutés
+        à `computed`)
+        """
+        cache_key = (prefix, content_type)
+        ranking = computed.get(cache_key)
+        if ranking is not None:
+            return ranking
+        with self._lock:
+            ranking = self._top.get(cache_key)
+            if ranking is not None:
+                return list(ranking)
+
+        start = bisect.bisect_left(keys, prefix)
+        end = bisect.bisect_left(keys, prefix + _UPPER, start)
+        if end - start <= SUGGEST_SCAN_LIMIT:
+            return self._scan(keys[start:end], content_type)
+
+        # Titres égaux au préfixe (« préfixe\x00... », en tête de l'intervalle), puis un caractère de plus
+        candidates = set(self._scan(keys[start:bisect.bisect_left(keys, prefix + "\x01", start)], content_type))
+        for char in _ALPHABET:
+            candidates.update(self._compute(prefix + char, content_type, computed, keys))
+        ranking = heapq.nsmallest(SUGGEST_TOP, candidates)
+        computed[cache_key] = ranking
+        return ranking
+
+    def _scan(self, entries: List[str], content_type: str) -> List[tuple]:
+        titles = self._titles
+        candidates = (titles.get(entry.partition(_SEPARATOR)[2]) for entry in entries)
+        return heapq.nsmallest(SUGGEST_TOP, {
+            (-title.popularity, title.key) for title in candidates
+            if title is not None and (content_type == "all" or title.media_type == content_type)
+        })
+
+    def warm(self) -> int:
+        """Calcule d'avance les classements de tous les préfixes courants (tous types) ; retourne leur nombre"""
+        for char in _ALPHABET:
+            self._ranking(char, "all")
+        return len(self._top)
+
+    def suggest(self, query: str, content_type: str = "all", limit: int = 8) -> List[Dict[str, Any]]:
+        """
+        Titres commençant par la saisie (ou dont un mot significatif commence
+        par la saisie), du plus populaire au moins populaire
+
+        Args:
+            query: Début de titre saisi
+            content_type: 'movie', 'tv' ou 'all'
+            limit: Nombre maximum de suggestions (SUGGEST_TOP / 2 au plus)
+
+        Returns:
+            Liste de suggestions (id, title, year, type, provider, popularity,
+            poster_url), sans doublons entre fournisseurs
+        """
+        prefix = normalize_title(query)
+        if not prefix or limit < 1:
+            return []
+        if content_type not in ("movie", "tv"):
+            content_type = "all"
+
+        suggestions = []
+        seen = set()
+        for _, key in self._ranking(prefix, content_type):
+            title = self._titles.get(key)
+            if title is None or title.identity in seen:
+                continue
+            seen.add(title.identity)
+            suggestions.append(title.as_dict())
+            if len(suggestions) == limit:
+                break
+        return suggestions
+
+suggest_index = SuggestIndex()
@@ -0,0 +1,259 @@
+"""
+Traces par requête du pipeline de recommandation
+
+Chaque requête /api/... ouvre une trace (identifiant = X-Request-ID) ; les
+étapes du pipeline y ajoutent des spans : recherches par genre et par
+mot-clé, tendances, détails TMDb, enrichissement Watchmode, scoring,
+formatage, appels HTTP aux fournisseurs. Les spans ouverts dans les tâches
+parallèles (src/concurrency.py) rejoignent la trace de la requête.
+
+En fin de requête :
+  - l'en-tête Server-Timing donne la durée de chaque étape (temps réel
+    pendant lequel l'étape était active, appels parallèles confondus) ;
+  - les TRACE_SLOWEST traces les plus lentes des TRACE_RETENTION_SECONDS
+    dernières secondes sont gardées pour GET /api/traces.
+
+Hors requête (scripts, tests), span() ne fait rien.
+"""
+
+import contextvars
+import heapq
+import itertools
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+from src import metrics
+
+# Traces les plus lentes gardées par worker, et pendant combien de temps
+TRACE_SLOWEST = int(os.environ.get("TRACE_SLOWEST", "20"))
+TRACE_RETENTION_SECONDS = int(os.environ.get("TRACE_RETENTION_SECONDS", "900"))
+# Borne du nombre de spans d'une trace (une requête pathologique reste lisible)
+MAX_SPANS = 500
+
+_current_trace = contextvars.ContextVar("trace", default=None)
+_current_span = contextvars.ContextVar("span", default=None)
+
+class Trace:
+    """Spans d'une requête ; add() est appelé depuis plusieurs threads ou greenlets"""
+
+    def __init__(self, trace_id: str, name: str):
+        self.trace_id = trace_id
+        self.name = name
+        self.started_at = time.time()
+        self.start = time.perf_counter()
+        self.duration: Optional[float] = None
+        self.status: Optional[int] = None
+        self.spans: List[Dict[str, Any]] = []
+        self.dropped = 0
+        self._ids = itertools.count(1)
+        self._lock = threading.Lock()
+
+    def next_span_id(self) -> int:
+        return next(self._ids)
+
+    def add(self, span_id: int, parent: Optional[int], name: str, start: float, duration: float,
+            attrs: Dict[str, Any]):
+        with self._lock:
+            if len(self.spans) >= MAX_SPANS:
+                self.dropped += 1
+                return
+            self.spans.append({
+                "id": span_id,
+                "parent": parent,
+                "name": name,
+                "start": start - self.start,
+                "duration": duration,
+                "attrs": attrs,
+            })
+
+    def finish(self, status: Optional[int] = None) -> float:
+        self.duration = time.perf_counter() - self.start
+        self.status = status
+        return self.duration
+
+    def stage_timings(self) -> List[Dict[str, Any]]:
+        """
+        Durée par nom d'étape : union des intervalles de ses spans (des appels
+        parallèles ne comptent qu'une fois), dans l'ordre de première apparition
+        """
+        with self._lock:
+            spans = list(self.spans)
+        grouped: Dict[str, List[tuple]] = {}
+        for span in sorted(spans, key=lambda span: span["start"]):
+            grouped.setdefault(span["name"], []).append((span["start"], span["start"] + span["duration"]))
+
+        timings = []
+        for name, intervals in grouped.items():
+            total, current_start, current_end = 0.0, None, None
+            for start, end in intervals:
+                if current_end is None or start > current_end:
+                    if current_end is not None:
+                        total += current_end - current_start
+                    current_start, current_end = start, end
+                else:
+                    current_end = max(current_end, end)
+            total += current_end - current_start
+            timings.append({"name": name, "duration": total, "count": len(intervals)})
+        return timings
+
+    def server_timing(self) -> str:
+        """Valeur de l'en-tête Server-Timing (durées en millisecondes)"""
+        parts = []
+        for timing in self.stage_timings():
+            part = f"{timing['name']};dur={timing['duration'] * 1000:.1f}"
+            if timing["count"] > 1:
+                part += f';desc="{timing["count"]} appels"'
+            parts.append(part)
+        if self.duration is not None:
+            parts.append(f"total;dur={self.duration * 1000:.1f}")
+        return ", ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        with self._lock:
+            spans = sorted(self.spans, key=lambda span: span["start"])
+        return {
+            "trace_id": self.trace_id,
+            "name": self.name,
+            "started_at": self.started_at,
+            "duration_ms": round((self.duration or 0) * 1000, 1),
+            "status": self.status,
+            "stages": [
+                {"name": timing["name"], "duration_ms": round(timing["duration"] * 1000, 1), "count": timing["count"]}
+                for timing in self.stage_timings()
+            ],
+            "spans": [
+                {
+                    "id": span["id"],
+                    "parent": span["parent"],
+                    "name": span["name"],
+                    "start_ms": round(span["start"] * 1000, 1),
+                    "duration_ms": round(span["duration"] * 1000, 1),
+                    **({"attrs": span["attrs"]} if span["attrs"] else {}),
+                }
+                for span in spans
+            ],
+            "dropped_spans": self.dropped,
+        }
+
+class SlowTraces:
+    """Les `capacity` traces les plus lentes parmi les plus récentes (tas borné)"""
+
+    def __init__(self, capacity: int = TRACE_SLOWEST, retention_seconds: int = TRACE_RETENTION_SECONDS):
+        self.capacity = capacity
+        self.retention_seconds = retention_seconds
+        self._heap: List[tuple] = []  # (durée, numéro, trace) : la plus rapide en tête
+        self._sequence = itertools.count()
+        self._lock = threading.Lock()
+
+    def _expire(self):
+        oldest = time.time() - self.retention_seconds
+        if any(trace.started_at < oldest for _, _, trace in self._heap):
+            self._heap = [entry for entry in self._heap if entry[2].started_at >= oldest]
+            heapq.heapify(self._heap)
+
+    def add(self, trace: Trace):
+        if self.capacity <= 0:
+            return
+        entry = (trace.duration or 0.0, next(self._sequence), trace)
+        with self._lock:
+            self._expire()
+            if len(self._heap) < self.capacity:
+                heapq.heappush(self._heap, entry)
+            elif entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def list(self) -> List[Dict[str, Any]]:
+        """Traces gardées, de la plus lente à la plus rapide"""
+        with self._lock:
+            self._expire()
+            traces = [trace for _, _, trace in sorted(self._heap, reverse=True)]
+        return [trace.to_dict() for trace in traces]
+
+    def clear(self):
+        with self._lock:
+            self._heap = []
+
+# Instance globale (une par processus worker)
+slow_traces = SlowTraces()
+
+def start_trace(trace_id: str, name: str) -> contextvars.Token:
+    """Ouvre la trace de la requête courante ; retourne le jeton pour finish_trace"""
+    return _current_trace.set(Trace(trace_id, name))
+
+def finish_trace(token: contextvars.Token, status: Optional[int] = None) -> Optional[Trace]:
+    """Ferme la trace ouverte par start_trace et la propose aux traces lentes"""
+    trace = _current_trace.get()
+    _current_trace.reset(token)
+    if trace is None:
+        return None
+    trace.finish(status)
+    slow_traces.add(trace)
+    return trace
+
+def current_trace() -> Optional[Trace]:
+    return _current_trace.get()
+
+@contextmanager
+def span(name: str, **attrs: Any) -> Iterator[None]:
+    """Mesure le bloc comme un span de la trace courante (sans effet hors trace)"""
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    span_id = trace.next_span_id()
+    parent = _current_span.get()
+    token = _current_span.set(span_id)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _current_span.reset(token)
+        trace.add(span_id, parent, name, start, time.perf_counter() - start, attrs)
+
+def record_span(name: str, start: float, duration: float, **attrs: Any):
+    """Ajoute un span déjà mesuré (callbacks, début et fin dans deux fonctions)"""
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add(trace.next_span_id(), _current_span.get(), name, start, duration, attrs)
+
+@contextmanager
+def stage(name: str, **attrs: Any) -> Iterator[None]:
+    """Étape du pipeline : span de la trace et histogramme des métriques"""
+    start = time.perf_counter()
+    try:
+        with span(name, **attrs):
+            yield
+    finally:
+        metrics.stage_duration.observe(time.perf_counter() - start, stage=name)
+
+def init_tracing(app):
+    """Trace chaque requête /api/... et ajoute l'en-tête Server-Timing"""
+    from flask import request
+    from src.logging_config import request_id_var
+
+    @app.before_request
+    def open_trace():
+        if request.path.startswith("/api/"):
+            endpoint = request.url_rule.endpoint if request.url_rule is not None else "unmatched"
+            trace_id = request_id_var.get() or os.urandom(8).hex()
+            # Dans l'environ WSGI : les sous-requêtes d'un lot (/api/batch) partagent g
+            request.environ["trace_token"] = start_trace(trace_id, f"{request.method} {endpoint}")
+
+    @app.after_request
+    def close_trace(response):
+        token = request.environ.pop("trace_token", None)
+        if token is not None:
+            trace = finish_trace(token, response.status_code)
+            if trace is not None:
+                response.headers["Server-Timing"] = trace.server_timing()
+        return response
+
+    @app.teardown_request
+    def drop_trace(exc=None):
+        # Requête interrompue par une exception : after_request n'a pas été appelé
+        token = request.environ.pop("trace_token", None)
+        if token is not None:
+            finish_trace(token, 500)
@@ -0,0 +1,142 @@
+"""
+Tests du contrôle d'admission des routes coûteuses
+"""
+
+import sys
+import os
+import asyncio
+import json
+import threading
+import time
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.admission import AdmissionLimit, Overloaded
+from src.response_cache import ResponseCache
+
+def test_limit_queues_then_sheds():
+    """1 place, 1 en file : la 3e requête est refusée tout de suite, la 2e attend"""
+    limit = AdmissionLimit("test", max_concurrent=1, max_queue=1, queue_timeout=1.0)
+    release = threading.Event()
+    results = []
+
+    def slow():
+        with limit.slot():
+            release.wait(2)
+        results.append("slow")
+
+    def queued():
+        with limit.slot():
+            results.append("queued")
+
+    first = threading.Thread(target=slow)
+    first.start()
+    time.sleep(0.05)
+    second = threading.Thread(target=queued)
+    second.start()
+    time.sleep(0.05)
+
+    try:
+        with limit.slot():
+            raise AssertionError("La file pleine aurait dû refuser la requête")
+    except Overloaded as e:
+        assert 1 <= e.retry_after <= 30
+
+    release.set()
+    first.join()
+    second.join()
+    assert results == ["slow", "queued"]
+    stats = limit.stats()
+    assert stats["admitted"] == 2 and stats["queued"] == 1 and stats["shed_queue_full"] == 1
+    assert stats["active"] == 0 and stats["waiting"] == 0
+
+def test_queue_timeout_sheds():
+    limit = AdmissionLimit("test", max_concurrent=1, max_queue=4, queue_timeout=0.05)
+    assert limit.acquire()
+    assert not limit.acquire()
+    assert limit.stats()["shed_timeout"] == 1
+    limit.release(0.1)
+
+def test_latest_response_survives_version_change():
+    """La dernière réponse reste disponible (mode dégradé) après un changement de version"""
+    cache = ResponseCache()
+    entry = cache.store("search|a|all|20|c1", "c1", {"results": [{"id": 1}]}, base_key="search|a|all|20")
+    assert cache.get("search|a|all|20|c2") is None
+    assert cache.latest("search|a|all|20") is entry
+
+class StubEngine:
+    """Moteur simulé : version modifiable, recherches comptées"""
+
+    def __init__(self):
+        self.response_cache = ResponseCache()
+        self.version = "c1"
+        self.searches = []
+
+    def response_version(self, user_id=None):
+        return self.version
+
+    async def search_content_async(self, query, content_type="all", max_results=20):
+        self.searches.append(query)
+        return {"results": [{"id": 1, "title": query}], "query": query}
+
+def asgi_get(application, path, query, headers):
+    """Requête GET sur l'application ASGI : (statut, en-têtes, corps)"""
+    messages = []
+
+    async def receive():
+        return {"type": "http.request", "body": b""}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {"type": "http", "method": "GET", "path": path, "query_string": query.encode(),
+             "headers": [(key.encode(), value.encode()) for key, value in headers.items()]}
+    asyncio.run(application(scope, receive, send))
+    start, body = messages
+    return start["status"], {key.decode(): value.decode() for key, value in start["headers"]}, body["body"]
+
+def test_asgi_routes_use_admission_and_stale_fallback():
+    """Routes ASGI natives : calcul sous admission, réponse périmée ou 503 en cas de surcharge"""
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    from unittest import mock
+    import asgi
+    from api import db
+    from src.admission import admission
+    from src.auth import generate_jwt_token
+
+    with asgi.app.app_context():
+        db.create_all()
+    engine = StubEngine()
+    application = asgi.AsyncAPI(asgi.app, engine)
+    headers = {"authorization": f"Bearer {generate_jwt_token(1, 'alice')}"}
+    limit = AdmissionLimit("search", max_concurrent=1, max_queue=0, queue_timeout=0.05)
+
+    with mock.patch.dict(admission._limits, {"search": limit}):
+        status, _, body = asgi_get(application, "/api/search", "q=dune", headers)
+        assert status == 200 and json.loads(body)["query"] == "dune"
+        assert limit.stats()["admitted"] == 1 and limit.stats()["active"] == 0
+
+        # Nouvelle version et place occupée : dernière réponse connue, marquée périmée
+        engine.version = "c2"
+        assert limit.acquire()
+        try:
+            status, response_headers, body = asgi_get(application, "/api/search", "q=dune", headers)
+            assert status == 200 and response_headers["x-degraded"] == "stale"
+            assert json.loads(body)["query"] == "dune"
+
+            # Aucune réponse connue : 503 avec Retry-After
+            status, response_headers, body = asgi_get(application, "/api/search", "q=alien", headers)
+            assert status == 503 and int(response_headers["retry-after"]) >= 1
+            assert json.loads(body)["retry_after"] == int(response_headers["retry-after"])
+        finally:
+            limit.release(0.1)
+        assert engine.searches == ["dune"]
+        assert limit.stats()["served_stale"] == 1 and limit.stats()["shed_queue_full"] == 2
+
+if __name__ == "__main__":
+    test_limit_queues_then_sheds()
+    test_queue_timeout_sheds()
+    test_latest_response_survives_version_change()
+    test_asgi_routes_use_admission_and_stale_fallback()
+    print("✅ Tests du contrôle d'admission réussis")
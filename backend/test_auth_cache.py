@@ -0,0 +1,131 @@
+"""
+Tests du cache de tokens JWT vérifiés
+Vérifie qu'une série de requêtes avec le même token ne décode qu'une seule fois
+"""
+
+import sys
+import os
+from unittest import mock
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+import jwt
+from src.auth import generate_jwt_token, verify_jwt_token, revoke_token, token_cache, hash_token
+
+def test_token_decoded_once_per_page_load():
+    """Cinq appels API avec le même token ne déclenchent qu'un seul jwt.decode"""
+    token_cache.clear()
+    token = generate_jwt_token(42, "alice")
+
+    with mock.patch("jwt.decode", wraps=jwt.decode) as decode:
+        payloads = [verify_jwt_token(token) for _ in range(5)]
+
+    assert decode.call_count == 1
+    assert all(p["user_id"] == 42 for p in payloads)
+
+def test_revoked_token_is_rejected():
+    """Un token révoqué n'est plus accepté, même s'il était en cache"""
+    token_cache.clear()
+    token = generate_jwt_token(7, "bob")
+
+    assert verify_jwt_token(token) is not None
+    revoke_token(token)
+    assert verify_jwt_token(token) is None
+
+def test_revocation_hook_is_consulted_on_decode():
+    """Le hook de révocation (UserSession) est consulté lors d'un nouveau décodage"""
+    token_cache.clear()
+    token = generate_jwt_token(8, "carol")
+    revoked = {hash_token(token)}
+
+    token_cache.set_revocation_check(lambda token_hash: token_hash in revoked)
+    try:
+        assert verify_jwt_token(token) is None
+    finally:
+        token_cache.set_revocation_check(None)
+
+def test_revocation_check_fails_closed():
+    """Une erreur du hook de révocation (base injoignable) refuse le token"""
+    token_cache.clear()
+    token = generate_jwt_token(9, "dave")
+
+    def unreachable(token_hash):
+        raise RuntimeError("base injoignable")
+
+    token_cache.set_revocation_check(unreachable)
+    try:
+        assert verify_jwt_token(token) is None
+    finally:
+        token_cache.set_revocation_check(None)
+
+def test_db_revocation_check_outside_app_context():
+    """Le hook UserSession fonctionne hors contexte Flask (routes ASGI natives)"""
+    from datetime import datetime, timedelta
+    from flask import Flask
+    from models import db, User, UserSession
+    from src.middleware import init_auth_middleware
+
+    app = Flask(__name__)
+    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+    db.init_app(app)
+    init_auth_middleware(app)
+    token = generate_jwt_token(1, "erin")
+    with app.app_context():
+        db.create_all()
+        db.session.add(User(id=1, name="erin", email="erin@example.com", password_hash="x", password_salt="x"))
+        db.session.add(UserSession(user_id=1, token_hash=hash_token(token), is_active=False,
+                                   expires_at=datetime.utcnow() + timedelta(hours=1)))
+        db.session.commit()
+
+    # Oublie la révocation locale posée par l'événement SQLAlchemy : seule la base répond
+    token_cache.clear()
+    try:
+        assert verify_jwt_token(token) is None
+        assert verify_jwt_token(generate_jwt_token(1, "erin2")) is not None
+    finally:
+        token_cache.set_revocation_check(None)
+        token_cache.clear()
+
+def test_cache_is_bounded():
+    """Le cache ne dépasse pas sa taille maximale"""
+    token_cache.clear()
+    max_entries = token_cache.max_entries
+    token_cache.max_entries = 3
+    try:
+        for user_id in range(10):
+            verify_jwt_token(generate_jwt_token(user_id, f"user{user_id}"))
+        assert len(token_cache._entries) == 3
+    finally:
+        token_cache.max_entries = max_entries
+        token_cache.clear()
+
+def test_revocation_list_is_pruned_and_bounded():
+    """Les révocations expirées sont purgées et la liste locale reste bornée"""
+    import time
+    token_cache.clear()
+    max_entries = token_cache.max_entries
+    token_cache.max_entries = 3
+    try:
+        now = time.time()
+        token_cache.revoke("expire", expires_at=now - 1)
+        token_cache.revoke("a", expires_at=now + 10)
+        assert set(token_cache._revoked) == {"a"}
+
+        for i in range(5):
+            token_cache.revoke(f"t{i}", expires_at=now + 100 + i)
+        assert set(token_cache._revoked) == {"t2", "t3", "t4"}
+        assert token_cache.is_revoked("t4")
+    finally:
+        token_cache.max_entries = max_entries
+        token_cache.clear()
+
+if __name__ == "__main__":
+    test_token_decoded_once_per_page_load()
+    test_revoked_token_is_rejected()
+    test_revocation_hook_is_consulted_on_decode()
+    test_revocation_check_fails_closed()
+    test_db_revocation_check_outside_app_context()
+    test_cache_is_bounded()
+    test_revocation_list_is_pruned_and_bounded()
+    print("✅ Tests du cache de tokens réussis")
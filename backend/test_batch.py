@@ -0,0 +1,75 @@
+"""
+Tests des requêtes groupées (POST /api/batch)
+"""
+
+import sys
+import os
+import json
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, jsonify, request
+
+from src.batch import BatchError, BatchRunner, parse_batch
+
+def test_parse_batch_rejects_malformed_batches():
+    """Chemin hors /api, méthode inconnue ou lot trop grand -> BatchError"""
+    subrequests = parse_batch({"requests": [{"path": "/api/genres"}, {"id": "u", "path": "/api/users/1"}]})
+    assert [sub["id"] for sub in subrequests] == [0, "u"]
+    assert subrequests[0]["method"] == "GET"
+
+    for payload in (
+        [],
+        {"requests": []},
+        {"requests": [{"path": "/admin"}]},
+        {"requests": [{"path": "/api/genres?x=1"}]},
+        {"requests": [{"path": "/api/genres", "method": "PATCH"}]},
+        {"requests": [{"path": "/api/genres"}] * 100},
+    ):
+        try:
+            parse_batch(payload)
+        except BatchError:
+            continue
+        raise AssertionError(f"Lot accepté à tort : {payload}")
+
+def test_runner_keeps_order_and_statuses():
+    """Réponses dans l'ordre du lot, avec le statut de chaque sous-requête"""
+    app = Flask(__name__)
+
+    @app.route("/api/ping")
+    def ping():
+        return jsonify({"pong": request.args.get("n")})
+
+    @app.route("/api/items", methods=["POST"])
+    def create_item():
+        return jsonify(request.get_json()), 201
+
+    @app.route("/api/stream")
+    def stream():
+        return "flux"
+
+    @app.route("/<path:path>")
+    def frontend(path):
+        return "index"
+
+    runner = BatchRunner(app, concurrent_endpoints=["ping"], excluded_endpoints=["stream"],
+                         fallback_endpoint="frontend")
+    subrequests = parse_batch({"requests": [
+        {"path": "/api/ping", "params": {"n": 1}},
+        {"path": "/api/ping", "params": {"n": 2}},
+        {"path": "/api/items", "method": "POST", "body": {"name": "a"}},
+        {"path": "/api/stream"},
+        {"path": "/api/inconnue"},
+    ]})
+    with app.test_request_context("/api/batch", method="POST"):
+        responses = json.loads(runner.run(subrequests))["responses"]
+
+    assert [r["status"] for r in responses] == [200, 200, 201, 400, 404]
+    assert responses[0]["body"] == {"pong": "1"} and responses[1]["body"] == {"pong": "2"}
+    assert responses[2]["body"] == {"name": "a"}
+
+if __name__ == "__main__":
+    test_parse_batch_rejects_malformed_batches()
+    test_runner_keeps_order_and_statuses()
+    print("✅ Tests des requêtes groupées réussis")
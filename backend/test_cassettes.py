@@ -0,0 +1,124 @@
+"""
+Tests de l'enregistrement et du rejeu des appels des fournisseurs (cassettes)
+"""
+
+import sys
+import os
+import asyncio
+import gzip
+import json
+import tempfile
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import requests
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.api_providers import cassettes
+from src.api_providers.http_session import CassetteAdapter
+from src.api_providers.tmdb_provider import TMDbProvider
+
+class FakeTMDbHandler(BaseHTTPRequestHandler):
+    """Répond à /3/search/multi en renvoyant la clé d'API reçue (pour vérifier qu'elle est effacée)"""
+
+    def do_GET(self):
+        body = json.dumps({"page": 1, "echo": self.path, "results": [
+            {"id": 550, "media_type": "movie", "title": "Fight Club", "release_date": "1999-10-15",
+             "vote_average": 8.4, "overview": "Un employé de bureau insomniaque..."}
+        ]}).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json;charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+def provider_with_cassettes(base_url: str, mode: str, store: cassettes.CassetteStore) -> TMDbProvider:
+    provider = TMDbProvider("cle-secrete-1234", base_url=base_url)
+    session = requests.Session()
+    session.mount("http://", CassetteAdapter("TMDb", "/3", mode=mode, store=store))
+    provider._session, provider._session_pid = session, os.getpid()
+    return provider
+
+def test_record_then_replay_offline_without_api_key():
+    server = HTTPServer(("127.0.0.1", 0), FakeTMDbHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    base_url = f"http://127.0.0.1:{server.server_port}/3"
+
+    with tempfile.TemporaryDirectory() as directory:
+        try:
+            recorder = provider_with_cassettes(base_url, "record", cassettes.CassetteStore(directory))
+            recorded = recorder.search_content("fight club")
+        finally:
+            server.shutdown()
+            server.server_close()
+        assert recorded["results"][0]["title"] == "Fight Club"
+
+        # Cassette compressée, sans la clé d'API (ni dans la requête ni dans la réponse)
+        files = [os.path.join(root, name) for root, _, names in os.walk(directory) for name in names]
+        assert len(files) == 1 and files[0].endswith(".json.gz")
+        with gzip.open(files[0], "rb") as f:
+            raw = f.read().decode()
+        assert "cle-secrete-1234" not in raw and "***" in raw
+
+        # Serveur arrêté : la réponse vient de la cassette, même avec une autre clé
+        store = cassettes.CassetteStore(directory)
+        replayer = provider_with_cassettes(base_url, "replay", store)
+        replayer.api_key = "autre-cle-5678"
+        assert replayer.search_content("fight club") == recorded
+        assert store.stats["hits"] == 1
+
+        # Requête jamais enregistrée : erreur réseau, gérée par le fournisseur
+        assert "error" in replayer.search_content("inconnu")
+        assert store.stats["misses"] == 1
+
+def test_key_ignores_base_url_secret_and_parameter_order():
+    key, description = cassettes.normalize_request(
+        "get", "https://api.themoviedb.org/3/search/multi?query=dune&api_key=abc", {"page": 1},
+        provider="TMDb", base_path="/3"
+    )
+    # Serveur de substitution : autre hôte, autre URL de base
+    same, _ = cassettes.normalize_request(
+        "GET", "http://127.0.0.1:8900/tmdb/3/search/multi", {"page": "1", "api_key": "xyz", "query": "dune"},
+        provider="TMDb", base_path="/tmdb/3"
+    )
+    other, _ = cassettes.normalize_request("GET", "http://127.0.0.1/3/search/multi", {"query": "dune", "page": 2},
+                                           provider="TMDb", base_path="/3")
+    assert key == same and key != other
+    assert description == {"provider": "TMDb", "method": "GET", "path": "/search/multi",
+                           "query": "page=1&query=dune"}
+
+def test_async_replay_with_recorded_latency():
+    with tempfile.TemporaryDirectory() as directory:
+        store = cassettes.CassetteStore(directory, latency_factor=1.0)
+        key, description = cassettes.normalize_request("GET", "http://x/3/movie/550", {"api_key": "k"},
+                                                       provider="TMDb", base_path="/3")
+        store.save(key, description, 200, {"content-type": "application/json"}, b'{"id": 550}', 0.05)
+
+        calls = []
+        session = cassettes.CassetteClientSession(store, observer=lambda *args: calls.append(args),
+                                                  base_paths={"/tmdb/3": "TMDb", "/watchmode/v1": "Watchmode"})
+
+        async def fetch():
+            async with session.get("http://y/tmdb/3/movie/550", params={"api_key": "autre"}) as response:
+                return response.status, await response.json()
+
+        loop = asyncio.new_event_loop()
+        try:
+            started = loop.time()
+            assert loop.run_until_complete(fetch()) == (200, {"id": 550})
+            assert loop.time() - started >= 0.045
+        finally:
+            loop.close()
+        assert calls and calls[0][3] == 200
+
+if __name__ == "__main__":
+    test_record_then_replay_offline_without_api_key()
+    test_key_ignores_base_url_secret_and_parameter_order()
+    test_async_replay_with_recorded_latency()
+    print("✅ Tests des cassettes réussis")
@@ -0,0 +1,106 @@
+"""
+Tests du catalogue partagé (segment mmap versionné)
+"""
+
+import sys
+import os
+import tempfile
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.catalog_store import CatalogStore, publish
+
+def _make_store(path):
+    store = CatalogStore(path)
+    store.CHECK_INTERVAL = 0
+    return store
+
+def test_publish_and_lookup():
+    """Les caractéristiques publiées sont relues sans copie depuis le fichier"""
+    path = os.path.join(tempfile.mkdtemp(), "catalog.bin")
+    publish([
+        {"id": 42, "media_type": "tv", "rating": 8.5, "popularity": 120.0, "vote_count": 900,
+         "genre_ids": [18, 53], "streaming_services": ["netflix", "hbo"]},
+        {"id": 7, "rating": 6.0, "genre_ids": [28]},
+    ], path)
+
+    features = _make_store(path).current()
+    assert len(features) == 2
+    assert features.lookup(42, "tv") == {
+        "id": 42, "media_type": "tv", "rating": 8.5, "popularity": 120.0, "vote_count": 900,
+        "genre_ids": [18, 53], "streaming_services": ["netflix", "hbo"],
+    }
+    assert features.lookup(8) is None
+    # Sans type : film
+    assert features.lookup(42) is None and features.lookup(7)["rating"] == 6.0
+    assert not features.columns["rating"].flags.writeable
+
+def test_new_version_is_swapped_in():
+    """Une nouvelle version remplace l'ancienne sans invalider les lecteurs en cours"""
+    path = os.path.join(tempfile.mkdtemp(), "catalog.bin")
+    store = _make_store(path)
+    assert store.current() is None
+
+    publish([{"id": 1, "rating": 5.0}], path)
+    old = store.current()
+    assert old.version == 1
+
+    publish([{"id": 1, "rating": 9.0}, {"id": 2, "rating": 7.0}], path)
+    assert store.current().version == 2
+    assert store.current().lookup(1)["rating"] == 9.0
+    assert old.lookup(1)["rating"] == 5.0
+
+def test_enrich_fills_missing_fields_only():
+    """enrich() complète genres et disponibilité sans écraser les données du fournisseur"""
+    path = os.path.join(tempfile.mkdtemp(), "catalog.bin")
+    publish([{"id": 3, "genre_ids": [35], "streaming_services": ["disney"]}], path)
+    store = _make_store(path)
+
+    assert store.enrich({"id": 3, "provider": "TMDb"}) == {
+        "id": 3, "provider": "TMDb", "genre_ids": [35], "streaming_services": ["disney"]}
+    assert store.enrich({"id": 3, "provider": "TMDb", "genre_ids": [18]})["genre_ids"] == [18]
+    assert store.enrich({"id": 99, "provider": "TMDb"}) == {"id": 99, "provider": "TMDb"}
+
+def test_movie_and_series_with_same_id():
+    """Un film et une série TMDb de même identifiant sont deux éléments distincts"""
+    path = os.path.join(tempfile.mkdtemp(), "catalog.bin")
+    publish([
+        {"id": 1399, "media_type": "tv", "rating": 8.4, "genre_ids": [10765]},
+        {"id": 1399, "media_type": "movie", "rating": 6.1, "genre_ids": [28]},
+        {"id": 1400, "media_type": "movie", "rating": 5.0},
+        {"id": 12, "media_type": "tv", "rating": 7.0},
+    ], path)
+    store = _make_store(path)
+    features = store.current()
+
+    assert len(features) == 4
+    assert features.lookup(1399, "tv")["rating"] == 8.4
+    assert features.lookup(1399, "movie")["rating"] == 6.1
+    assert features.lookup(12, "tv")["media_type"] == "tv" and features.lookup(12, "movie") is None
+    assert store.enrich({"id": 1399, "provider": "TMDb", "media_type": "tv"})["genre_ids"] == [10765]
+    assert store.enrich({"id": 1399, "provider": "TMDb", "media_type": "movie"})["genre_ids"] == [28]
+
+def test_enrich_ignores_watchmode_ids():
+    """Un id Watchmode n'est pas un id TMDb : seul le tmdb_id de l'élément est cherché"""
+    path = os.path.join(tempfile.mkdtemp(), "catalog.bin")
+    publish([
+        {"id": 3173903, "media_type": "movie", "genre_ids": [27], "streaming_services": ["netflix"]},
+        {"id": 603, "media_type": "movie", "genre_ids": [28, 878], "streaming_services": ["disney"]},
+    ], path)
+    store = _make_store(path)
+
+    # Même valeur d'id qu'une ligne du catalogue, mais id Watchmode : inchangé
+    watchmode = {"id": 3173903, "provider": "Watchmode", "genre_names": ["Drame"]}
+    assert store.enrich(watchmode) == watchmode
+    # Avec son tmdb_id, l'élément Watchmode est complété par la bonne ligne
+    enriched = store.enrich({"id": 3173903, "provider": "Watchmode", "tmdb_id": 603})
+    assert enriched["streaming_services"] == ["disney"] and enriched["genre_ids"] == [28, 878]
+
+if __name__ == "__main__":
+    test_publish_and_lookup()
+    test_new_version_is_swapped_in()
+    test_enrich_fills_missing_fields_only()
+    test_movie_and_series_with_same_id()
+    test_enrich_ignores_watchmode_ids()
+    print("✅ Tests du catalogue partagé réussis")
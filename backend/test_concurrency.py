@@ -0,0 +1,33 @@
+"""
+Tests de l'exécution parallèle (pool partagé, appels imbriqués, délai global)
+"""
+
+import sys
+import os
+import time
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.concurrency import run_concurrently
+
+def test_nested_call_respects_timeout():
+    """Appel imbriqué depuis le pool partagé : le délai global n'attend pas les tâches en retard"""
+    def slow():
+        time.sleep(0.5)
+        return "lent"
+
+    def parent():
+        start = time.perf_counter()
+        outcomes = run_concurrently([lambda: "rapide", slow], timeout=0.1)
+        return outcomes, time.perf_counter() - start
+
+    [((outcomes, elapsed), error)] = run_concurrently([parent])
+    assert error is None
+    assert elapsed < 0.4
+    assert outcomes[0] == ("rapide", None)
+    assert outcomes[1][0] is None and outcomes[1][1] is not None
+
+if __name__ == "__main__":
+    test_nested_call_respects_timeout()
+    print("✅ Tests de l'exécution parallèle réussis")
@@ -0,0 +1,144 @@
+"""
+Tests du chargement groupé des détails TMDb (parallélisme borné, cache partagé, échéance)
+"""
+
+import sys
+import os
+import asyncio
+import threading
+import time
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.api_providers.detail_loader import DetailLoader
+
+class FakeTMDb:
+    """Détails TMDb simulés : latence par id, appels et simultanéité comptés"""
+
+    def __init__(self, latency=0.05, slow_ids=(), slow_latency=0.5, missing_ids=()):
+        self.latency = latency
+        self.slow_ids = set(slow_ids)
+        self.slow_latency = slow_latency
+        self.missing_ids = set(missing_ids)
+        self.calls = []
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def _details(self, item_id, content_type):
+        if item_id in self.missing_ids:
+            return {"error": "Erreur détails TMDb: 404"}
+        return {"id": item_id, "media_type": content_type, "genres": [{"id": 18, "name": "Drame"}]}
+
+    def _delay(self, item_id):
+        return self.slow_latency if item_id in self.slow_ids else self.latency
+
+    def get_details(self, item_id, content_type):
+        with self._lock:
+            self.calls.append((item_id, content_type))
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        time.sleep(self._delay(item_id))
+        with self._lock:
+            self.active -= 1
+        return self._details(item_id, content_type)
+
+    async def get_details_async(self, session, item_id, content_type):
+        self.calls.append((item_id, content_type))
+        await asyncio.sleep(self._delay(item_id))
+        return self._details(item_id, content_type)
+
+def test_bounded_fanout_and_shared_cache():
+    provider = FakeTMDb(latency=0.05, missing_ids={7})
+    loader = DetailLoader(provider, max_concurrency=5, deadline=5)
+    keys = [(i, "movie") for i in range(20)] + [(3, "movie"), (3, "tv")]
+
+    start = time.perf_counter()
+    batch = loader.load_many(keys)
+    elapsed = time.perf_counter() - start
+    # 21 appels distincts, 5 à la fois : ~5 allers-retours au lieu de 21
+    assert len(provider.calls) == 21 and provider.max_active <= 5
+    assert elapsed < 0.05 * 21 / 2
+    assert batch.pending == 0 and len(batch.details) == 20 and (7, "movie") not in batch.details
+    assert batch.details[(3, "tv")]["media_type"] == "tv"
+
+    # Deuxième lot : tout vient du cache, sauf l'erreur (jamais gardée)
+    again = loader.load_many(keys)
+    assert provider.calls[21:] == [(7, "movie")]
+    assert again.details == batch.details
+    assert loader.get(5, "movie") is batch.details[(5, "movie")] and len(provider.calls) == 22
+
+def test_deadline_returns_partial_details_and_late_calls_fill_cache():
+    provider = FakeTMDb(latency=0.01, slow_ids={2}, slow_latency=0.4)
+    loader = DetailLoader(provider, max_concurrency=10, deadline=0.15)
+
+    start = time.perf_counter()
+    batch = loader.load_many([(i, "movie") for i in range(5)])
+    assert time.perf_counter() - start < 0.35
+    assert batch.pending == 1 and sorted(key[0] for key in batch.details) == [0, 1, 3, 4]
+
+    # L'appel en retard termine en arrière-plan et remplit le cache
+    deadline = time.time() + 2
+    while loader.cache.get(loader._cache_key(2, "movie")) is None and time.time() < deadline:
+        time.sleep(0.02)
+    late = loader.load_many([(2, "movie")])
+    assert late.pending == 0 and late.details[(2, "movie")]["id"] == 2
+    assert len(provider.calls) == 5
+
+def test_async_batch_with_deadline():
+    provider = FakeTMDb(latency=0.02, slow_ids={1}, slow_latency=0.3)
+    loader = DetailLoader(provider, max_concurrency=2, deadline=0.15)
+
+    async def load():
+        first = await loader.load_many_async(None, [(0, "tv"), (1, "movie"), (2, "movie")])
+        await asyncio.sleep(0.3)
+        second = await loader.load_many_async(None, [(0, "tv"), (1, "movie")])
+        return first, second
+
+    first, second = asyncio.run(load())
+    assert first.pending == 1 and set(first.details) == {(0, "tv"), (2, "movie")}
+    assert second.pending == 0 and set(second.details) == {(0, "tv"), (1, "movie")}
+    assert len(provider.calls) == 3
+
+class StubAPIManager:
+    """Tendances TMDb simulées (un film, une série)"""
+
+    def __init__(self, provider):
+        self.detail_loader = DetailLoader(provider, deadline=0.15)
+
+    def get_trending_parallel(self, content_type="all", max_results=20):
+        return {"results": [
+            {"id": 1, "title": "Film", "media_type": "movie", "provider": "TMDb", "popularity": 50, "year": "2024"},
+            {"id": 2, "title": "Série", "media_type": "tv", "provider": "TMDb", "popularity": 40, "year": "2024"},
+        ], "providers_used": ["TMDb"]}
+
+def test_trending_enrichment_uses_media_type_and_skips_cache_when_partial():
+    from src.recommendation_engine_v2 import ModularRecommendationEngine
+    from src.search_index import SearchIndex
+    from src.suggest_index import SuggestIndex
+
+    provider = FakeTMDb(latency=0.01, slow_ids={2}, slow_latency=0.3)
+    engine = ModularRecommendationEngine()
+    engine.api_manager = StubAPIManager(provider)
+    engine.search_index = SearchIndex()
+    engine.suggest_index = SuggestIndex()
+
+    first = engine.get_trending_content()
+    assert sorted(provider.calls) == [(1, "movie"), (2, "tv")]
+    assert first["partial"] and first["results"][0]["detailed_info"]["id"] == 1
+    assert "detailed_info" not in first["results"][1]
+
+    # Réponse partielle non gardée : la suivante trouve le détail en retard dans le cache
+    time.sleep(0.3)
+    second = engine.get_trending_content()
+    assert "partial" not in second and second["results"][1]["detailed_info"]["media_type"] == "tv"
+    assert len(provider.calls) == 2
+    assert engine.get_trending_content() is second
+
+if __name__ == "__main__":
+    test_bounded_fanout_and_shared_cache()
+    test_deadline_returns_partial_details_and_late_calls_fill_cache()
+    test_async_batch_with_deadline()
+    test_trending_enrichment_uses_media_type_and_skips_cache_when_partial()
+    print("✅ Tests du chargement des détails réussis")
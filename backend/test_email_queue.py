@@ -0,0 +1,136 @@
+"""
+Tests de la file d'envoi d'emails
+Utilise un serveur SMTP local de substitution (sans réseau)
+"""
+
+import sys
+import os
+import time
+import smtplib
+import tempfile
+from email.mime.text import MIMEText
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.email_queue import EmailQueue, EmailWorker
+from src.email_service import EmailService
+
+class FakeSMTP:
+    """Serveur SMTP de substitution : enregistre connexions, logins et envois"""
+
+    connections = 0
+    sent = []
+    fail_next = 0
+
+    def __init__(self):
+        FakeSMTP.connections += 1
+        self.logged_in = True
+
+    def sendmail(self, sender, recipient, payload):
+        if FakeSMTP.fail_next:
+            FakeSMTP.fail_next -= 1
+            raise smtplib.SMTPServerDisconnected("connexion perdue")
+        FakeSMTP.sent.append((sender, recipient, payload))
+
+    def quit(self):
+        pass
+
+    @classmethod
+    def reset(cls):
+        cls.connections = 0
+        cls.sent = []
+        cls.fail_next = 0
+
+def _make_queue():
+    return EmailQueue(os.path.join(tempfile.mkdtemp(), "emails.sqlite3"))
+
+def test_batch_reuses_one_connection():
+    """Un lot de plusieurs emails n'ouvre qu'une connexion SMTP"""
+    FakeSMTP.reset()
+    queue = _make_queue()
+    worker = EmailWorker(queue, FakeSMTP)
+
+    for i in range(5):
+        queue.enqueue("app@example.com", f"user{i}@example.com", f"message {i}")
+
+    assert worker.process_batch() == 5
+    assert FakeSMTP.connections == 1
+    assert len(FakeSMTP.sent) == 5
+    assert queue.counts() == {"sent": 5}
+
+def test_failed_send_is_retried_with_backoff():
+    """Un échec remet l'email en file avec un délai, sans le perdre"""
+    FakeSMTP.reset()
+    FakeSMTP.fail_next = 2  # échec de l'envoi puis de la reconnexion
+    queue = _make_queue()
+    worker = EmailWorker(queue, FakeSMTP, base_retry_delay=0.0)
+
+    queue.enqueue("app@example.com", "user@example.com", "message")
+    worker.process_batch()
+    assert queue.counts() == {"pending": 1}
+
+    worker.process_batch()
+    assert queue.counts() == {"sent": 1}
+
+def test_gives_up_after_max_attempts():
+    """Après max_attempts échecs, l'email est marqué en échec"""
+    FakeSMTP.reset()
+    FakeSMTP.fail_next = 100
+    queue = _make_queue()
+    worker = EmailWorker(queue, FakeSMTP, base_retry_delay=0.0, max_attempts=3)
+
+    queue.enqueue("app@example.com", "user@example.com", "message")
+    for _ in range(3):
+        worker.process_batch()
+
+    assert queue.counts() == {"failed": 1}
+
+def test_queue_is_durable():
+    """Les emails en attente survivent à la recréation de la file (redémarrage)"""
+    path = os.path.join(tempfile.mkdtemp(), "emails.sqlite3")
+    EmailQueue(path).enqueue("app@example.com", "user@example.com", "message")
+
+    assert EmailQueue(path).counts() == {"pending": 1}
+
+def test_email_service_enqueues_instead_of_sending():
+    """EmailService ne contacte pas le serveur SMTP pendant la requête"""
+    FakeSMTP.reset()
+    queue = _make_queue()
+    service = EmailService(email_queue=queue)
+    service.sender_email = "app@example.com"
+    service._worker = EmailWorker(queue, FakeSMTP, poll_interval=60)
+    service._worker.ensure_started = lambda: None
+
+    message = MIMEText("Bonjour")
+    assert service._send_email(message, "user@example.com")
+    assert FakeSMTP.connections == 0
+    assert queue.counts() == {"pending": 1}
+
+def test_worker_started_at_boot_sends_queued_emails():
+    """Au démarrage du processus, les emails restés en file partent sans nouvel envoi"""
+    FakeSMTP.reset()
+    queue = _make_queue()
+    queue.enqueue("app@example.com", "user@example.com", "message")
+    service = EmailService(email_queue=queue)
+    assert not service.start_worker()  # SMTP non configuré : pas de worker
+
+    service.sender_email = "app@example.com"
+    service._worker = EmailWorker(queue, FakeSMTP, poll_interval=60)
+    try:
+        assert service.start_worker()
+        deadline = time.time() + 5
+        while queue.counts() != {"sent": 1} and time.time() < deadline:
+            time.sleep(0.02)
+        assert queue.counts() == {"sent": 1} and len(FakeSMTP.sent) == 1
+    finally:
+        service._worker.stop()
+
+if __name__ == "__main__":
+    test_batch_reuses_one_connection()
+    test_failed_send_is_retried_with_backoff()
+    test_gives_up_after_max_attempts()
+    test_queue_is_durable()
+    test_email_service_enqueues_instead_of_sending()
+    test_worker_started_at_boot_sends_queued_emails()
+    print("✅ Tests de la file d'emails réussis")
@@ -0,0 +1,90 @@
+"""
+Tests du codec JSON (orjson et repli sur le module json standard)
+"""
+
+import sys
+import os
+import json
+from datetime import datetime, timezone
+from unittest import mock
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from flask import Flask, jsonify
+
+from src import json_codec
+
+DATA = {
+    "titre": "Le Fabuleux Destin d'Amélie Poulain",
+    "résultats": [{"id": 2, "note": 7.5, "genres": ["Comédie", "Romance"]}, {"id": 1, "vide": {}}],
+    "liste_vide": [],
+    "actif": True,
+    "absent": None,
+}
+
+def both_backends():
+    """Exécute le test avec orjson puis avec le module json standard"""
+    yield json_codec.orjson
+    with mock.patch.object(json_codec, "orjson", None):
+        yield None
+
+def test_dumps_same_bytes_with_and_without_orjson():
+    outputs = []
+    for backend in both_backends():
+        outputs.append((
+            json_codec.dumps(DATA),
+            json_codec.dumps(DATA, sort_keys=True),
+            json_codec.dumps(DATA, sort_keys=True, indent=True),
+        ))
+        assert json_codec.backend_name() == ("orjson" if backend is not None else "json")
+    assert outputs[0] == outputs[1]
+
+    compact, sorted_keys, indented = outputs[0]
+    # UTF-8 sans échappement, compact, clés triées, indentation de 2 espaces
+    assert "Amélie".encode("utf-8") in compact and b"\\u00e9" not in compact
+    assert compact.startswith(b'{"titre":')
+    assert sorted_keys.startswith(b'{"absent":null,"actif":true,')
+    assert indented == json.dumps(DATA, ensure_ascii=False, sort_keys=True, indent=2).encode("utf-8")
+    assert json_codec.loads(compact) == DATA
+
+def test_fallback_when_orjson_cannot_encode():
+    """Entier de plus de 64 bits : orjson échoue, le module json prend le relais"""
+    data = {"grand": 2 ** 70, "date": datetime(2026, 10, 19, tzinfo=timezone.utc)}
+    for _ in both_backends():
+        encoded = json_codec.dumps(data, default=str)
+        assert encoded == b'{"grand":1180591620717411303424,"date":"2026-10-19 00:00:00+00:00"}'
+
+    # Objet vraiment non encodable : l'erreur du module json remonte
+    try:
+        json_codec.dumps({"objet": object()})
+    except TypeError:
+        pass
+    else:
+        raise AssertionError("TypeError attendue")
+
+def test_provider_matches_jsonify():
+    """Le fournisseur rapide produit les mêmes octets que le fournisseur par défaut (sans échappement)"""
+    data = dict(DATA, publie=datetime(2026, 10, 19, 12, 30, tzinfo=timezone.utc))
+
+    default_app = Flask("defaut")
+    default_app.json.ensure_ascii = False
+    with default_app.app_context():
+        expected = jsonify(data).get_data()
+        expected_sorted = default_app.json.dumps(data, sort_keys=True, indent=2)
+
+    for _ in both_backends():
+        app = Flask("rapide")
+        json_codec.init_json_provider(app)
+        with app.app_context():
+            assert jsonify(data).get_data() == expected
+            # Arguments non gérés par le codec : délégation au fournisseur par défaut
+            assert app.json.dumps(data, sort_keys=True, indent=2) == expected_sorted
+            assert app.json.loads(app.json.dumps(data)) == json.loads(expected)
+    assert b'"Mon, 19 Oct 2026 12:30:00 GMT"' in expected
+
+if __name__ == "__main__":
+    test_dumps_same_bytes_with_and_without_orjson()
+    test_fallback_when_orjson_cannot_encode()
+    test_provider_matches_jsonify()
+    print("✅ Tests du codec JSON réussis")
@@ -0,0 +1,80 @@
+"""
+Tests des métriques (/metrics) et de leur agrégation entre workers
+"""
+
+import sys
+import os
+import tempfile
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.metrics import Registry, archive_worker, merge_snapshots, quantile, render_text, write_snapshot
+
+def _worker_snapshot(pid, requests, latency):
+    registry = Registry()
+    counter = registry.counter("app_requests_total", "Requêtes", ("route",))
+    histogram = registry.histogram("app_duration_seconds", "Durée", ("route",), buckets=(0.1, 1.0))
+    for _ in range(requests):
+        counter.inc(route="search")
+        histogram.observe(latency, route="search")
+    registry.gauge("app_in_flight", "En cours", ("limit",), lambda: [(("search",), 2)])
+    return dict(registry.snapshot(), pid=pid)
+
+def test_workers_are_summed():
+    """Compteurs, tranches d'histogramme et fenêtres s'additionnent ; jauges des seuls workers vivants"""
+    text = render_text(merge_snapshots([
+        _worker_snapshot(os.getpid(), 3, 0.05),
+        _worker_snapshot(None, 1, 0.5),  # worker arrêté
+    ]))
+    assert 'app_requests_total{route="search"} 4' in text
+    assert 'app_requests_window{route="search",window="1m"} 4' in text
+    assert 'app_duration_seconds_bucket{route="search",le="0.1"} 3' in text
+    assert 'app_duration_seconds_bucket{route="search",le="+Inf"} 4' in text
+    assert 'app_duration_seconds_window_count{route="search",window="5m"} 4' in text
+    assert 'app_in_flight{limit="search"} 2' in text
+
+def test_archive_keeps_counters_of_exited_workers():
+    with tempfile.TemporaryDirectory() as directory:
+        write_snapshot(_worker_snapshot(999999, 2, 0.05), directory)
+        archive_worker(999999, directory)
+        archive_worker(999999, directory)  # déjà replié : sans effet
+        assert sorted(os.listdir(directory)) == ["archive.json"]
+
+        from src.metrics import read_snapshots
+        text = render_text(merge_snapshots(read_snapshots(directory)))
+        assert 'app_requests_total{route="search"} 2' in text
+        assert "app_in_flight" not in text
+
+def test_quantile_interpolation():
+    assert quantile(0.5, (0.1, 1.0), [10, 10, 0]) == 0.1
+    assert abs(quantile(0.75, (0.1, 1.0), [10, 10, 0]) - 0.55) < 1e-9
+
+class FailingAPIManager:
+    """Recherches en échec (exception), tendances en erreur fournisseur"""
+
+    async def search_content_async(self, query, content_type="all", max_results=20):
+        raise ConnectionError("TMDb injoignable")
+
+    async def get_trending_async(self, content_type="all", max_results=20):
+        return {"error": "Erreur TMDb: 503"}
+
+def test_candidate_search_failures_are_counted():
+    import asyncio
+    from src.metrics import candidate_search_failures
+    from src.recommendation_scoring import RecommendationEngine
+
+    before = dict(candidate_search_failures._values)
+    engine = RecommendationEngine(FailingAPIManager())
+    preferences = {"genres_likes": ["Action", "Drame"], "keywords_likes": []}
+    assert asyncio.run(engine.get_personalized_recommendations_async(preferences)) == []
+
+    counts = {key: value - before.get(key, 0) for key, value in candidate_search_failures._values.items()}
+    assert counts == {("search",): 2, ("trending",): 1}
+
+if __name__ == "__main__":
+    test_workers_are_summed()
+    test_archive_keeps_counters_of_exited_workers()
+    test_quantile_interpolation()
+    test_candidate_search_failures_are_counted()
+    print("✅ Tests des métriques réussis")
@@ -0,0 +1,64 @@
+"""
+Tests du profilage à la demande (jetons signés, artefacts)
+"""
+
+import sys
+import os
+import pstats
+import tempfile
+import time
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src import profiling, tracing
+from src.concurrency import run_concurrently
+
+def test_token_signature_and_expiry():
+    token = profiling.make_token("sample", 60, secret="secret")
+    assert profiling.verify_token(token, secret="secret") == "sample"
+    assert profiling.verify_token(token, secret="autre") is None
+    # Mode modifié : la signature ne correspond plus
+    assert profiling.verify_token(token.replace(".sample.", ".cprofile."), secret="secret") is None
+    assert profiling.verify_token(profiling.make_token("cprofile", -1, secret="secret"), secret="secret") is None
+    # Sans secret, le profilage est désactivé
+    assert profiling.verify_token(token, secret="") is None
+
+def test_cprofile_covers_pool_tasks_and_outbound_calls():
+    """Les tâches parallèles sont profilées et les appels http.* de la trace sont joints"""
+    def fetch_details():
+        time.sleep(0.02)
+        return 1
+
+    trace_token = tracing.start_trace("req-1", "GET test")
+    profile = profiling.RequestProfile("cprofile", "GET", "/api/search?q=x")
+    profile.begin()
+    run_concurrently([fetch_details] * 3)
+    tracing.record_span("http.TMDb", time.perf_counter() - 0.01, 0.01, endpoint="/search/multi")
+    with tempfile.TemporaryDirectory() as directory:
+        summary = profile.save(200, directory)
+        tracing.finish_trace(trace_token, 200)
+
+        stats = pstats.Stats(os.path.join(directory, summary["artifact"]))
+        calls = {name: row[1] for (_, _, name), row in stats.stats.items()}
+        assert calls["fetch_details"] == 3
+        assert summary["outbound_calls"][0]["endpoint"] == "/search/multi"
+        assert profiling.list_profiles(directory)[0]["outbound_calls"] == 1
+        assert profiling.artifact_path("../" + summary["id"], directory) is None
+
+def test_sampling_profiler_writes_collapsed_stacks():
+    sampler = profiling.SamplingProfiler(interval=0.001)
+    sampler.start()
+    deadline = time.perf_counter() + 0.05
+    while time.perf_counter() < deadline:
+        pass
+    sampler.stop()
+    lines = sampler.collapsed().splitlines()
+    assert lines and all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+    assert any("test_sampling_profiler_writes_collapsed_stacks" in line for line in lines)
+
+if __name__ == "__main__":
+    test_token_signature_and_expiry()
+    test_cprofile_covers_pool_tasks_and_outbound_calls()
+    test_sampling_profiler_writes_collapsed_stacks()
+    print("✅ Tests du profilage réussis")
@@ -0,0 +1,72 @@
+"""
+Tests du cache de réponses sérialisées (ETag / 304)
+"""
+
+import sys
+import os
+import gzip
+import json
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.response_cache import ResponseCache, etag_matches, is_cacheable, render
+
+def test_store_serializes_once_with_strong_etag():
+    """Le corps est sérialisé au stockage ; l'ETag dépend de la version et du contenu"""
+    cache = ResponseCache()
+    data = {"results": [{"id": i, "title": f"Film {i}"} for i in range(200)]}
+
+    entry = cache.store("trending|all|20|c1", "c1", data)
+    assert cache.get("trending|all|20|c1") is entry
+    assert json.loads(entry.body) == data
+    assert entry.etag.startswith("c1-")
+
+    other_version = cache.store("trending|all|20|c2", "c2", data)
+    assert other_version.etag != entry.etag
+
+def test_render_304_and_compression():
+    """If-None-Match à jour -> 304 sans corps ; sinon corps compressé une seule fois"""
+    cache = ResponseCache()
+    entry = cache.store("k", "c0", [{"id": i} for i in range(500)])
+
+    status, body, headers = render(entry, f'W/"{entry.etag}", "autre"', "gzip")
+    assert status == 304 and body == b""
+    assert headers["ETag"] == f'"{entry.etag}-gzip"'
+
+    status, body, headers = render(entry, '"perime"', "gzip")
+    assert status == 200 and headers["Content-Encoding"] == "gzip"
+    assert gzip.decompress(body) == entry.body
+    assert entry.encoded("gzip") is body
+
+    assert not etag_matches(None, entry.etag)
+
+def test_etag_depends_on_content_coding():
+    """Un ETag fort différent par encodage ; l'ETag de n'importe quelle variante revalide"""
+    cache = ResponseCache()
+    entry = cache.store("k", "c0", [{"id": i} for i in range(500)])
+
+    etags = {}
+    for accept_encoding in (None, "gzip", "br"):
+        status, _, headers = render(entry, None, accept_encoding)
+        assert status == 200
+        etags[accept_encoding] = headers["ETag"]
+    assert etags == {None: f'"{entry.etag}"', "gzip": f'"{entry.etag}-gzip"', "br": f'"{entry.etag}-br"'}
+
+    # Variante gzip revalidée par un client sans gzip : 304 avec l'ETag de la variante non compressée
+    status, _, headers = render(entry, etags["gzip"], None)
+    assert status == 304 and headers["ETag"] == etags[None] and "Content-Encoding" not in headers
+    assert not etag_matches(f'"{entry.etag}-deflate"', entry.etag)
+    assert not etag_matches('"c0-autre-gzip"', entry.etag)
+
+def test_errors_and_empty_results_are_not_cached():
+    assert not is_cacheable([])
+    assert not is_cacheable({"error": "Aucun résultat trouvé", "results": []})
+    assert is_cacheable({"results": [{"id": 1}]})
+
+if __name__ == "__main__":
+    test_store_serializes_once_with_strong_etag()
+    test_render_304_and_compression()
+    test_etag_depends_on_content_coding()
+    test_errors_and_empty_results_are_not_cached()
+    print("✅ Tests du cache de réponses réussis")
@@ -0,0 +1,164 @@
+"""
+Tests de l'index local de recherche (normalisation, BM25, confiance)
+"""
+
+import sys
+import os
+import threading
+import time
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.search_index import SearchIndex, fold, tokenize
+
+def tmdb_item(item_id, title, description="", popularity=10.0, media_type="movie", year="2001", **extra):
+    return {"id": item_id, "title": title, "description": description, "popularity": popularity,
+            "media_type": media_type, "year": year, "provider": "TMDb", "rating": 7.0, **extra}
+
+def test_french_folding():
+    assert fold("Amélie Poulain, cœur") == "amelie poulain, coeur"
+    assert tokenize("L'Été où j'ai grandi") == ["ete", "ou", "j", "ai", "grandi"]
+
+    index = SearchIndex()
+    index.add(tmdb_item(1, "Le Fabuleux Destin d'Amélie Poulain", original_title="Le Fabuleux Destin d'Amélie Poulain"))
+    assert [hit["id"] for hit in index.search("amelie").results] == [1]
+    assert [hit["id"] for hit in index.search("AMÉLIE poulain").results] == [1]
+    # Mots vides seuls : aucune recherche
+    assert index.search("le de la").results == []
+
+def test_bm25_fields_popularity_and_duplicates():
+    index = SearchIndex()
+    index.add_many([
+        tmdb_item(1, "Dune", "Un jeune noble sur une planète désertique", popularity=5),
+        tmdb_item(2, "Lawrence d'Arabie", "Une épopée dans les dunes du désert", popularity=50),
+        tmdb_item(3, "Dune", "Adaptation du roman de Frank Herbert", popularity=900, year="2021"),
+        tmdb_item(4, "Dune", "Série dérivée", popularity=40, media_type="tv", year="2000"),
+        tmdb_item(5, "Le Désert", "Une dune", popularity=900),
+        # Même titre, année et type qu'un résultat TMDb : doublon entre fournisseurs
+        dict(tmdb_item(1003, "Dune", "Adaptation du roman de Frank Herbert", popularity=80, year="2021"),
+             provider="Watchmode"),
+    ])
+    hits = index.search("dune")
+    ids = [hit["id"] for hit in hits.results]
+    # Titre > résumé (même très populaire), popularité à texte égal ; le
+    # doublon Watchmode est écarté ; pas de racinisation : « dunes » ne correspond pas
+    assert ids[0] == 3 and set(ids[:3]) == {1, 3, 4} and ids[3] == 5 and hits.total == 4
+    assert [hit["id"] for hit in index.search("dune", "tv").results] == [4]
+    # Le titre original et le résumé sont aussi indexés
+    assert [hit["id"] for hit in index.search("herbert").results] == [3]
+
+def test_confidence_eviction_and_concurrency():
+    index = SearchIndex(max_documents=50, min_results=3)
+    index.add_many(tmdb_item(i, f"Matrix {i}", popularity=i) for i in range(10))
+    assert index.search("matrix").confident
+    # Un terme absent du meilleur résultat : pas assez sûr, les fournisseurs sont interrogés
+    assert not index.search("matrix reloaded").confident
+    # Trop peu de résultats
+    assert not SearchIndex(min_results=3).search("matrix").confident
+
+    threads = [threading.Thread(target=index.add_many, args=([tmdb_item(1000 * t + i, f"Titre {i}")
+                                                              for i in range(100)],)) for t in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # Les plus anciens sont retirés, index et postings restent cohérents
+    assert len(index) == 50
+    assert index.search("matrix").results == []
+    assert index.search("titre").total == 50
+
+class StubAPIManager:
+    """Fournisseur TMDb simulé : compte les recherches"""
+
+    def __init__(self):
+        self.queries = []
+
+    def search_content_parallel(self, query, content_type="all", max_results=20):
+        self.queries.append(query)
+        return {"results": [tmdb_item(7, "Zorro", "Le justicier masqué", popularity=30),
+                            tmdb_item(8, "Le Masque de Zorro", popularity=60, year="1998")],
+                "providers_used": ["TMDb"]}
+
+def test_engine_answers_from_index_and_refreshes_in_background():
+    from src.recommendation_engine_v2 import ModularRecommendationEngine
+
+    engine = ModularRecommendationEngine()
+    engine.api_manager = StubAPIManager()
+    engine.search_index = SearchIndex(min_results=2)
+
+    # Requête froide : fournisseurs, résultats indexés
+    cold = engine.search_content("zorro")
+    assert cold["providers_used"] == ["TMDb"] and engine.api_manager.queries == ["zorro"]
+
+    # Même requête hors cache : réponse de l'index, fournisseurs en arrière-plan
+    engine.cache_manager.clear()
+    warm = engine.search_content("ZORRO")
+    assert warm["providers_used"] == ["index"]
+    assert {item["id"] for item in warm["results"]} == {7, 8}
+    deadline = time.time() + 5
+    while len(engine.api_manager.queries) < 2 and time.time() < deadline:
+        time.sleep(0.01)
+    assert engine.api_manager.queries == ["zorro", "ZORRO"]
+
+class RefreshingAPIManager(StubAPIManager):
+    """Le rafraîchissement (lent) trouve un titre de plus que la première recherche"""
+
+    detail_loader = None
+
+    def search_content_parallel(self, query, content_type="all", max_results=20):
+        results = super().search_content_parallel(query, content_type, max_results)
+        if len(self.queries) > 1:
+            time.sleep(0.1)
+            results["results"].append(tmdb_item(9, "La Légende de Zorro", popularity=45, year="2005"))
+        return results
+
+def test_refreshed_search_is_served_by_the_route():
+    """/api/search sert le classement rafraîchi, pas la réponse de l'index gardée en cache"""
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    import api
+    from src.auth import generate_jwt_token
+
+    with api.app.app_context():
+        api.db.create_all()
+    engine = api.modular_engine
+    api_manager, index = engine.api_manager, engine.search_index
+    engine.api_manager = RefreshingAPIManager()
+    engine.search_index = SearchIndex(min_results=2)
+    engine.clear_cache()
+    client = api.app.test_client()
+    headers = {"Authorization": f"Bearer {generate_jwt_token(1, 'alice')}"}
+
+    def search():
+        response = client.get("/api/search?q=zorro", headers=headers)
+        assert response.status_code == 200
+        return response.get_json()
+
+    try:
+        assert search()["providers_used"] == ["TMDb"]
+        # Réponse de l'index mise en cache ; les fournisseurs sont rappelés en arrière-plan
+        engine.clear_cache()
+        warm = search()
+        assert warm["providers_used"] == ["index"] and {item["id"] for item in warm["results"]} == {7, 8}
+
+        deadline = time.time() + 5
+        refreshed = search()
+        while refreshed["providers_used"] == ["index"] and time.time() < deadline:
+            time.sleep(0.02)
+            refreshed = search()
+        assert {item["id"] for item in refreshed["results"]} == {7, 8, 9}
+        assert refreshed["providers_used"] == ["TMDb", "index"]
+        # La dernière réponse connue (mode dégradé) est aussi la réponse rafraîchie
+        latest = engine.response_cache.latest("search|zorro|all|20")
+        assert latest is not None and b"La L" in latest.body
+    finally:
+        engine.api_manager, engine.search_index = api_manager, index
+        engine.clear_cache()
+
+if __name__ == "__main__":
+    test_french_folding()
+    test_bm25_fields_popularity_and_duplicates()
+    test_confidence_eviction_and_concurrency()
+    test_engine_answers_from_index_and_refreshes_in_background()
+    test_refreshed_search_is_served_by_the_route()
+    print("✅ Tests de l'index de recherche réussis")
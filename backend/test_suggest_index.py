@@ -0,0 +1,147 @@
+"""
+Tests des suggestions de titres pendant la saisie (préfixes, popularité, taille bornée)
+"""
+
+import sys
+import os
+import threading
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src.suggest_index import SuggestIndex, normalize_title, title_prefixes
+
+def tmdb_item(item_id, title, popularity=10.0, media_type="movie", year="2001", provider="TMDb"):
+    return {"id": item_id, "title": title, "popularity": popularity, "media_type": media_type,
+            "year": year, "provider": provider}
+
+def titles(suggestions):
+    return [suggestion["title"] for suggestion in suggestions]
+
+def test_prefixes_and_normalization():
+    assert normalize_title("Le Fabuleux Destin d'Amélie Poulain") == "le fabuleux destin d amelie poulain"
+    # Titre entier puis premiers mots significatifs (mots vides ignorés)
+    assert title_prefixes("le masque de zorro") == ["le masque de zorro", "masque de zorro", "zorro"]
+
+    index = SuggestIndex()
+    index.add_many([
+        tmdb_item(1, "Le Masque de Zorro", popularity=60, year="1998"),
+        tmdb_item(2, "Le Fabuleux Destin d'Amélie Poulain", popularity=80),
+        tmdb_item(3, "Zodiac", popularity=40, year="2007"),
+    ])
+    assert titles(index.suggest("le")) == ["Le Fabuleux Destin d'Amélie Poulain", "Le Masque de Zorro"]
+    assert titles(index.suggest("LE MASQUE D")) == ["Le Masque de Zorro"]
+    assert titles(index.suggest("masq")) == ["Le Masque de Zorro"]
+    assert titles(index.suggest("zo")) == ["Le Masque de Zorro", "Zodiac"]
+    assert titles(index.suggest("fabuleux destin")) == ["Le Fabuleux Destin d'Amélie Poulain"]
+    # Préfixe de mot seulement, pas de sous-chaîne
+    assert index.suggest("asque") == []
+    assert index.suggest("  ") == []
+
+def test_popularity_type_duplicates_and_incremental_updates():
+    index = SuggestIndex()
+    # Plus de SUGGEST_SCAN_LIMIT entrées : classement du préfixe gardé en cache
+    index.add_many(tmdb_item(i, f"Film {i}", popularity=i, media_type="movie" if i % 2 else "tv")
+                   for i in range(3000))
+    assert titles(index.suggest("f", limit=3)) == ["Film 2999", "Film 2998", "Film 2997"]
+    assert titles(index.suggest("fi", "tv", limit=2)) == ["Film 2998", "Film 2996"]
+    assert index.suggest("film 2999")[0] == {"id": 2999, "title": "Film 2999", "year": "2001", "type": "movie",
+                                             "provider": "TMDb", "popularity": 2999.0}
+
+    # Nouveau titre et doublon d'un autre fournisseur : classements en cache mis à jour
+    index.add(tmdb_item(5000, "Fantômes", popularity=10 ** 6))
+    index.add(tmdb_item(7000, "Fantomes", popularity=10, provider="Watchmode"))
+    assert titles(index.suggest("f", limit=3)) == ["Fantômes", "Film 2999", "Film 2998"]
+    # Popularité en baisse, titre renommé : plus en tête
+    index.add(tmdb_item(2999, "Film 2999", popularity=0))
+    index.add(tmdb_item(2998, "Autre histoire", popularity=2998, media_type="tv"))
+    assert titles(index.suggest("f", limit=3)) == ["Fantômes", "Film 2997", "Film 2996"]
+    assert titles(index.suggest("fi", "tv", limit=2)) == ["Film 2996", "Film 2994"]
+    assert titles(index.suggest("histoire")) == ["Autre histoire"]
+
+def test_size_is_bounded_by_popularity():
+    index = SuggestIndex(max_titles=100)
+    index.add_many(tmdb_item(i, f"Titre {i}", popularity=i) for i in range(150))
+    assert len(index) <= 100
+    assert index.suggest("titre 0") == []
+    assert titles(index.suggest("titre", limit=1)) == ["Titre 149"]
+
+def test_suggestions_during_concurrent_inserts():
+    """Lectures pendant les insertions (petits et gros lots) : tableau jamais lu en cours de modification"""
+    index = SuggestIndex()
+    index.add_many(tmdb_item(i, f"Film {i}", popularity=i) for i in range(2000))
+    errors = []
+
+    def write(offset):
+        try:
+            for batch in range(20):
+                size = 5 if batch % 2 else 100
+                start = offset + batch * 100
+                index.add_many(tmdb_item(i, f"Film {i}", popularity=i) for i in range(start, start + size))
+        except Exception as e:
+            errors.append(e)
+
+    def read():
+        try:
+            for _ in range(200):
+                assert index.suggest("film", limit=3)
+                index.suggest("f", "tv")
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=write, args=(10000 * (t + 1),)) for t in range(2)]
+    threads += [threading.Thread(target=read) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert errors == []
+    assert index._keys == sorted(index._keys)
+    assert titles(index.suggest("f", limit=1)) == ["Film 21904"]
+
+class StubAPIManager:
+    """Fournisseur TMDb simulé"""
+
+    def search_content_parallel(self, query, content_type="all", max_results=20):
+        return {"results": [dict(tmdb_item(8, "Le Masque de Zorro", popularity=60, year="1998"),
+                                 description="", rating=7.0)],
+                "providers_used": ["TMDb"]}
+
+def test_engine_suggests_titles_seen_in_searches():
+    from src.recommendation_engine_v2 import ModularRecommendationEngine
+    from src.search_index import SearchIndex
+
+    engine = ModularRecommendationEngine()
+    engine.api_manager = StubAPIManager()
+    engine.search_index = SearchIndex()
+    engine.suggest_index = SuggestIndex()
+
+    assert engine.suggest_titles("zor") == []
+    engine.search_content("zorro")
+    assert titles(engine.suggest_titles("zor")) == ["Le Masque de Zorro"]
+    assert engine.suggest_titles("zor", "series") == []
+
+def test_suggest_route_rejects_invalid_limit():
+    """limit non numérique : 400 et non 500 ; hors bornes : valeur par défaut"""
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    import api
+    from src.auth import generate_jwt_token
+
+    with api.app.app_context():
+        api.db.create_all()
+    client = api.app.test_client()
+    headers = {"Authorization": f"Bearer {generate_jwt_token(1, 'alice')}"}
+
+    response = client.get("/api/search/suggest?q=zor&limit=abc", headers=headers)
+    assert response.status_code == 400 and "limit" in response.get_json()["error"]
+    response = client.get("/api/search/suggest?q=zor&limit=500", headers=headers)
+    assert response.status_code == 200 and response.get_json()["query"] == "zor"
+
+if __name__ == "__main__":
+    test_prefixes_and_normalization()
+    test_popularity_type_duplicates_and_incremental_updates()
+    test_size_is_bounded_by_popularity()
+    test_suggestions_during_concurrent_inserts()
+    test_engine_suggests_titles_seen_in_searches()
+    test_suggest_route_rejects_invalid_limit()
+    print("✅ Tests des suggestions de titres réussis")
@@ -0,0 +1,77 @@
+"""
+Tests des traces par requête (Server-Timing, traces lentes)
+"""
+
+import sys
+import os
+import time
+
+# Ajouter le répertoire parent au chemin
+sys.path.append(os.path.dirname(os.path.abspath(__file__)))
+
+from src import tracing
+from src.concurrency import run_concurrently
+
+def test_parallel_spans_join_the_request_trace():
+    """Spans des tâches parallèles rattachés à la trace ; durée d'étape = temps réel, pas la somme"""
+    token = tracing.start_trace("req-1", "GET test")
+
+    def detail():
+        with tracing.stage("details"):
+            time.sleep(0.05)
+
+    with tracing.stage("scoring"):
+        run_concurrently([detail] * 4)
+    trace = tracing.finish_trace(token, 200)
+
+    timings = {timing["name"]: timing for timing in trace.stage_timings()}
+    assert timings["details"]["count"] == 4
+    assert 0.04 < timings["details"]["duration"] < 0.15
+    scoring_id = next(span["id"] for span in trace.spans if span["name"] == "scoring")
+    assert all(span["parent"] == scoring_id for span in trace.spans if span["name"] == "details")
+
+    header = trace.server_timing()
+    assert header.startswith("scoring;dur=") and 'details;dur=' in header and '"4 appels"' in header
+    assert header.split(", ")[-1].startswith("total;dur=")
+
+def test_span_outside_trace_is_noop():
+    with tracing.span("orphelin"):
+        pass
+    assert tracing.current_trace() is None
+
+def test_only_slowest_traces_are_kept():
+    buffer = tracing.SlowTraces(capacity=2)
+    for index, duration in enumerate([0.3, 0.1, 0.5, 0.2]):
+        trace = tracing.Trace(f"t{index}", "GET test")
+        trace.duration = duration
+        buffer.add(trace)
+    assert [trace["trace_id"] for trace in buffer.list()] == ["t2", "t0"]
+
+def test_traces_route_requires_profiling_token():
+    """/api/traces refuse un simple JWT utilisateur (403) ; le jeton de profilage signé l'ouvre"""
+    os.environ.setdefault("DATABASE_URL", "sqlite://")
+    from unittest import mock
+    import api
+    from src import profiling
+    from src.auth import generate_jwt_token
+
+    with api.app.app_context():
+        api.db.create_all()
+    client = api.app.test_client()
+    headers = {"Authorization": f"Bearer {generate_jwt_token(1, 'alice')}"}
+
+    with mock.patch.object(profiling, "PROFILING_SECRET", "secret"):
+        assert client.get("/api/traces", headers=headers).status_code == 403
+        headers["X-Profile"] = profiling.make_token("sample", 60, secret="autre")
+        assert client.get("/api/traces", headers=headers).status_code == 403
+
+        headers["X-Profile"] = profiling.make_token("admin", 60)
+        response = client.get("/api/traces", headers=headers)
+        assert response.status_code == 200 and "traces" in response.get_json()
+
+if __name__ == "__main__":
+    test_parallel_spans_join_the_request_trace()
+    test_span_outside_trace_is_noop()
+    test_only_slowest_traces_are_kept()
+    test_traces_route_requires_profiling_token()
+    print("✅ Tests des traces réussis")
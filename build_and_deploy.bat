@@ -19,6 +19,11 @@ if exist ..\backend\static rmdir /s /q ..\backend\static
 mkdir ..\backend\static
 xcopy /s /e /y dist\* ..\backend\static\
 
+echo Precompression des fichiers statiques...
+cd ..\backend
+python -m src.static_assets build static
+cd ..\frontend
+
 echo.
 echo 4. Build termine !
 echo Les fichiers sont prets dans backend\static\
@@ -11,6 +11,33 @@ const API_URL = (() => {
   return `${window.location.protocol}//${window.location.hostname}/api`;
 })();
 
+// Lit un flux text/event-stream et appelle onEvent(événement, données JSON)
+async function readEventStream(response, onEvent) {
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  
+  for (;;) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+    
+    let separator;
+    while ((separator = buffer.indexOf('\n\n')) !== -1) {
+      const block = buffer.slice(0, separator);
+      buffer = buffer.slice(separator + 2);
+      
+      let event = 'message';
+      let data = '';
+      for (const line of block.split('\n')) {
+        if (line.startsWith('event: ')) event = line.slice(7);
+        else if (line.startsWith('data: ')) data += line.slice(6);
+      }
+      if (data) onEvent(event, JSON.parse(data));
+    }
+  }
+}
+
 export default createStore({
   state: {
     currentUser: JSON.parse(localStorage.getItem('user')),
@@ -77,22 +104,22 @@ export default createStore({
     },
     
     // Récupérer les recommandations pour l'utilisateur actuel
+    // En flux (SSE) : le classement provisoire s'affiche dès les premiers
+    // résultats puis se met à jour ; repli sur la route classique sinon
     async fetchRecommendations({ commit, state }, { contentType = 'all', n = 5, streamingServices = [] }) {
       if (!state.currentUser) return;
       commit('setLoading', true);
       commit('setError', null);
       try {
-        // Construction de l'URL avec gestion des services de streaming
-        let url = `${API_URL}/recommendations/${state.currentUser.id}?content_type=${contentType}&n=${n}`;
+        // Construction des paramètres avec gestion des services de streaming
+        let query = `content_type=${contentType}&n=${n}`;
         
         // Support du format moderne streamingServices (liste)
         if (streamingServices && streamingServices.length > 0) {
           // Utiliser le nouveau paramètre streaming_services au lieu de streaming_service
-          url += `&streaming_services=${encodeURIComponent(streamingServices.join(','))}`;
+          query += `&streaming_services=${encodeURIComponent(streamingServices.join(','))}`;
         }
         
-        console.log('🔍 Fetching recommendations from:', url);
-        
         // Ajouter l'authentification si nécessaire
         const headers = {};
         const token = localStorage.getItem('auth_token');
@@ -100,9 +127,28 @@ export default createStore({
           headers['Authorization'] = `Bearer ${token}`;
         }
         
-        const response = await axios.get(url, { headers });
-        console.log('✅ Recommendations received:', response.data);
+        const baseUrl = `${API_URL}/recommendations/${state.currentUser.id}`;
+        
+        // EventSource ne permet pas d'envoyer l'en-tête Authorization : fetch + lecture du flux
+        if (window.fetch && window.ReadableStream && window.TextDecoder) {
+          const response = await fetch(`${baseUrl}/stream?${query}`, { headers });
+          if (response.ok && response.body) {
+            await readEventStream(response, (event, data) => {
+              if (event === 'ranking' || event === 'complete') {
+                commit('setRecommendations', data.items);
+                // Le spinner disparaît dès le premier classement
+                if (data.items.length > 0 || event === 'complete') {
+                  commit('setLoading', false);
+                }
+              } else if (event === 'error') {
+                throw new Error(data.error);
+              }
+            });
+            return;
+          }
+        }
         
+        const response = await axios.get(`${baseUrl}?${query}`, { headers });
         commit('setRecommendations', response.data);
       } catch (error) {
         console.error('❌ Error fetching recommendations:', error);
@@ -112,6 +158,57 @@ export default createStore({
       }
     },
     
+    // Charger en une seule requête (/api/batch) les données d'une page :
+    // genres, services, utilisateur courant et, si demandé, ses recommandations
+    async loadPageData({ commit, state }, { genres = true, services = true, recommendations = null } = {}) {
+      commit('setLoading', true);
+      commit('setError', null);
+      
+      const requests = [];
+      if (genres) requests.push({ id: 'genres', path: '/api/genres' });
+      if (services) requests.push({ id: 'services', path: '/api/services' });
+      if (state.currentUser) {
+        requests.push({ id: 'user', path: `/api/users/${state.currentUser.id}` });
+        if (recommendations) {
+          const { contentType = 'all', n = 5, streamingServices = [] } = recommendations;
+          const params = { content_type: contentType, n };
+          if (streamingServices.length > 0) {
+            params.streaming_services = streamingServices.join(',');
+          }
+          requests.push({ id: 'recommendations', path: `/api/recommendations/${state.currentUser.id}`, params });
+        }
+      }
+      
+      try {
+        const headers = {};
+        const token = localStorage.getItem('auth_token');
+        if (token) {
+          headers['Authorization'] = `Bearer ${token}`;
+        }
+        
+        const response = await axios.post(`${API_URL}/batch`, { requests }, { headers });
+        
+        for (const { id, status, body } of response.data.responses) {
+          if (status !== 200) {
+            console.error(`❌ Batch ${id}:`, body);
+            if (id === 'recommendations') {
+              commit('setError', `Erreur lors de la récupération des recommandations: ${body.error}`);
+            }
+            continue;
+          }
+          if (id === 'genres') commit('setGenres', body);
+          else if (id === 'services') commit('setStreamingServices', body);
+          else if (id === 'user') commit('setCurrentUser', body);
+          else if (id === 'recommendations') commit('setRecommendations', body);
+        }
+      } catch (error) {
+        console.error('❌ Error loading page data:', error);
+        commit('setError', `Erreur lors du chargement: ${error.response?.data?.error || error.message}`);
+      } finally {
+        commit('setLoading', false);
+      }
+    },
+    
     // Récupérer les genres disponibles
     async fetchGenres({ commit }) {
       commit('setLoading', true);